@@ -35,6 +35,11 @@ from qhana_plugin_runner.db.models.tasks import (
     TaskLink,
     TaskUpdateSubscription,
 )
+from qhana_plugin_runner.plugin_utils.array_transport import (
+    accepts_binary,
+    get_request_arrays,
+    make_binary_response,
+)
 from qhana_plugin_runner.tasks import (
     TASK_STEPS_CHANGED,
     add_step,
@@ -44,17 +49,29 @@ from qhana_plugin_runner.tasks import (
 
 from . import HINGELOSS_BLP, HingeLoss
 from .schemas import (
+    BatchEvaluateRequestSchema,
+    BatchLossResponseSchema,
     CallbackUrl,
     CallbackUrlSchema,
+    CombinedResponseSchema,
     EvaluateRequestSchema,
     EvaluateSchema,
+    GradientResponseSchema,
     HyperparamterInputData,
     HyperparamterInputSchema,
     LossResponseSchema,
     PassDataSchema,
     WeightsResponseSchema,
 )
-from .tasks import clear_task_data, hinge_loss, load_data, load_data_from_db
+from .tasks import (
+    clear_task_data,
+    hinge_loss,
+    hinge_loss_and_gradient,
+    hinge_loss_batch,
+    hinge_loss_gradient,
+    load_data,
+    load_data_from_db,
+)
 
 
 @HINGELOSS_BLP.route("/")
@@ -225,8 +242,38 @@ class SetupProcess(MethodView):
                 _external=True,
             ),
         )
+        calc_grad_link = TaskLink(
+            db_task,
+            type="of-evaluate-gradient",
+            href=url_for(
+                f"{HINGELOSS_BLP.name}.{CalcGradientEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
+        calc_loss_and_grad_link = TaskLink(
+            db_task,
+            type="of-evaluate-combined",
+            href=url_for(
+                f"{HINGELOSS_BLP.name}.{CalcLossAndGradEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
+        calc_loss_batch_link = TaskLink(
+            db_task,
+            type="of-evaluate-batch",
+            href=url_for(
+                f"{HINGELOSS_BLP.name}.{CalcLossBatchEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
         DB.session.add(weights_link)
         DB.session.add(calc_loss_link)
+        DB.session.add(calc_grad_link)
+        DB.session.add(calc_loss_and_grad_link)
+        DB.session.add(calc_loss_batch_link)
 
         subscription.save()
 
@@ -450,33 +497,124 @@ class WeightsEndpoint(MethodView):
         return {"weights": db_task.data.get("weights", -1)}
 
 
+def _get_weights(evaluate_input: dict) -> np.ndarray:
+    """Get the weights from a binary (application/octet-stream) or json request body."""
+    try:
+        arrays = get_request_arrays()
+    except ValueError as err:
+        abort(HTTPStatus.BAD_REQUEST, message=str(err))
+    if arrays is not None:
+        if len(arrays) != 1:
+            abort(HTTPStatus.BAD_REQUEST, message="Expected exactly one weights array!")
+        return arrays[0]
+    if "weights" not in evaluate_input:
+        abort(HTTPStatus.BAD_REQUEST, message="No weights given!")
+    try:
+        return np.array(evaluate_input["weights"], dtype=float)
+    except ValueError:
+        abort(
+            HTTPStatus.BAD_REQUEST, message="All weight vectors must have the same size!"
+        )
+
+
+def _prepare_data(db_id: int, evaluate_input: dict):
+
+    db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+    if db_task is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        abort(HTTPStatus.NOT_FOUND, message=msg)
+
+    assert isinstance(db_task.data, dict)
+
+    weights = _get_weights(evaluate_input)
+    features = load_data_from_db(db_task.data["features_key"])
+    target = load_data_from_db(db_task.data["target_key"])
+
+    if weights.ndim == 0 or weights.shape[-1] != features.shape[1]:
+        msg = f"Expected {features.shape[1]} weights per weight vector!"
+        abort(HTTPStatus.BAD_REQUEST, message=msg)
+
+    return weights, features, target, db_task.data["c"]
+
+
 @HINGELOSS_BLP.route("/task/<int:db_id>/loss/")
 class CalcLossEndpoint(MethodView):
     """Endpoint for the loss calculation."""
 
     @HINGELOSS_BLP.response(HTTPStatus.OK, LossResponseSchema())
     @HINGELOSS_BLP.arguments(
-        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=True
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
     )
     @HINGELOSS_BLP.require_jwt("jwt", optional=True)
     def post(self, input_data: dict, db_id: int) -> dict:
         """Calculate the loss given the specific weights."""
 
-        db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-        if db_task is None:
-            msg = f"Could not load task data with id {db_id} to read parameters!"
-            abort(HTTPStatus.NOT_FOUND, message=msg)
+        weights, features, target, c = _prepare_data(db_id, input_data)
 
-        assert isinstance(db_task.data, dict)
+        loss = hinge_loss(X=features, y=target, w=weights, C=c)
+        if accepts_binary():
+            return make_binary_response(loss)
+        return {"loss": loss}
 
-        weights = np.array(input_data["weights"])
-        features = load_data_from_db(db_task.data["features_key"])
-        target = load_data_from_db(db_task.data["target_key"])
 
-        loss = hinge_loss(
-            X=features,
-            y=target,
-            w=weights,
-            C=db_task.data["c"],
-        )
-        return {"loss": loss}
+@HINGELOSS_BLP.route("/task/<int:db_id>/gradient/")
+class CalcGradientEndpoint(MethodView):
+    """Endpoint for the gradient calculation."""
+
+    @HINGELOSS_BLP.response(HTTPStatus.OK, GradientResponseSchema())
+    @HINGELOSS_BLP.arguments(
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @HINGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the (sub)gradient given the specific weights."""
+
+        weights, features, target, c = _prepare_data(db_id, input_data)
+
+        gradient = hinge_loss_gradient(X=features, y=target, w=weights, C=c)
+        if accepts_binary():
+            return make_binary_response(gradient)
+        return {"gradient": gradient.tolist()}
+
+
+@HINGELOSS_BLP.route("/task/<int:db_id>/loss-and-gradient/")
+class CalcLossAndGradEndpoint(MethodView):
+    """Endpoint for the loss and gradient calculation."""
+
+    @HINGELOSS_BLP.response(HTTPStatus.OK, CombinedResponseSchema())
+    @HINGELOSS_BLP.arguments(
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @HINGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the loss and the (sub)gradient given the specific weights."""
+
+        weights, features, target, c = _prepare_data(db_id, input_data)
+
+        loss, gradient = hinge_loss_and_gradient(X=features, y=target, w=weights, C=c)
+        if accepts_binary():
+            return make_binary_response(loss, gradient)
+        return {"loss": loss, "gradient": gradient.tolist()}
+
+
+@HINGELOSS_BLP.route("/task/<int:db_id>/loss-batch/")
+class CalcLossBatchEndpoint(MethodView):
+    """Endpoint for the loss calculation of many weight vectors."""
+
+    @HINGELOSS_BLP.response(HTTPStatus.OK, BatchLossResponseSchema())
+    @HINGELOSS_BLP.arguments(
+        BatchEvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @HINGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the losses given a list of weight vectors."""
+
+        weights, features, target, c = _prepare_data(db_id, input_data)
+
+        if weights.ndim != 2:
+            abort(HTTPStatus.BAD_REQUEST, message="Expected a list of weight vectors!")
+
+        losses = hinge_loss_batch(X=features, y=target, W=weights, C=c)
+        if accepts_binary():
+            return make_binary_response(losses)
+        return {"losses": losses.tolist()}
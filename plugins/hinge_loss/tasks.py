@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from functools import lru_cache
 from io import BytesIO
 from typing import Optional
 
@@ -23,6 +22,7 @@ from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.db import DB
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.db.models.virtual_plugins import DataBlob
+from qhana_plugin_runner.plugin_utils.array_cache import get_array_cache
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     ensure_array,
     load_entities,
@@ -34,6 +34,10 @@ from . import HingeLoss
 TASK_LOGGER = get_task_logger(__name__)
 
 
+BATCH_CHUNK_ELEMENTS = 2**22
+"""Maximum number of scores (samples x weight vectors) computed at once by :py:func:`hinge_loss_batch`."""
+
+
 def hinge_loss(w, X, y, C=1.0):
     """
     Hinge loss function for binary classification.
@@ -58,13 +62,89 @@ def hinge_loss(w, X, y, C=1.0):
         The hinge loss.
     """
     n_samples, _ = X.shape
-    loss = 0.0
-    for i in range(n_samples):
-        score = np.dot(w, X[i])
-        loss += max(0, 1 - y[i] * score)
-    loss = C * loss / n_samples  # regularization term
+    margins = np.maximum(0, 1 - y * (X @ w))
+    loss = C * margins.sum() / n_samples  # regularization term
     loss += 0.5 * np.dot(w, w)  # l2 regularization
-    return loss
+    return float(loss)
+
+
+def hinge_loss_and_gradient(w, X, y, C=1.0):
+    """
+    Hinge loss and its subgradient with respect to the weights.
+
+    Samples with a margin of exactly 1 contribute no gradient.
+
+    Parameters
+    ----------
+    w : 1-D array
+        Weight vector.
+
+    X : 2-D array
+        Input data, shape (n_samples, n_features).
+
+    y : 1-D array
+        Output data, shape (n_samples, ).
+
+    C : float
+        Regularization parameter.
+
+    Returns
+    -------
+    tuple of float and 1-D array
+        The hinge loss and the subgradient, shape (n_features, ).
+    """
+    n_samples, _ = X.shape
+    margins = 1 - y * (X @ w)
+    active = margins > 0
+    loss = C * margins[active].sum() / n_samples + 0.5 * np.dot(w, w)
+    gradient = w - (C / n_samples) * ((y * active) @ X)
+    return float(loss), gradient
+
+
+def hinge_loss_gradient(w, X, y, C=1.0):
+    """
+    Subgradient of the hinge loss with respect to the weights.
+
+    See :py:func:`hinge_loss_and_gradient`.
+    """
+    return hinge_loss_and_gradient(w, X, y, C)[1]
+
+
+def hinge_loss_batch(W, X, y, C=1.0):
+    """
+    Hinge loss of many weight vectors at once.
+
+    The scores of all weight vectors are computed as one matrix product
+    (in chunks of samples to bound the memory usage).
+
+    Parameters
+    ----------
+    W : 2-D array
+        Weight vectors, shape (n_weight_vectors, n_features).
+
+    X : 2-D array
+        Input data, shape (n_samples, n_features).
+
+    y : 1-D array
+        Output data, shape (n_samples, ).
+
+    C : float
+        Regularization parameter.
+
+    Returns
+    -------
+    1-D array
+        The hinge loss of every weight vector, shape (n_weight_vectors, ).
+    """
+    n_samples, _ = X.shape
+    chunk_size = max(1, BATCH_CHUNK_ELEMENTS // max(1, len(W)))
+    margin_sums = np.zeros(len(W))
+    for start in range(0, n_samples, chunk_size):
+        scores = X[start : start + chunk_size] @ W.T
+        scores *= -y[start : start + chunk_size, None]
+        scores += 1
+        margin_sums += np.maximum(scores, 0, out=scores).sum(axis=0)
+    return C * margin_sums / n_samples + 0.5 * np.einsum("ij,ij->i", W, W)
 
 
 @CELERY.task(name=f"{HingeLoss.instance.identifier}.load_data", bind=True)
@@ -100,6 +180,8 @@ def load_data(self, db_id: int):
         x_dump = BytesIO()
         np.save(x_dump, x_array, allow_pickle=False)
         DataBlob.set_value(HingeLoss.instance.name, key_x, x_dump.getvalue())
+        # remove outdated cached data of previous uploads
+        get_array_cache().remove(HingeLoss.instance.name, key_x)
         task_data.data["features_key"] = key_x
         task_data.data["weights"] = x_array.shape[1]
         del data  # clear large data from memory faster
@@ -120,6 +202,8 @@ def load_data(self, db_id: int):
         y_dump = BytesIO()
         np.save(y_dump, y_array, allow_pickle=False)
         DataBlob.set_value(HingeLoss.instance.name, key_y, y_dump.getvalue())
+        # remove outdated cached data of previous uploads
+        get_array_cache().remove(HingeLoss.instance.name, key_y)
         task_data.data["target_key"] = key_y
         del data  # clear large data from memory faster
         del y_array
@@ -139,30 +223,32 @@ def clear_task_data(db_id: int):
 
     assert isinstance(task_data.data, dict)
 
-    # clear the complete cache as the data is no longer required in memory
-    # may slow down other jobs running at the same time
-    load_data_from_db.cache_clear()
+    array_cache = get_array_cache()
 
     for key in ("features_key", "target_key"):
         data_key = task_data.data[key]
-        # clear blob data that is no longer needed
+        # clear cached and blob data that is no longer needed
+        array_cache.remove(HingeLoss.instance.name, data_key)
         DataBlob.delete_value(HingeLoss.instance.name, data_key)
     DB.session.commit()
 
     return "completed objective function task"
 
 
-@lru_cache(maxsize=8)  # values may be large so avoid excessive caching...
 def load_data_from_db(key: str) -> np.ndarray:
     """Load a numpy array from the database given the database key.
 
-    Results of this function are cached for maximum efficiency!
+    The array is cached in a memory mapped file that is shared by all worker
+    processes (see :py:mod:`~qhana_plugin_runner.plugin_utils.array_cache`).
 
     Args:
         key (str): the key the array is stored under
 
     Returns:
-        np.ndarray: the numpy array
+        np.ndarray: the (read-only) numpy array
     """
-    data = BytesIO(DataBlob.get_value(HingeLoss.instance.name, key))
-    return np.load(data, allow_pickle=False)
+    return get_array_cache().get_array(
+        HingeLoss.instance.name,
+        key,
+        lambda: DataBlob.get_value(HingeLoss.instance.name, key),
+    )
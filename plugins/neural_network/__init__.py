@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from os import environ
 from typing import Optional
 
 from flask import Flask
@@ -32,6 +33,22 @@ NN_BLP = SecurityBlueprint(
 
 
 class NeuralNetwork(QHAnaPluginBase):
+    """Neural network objective function plugin.
+
+    The number of threads torch uses per worker process can be limited with the
+    `NN_TORCH_THREADS` config key (or environment variable) to avoid
+    oversubscribing the cpus when several worker processes evaluate networks
+    at the same time (e.g. with celery concurrency > 1). A good value is the
+    number of cpus divided by the number of worker processes. Defaults to 0,
+    which keeps the torch default.
+
+    Evaluations with many samples can be split into shards that are evaluated
+    by a pool of worker processes. Set the `NN_SHARD_PROCESSES` config key (or
+    environment variable) to the number of processes of the pool. Defaults to
+    0, which disables sharding. Sharding is not available in daemonic processes
+    (e.g. celery prefork workers).
+    """
+
     name = _plugin_name
     version = __version__
     description = "Neural Network objective-function plugin."
@@ -39,6 +56,13 @@ class NeuralNetwork(QHAnaPluginBase):
 
     def __init__(self, app: Optional[Flask]) -> None:
         super().__init__(app)
+        config = app.config if app is not None else {}
+        self.torch_threads = int(
+            environ.get("NN_TORCH_THREADS", config.get("NN_TORCH_THREADS", 0))
+        )
+        self.shard_processes = int(
+            environ.get("NN_SHARD_PROCESSES", config.get("NN_SHARD_PROCESSES", 0))
+        )
 
     def get_api_blueprint(self):
         return NN_BLP
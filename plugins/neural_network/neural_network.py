@@ -11,12 +11,30 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+"""The neural network of the objective function and its (sharded) evaluation.
 
+Loss and gradient can be evaluated on a minibatch of the samples (see
+:py:func:`minibatch_indices`) and split into shards that are evaluated by a
+pool of worker processes (see :py:func:`evaluate_sharded`). The data tensors
+are passed to the workers through shared memory, only the weights and the
+sample indices are copied.
+"""
+
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
 from torch import nn
 
+SHARD_MIN_SAMPLES = 2**14
+"""The minimum number of samples per shard, smaller evaluations are not split."""
+
 
 class NN(nn.Module):
     def __init__(self, input_dim: int, hidden_dim: int):
@@ -32,45 +50,231 @@ class NN(nn.Module):
         return self.linear_relu_stack(x)
 
     def set_weights(self, params: np.ndarray):
-        index = 0
-        for param in self.parameters():
-            number_of_elements = param.data.numel()
-            param.data = torch.tensor(
-                params[index : index + number_of_elements], dtype=torch.float32
-            ).view_as(param.data)
-            index += number_of_elements
+        """
+        Sets all parameters from one flat weight vector with a single conversion.
+        """
+        vector = torch.as_tensor(params, dtype=torch.float32)
+        if vector.numel() != self.number_of_weights:
+            raise ValueError(
+                f"Expected {self.number_of_weights} weights, got {vector.numel()}!"
+            )
+        nn.utils.vector_to_parameters(vector, self.parameters())
 
-    def get_loss(self, input_data: torch.Tensor, target_data: torch.Tensor):
+    @property
+    def number_of_weights(self) -> int:
+        return sum(p.numel() for p in self.parameters())
+
+    def _mse_loss(self, input_data: torch.Tensor, target_data: torch.Tensor):
         # Compute the output of the network
         output = self(input_data)
+        # Compute the mean squared error loss (target must have the shape of the output)
+        return torch.mean(torch.square(output - target_data.view_as(output)))
 
-        # Compute the mean squared error loss
-        loss = torch.mean((output - target_data) * (output - target_data))
-
+    def get_loss(self, input_data: torch.Tensor, target_data: torch.Tensor):
+        with torch.no_grad():
+            loss = self._mse_loss(input_data, target_data)
         return loss.item()
 
     def get_gradient(self, input_data: torch.Tensor, target_data: torch.Tensor):
-        # Zero the existing gradients
-        self.zero_grad()
+        return self.get_loss_and_gradient(input_data, target_data)[1]
 
-        output = self(input_data)
-        loss = torch.mean((output - target_data) * (output - target_data))
-        loss.backward()
-        grads = np.concatenate(
-            [p.grad.data.cpu().numpy().flatten() for p in self.parameters()]
-        ).astype(np.float64)
+    def get_loss_and_gradient(self, input_data: torch.Tensor, target_data: torch.Tensor):
+        parameters = list(self.parameters())
+        loss = self._mse_loss(input_data, target_data)
+        # compute the gradients directly instead of accumulating them in .grad
+        grads = torch.autograd.grad(loss, parameters)
+        grads = torch.cat([g.reshape(-1) for g in grads]).numpy().astype(np.float64)
 
-        return grads
+        return loss.item(), grads
 
-    def get_loss_and_gradient(self, input_data: torch.Tensor, target_data: torch.Tensor):
-        # Zero the existing gradients
-        self.zero_grad()
 
-        output = self(input_data)
-        loss = torch.mean((output - target_data) * (output - target_data))
-        loss.backward()
-        grads = np.concatenate(
-            [p.grad.data.cpu().numpy().flatten() for p in self.parameters()]
-        ).astype(np.float64)
+def set_torch_threads(threads: int):
+    """Limit the number of threads torch uses for the operators of this process.
 
-        return loss.item(), grads
+    Args:
+        threads (int): the number of threads, 0 keeps the torch default
+    """
+    if threads > 0 and torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+
+@lru_cache(maxsize=4)
+def _epoch_permutation(n_samples: int, seed: int, epoch: int) -> np.ndarray:
+    permutation = np.random.default_rng((seed, epoch)).permutation(n_samples)
+    permutation.setflags(write=False)
+    return permutation
+
+
+def minibatch_indices(
+    n_samples: int, batch_size: int, seed: int, step: int
+) -> np.ndarray:
+    """Get the indices of the samples in the minibatch of an optimization step.
+
+    The samples are shuffled at the start of every epoch with a random generator
+    seeded with ``(seed, epoch)``, so the same seed and step always select the
+    same minibatch and every sample is used once per epoch. The last minibatch
+    of an epoch may be smaller than the batch size.
+
+    Args:
+        n_samples (int): the number of samples in the dataset
+        batch_size (int): the number of samples per minibatch
+        seed (int): the seed of the shuffling
+        step (int): the index of the optimization step, counted over all epochs
+
+    Returns:
+        np.ndarray: the (read-only) indices of the samples in the minibatch
+    """
+    batches_per_epoch = -(-n_samples // batch_size)
+    epoch, batch = divmod(step, batches_per_epoch)
+    permutation = _epoch_permutation(n_samples, seed, epoch)
+    return permutation[batch * batch_size : (batch + 1) * batch_size]
+
+
+_POOL_LOCK = Lock()
+_POOL: Optional[Tuple[int, int, ProcessPoolExecutor]] = None  # (pid, processes, pool)
+
+_WORKER_NETWORKS: Dict[Tuple[int, int], NN] = {}
+
+
+def _init_shard_worker(threads: int):
+    # every worker only evaluates one shard at a time, more threads would oversubscribe the cpus
+    torch.set_num_threads(max(threads, 1))
+
+
+def _can_start_workers() -> bool:
+    # daemonic processes (e.g. celery prefork workers) are not allowed to have children
+    return not multiprocessing.current_process().daemon
+
+
+def _get_pool(processes: int) -> Optional[ProcessPoolExecutor]:
+    """Get the shard worker pool of this process, None if no worker processes can be started."""
+    global _POOL
+    if processes < 2 or not _can_start_workers():
+        return None
+    with _POOL_LOCK:
+        if _POOL is not None:
+            pid, pool_processes, pool = _POOL
+            if pid == os.getpid() and pool_processes == processes:
+                return pool
+            if pid == os.getpid():
+                pool.shutdown(wait=False)
+        threads = max(torch.get_num_threads() // processes, 1)
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            # forking after torch initialized its thread pools can deadlock the workers
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_shard_worker,
+            initargs=(threads,),
+        )
+        _POOL = (os.getpid(), processes, pool)
+        return pool
+
+
+@atexit.register
+def _shutdown_pool():
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL[0] == os.getpid():
+            _POOL[2].shutdown(wait=False, cancel_futures=True)
+
+
+def _evaluate_shard(
+    dimensions: Tuple[int, int],
+    weights: np.ndarray,
+    features: torch.Tensor,
+    target: torch.Tensor,
+    indices: Optional[np.ndarray],
+    with_gradient: bool,
+) -> Tuple[float, Optional[np.ndarray], int]:
+    network = _WORKER_NETWORKS.get(dimensions)
+    if network is None:
+        network = _WORKER_NETWORKS.setdefault(dimensions, NN(*dimensions))
+    network.set_weights(weights)
+    if indices is not None:
+        index = torch.from_numpy(indices)
+        features, target = features[index], target[index]
+    if with_gradient:
+        loss, gradient = network.get_loss_and_gradient(features, target)
+        return loss, gradient, len(features)
+    return network.get_loss(features, target), None, len(features)
+
+
+def evaluate_sharded(
+    network: NN,
+    weights: np.ndarray,
+    features: torch.Tensor,
+    target: torch.Tensor,
+    indices: Optional[np.ndarray] = None,
+    processes: int = 0,
+    with_gradient: bool = True,
+) -> Tuple[float, Optional[np.ndarray]]:
+    """Evaluate the loss (and gradient) of the network with the given weights.
+
+    If more than one process is requested and there are at least
+    :py:data:`SHARD_MIN_SAMPLES` samples per shard, the samples are split into
+    one shard per process. The shards are evaluated by a pool of spawned worker
+    processes and the results are averaged weighted by the shard sizes, which
+    gives the same mean squared error (and gradient) as a single evaluation.
+    Otherwise the network is evaluated in this process.
+
+    The data tensors must be in shared memory (see :py:meth:`torch.Tensor.share_memory_`)
+    to be evaluated by the worker processes.
+
+    Args:
+        network (NN): the network (used if the evaluation is not sharded)
+        weights (np.ndarray): the flat weight vector
+        features (torch.Tensor): the features of all samples
+        target (torch.Tensor): the target of all samples
+        indices (Optional[np.ndarray], optional): the samples to evaluate (e.g. a minibatch), defaults to all samples
+        processes (int, optional): the number of worker processes to use, defaults to 0
+        with_gradient (bool, optional): also calculate the gradient, defaults to True
+
+    Raises:
+        ValueError: if the number of weights does not match the network
+
+    Returns:
+        Tuple[float, Optional[np.ndarray]]: the loss and the gradient (None if with_gradient is False)
+    """
+    n_samples = len(features) if indices is None else len(indices)
+    shards = min(processes, n_samples // SHARD_MIN_SAMPLES)
+    pool = _get_pool(processes) if shards > 1 and features.is_shared() else None
+    if pool is None:
+        network.set_weights(weights)
+        if indices is not None:
+            index = torch.from_numpy(np.array(indices))
+            features, target = features[index], target[index]
+        if with_gradient:
+            return network.get_loss_and_gradient(features, target)
+        return network.get_loss(features, target), None
+
+    if weights.size != network.number_of_weights:
+        raise ValueError(
+            f"Expected {network.number_of_weights} weights, got {weights.size}!"
+        )
+    dimensions = (
+        network.linear_relu_stack[0].in_features,
+        network.linear_relu_stack[0].out_features,
+    )
+    bounds = np.linspace(0, n_samples, shards + 1, dtype=int)
+    futures = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if indices is None:
+            # views of the shared tensors are sent to the workers without copying the data
+            shard = (
+                features.narrow(0, start, end - start),
+                target.narrow(0, start, end - start),
+                None,
+            )
+        else:
+            shard = (features, target, np.array(indices[start:end]))
+        futures.append(
+            pool.submit(_evaluate_shard, dimensions, weights, *shard, with_gradient)
+        )
+    results: List[Tuple[float, Optional[np.ndarray], int]] = [
+        future.result() for future in futures
+    ]
+
+    loss = sum(shard_loss * count for shard_loss, _, count in results) / n_samples
+    if not with_gradient:
+        return loss, None
+    gradient = sum(shard_gradient * count for _, shard_gradient, count in results)
+    return loss, gradient / n_samples
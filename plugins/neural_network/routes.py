@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import Mapping, Optional
+from threading import Lock, RLock
+from typing import Hashable, Mapping, NamedTuple, Optional
 
 import numpy as np
 import torch
@@ -36,6 +38,11 @@ from qhana_plugin_runner.db.models.tasks import (
     TaskLink,
     TaskUpdateSubscription,
 )
+from qhana_plugin_runner.plugin_utils.array_transport import (
+    accepts_binary,
+    get_request_arrays,
+    make_binary_response,
+)
 from qhana_plugin_runner.tasks import (
     TASK_STEPS_CHANGED,
     add_step,
@@ -44,7 +51,7 @@ from qhana_plugin_runner.tasks import (
 )
 
 from . import NN_BLP, NeuralNetwork
-from .neural_network import NN
+from .neural_network import NN, evaluate_sharded, minibatch_indices, set_torch_threads
 from .schemas import (
     CallbackUrl,
     CallbackUrlSchema,
@@ -55,6 +62,7 @@ from .schemas import (
     HyperparamterInputData,
     HyperparamterInputSchema,
     LossResponseSchema,
+    MinibatchSchema,
     PassDataSchema,
     WeightsResponseSchema,
 )
@@ -467,7 +475,39 @@ class WeightsEndpoint(MethodView):
         return {"weights": db_task.data.get("weights", -1)}
 
 
-def _prepare_network(db_id: int, evaluate_input: dict):
+MAX_CACHED_NETWORKS = 8
+"""The maximum number of networks (with their data tensors) cached per process."""
+
+
+class CachedNetwork(NamedTuple):
+    nn: NN
+    features: torch.Tensor
+    target: torch.Tensor
+    data_source: tuple  # the (memory mapped) arrays the tensors were created from
+    lock: Lock  # requests for the same network are evaluated one after another
+
+
+_NETWORK_LOCK = RLock()
+_NETWORK_CACHE: "OrderedDict[Hashable, CachedNetwork]" = OrderedDict()
+
+
+def _get_weights(evaluate_input: dict) -> np.ndarray:
+    """Get the weights from a binary (application/octet-stream) or json request body."""
+    try:
+        arrays = get_request_arrays()
+    except ValueError as err:
+        abort(HTTPStatus.BAD_REQUEST, message=str(err))
+    if arrays is not None:
+        if len(arrays) != 1:
+            abort(HTTPStatus.BAD_REQUEST, message="Expected exactly one weight vector!")
+        return arrays[0].reshape(-1)
+    if "weights" not in evaluate_input:
+        abort(HTTPStatus.BAD_REQUEST, message="No weights given!")
+    return np.array(evaluate_input["weights"])
+
+
+def _prepare_network(db_id: int) -> CachedNetwork:
+    """Get the network and the data tensors of the task from the per process cache."""
 
     db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
     if db_task is None:
@@ -476,21 +516,69 @@ def _prepare_network(db_id: int, evaluate_input: dict):
 
     assert isinstance(db_task.data, dict)
 
-    weights = np.array(evaluate_input["weights"])
+    set_torch_threads(NeuralNetwork.instance.torch_threads)
+
     features = load_data_from_db(db_task.data["features_key"])
     target = load_data_from_db(db_task.data["target_key"])
     number_of_neurons: int = db_task.data["number_of_neurons"]
 
-    # create the neural network
-    nn = NN(features.shape[1], number_of_neurons)
-    # set the weights
-    nn.set_weights(weights)
-
-    return (
-        nn,
-        torch.tensor(features, dtype=torch.float32),
-        torch.tensor(target, dtype=torch.float32),
+    key = (db_id, features.shape[1], number_of_neurons)
+    with _NETWORK_LOCK:
+        cached = _NETWORK_CACHE.get(key)
+        if cached is not None:
+            if cached.data_source[0] is features and cached.data_source[1] is target:
+                _NETWORK_CACHE.move_to_end(key)
+                return cached
+            del _NETWORK_CACHE[key]  # the data of the task was replaced
+
+    # create the neural network and the data tensors only once
+    cached = CachedNetwork(
+        nn=NN(features.shape[1], number_of_neurons),
+        features=torch.tensor(features, dtype=torch.float32),
+        target=torch.tensor(target, dtype=torch.float32),
+        data_source=(features, target),
+        lock=Lock(),
     )
+    if NeuralNetwork.instance.shard_processes > 1:
+        # the shard worker processes read the data from shared memory
+        cached.features.share_memory_()
+        cached.target.share_memory_()
+    with _NETWORK_LOCK:
+        cached = _NETWORK_CACHE.setdefault(key, cached)
+        while len(_NETWORK_CACHE) > MAX_CACHED_NETWORKS:
+            _NETWORK_CACHE.popitem(last=False)
+    return cached
+
+
+def _evaluate(
+    db_id: int, evaluate_input: dict, minibatch: dict, with_gradient: bool = True
+):
+    """Evaluate the network of the task on all samples or on the requested minibatch."""
+    weights = _get_weights(evaluate_input)
+    network = _prepare_network(db_id=db_id)
+
+    indices = None
+    if minibatch.get("batch_size"):
+        indices = minibatch_indices(
+            len(network.features),
+            minibatch["batch_size"],
+            minibatch["seed"],
+            minibatch["step"],
+        )
+
+    with network.lock:
+        try:
+            return evaluate_sharded(
+                network.nn,
+                weights,
+                network.features,
+                network.target,
+                indices=indices,
+                processes=NeuralNetwork.instance.shard_processes,
+                with_gradient=with_gradient,
+            )
+        except ValueError as err:
+            abort(HTTPStatus.BAD_REQUEST, message=str(err))
 
 
 @NN_BLP.route("/task/<int:db_id>/loss/")
@@ -499,15 +587,16 @@ class CalcLossEndpoint(MethodView):
 
     @NN_BLP.response(HTTPStatus.OK, LossResponseSchema())
     @NN_BLP.arguments(
-        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=True
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
     )
+    @NN_BLP.arguments(MinibatchSchema(unknown=EXCLUDE), location="query", required=False)
     @NN_BLP.require_jwt("jwt", optional=True)
-    def post(self, input_data: dict, db_id: int) -> dict:
+    def post(self, input_data: dict, minibatch: dict, db_id: int) -> dict:
         """Calculate the loss given the specific weights."""
 
-        nn, features, target = _prepare_network(db_id=db_id, evaluate_input=input_data)
-
-        loss = nn.get_loss(features, target)
+        loss, _ = _evaluate(db_id, input_data, minibatch, with_gradient=False)
+        if accepts_binary():
+            return make_binary_response(loss)
         return {"loss": loss}
 
 
@@ -517,15 +606,16 @@ class CalcGradientEndpoint(MethodView):
 
     @NN_BLP.response(HTTPStatus.OK, GradientResponseSchema())
     @NN_BLP.arguments(
-        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=True
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
     )
+    @NN_BLP.arguments(MinibatchSchema(unknown=EXCLUDE), location="query", required=False)
     @NN_BLP.require_jwt("jwt", optional=True)
-    def post(self, input_data: dict, db_id: int) -> dict:
+    def post(self, input_data: dict, minibatch: dict, db_id: int) -> dict:
         """Endpoint for the calculation callback."""
 
-        nn, features, target = _prepare_network(db_id=db_id, evaluate_input=input_data)
-
-        gradient = nn.get_gradient(features, target)
+        _, gradient = _evaluate(db_id, input_data, minibatch)
+        if accepts_binary():
+            return make_binary_response(gradient)
         return {"gradient": gradient.tolist()}
 
 
@@ -535,13 +625,14 @@ class CalcLossandGradEndpoint(MethodView):
 
     @NN_BLP.response(HTTPStatus.OK, CombinedResponseSchema())
     @NN_BLP.arguments(
-        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=True
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
     )
+    @NN_BLP.arguments(MinibatchSchema(unknown=EXCLUDE), location="query", required=False)
     @NN_BLP.require_jwt("jwt", optional=True)
-    def post(self, input_data: dict, db_id: int) -> dict:
+    def post(self, input_data: dict, minibatch: dict, db_id: int) -> dict:
         """Endpoint for the calculation callback."""
 
-        nn, features, target = _prepare_network(db_id=db_id, evaluate_input=input_data)
-
-        loss, grad = nn.get_loss_and_gradient(features, target)
+        loss, grad = _evaluate(db_id, input_data, minibatch)
+        if accepts_binary():
+            return make_binary_response(loss, grad)
         return {"loss": loss, "gradient": grad.tolist()}
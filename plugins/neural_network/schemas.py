@@ -83,7 +83,39 @@ class WeightsResponseSchema(MaBaseSchema):
 
 
 class EvaluateRequestSchema(MaBaseSchema):
-    weights = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+    weights = ma.fields.List(
+        ma.fields.Number(),
+        required=False,
+        allow_none=False,
+        metadata={
+            "description": "The weights (required unless they are sent as application/octet-stream body)."
+        },
+    )
+
+
+class MinibatchSchema(MaBaseSchema):
+    batch_size = ma.fields.Integer(
+        required=False,
+        allow_none=True,
+        validate=ma.validate.Range(min=1),
+        metadata={
+            "description": "Only evaluate a minibatch of this many samples instead of all samples."
+        },
+    )
+    seed = ma.fields.Integer(
+        required=False,
+        load_default=0,
+        validate=ma.validate.Range(min=0),
+        metadata={"description": "The seed used to shuffle the samples of every epoch."},
+    )
+    step = ma.fields.Integer(
+        required=False,
+        load_default=0,
+        validate=ma.validate.Range(min=0),
+        metadata={
+            "description": "The index of the optimization step (counted over all epochs) that selects the minibatch."
+        },
+    )
 
 
 class LossResponseSchema(MaBaseSchema):
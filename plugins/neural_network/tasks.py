@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from functools import lru_cache
 from io import BytesIO
 from typing import Optional
 
@@ -23,6 +22,7 @@ from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.db import DB
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.db.models.virtual_plugins import DataBlob
+from qhana_plugin_runner.plugin_utils.array_cache import get_array_cache
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     ensure_array,
     load_entities,
@@ -70,6 +70,8 @@ def load_data(self, db_id: int):
         x_dump = BytesIO()
         np.save(x_dump, x_array, allow_pickle=False)
         DataBlob.set_value(NeuralNetwork.instance.name, key_x, x_dump.getvalue())
+        # remove outdated cached data of previous uploads
+        get_array_cache().remove(NeuralNetwork.instance.name, key_x)
         task_data.data["features_key"] = key_x
         task_data.data["weights"] = (
             (x_array.shape[1] * number_of_neurons) + (number_of_neurons * 2) + 1
@@ -92,6 +94,8 @@ def load_data(self, db_id: int):
         y_dump = BytesIO()
         np.save(y_dump, y_array, allow_pickle=False)
         DataBlob.set_value(NeuralNetwork.instance.name, key_y, y_dump.getvalue())
+        # remove outdated cached data of previous uploads
+        get_array_cache().remove(NeuralNetwork.instance.name, key_y)
         task_data.data["target_key"] = key_y
         del data  # clear large data from memory faster
         del y_array
@@ -111,30 +115,32 @@ def clear_task_data(db_id: int):
 
     assert isinstance(task_data.data, dict)
 
-    # clear the complete cache as the data is no longer required in memory
-    # may slow down other jobs running at the same time
-    load_data_from_db.cache_clear()
+    array_cache = get_array_cache()
 
     for key in ("features_key", "target_key"):
         data_key = task_data.data[key]
-        # clear blob data that is no longer needed
+        # clear cached and blob data that is no longer needed
+        array_cache.remove(NeuralNetwork.instance.name, data_key)
         DataBlob.delete_value(NeuralNetwork.instance.name, data_key)
     DB.session.commit()
 
     return "completed objective function task"
 
 
-@lru_cache(maxsize=8)  # values may be large so avoid excessive caching...
 def load_data_from_db(key: str) -> np.ndarray:
     """Load a numpy array from the database given the database key.
 
-    Results of this function are cached for maximum efficiency!
+    The array is cached in a memory mapped file that is shared by all worker
+    processes (see :py:mod:`~qhana_plugin_runner.plugin_utils.array_cache`).
 
     Args:
         key (str): the key the array is stored under
 
     Returns:
-        np.ndarray: the numpy array
+        np.ndarray: the (read-only) numpy array
     """
-    data = BytesIO(DataBlob.get_value(NeuralNetwork.instance.name, key))
-    return np.load(data, allow_pickle=False)
+    return get_array_cache().get_array(
+        NeuralNetwork.instance.name,
+        key,
+        lambda: DataBlob.get_value(NeuralNetwork.instance.name, key),
+    )
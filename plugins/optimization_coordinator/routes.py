@@ -12,10 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from datetime import datetime
 from http import HTTPStatus
 from logging import Logger
-from typing import Mapping, Optional
+from typing import Dict, Mapping, Optional
 
 from celery.utils.log import get_task_logger
 from flask import Response, redirect
@@ -36,23 +35,24 @@ from qhana_plugin_runner.api.plugin_schemas import (
     WebhookParamsSchema,
 )
 from qhana_plugin_runner.db.db import DB
-from qhana_plugin_runner.db.models.tasks import ProcessingTask
-from qhana_plugin_runner.plugin_utils.interop import get_task_result_no_wait
-from qhana_plugin_runner.tasks import (
-    TASK_DETAILS_CHANGED,
-    TASK_STATUS_CHANGED,
-    TASK_STEPS_CHANGED,
-    save_task_error,
-)
+from qhana_plugin_runner.db.models.tasks import ProcessingTask, TaskStateTransition
+from qhana_plugin_runner.tasks import TASK_STEPS_CHANGED, save_task_error
 
 from . import OPTIMIZER_BLP, Optimizer
 from .schemas import OptimizerSetupTaskInputData, OptimizerSetupTaskInputSchema
 from .tasks import (
+    FINAL_PHASES,
+    MINIMIZER,
+    OBJECTIVE_FUNCTION,
+    PHASE,
+    STARTED,
+    WATCHDOG_TIMEOUT,
     add_plugin_entrypoint_task,
     check_minimizer_steps,
     check_of_steps,
     handle_minimizer_result,
     handle_of_result,
+    watchdog,
 )
 
 
@@ -234,8 +234,6 @@ class OptimizerSetupProcessStep(MethodView):
 
         assert isinstance(db_task.data, dict)  # type checker assertion
 
-        db_task.data["task_state"] = "setup"
-
         # save the input data to the database
         db_task.data["features_url"] = arguments.features
         db_task.data["target_url"] = arguments.target
@@ -261,6 +259,8 @@ class OptimizerSetupProcessStep(MethodView):
         db_task.data["of_webhook"] = of_webhook
         db_task.data["of_plugin_url"] = arguments.objective_function_plugin_selector
 
+        TaskStateTransition.transition(db_task, PHASE, "setup", (None,), commit=False)
+
         db_task.save(commit=True)
 
         task = add_plugin_entrypoint_task.s(
@@ -275,6 +275,9 @@ class OptimizerSetupProcessStep(MethodView):
 
         task.apply_async()
 
+        # only polls the coordinated tasks if their webhook events stop
+        watchdog.s(db_id=db_task.id).apply_async(countdown=WATCHDOG_TIMEOUT)
+
         return redirect(
             url_for("tasks-api.TaskView", task_id=str(db_task.id)), HTTPStatus.SEE_OTHER
         )
@@ -283,6 +286,46 @@ class OptimizerSetupProcessStep(MethodView):
 #### Webhooks ##################################################################
 
 
+def _load_optimization_states(db_id: int) -> Dict[str, TaskStateTransition]:
+    db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+    if db_task is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        abort(HTTPStatus.NOT_FOUND, message=msg)
+
+    states = TaskStateTransition.get_current_states(db_task)
+
+    if db_task.task_name != "optimize" or PHASE not in states:
+        # wrong task name or missing task state data
+        abort(HTTPStatus.NOT_FOUND, message="wrong task name/type")
+
+    return states
+
+
+def _start_sub_task(
+    db_id: int, machine: str, task_url: str, from_phase: str, phase: str
+) -> bool:
+    """Record the first event of a coordinated task and enter the next phase.
+
+    Returns:
+        bool: False if another coordinated task was recorded before
+    """
+    if not TaskStateTransition.transition(
+        db_id, machine, STARTED, (None,), data=task_url, commit=False
+    ) or not TaskStateTransition.transition(
+        db_id, PHASE, phase, (from_phase,), commit=False
+    ):
+        DB.session.rollback()
+        current = TaskStateTransition.get_current(db_id, machine)
+        # concurrent event of the same task
+        return current is not None and current.data == task_url
+
+    db_task: ProcessingTask = ProcessingTask.get_by_id(id_=db_id)
+    db_task.clear_previous_step()
+    db_task.save(commit=True)
+    TASK_STEPS_CHANGED.send(current_app._get_current_object(), task_id=db_id)
+    return True
+
+
 @OPTIMIZER_BLP.route("/task/<int:db_id>/objective-function-webhook/")
 class ObjectiveFunctionWebhook(MethodView):
     """Webhook receiving updates of the objective function."""
@@ -293,6 +336,9 @@ class ObjectiveFunctionWebhook(MethodView):
         """
         Handle webhook updates of the objective function.
 
+        The event is only recorded here, the objective function task is
+        fetched (once) by the started task.
+
         Args:
             params ({'source': '{url}', 'event': '{event type}'}): standard webhook data for task update subscriptions.
             db_id (str): The ID of the task.
@@ -303,58 +349,35 @@ class ObjectiveFunctionWebhook(MethodView):
             # event is not interesting here
             abort(HTTPStatus.NOT_FOUND, message="wrong event")
 
-        db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-        if db_task is None:
-            msg = f"Could not load task data with id {db_id} to read parameters!"
-            abort(HTTPStatus.NOT_FOUND, message=msg)
-
-        assert isinstance(db_task.data, dict)  # type checker assertion
-
-        task_state = db_task.data.get("task_state")
-
-        if db_task.task_name != "optimize" or task_state is None:
-            # wrong task name or missing task state data
-            abort(HTTPStatus.NOT_FOUND, message="wrong task name/type")
+        states = _load_optimization_states(db_id)
+        task_state = states[PHASE].state
+        of_state = states.get(OBJECTIVE_FUNCTION)
+        of_task_url = params["source"]
 
-        if task_state != "setup" and db_task.data["of_task_url"] != params["source"]:
+        if task_state in FINAL_PHASES:
+            return "", HTTPStatus.NO_CONTENT  # optimization is already finished
+
+        if of_state is None:
+            if task_state != "setup" or not _start_sub_task(
+                db_id, OBJECTIVE_FUNCTION, of_task_url, "setup", "of_setup"
+            ):
+                abort(
+                    HTTPStatus.NOT_FOUND,
+                    message=f"wrong task phase or source url (phase={task_state})",
+                )
+        elif of_state.data != of_task_url:
             # wrong webhook source
             abort(
                 HTTPStatus.NOT_FOUND,
                 message=f"wrong task phase or source url (phase={task_state})",
             )
 
-        of_task_url = params["source"]
-
-        app = current_app._get_current_object()
-
         # handle status events
 
         if event_type == "status":
-            status, result = get_task_result_no_wait(of_task_url)
-            if status == "FAILURE" and db_task.data.get("of_success") is not False:
-                old_status = db_task.status
-
-                db_task.task_status = "FAILURE"
-                db_task.finished_at = datetime.utcnow()
-                db_task.data["of_success"] = False
-                db_task.add_task_log_entry(f"Objective function FAILED! ({of_task_url})")
-                if task_state not in ("setup-minimizer", "minimize") and (
-                    log := result.get("log")
-                ):
-                    db_task.add_task_log_entry(
-                        f"--- objective function log ---\n{log}\n--- end objective function log ---"
-                    )
-
-                db_task.save(commit=True)
-
-                TASK_DETAILS_CHANGED.send(app, task_id=db_id)
-                if old_status != db_task.status:
-                    TASK_STATUS_CHANGED.send(app, task_id=db_id)
-
-            if status == "SUCCESS":
-                task = handle_of_result.s(db_id=db_id)
-                task.link_error(save_task_error.s(db_id=db_task.id))
-                task.apply_async()
+            task = handle_of_result.s(db_id=db_id)
+            task.link_error(save_task_error.s(db_id=db_id))
+            task.apply_async()
             return "", HTTPStatus.NO_CONTENT
 
         # only step events get past this line
@@ -364,13 +387,6 @@ class ObjectiveFunctionWebhook(MethodView):
             # TODO: check how such events should be handled (and by which plugin!)
             return "", HTTPStatus.NO_CONTENT
 
-        if task_state == "setup":
-            db_task.data["of_task_url"] = params["source"]
-            db_task.data["task_state"] = "of_setup"
-            db_task.clear_previous_step()
-            db_task.save(commit=True)
-            TASK_STEPS_CHANGED.send(app, task_id=db_id)
-
         # start task to handle of-step updates
         task = check_of_steps.s(db_id=db_id)
         task.apply_async()
@@ -388,6 +404,9 @@ class MinimizerWebhook(MethodView):
         """
         Handle webhook updates of the minimizer.
 
+        The event is only recorded here, the minimizer task is fetched (once)
+        by the started task.
+
         Args:
             params ({'source': '<url>', 'event': '<event type>'}): standard webhook data for task update subscriptions.
             db_id (str): The ID of the task.
@@ -398,72 +417,38 @@ class MinimizerWebhook(MethodView):
             # event is not interesting here
             abort(HTTPStatus.NOT_FOUND, message="wrong event")
 
-        db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-        if db_task is None:
-            msg = f"Could not load task data with id {db_id} to read parameters!"
-            abort(HTTPStatus.NOT_FOUND, message=msg)
-
-        assert isinstance(db_task.data, dict)  # type checker assertion
-
-        task_state = db_task.data.get("task_state")
+        states = _load_optimization_states(db_id)
+        task_state = states[PHASE].state
+        minimizer_state = states.get(MINIMIZER)
+        minimizer_task_url = params["source"]
 
-        if db_task.task_name != "optimize" or task_state is None:
-            # wrong task name or missing task state data
-            abort(HTTPStatus.NOT_FOUND, message="wrong task name/type")
+        if task_state in FINAL_PHASES:
+            return "", HTTPStatus.NO_CONTENT  # optimization is already finished
 
         if task_state in ("setup", "of_setup", "of_cleanup"):
             # wrong task phase
             abort(HTTPStatus.NOT_FOUND, message=f"Wrong task phase: {task_state}")
 
-        if (
-            task_state != "minimizer_init"
-            and db_task.data["minimizer_task_url"] != params["source"]
-        ):
+        if minimizer_state is None:
+            if task_state != "minimizer_init" or not _start_sub_task(
+                db_id, MINIMIZER, minimizer_task_url, "minimizer_init", "minimizer_setup"
+            ):
+                abort(HTTPStatus.NOT_FOUND, message="Wrong source url")
+        elif minimizer_state.data != minimizer_task_url:
             abort(
                 HTTPStatus.NOT_FOUND, message="Wrong source url"
             )  # wrong webhook source
 
-        minimizer_task_url = params["source"]
-
-        app = current_app._get_current_object()
-
         # handle status events
 
         if event_type == "status":
-            status, result = get_task_result_no_wait(minimizer_task_url)
-            if status == "FAILURE" and db_task.data.get("minimizer_success") is not False:
-                old_status = db_task.status
-
-                db_task.task_status = "FAILURE"
-                db_task.finished_at = datetime.utcnow()
-                db_task.data["minimizer_success"] = False
-                db_task.add_task_log_entry(f"Minimizer FAILED! ({minimizer_task_url})")
-                if log := result.get("log"):
-                    db_task.add_task_log_entry(
-                        f"--- minimizer log ---\n{log}\n--- end minimizer log ---"
-                    )
-
-                db_task.save(commit=True)
-
-                TASK_DETAILS_CHANGED.send(app, task_id=db_id)
-                if old_status != db_task.status:
-                    TASK_STATUS_CHANGED.send(app, task_id=db_id)
-
-            if status == "SUCCESS":
-                task = handle_minimizer_result.s(db_id=db_id)
-                task.link_error(save_task_error.s(db_id=db_task.id))
-                task.apply_async()
+            task = handle_minimizer_result.s(db_id=db_id)
+            task.link_error(save_task_error.s(db_id=db_id))
+            task.apply_async()
             return "", HTTPStatus.NO_CONTENT
 
         # only step events get past this line
 
-        if task_state == "minimizer_init":
-            db_task.data["minimizer_task_url"] = params["source"]
-            db_task.data["task_state"] = "minimizer_setup"
-            db_task.clear_previous_step()
-            db_task.save(commit=True)
-            TASK_STEPS_CHANGED.send(app, task_id=db_id)
-
         # start task to handle minimizer-step updates
         task = check_minimizer_steps.s(db_id=db_id)
         task.apply_async()
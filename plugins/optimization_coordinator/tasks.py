@@ -12,16 +12,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Tasks of the optimization coordinator.
+
+The coordinator tracks its progress in three state machines persisted as
+:class:`~qhana_plugin_runner.db.models.tasks.TaskStateTransition` entries:
+
+* ``phase``: ``setup`` -> ``of_setup`` -> ``minimizer_init`` -> ``minimizer_setup``
+  -> ``minimize`` -> ``of_cleanup`` -> ``finished`` (or ``failed`` from any phase)
+* ``of``: ``started`` -> ``data_passed`` -> ``finishing`` -> ``success`` (or ``failure``)
+* ``minimizer``: ``started`` -> ``success`` (or ``failure``)
+
+The states of the ``of`` and ``minimizer`` state machines carry the URL of the
+coordinated task. State transitions are only triggered by webhook events of the
+coordinated tasks. Transitions that call an endpoint of a coordinated task are
+guarded by the state they start from, so duplicate events never call an
+endpoint twice. The :py:func:`watchdog` only polls the coordinated tasks if
+no transition happened for :py:data:`WATCHDOG_TIMEOUT` seconds, e.g. because
+an event was lost.
+"""
+
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from urllib.parse import quote, urljoin, urlsplit, urlunsplit
 
+from celery.canvas import Signature
 from celery.utils.log import get_task_logger
 from flask.globals import current_app
 
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.db import DB
-from qhana_plugin_runner.db.models.tasks import ProcessingTask
+from qhana_plugin_runner.db.models.tasks import ProcessingTask, TaskStateTransition
 from qhana_plugin_runner.plugin_utils.interop import (
     call_plugin_endpoint,
     get_task_result_no_wait,
@@ -29,6 +49,7 @@ from qhana_plugin_runner.plugin_utils.interop import (
 from qhana_plugin_runner.requests import open_url
 from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.tasks import (
+    TASK_DETAILS_CHANGED,
     TASK_STATUS_CHANGED,
     TASK_STEPS_CHANGED,
     add_step,
@@ -40,6 +61,43 @@ from . import Optimizer
 
 TASK_LOGGER = get_task_logger(__name__)
 
+WATCHDOG_TIMEOUT = 300
+"""Seconds without a state transition after which the watchdog polls the coordinated tasks."""
+
+PHASE = "phase"
+OBJECTIVE_FUNCTION = "of"
+MINIMIZER = "minimizer"
+
+PHASES = (
+    "setup",
+    "of_setup",
+    "minimizer_init",
+    "minimizer_setup",
+    "minimize",
+    "of_cleanup",
+)
+FINAL_PHASES = ("finished", "failed")
+
+STARTED = "started"
+DATA_PASSED = "data_passed"
+FINISHING = "finishing"
+SUCCESS = "success"
+FAILURE = "failure"
+FINAL_STATES = (SUCCESS, FAILURE)
+
+
+def _load_task(db_id: int) -> ProcessingTask:
+    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+
+    if task_data is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        TASK_LOGGER.error(msg)
+        raise KeyError(msg)
+
+    assert isinstance(task_data.data, dict)
+
+    return task_data
+
 
 @CELERY.task(
     name=f"{Optimizer.instance.identifier}.add_plugin_entrypoint_task", bind=True
@@ -75,391 +133,442 @@ def add_plugin_entrypoint_task(
     )
 
 
-@CELERY.task(
-    name=f"{Optimizer.instance.identifier}.check_of_steps", bind=True, ignore_result=True
-)
-def check_of_steps(self, db_id: int):
-    TASK_LOGGER.info(f"Starting passing data to of plugin with db id '{db_id}'")
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
-
-    assert isinstance(task_data.data, dict)
-
-    task_state = task_data.data["task_state"]
-
-    if task_state not in ("of_setup", "of_cleanup"):
-        # ignore step updates of objective function if not in the
-        # objective function setup phase
-        return
-
-    of_task_url = task_data.data["of_task_url"]
-
-    assert isinstance(of_task_url, str)
-
-    status, of_data = get_task_result_no_wait(of_task_url)
-
-    if status != "PENDING":
-        return  # no need to handle step updates if result is already settled
+def _mirror_steps(
+    task_data: ProcessingTask,
+    task_url: str,
+    result: Dict[str, Any],
+    prefix: str,
+    special_steps: Tuple[str, ...],
+) -> Optional[Dict[str, Any]]:
+    """Mirror the steps of a coordinated task as steps of the coordinator task.
 
-    cleared_of_steps = set()
-    uncleared_of_step = None
+    Returns:
+        Optional[Dict[str, Any]]: the uncleared special step of the coordinated task (if any)
+    """
+    cleared_steps = set()
+    uncleared_step = None
 
-    # parse of steps
-    for index, step in enumerate(of_data.get("steps", [])):
+    for index, step in enumerate(result.get("steps", [])):
         external_step_id = step.get("stepId", str(index))
-        step_id = f"of.{external_step_id}"
+        step_id = f"{prefix}.{external_step_id}"
         if step.get("cleared"):
-            if external_step_id in ("pass_data", "evaluate"):
-                continue  # ignore the special steps
-            cleared_of_steps.add(step_id)
+            if external_step_id in special_steps:
+                continue  # special steps are not mirrored
+            cleared_steps.add(step_id)
         else:
             step["internal_step_id"] = step_id
-            uncleared_of_step = step
+            uncleared_step = step
 
     # mark cleared steps as cleared
-    did_clear_step = False
+    did_change_steps = False
     for step in task_data.steps:
-        if step.step_id in cleared_of_steps and not step.cleared:
-            did_clear_step = True
+        if step.step_id in cleared_steps and not step.cleared:
+            did_change_steps = True
             step.cleared = True
             DB.session.add(step)
 
-    # handle uncleared step (if normal step)
-    if uncleared_of_step and (step_id := uncleared_of_step.get("stepId")) not in (
-        "pass_data",
-        "evaluate",
-    ):
-        task_data.add_next_step(
-            href=urljoin(of_task_url, uncleared_of_step["href"]),
-            ui_href=urljoin(of_task_url, uncleared_of_step["uiHref"]),
-            step_id=uncleared_of_step["internal_step_id"],
-        )
-        uncleared_of_step = None
+    # mirror uncleared step (if normal step)
+    if uncleared_step and uncleared_step.get("stepId") not in special_steps:
+        step_id = uncleared_step["internal_step_id"]
+        last_step = task_data.steps[-1] if task_data.steps else None
+        if last_step is None or last_step.step_id != step_id or last_step.cleared:
+            task_data.add_next_step(
+                href=urljoin(task_url, uncleared_step["href"]),
+                ui_href=urljoin(task_url, uncleared_step["uiHref"]),
+                step_id=step_id,
+            )
+            did_change_steps = True
+        uncleared_step = None
 
-    if uncleared_of_step and uncleared_of_step.get("stepId") == "evaluate":
-        # objective function is fully setup, enter minimizer init phase
-        task_data.data["task_state"] = "minimizer_init"
+    if did_change_steps:
+        DB.session.commit()
+        app = current_app._get_current_object()
+        TASK_STEPS_CHANGED.send(app, task_id=task_data.id)
+
+    return uncleared_step
 
-    DB.session.commit()
 
-    app = current_app._get_current_object()
-    if did_clear_step:
-        TASK_STEPS_CHANGED.send(app, task_id=db_id)
+def _handle_of_steps(task_data: ProcessingTask, of_task_url: str, of_data: dict):
+    db_id = task_data.id
+    phase = TaskStateTransition.get_current(db_id, PHASE)
+    task_state = phase.state if phase is not None else None
+
+    if task_state not in ("of_setup", "of_cleanup"):
+        # ignore step updates of objective function if not in the
+        # objective function setup or cleanup phase
+        return
+
+    uncleared_of_step = _mirror_steps(
+        task_data, of_task_url, of_data, "of", ("pass_data", "evaluate")
+    )
+
+    if not uncleared_of_step:
+        return
 
     # handle special steps
-    if uncleared_of_step:
-        step_id = uncleared_of_step.get("stepId")
-        if step_id == "pass_data":
+    step_id = uncleared_of_step.get("stepId")
+    step_href = urljoin(of_task_url, uncleared_of_step["href"])
+
+    if step_id == "pass_data":
+        if not TaskStateTransition.transition(
+            db_id, OBJECTIVE_FUNCTION, DATA_PASSED, (STARTED,), data=of_task_url
+        ):
+            return  # data was already passed
+        try:
             call_plugin_endpoint(
-                urljoin(of_task_url, uncleared_of_step["href"]),
+                step_href,
                 data={
                     "features": task_data.data["features_url"],
                     "target": task_data.data["target_url"],
                 },
                 debug=True,
             )
-        if step_id == "evaluate":
-            if task_data.has_uncleared_step:
-                if task_data.steps[-1].step_id == "minimizer_setup":
-                    # step is already present, do nothing
-                    return
-            task = add_plugin_entrypoint_task.s(
-                db_id=db_id,
-                plugin_url=task_data.data["minimizer_plugin_url"],
-                webhook_url=task_data.data["minimizer_webhook"],
-                step_id="minimizer_setup",
-                task_log="Prepare to setup minimizer.",
+        except Exception:
+            # allow the next event (or the watchdog) to pass the data again
+            TaskStateTransition.transition(
+                db_id, OBJECTIVE_FUNCTION, STARTED, (DATA_PASSED,), data=of_task_url
             )
+            raise
 
-            task.link_error(save_task_error.s(db_id=db_id))
+    if step_id == "evaluate" and task_state == "of_setup":
+        # objective function is fully setup, enter minimizer init phase
+        if not TaskStateTransition.transition(
+            db_id, PHASE, "minimizer_init", ("of_setup",)
+        ):
+            return  # minimizer setup was already started
+        task = add_plugin_entrypoint_task.s(
+            db_id=db_id,
+            plugin_url=task_data.data["minimizer_plugin_url"],
+            webhook_url=task_data.data["minimizer_webhook"],
+            step_id="minimizer_setup",
+            task_log="Prepare to setup minimizer.",
+        )
+        task.link_error(save_task_error.s(db_id=db_id))
+        task.apply_async()
 
-            return self.replace(task)
+    if step_id == "evaluate" and task_state == "of_cleanup":
+        # call step href to advance of progress
+        # TODO: maybe pass final weights to evaluate step?
+        if not TaskStateTransition.transition(
+            db_id,
+            OBJECTIVE_FUNCTION,
+            FINISHING,
+            (STARTED, DATA_PASSED),
+            data=of_task_url,
+        ):
+            return  # evaluate step was already called
+        call_plugin_endpoint(step_href, None)
+
+
+def _handle_of_result(
+    task_data: ProcessingTask, of_task_url: str, status: str, result: dict
+) -> Optional[Signature]:
+    db_id = task_data.id
 
+    if status == "PENDING":
+        return None  # result was in fact not settled
 
-@CELERY.task(
-    name=f"{Optimizer.instance.identifier}.check_minimizer_steps",
-    bind=True,
-    ignore_result=True,
-)
-def check_minimizer_steps(self, db_id: int):
-    TASK_LOGGER.info(f"Starting passing data to minimizer plugin with db id '{db_id}'")
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+    if status == "FAILURE":
+        if not TaskStateTransition.transition(
+            db_id,
+            OBJECTIVE_FUNCTION,
+            FAILURE,
+            (STARTED, DATA_PASSED, FINISHING),
+            data=of_task_url,
+        ):
+            return None  # failure was already handled
+        phase = TaskStateTransition.get_current(db_id, PHASE)
+        task_data.add_task_log_entry(f"Objective function FAILED! ({of_task_url})")
+        if phase.state not in ("minimizer_setup", "minimize") and (
+            log := result.get("log")
+        ):
+            task_data.add_task_log_entry(
+                f"--- objective function log ---\n{log}\n--- end objective function log ---"
+            )
+        task_data.save(commit=True)
+        TASK_DETAILS_CHANGED.send(current_app._get_current_object(), task_id=db_id)
+        return _check_final_result(task_data)
 
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
+    # TODO: load of data?
 
-    assert isinstance(task_data.data, dict)
+    if not TaskStateTransition.transition(
+        db_id,
+        OBJECTIVE_FUNCTION,
+        SUCCESS,
+        (STARTED, DATA_PASSED, FINISHING),
+        data=of_task_url,
+    ):
+        return None  # result was already handled
 
-    task_state = task_data.data["task_state"]
+    # check if optimization is finished
+    return _check_final_result(task_data)
 
-    if task_state not in ("minimizer_setup", "minimize"):
-        # ignore step updates of minimizer if not in any minimizer phase
-        return
 
-    minimizer_task_url = task_data.data["minimizer_task_url"]
+def _update_of(task_data: ProcessingTask) -> Optional[Signature]:
+    """Fetch the objective function task once and handle its steps or its result."""
+    of_state = TaskStateTransition.get_current(task_data.id, OBJECTIVE_FUNCTION)
 
-    assert isinstance(minimizer_task_url, str)
+    if of_state is None or of_state.state in FINAL_STATES:
+        return None
 
-    status, minimizer_data = get_task_result_no_wait(minimizer_task_url)
+    status, of_data = get_task_result_no_wait(of_state.data)
 
-    if status != "PENDING":
-        return  # no need to handle step updates if result is already settled
+    if status == "PENDING":
+        _handle_of_steps(task_data, of_state.data, of_data)
+        return None
 
-    cleared_minimizer_steps = set()
-    uncleared_minimizer_step = None
+    return _handle_of_result(task_data, of_state.data, status, of_data)
 
-    # parse of steps
-    for index, step in enumerate(minimizer_data.get("steps", [])):
-        external_step_id = step.get("stepId", str(index))
-        step_id = f"min.{external_step_id}"
-        if step.get("cleared"):
-            if external_step_id != "minimize":
-                continue  # ignore the special steps
-            cleared_minimizer_steps.add(step_id)
-        else:
-            step["internal_step_id"] = step_id
-            uncleared_minimizer_step = step
 
-    # mark cleared steps as cleared
-    did_clear_step = False
-    for step in task_data.steps:
-        if step.step_id in cleared_minimizer_steps and not step.cleared:
-            did_clear_step = True
-            step.cleared = True
-            DB.session.add(step)
+@CELERY.task(
+    name=f"{Optimizer.instance.identifier}.check_of_steps", bind=True, ignore_result=True
+)
+def check_of_steps(self, db_id: int):
+    TASK_LOGGER.info(f"Checking objective function steps for task with db id '{db_id}'")
+    task_data = _load_task(db_id)
 
-    # handle uncleared step (if normal step)
-    if (
-        uncleared_minimizer_step
-        and (step_id := uncleared_minimizer_step.get("stepId")) != "minimize"
-    ):
-        task_data.add_next_step(
-            href=urljoin(minimizer_task_url, uncleared_minimizer_step["href"]),
-            ui_href=urljoin(minimizer_task_url, uncleared_minimizer_step["uiHref"]),
-            step_id=uncleared_minimizer_step["internal_step_id"],
-        )
-        uncleared_minimizer_step = None
-        if step_id == "evaluate":
-            # objective function is fully setup, enter minimizer setup phase
-            task_data.data["task_state"] = "minimizer_setup"
+    final_task = _update_of(task_data)
 
-    if uncleared_minimizer_step and uncleared_minimizer_step.get("stepId") == "minimize":
-        # minimizer is ready to minimize, enter minimize phase
-        task_data.data["task_state"] = "minimize"
+    if final_task is not None:
+        return self.replace(final_task)
 
-    DB.session.commit()
 
-    app = current_app._get_current_object()
-    if did_clear_step:
-        TASK_STEPS_CHANGED.send(app, task_id=db_id)
+@CELERY.task(
+    name=f"{Optimizer.instance.identifier}.handle_of_result",
+    bind=True,
+    ignore_result=True,
+)
+def handle_of_result(self, db_id: int):
+    TASK_LOGGER.info(f"Start gathering of result for task with db_id={db_id}")
+    task_data = _load_task(db_id)
+
+    # the status event might have been sent for a pending step update, handle both
+    final_task = _update_of(task_data)
+
+    if final_task is not None:
+        return self.replace(final_task)
+
+
+def _handle_minimizer_steps(
+    task_data: ProcessingTask, minimizer_task_url: str, minimizer_data: dict
+):
+    db_id = task_data.id
+    phase = TaskStateTransition.get_current(db_id, PHASE)
+    task_state = phase.state if phase is not None else None
+
+    if task_state not in ("minimizer_setup", "minimize"):
+        # ignore step updates of minimizer if not in any minimizer phase
+        return
+
+    uncleared_minimizer_step = _mirror_steps(
+        task_data, minimizer_task_url, minimizer_data, "min", ("minimize",)
+    )
+
+    if not uncleared_minimizer_step:
+        return
 
     # handle special steps
-    if uncleared_minimizer_step:
-        step_id = uncleared_minimizer_step.get("stepId")
-        if step_id == "minimize":
+    if uncleared_minimizer_step.get("stepId") == "minimize":
+        # minimizer is ready to minimize, enter minimize phase
+        if not TaskStateTransition.transition(
+            db_id, PHASE, "minimize", ("minimizer_setup",)
+        ):
+            return  # minimization was already started
+        of_state = TaskStateTransition.get_current(db_id, OBJECTIVE_FUNCTION)
+        try:
             call_plugin_endpoint(
                 urljoin(minimizer_task_url, uncleared_minimizer_step["href"]),
                 data={
-                    "objectiveFunction": task_data.data["of_task_url"],
+                    "objectiveFunction": of_state.data,
                     # TODO: "initialWeights": "TODO"
                 },
                 debug=True,
             )
+        except Exception:
+            # allow the next event (or the watchdog) to start the minimization again
+            TaskStateTransition.transition(db_id, PHASE, "minimizer_setup", ("minimize",))
+            raise
 
 
-@CELERY.task(
-    name=f"{Optimizer.instance.identifier}.enter_of_cleanup",
-    bind=True,
-    ignore_result=True,
-)
-def enter_of_cleanup(self, db_id: int):
-    TASK_LOGGER.info(
-        f"Start cleaning up the running objective function task for task with db_id={db_id}"
-    )
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+def _handle_minimizer_result(
+    task_data: ProcessingTask, minimizer_task_url: str, status: str, result: dict
+) -> Optional[Signature]:
+    db_id = task_data.id
 
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
-
-    assert isinstance(task_data.data, dict)
+    if status == "PENDING":
+        return None  # result was in fact not settled
 
-    if task_data.data["task_state"] != "of_cleanup":
-        return  # called cleanup in the wrong tasl phase
+    if status == "FAILURE":
+        if not TaskStateTransition.transition(
+            db_id, MINIMIZER, FAILURE, (STARTED,), data=minimizer_task_url
+        ):
+            return None  # failure was already handled
+        task_data.add_task_log_entry(f"Minimizer FAILED! ({minimizer_task_url})")
+        if log := result.get("log"):
+            task_data.add_task_log_entry(
+                f"--- minimizer log ---\n{log}\n--- end minimizer log ---"
+            )
+        task_data.save(commit=True)
+        TASK_DETAILS_CHANGED.send(current_app._get_current_object(), task_id=db_id)
+        return _check_final_result(task_data)
 
-    if task_data.data.get("of_success"):
-        return  # task is already finished, no cleanup required
+    if not TaskStateTransition.transition(
+        db_id, MINIMIZER, SUCCESS, (STARTED,), data=minimizer_task_url, commit=False
+    ):
+        return None  # result was already handled
 
-    result_url = task_data.data["of_task_url"]
+    entered_of_cleanup = TaskStateTransition.transition(
+        db_id, PHASE, "of_cleanup", ("minimizer_setup", "minimize"), commit=False
+    )
+    DB.session.commit()
 
-    assert isinstance(result_url, str)
+    for out in result.get("outputs", []):
+        name = out.get("name", "")
+        url = out.get("href", "")
+        data_type = out.get("dataType", "")
+        content_type = out.get("contentType", "")
+        STORE.persist_task_result(
+            db_id,
+            url,
+            name,
+            data_type,
+            content_type,
+            storage_provider="url_file_store",
+        )
 
-    status, result_data = get_task_result_no_wait(result_url)
+    if entered_of_cleanup:
+        # start working on cleaning up the open objective function result
+        TASK_LOGGER.info(
+            f"Start cleaning up the running objective function task for task with db_id={db_id}"
+        )
+        final_task = _update_of(task_data)
+        if final_task is not None:
+            return final_task
 
-    if status != "PENDING":
-        return  # task is already finished, no cleanup required
+    # check if optimization is finished
+    return _check_final_result(task_data)
 
-    steps = result_data.get("steps", [])
 
-    if not steps:
-        return  # task has no steps, no cleanup possible
+def _update_minimizer(task_data: ProcessingTask) -> Optional[Signature]:
+    """Fetch the minimizer task once and handle its steps or its result."""
+    minimizer_state = TaskStateTransition.get_current(task_data.id, MINIMIZER)
 
-    last_step = steps[-1]
+    if minimizer_state is None or minimizer_state.state in FINAL_STATES:
+        return None
 
-    if last_step.get("cleared"):
-        return  # task has no uncleared steps, no cleanup required
+    status, minimizer_data = get_task_result_no_wait(minimizer_state.data)
 
-    if last_step.get("stepId") == "evaluate":
-        # of is still in evaluate step, call step href to advance of progress
-        # TODO: maybe pass final weights to evaluate step?
-        call_plugin_endpoint(urljoin(result_url, last_step["href"]), None)
+    if status == "PENDING":
+        _handle_minimizer_steps(task_data, minimizer_state.data, minimizer_data)
+        return None
 
-    else:
-        # of is in any other open step, make sure that step is checked
-        return self.replace(check_of_steps.s(db_id=db_id))
+    return _handle_minimizer_result(
+        task_data, minimizer_state.data, status, minimizer_data
+    )
 
 
 @CELERY.task(
-    name=f"{Optimizer.instance.identifier}.handle_minimizer_result",
+    name=f"{Optimizer.instance.identifier}.check_minimizer_steps",
     bind=True,
     ignore_result=True,
 )
-def handle_minimizer_result(self, db_id: int):
-    TASK_LOGGER.info(f"Start gathering minimizer result for task with db_id={db_id}")
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
-
-    assert isinstance(task_data.data, dict)
-
-    result_url = task_data.data["minimizer_task_url"]
-
-    status, result_data = get_task_result_no_wait(result_url)
-
-    if status == "PENDING":
-        return  # result was in fact not settled
-
-    if status == "FAILURE":
-        task_data.data["minimizer_success"] = False
-        task_data.save(commit=True)
-        return self.replace(check_final_result.s(db_id=db_id))
-
-    outputs = result_data.get("outputs", [])
-
-    if not task_data.data.get("minimizer_success"):  # prevent duplicates
-        for out in outputs:
-            name = out.get("name", "")
-            url = out.get("href", "")
-            data_type = out.get("dataType", "")
-            content_type = out.get("contentType", "")
-            STORE.persist_task_result(
-                db_id,
-                url,
-                name,
-                data_type,
-                content_type,
-                storage_provider="url_file_store",
-            )
-
-    task_data.data["minimizer_success"] = True
-    task_data.data["task_state"] = "of_cleanup"
-
-    task_data.save(commit=True)
+def check_minimizer_steps(self, db_id: int):
+    TASK_LOGGER.info(f"Checking minimizer steps for task with db id '{db_id}'")
+    task_data = _load_task(db_id)
 
-    # start working on cleaning up the open objective function result
-    of_cleanup_task = enter_of_cleanup.s(db_id=db_id)
-    of_cleanup_task.apply_async()
+    final_task = _update_minimizer(task_data)
 
-    # check if optimization is finished
-    return self.replace(check_final_result.s(db_id=db_id))
+    if final_task is not None:
+        return self.replace(final_task)
 
 
 @CELERY.task(
-    name=f"{Optimizer.instance.identifier}.handle_of_result",
+    name=f"{Optimizer.instance.identifier}.handle_minimizer_result",
     bind=True,
     ignore_result=True,
 )
-def handle_of_result(self, db_id: int):
-    TASK_LOGGER.info(f"Start gathering of result for task with db_id={db_id}")
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+def handle_minimizer_result(self, db_id: int):
+    TASK_LOGGER.info(f"Start gathering minimizer result for task with db_id={db_id}")
+    task_data = _load_task(db_id)
 
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
+    # the status event might have been sent for a pending step update, handle both
+    final_task = _update_minimizer(task_data)
 
-    assert isinstance(task_data.data, dict)
+    if final_task is not None:
+        return self.replace(final_task)
 
-    result_url = task_data.data["of_task_url"]
 
-    status, result_data = get_task_result_no_wait(result_url)
+def _check_final_result(task_data: ProcessingTask) -> Optional[Signature]:
+    """Finish the optimization if both coordinated tasks are finished or one of them failed.
 
-    if status == "PENDING":
-        return  # result was in fact not settled
+    Returns:
+        Optional[Signature]: the task saving the successful result (the caller must start it)
+    """
+    db_id = task_data.id
+    states = TaskStateTransition.get_current_states(db_id)
+    sub_task_states = {
+        states[machine].state if machine in states else None
+        for machine in (OBJECTIVE_FUNCTION, MINIMIZER)
+    }
 
-    if status == "FAILURE":
-        task_data.data["of_success"] = False
+    if FAILURE in sub_task_states:
+        if not TaskStateTransition.transition(db_id, PHASE, "failed", PHASES):
+            TASK_LOGGER.debug("Task result is already settled.")
+            return None
+        TASK_LOGGER.info("One or more sub tasks have finished as failed!")
+        task_data.task_status = "FAILURE"
+        task_data.finished_at = datetime.utcnow()
         task_data.save(commit=True)
-        return self.replace(check_final_result.s(db_id=db_id))
 
-    # TODO: load of data?
+        app = current_app._get_current_object()
+        TASK_STATUS_CHANGED.send(app, task_id=db_id)
+        return None
 
-    task_data.data["of_success"] = True
+    if sub_task_states != {SUCCESS}:
+        TASK_LOGGER.debug("One or more sub tasks are not finished.")
+        return None
 
-    task_data.save(commit=True)
+    # both subtasks must have finished successfully
+    if not TaskStateTransition.transition(db_id, PHASE, "finished", PHASES):
+        TASK_LOGGER.debug("Task result is already settled.")
+        return None
 
-    # check if optimization is finished
-    return self.replace(check_final_result.s(db_id=db_id))
+    return save_task_result.s(task_log="Finished optimization process.", db_id=db_id)
 
 
 @CELERY.task(
-    name=f"{Optimizer.instance.identifier}.check_final_result",
+    name=f"{Optimizer.instance.identifier}.watchdog",
     bind=True,
     ignore_result=True,
 )
-def check_final_result(self, db_id: int):
-    TASK_LOGGER.info(f"Checking final result for task with db_id={db_id}")
-    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+def watchdog(self, db_id: int):
+    """Poll the coordinated tasks if no state transition happened for ``WATCHDOG_TIMEOUT`` seconds.
 
-    if task_data is None:
-        msg = f"Could not load task data with id {db_id} to read parameters!"
-        TASK_LOGGER.error(msg)
-        raise KeyError(msg)
+    The watchdog reschedules itself until the optimization is finished.
+    """
+    task_data = _load_task(db_id)
 
-    assert isinstance(task_data.data, dict)
-
-    if task_data.status in ("SUCCESS", "FAILURE"):
-        TASK_LOGGER.debug("Task result is already settled.")
+    if task_data.is_finished:
         return
 
-    of_state = task_data.data.get("of_success", None)
-    minimizer_state = task_data.data.get("minimizer_success", None)
+    states = TaskStateTransition.get_current_states(db_id)
 
-    if of_state is None or minimizer_state is None:
-        TASK_LOGGER.debug("One or more sub tasks are not finished.")
+    if PHASE not in states or states[PHASE].state in FINAL_PHASES:
         return
 
-    if of_state is False or minimizer_state is False:
-        TASK_LOGGER.info("One or more sub tasks have finished as failed!")
-        task_data.task_status = "FAILURE"
-        task_data.finished_at = datetime.utcnow()
-        task_data.save(commit=True)
+    idle_time = min(state.seconds_since() for state in states.values())
 
-        app = current_app._get_current_object()
-        TASK_STATUS_CHANGED.send(app, task_id=db_id)
-        return
+    if idle_time >= WATCHDOG_TIMEOUT:
+        TASK_LOGGER.info(
+            f"No events for {idle_time:.0f}s, polling the coordinated tasks of task with db_id={db_id}"
+        )
+        idle_time = 0
+        try:
+            final_task = _update_of(task_data) or _update_minimizer(task_data)
+        except Exception as err:
+            TASK_LOGGER.warning(f"Polling the coordinated tasks failed: {err!r}")
+        else:
+            if final_task is not None:
+                return self.replace(final_task)
 
-    # both subtasks must have finished successfully
-    return self.replace(
-        save_task_result.s(task_log="Finished optimization process.", db_id=db_id)
-    )
+    watchdog.s(db_id=db_id).apply_async(countdown=WATCHDOG_TIMEOUT - idle_time)
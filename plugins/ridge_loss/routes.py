@@ -35,6 +35,11 @@ from qhana_plugin_runner.db.models.tasks import (
     TaskLink,
     TaskUpdateSubscription,
 )
+from qhana_plugin_runner.plugin_utils.array_transport import (
+    accepts_binary,
+    get_request_arrays,
+    make_binary_response,
+)
 from qhana_plugin_runner.tasks import (
     TASK_STEPS_CHANGED,
     add_step,
@@ -44,17 +49,29 @@ from qhana_plugin_runner.tasks import (
 
 from . import RIDGELOSS_BLP, RidgeLoss
 from .schemas import (
+    BatchEvaluateRequestSchema,
+    BatchLossResponseSchema,
     CallbackUrl,
     CallbackUrlSchema,
+    CombinedResponseSchema,
     EvaluateRequestSchema,
     EvaluateSchema,
+    GradientResponseSchema,
     HyperparamterInputData,
     HyperparamterInputSchema,
     LossResponseSchema,
     PassDataSchema,
+    SolutionResponseSchema,
     WeightsResponseSchema,
 )
-from .tasks import clear_task_data, load_data, load_data_from_db, ridge_loss
+from .tasks import (
+    clear_task_data,
+    load_data,
+    load_data_from_db,
+    ridge_loss_and_gradient,
+    ridge_loss_batch,
+    ridge_solution,
+)
 
 
 @RIDGELOSS_BLP.route("/")
@@ -229,8 +246,48 @@ class SetupProcess(MethodView):
                 _external=True,
             ),
         )
+        calc_grad_link = TaskLink(
+            db_task,
+            type="of-evaluate-gradient",
+            href=url_for(
+                f"{RIDGELOSS_BLP.name}.{CalcGradientEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
+        calc_loss_and_grad_link = TaskLink(
+            db_task,
+            type="of-evaluate-combined",
+            href=url_for(
+                f"{RIDGELOSS_BLP.name}.{CalcLossAndGradEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
+        calc_loss_batch_link = TaskLink(
+            db_task,
+            type="of-evaluate-batch",
+            href=url_for(
+                f"{RIDGELOSS_BLP.name}.{CalcLossBatchEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
+        solution_link = TaskLink(
+            db_task,
+            type="of-solution",
+            href=url_for(
+                f"{RIDGELOSS_BLP.name}.{SolutionEndpoint.__name__}",
+                db_id=db_task.id,
+                _external=True,
+            ),
+        )
         DB.session.add(weights_link)
         DB.session.add(calc_loss_link)
+        DB.session.add(calc_grad_link)
+        DB.session.add(calc_loss_and_grad_link)
+        DB.session.add(calc_loss_batch_link)
+        DB.session.add(solution_link)
 
         subscription.save()
 
@@ -454,33 +511,162 @@ class WeightsEndpoint(MethodView):
         return {"weights": db_task.data.get("weights", -1)}
 
 
+def _get_weights(evaluate_input: dict) -> np.ndarray:
+    """Get the weights from a binary (application/octet-stream) or json request body."""
+    try:
+        arrays = get_request_arrays()
+    except ValueError as err:
+        abort(HTTPStatus.BAD_REQUEST, message=str(err))
+    if arrays is not None:
+        if len(arrays) != 1:
+            abort(HTTPStatus.BAD_REQUEST, message="Expected exactly one weights array!")
+        return arrays[0]
+    if "weights" not in evaluate_input:
+        abort(HTTPStatus.BAD_REQUEST, message="No weights given!")
+    try:
+        return np.array(evaluate_input["weights"], dtype=float)
+    except ValueError:
+        abort(
+            HTTPStatus.BAD_REQUEST, message="All weight vectors must have the same size!"
+        )
+
+
+def _load_moments(db_id: int):
+    """Load the moments of the data (see :py:func:`.tasks.accumulate_moments`) and alpha."""
+    db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+    if db_task is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        abort(HTTPStatus.NOT_FOUND, message=msg)
+
+    assert isinstance(db_task.data, dict)
+
+    if "gram_key" not in db_task.data:
+        abort(HTTPStatus.CONFLICT, message="The data was not loaded yet!")
+
+    gram = load_data_from_db(db_task.data["gram_key"])
+    xty = load_data_from_db(db_task.data["xty_key"])
+
+    return gram, xty, db_task.data["yty"], db_task.data["alpha"]
+
+
+def _prepare_data(db_id: int, evaluate_input: dict, batch: bool = False):
+    gram, xty, yty, alpha = _load_moments(db_id)
+
+    weights = _get_weights(evaluate_input)
+    if batch:
+        if weights.ndim != 2:
+            abort(HTTPStatus.BAD_REQUEST, message="Expected a list of weight vectors!")
+    else:
+        weights = weights.reshape(-1)
+
+    if weights.shape[-1] != len(xty):
+        msg = f"Expected {len(xty)} weights per weight vector!"
+        abort(HTTPStatus.BAD_REQUEST, message=msg)
+
+    return weights, gram, xty, yty, alpha
+
+
 @RIDGELOSS_BLP.route("/task/<int:db_id>/loss/")
 class CalcLossEndpoint(MethodView):
     """Endpoint for the loss calculation."""
 
     @RIDGELOSS_BLP.response(HTTPStatus.OK, LossResponseSchema())
     @RIDGELOSS_BLP.arguments(
-        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=True
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
     )
     @RIDGELOSS_BLP.require_jwt("jwt", optional=True)
     def post(self, input_data: dict, db_id: int) -> dict:
         """Calculate the loss given the specific weights."""
 
-        db_task: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
-        if db_task is None:
-            msg = f"Could not load task data with id {db_id} to read parameters!"
-            abort(HTTPStatus.NOT_FOUND, message=msg)
+        weights, gram, xty, yty, alpha = _prepare_data(db_id, input_data)
 
-        assert isinstance(db_task.data, dict)
+        loss, _ = ridge_loss_and_gradient(
+            w=weights, gram=gram, xty=xty, yty=yty, alpha=alpha
+        )
+        if accepts_binary():
+            return make_binary_response(loss)
+        return {"loss": loss}
 
-        weights = np.array(input_data["weights"])
-        features = load_data_from_db(db_task.data["features_key"])
-        target = load_data_from_db(db_task.data["target_key"])
 
-        loss = ridge_loss(
-            X=features,
-            y=target,
-            w=weights,
-            alpha=db_task.data["alpha"],
+@RIDGELOSS_BLP.route("/task/<int:db_id>/gradient/")
+class CalcGradientEndpoint(MethodView):
+    """Endpoint for the gradient calculation."""
+
+    @RIDGELOSS_BLP.response(HTTPStatus.OK, GradientResponseSchema())
+    @RIDGELOSS_BLP.arguments(
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @RIDGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the gradient given the specific weights."""
+
+        weights, gram, xty, yty, alpha = _prepare_data(db_id, input_data)
+
+        _, gradient = ridge_loss_and_gradient(
+            w=weights, gram=gram, xty=xty, yty=yty, alpha=alpha
         )
-        return {"loss": loss}
+        if accepts_binary():
+            return make_binary_response(gradient)
+        return {"gradient": gradient.tolist()}
+
+
+@RIDGELOSS_BLP.route("/task/<int:db_id>/loss-and-gradient/")
+class CalcLossAndGradEndpoint(MethodView):
+    """Endpoint for the loss and gradient calculation."""
+
+    @RIDGELOSS_BLP.response(HTTPStatus.OK, CombinedResponseSchema())
+    @RIDGELOSS_BLP.arguments(
+        EvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @RIDGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the loss and the gradient given the specific weights."""
+
+        weights, gram, xty, yty, alpha = _prepare_data(db_id, input_data)
+
+        loss, gradient = ridge_loss_and_gradient(
+            w=weights, gram=gram, xty=xty, yty=yty, alpha=alpha
+        )
+        if accepts_binary():
+            return make_binary_response(loss, gradient)
+        return {"loss": loss, "gradient": gradient.tolist()}
+
+
+@RIDGELOSS_BLP.route("/task/<int:db_id>/loss-batch/")
+class CalcLossBatchEndpoint(MethodView):
+    """Endpoint for the loss calculation of many weight vectors."""
+
+    @RIDGELOSS_BLP.response(HTTPStatus.OK, BatchLossResponseSchema())
+    @RIDGELOSS_BLP.arguments(
+        BatchEvaluateRequestSchema(unknown=EXCLUDE), location="json", required=False
+    )
+    @RIDGELOSS_BLP.require_jwt("jwt", optional=True)
+    def post(self, input_data: dict, db_id: int) -> dict:
+        """Calculate the losses given a list of weight vectors."""
+
+        weights, gram, xty, yty, alpha = _prepare_data(db_id, input_data, batch=True)
+
+        losses = ridge_loss_batch(W=weights, gram=gram, xty=xty, yty=yty, alpha=alpha)
+        if accepts_binary():
+            return make_binary_response(losses)
+        return {"losses": losses.tolist()}
+
+
+@RIDGELOSS_BLP.route("/task/<int:db_id>/solution/")
+class SolutionEndpoint(MethodView):
+    """Endpoint for the closed-form solution of the ridge regression."""
+
+    @RIDGELOSS_BLP.response(HTTPStatus.OK, SolutionResponseSchema())
+    @RIDGELOSS_BLP.require_jwt("jwt", optional=True)
+    def get(self, db_id: int) -> dict:
+        """Calculate the weights minimizing the loss and the minimal loss."""
+
+        gram, xty, yty, alpha = _load_moments(db_id)
+
+        weights = ridge_solution(gram=gram, xty=xty, alpha=alpha)
+        loss, _ = ridge_loss_and_gradient(
+            w=weights, gram=gram, xty=xty, yty=yty, alpha=alpha
+        )
+        if accepts_binary():
+            return make_binary_response(weights, loss)
+        return {"weights": weights.tolist(), "loss": loss}
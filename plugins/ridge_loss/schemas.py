@@ -83,8 +83,44 @@ class WeightsResponseSchema(MaBaseSchema):
 
 
 class EvaluateRequestSchema(MaBaseSchema):
-    weights = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+    weights = ma.fields.List(
+        ma.fields.Number(),
+        required=False,
+        allow_none=False,
+        metadata={
+            "description": "The weights (required unless they are sent as application/octet-stream body)."
+        },
+    )
 
 
 class LossResponseSchema(MaBaseSchema):
     loss = ma.fields.Number(required=True, allow_none=False)
+
+
+class GradientResponseSchema(MaBaseSchema):
+    gradient = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+
+
+class CombinedResponseSchema(MaBaseSchema):
+    loss = ma.fields.Number(required=True, allow_none=False)
+    gradient = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+
+
+class BatchEvaluateRequestSchema(MaBaseSchema):
+    weights = ma.fields.List(
+        ma.fields.List(ma.fields.Number()),
+        required=False,
+        allow_none=False,
+        metadata={
+            "description": "The weight vectors (required unless they are sent as application/octet-stream body)."
+        },
+    )
+
+
+class BatchLossResponseSchema(MaBaseSchema):
+    losses = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+
+
+class SolutionResponseSchema(MaBaseSchema):
+    weights = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+    loss = ma.fields.Number(required=True, allow_none=False)
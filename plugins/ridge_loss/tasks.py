@@ -12,9 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from functools import lru_cache
 from io import BytesIO
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Optional, Tuple
 
 import numpy as np
 from celery.utils.log import get_task_logger
@@ -23,7 +23,9 @@ from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.db import DB
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.db.models.virtual_plugins import DataBlob
+from qhana_plugin_runner.plugin_utils.array_cache import get_array_cache
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
+    ArrayEntity,
     ensure_array,
     load_entities,
 )
@@ -34,28 +36,131 @@ from . import RidgeLoss
 TASK_LOGGER = get_task_logger(__name__)
 
 
-def ridge_loss(w: np.ndarray, X: np.ndarray, y: np.ndarray, alpha: float) -> float:
+LOAD_CHUNK_SAMPLES = 2**13
+"""Number of samples that are accumulated at once by :py:func:`accumulate_moments`."""
+
+
+def accumulate_moments(
+    features: Iterable[Tuple[float, ...]], y: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, float]:
     """
-    Calculate the ridge loss given weights, features, target, and alpha.
+    Calculate the moments ``XᵀX/n``, ``Xᵀy/n`` and ``yᵀy/n`` the ridge loss depends on.
+
+    The features are consumed in chunks, so the whole feature matrix never has
+    to be in memory.
 
     Args:
-        w: Weights
-        X: Features
+        features: Feature vectors of the samples (in the same order as the target)
         y: Target
+
+    Raises:
+        ValueError: if the number of samples of features and target differ
+
+    Returns:
+        The moments ``(XᵀX/n, Xᵀy/n, yᵀy/n)``.
+    """
+    features = iter(features)
+    y = np.asarray(y, dtype=float).reshape(-1)
+    gram = None
+    xty = None
+    n_samples = 0
+    while chunk := list(islice(features, LOAD_CHUNK_SAMPLES)):
+        X = np.array(chunk, dtype=float, ndmin=2)
+        y_chunk = y[n_samples : n_samples + len(X)]
+        if len(y_chunk) != len(X):
+            raise ValueError("Features have more samples than the target!")
+        if gram is None:
+            gram = np.zeros((X.shape[1], X.shape[1]))
+            xty = np.zeros(X.shape[1])
+        gram += X.T @ X
+        xty += X.T @ y_chunk
+        n_samples += len(X)
+    if n_samples == 0 or n_samples != len(y):
+        raise ValueError("Features and target have a different number of samples!")
+    return gram / n_samples, xty / n_samples, float(y @ y) / n_samples
+
+
+def ridge_loss_and_gradient(
+    w: np.ndarray, gram: np.ndarray, xty: np.ndarray, yty: float, alpha: float
+) -> Tuple[float, np.ndarray]:
+    """
+    Calculate the ridge loss and its gradient from the moments of the data.
+
+    ``mean((y - Xw)²) = yᵀy/n - 2wᵀXᵀy/n + wᵀXᵀXw/n``, so every call is
+    ``O(d²)`` instead of ``O(n·d)``.
+
+    Args:
+        w: Weights
+        gram: ``XᵀX/n`` (see :py:func:`accumulate_moments`)
+        xty: ``Xᵀy/n``
+        yty: ``yᵀy/n``
+        alpha: Ridge regularization parameter
+
+    Returns:
+        The ridge loss and the gradient.
+    """
+    gram_w = gram @ w
+    loss = yty - 2 * (w @ xty) + w @ gram_w + alpha * (w @ w)
+    gradient = 2 * (gram_w - xty + alpha * w)
+    return float(max(loss, 0.0)), gradient
+
+
+def ridge_loss_batch(
+    W: np.ndarray, gram: np.ndarray, xty: np.ndarray, yty: float, alpha: float
+) -> np.ndarray:
+    """
+    Calculate the ridge loss of many weight vectors at once.
+
+    Args:
+        W: Weight vectors, shape (n_weight_vectors, n_features)
+        gram: ``XᵀX/n`` (see :py:func:`accumulate_moments`)
+        xty: ``Xᵀy/n``
+        yty: ``yᵀy/n``
         alpha: Ridge regularization parameter
 
     Returns:
-        The calculated ridge loss.
+        The ridge loss of every weight vector.
     """
-    y_pred = np.dot(X, w)
-    mse = np.mean((y - y_pred) ** 2)
-    ridge_penalty = alpha * np.sum(w**2)
-    return mse + ridge_penalty
+    losses = yty - 2 * (W @ xty) + np.einsum("ij,ij->i", W @ gram, W)
+    losses += alpha * np.einsum("ij,ij->i", W, W)
+    return np.maximum(losses, 0.0)
+
+
+def ridge_solution(gram: np.ndarray, xty: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Calculate the weights minimizing the ridge loss in closed form.
+
+    Solves ``(XᵀX/n + alpha·I) w = Xᵀy/n``, falls back to the least squares
+    solution if the system is singular (only possible for ``alpha <= 0``).
+
+    Args:
+        gram: ``XᵀX/n`` (see :py:func:`accumulate_moments`)
+        xty: ``Xᵀy/n``
+        alpha: Ridge regularization parameter
+
+    Returns:
+        The optimal weights.
+    """
+    system = gram + alpha * np.eye(len(gram))
+    try:
+        return np.linalg.solve(system, xty)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(system, xty, rcond=None)[0]
+
+
+def _store_array(task_data: ProcessingTask, name: str, array: np.ndarray):
+    key = f"{task_data.id}.{name}"
+    dump = BytesIO()
+    np.save(dump, array, allow_pickle=False)
+    DataBlob.set_value(RidgeLoss.instance.name, key, dump.getvalue())
+    # remove outdated cached data of previous uploads
+    get_array_cache().remove(RidgeLoss.instance.name, key)
+    task_data.data[f"{name}_key"] = key
 
 
 @CELERY.task(name=f"{RidgeLoss.instance.identifier}.load_data", bind=True)
 def load_data(self, db_id: int):
-    """Load the features and target arrays into DB for fast and efficient access."""
+    """Load the features and target and store the moments of the data the ridge loss depends on."""
     TASK_LOGGER.info(f"Load data for optimization '{db_id}'")
     task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
 
@@ -72,44 +177,33 @@ def load_data(self, db_id: int):
     assert isinstance(features_data_url, str)
     assert isinstance(target_data_url, str)
 
-    with open_url(features_data_url, stream=True) as x:
-        mimetype = get_mimetype(x)
+    with open_url(target_data_url, stream=True) as y:
+        mimetype = get_mimetype(y)
         if not mimetype:
-            raise ValueError("Could not determine mimetype of x!")
+            raise ValueError("Could not determine mimetype of y!")
 
-        data = tuple(
-            e.values
-            for e in ensure_array(load_entities(x, mimetype=mimetype), strict=True)
+        y_array = np.fromiter(
+            (
+                e.values[0]
+                for e in ensure_array(load_entities(y, mimetype=mimetype), strict=True)
+            ),
+            dtype=float,
         )
-        x_array = np.array(data)
-        key_x = f"{db_id}.features"
-        x_dump = BytesIO()
-        np.save(x_dump, x_array, allow_pickle=False)
-        DataBlob.set_value(RidgeLoss.instance.name, key_x, x_dump.getvalue())
-        task_data.data["features_key"] = key_x
-        task_data.data["weights"] = x_array.shape[1]
-        del data  # clear large data from memory faster
-        del x_array
-        del x_dump
 
-    with open_url(target_data_url, stream=True) as y:
-        mimetype = get_mimetype(y)
+    with open_url(features_data_url, stream=True) as x:
+        mimetype = get_mimetype(x)
         if not mimetype:
-            raise ValueError("Could not determine mimetype of y!")
+            raise ValueError("Could not determine mimetype of x!")
 
-        data = tuple(
-            e.values[0]
-            for e in ensure_array(load_entities(y, mimetype=mimetype), strict=True)
+        entities: Iterable[ArrayEntity] = ensure_array(
+            load_entities(x, mimetype=mimetype), strict=True
         )
-        y_array = np.array(data)
-        key_y = f"{db_id}.target"
-        y_dump = BytesIO()
-        np.save(y_dump, y_array, allow_pickle=False)
-        DataBlob.set_value(RidgeLoss.instance.name, key_y, y_dump.getvalue())
-        task_data.data["target_key"] = key_y
-        del data  # clear large data from memory faster
-        del y_array
-        del y_dump
+        gram, xty, yty = accumulate_moments((e.values for e in entities), y_array)
+
+    _store_array(task_data, "gram", gram)
+    _store_array(task_data, "xty", xty)
+    task_data.data["yty"] = yty
+    task_data.data["weights"] = len(xty)
 
     task_data.clear_previous_step()
 
@@ -125,30 +219,32 @@ def clear_task_data(db_id: int):
 
     assert isinstance(task_data.data, dict)
 
-    # clear the complete cache as the data is no longer required in memory
-    # may slow down other jobs running at the same time
-    load_data_from_db.cache_clear()
+    array_cache = get_array_cache()
 
-    for key in ("features_key", "target_key"):
+    for key in ("gram_key", "xty_key"):
         data_key = task_data.data[key]
-        # clear blob data that is no longer needed
+        # clear cached and blob data that is no longer needed
+        array_cache.remove(RidgeLoss.instance.name, data_key)
         DataBlob.delete_value(RidgeLoss.instance.name, data_key)
     DB.session.commit()
 
     return "completed objective function task"
 
 
-@lru_cache(maxsize=8)  # values may be large so avoid excessive caching...
 def load_data_from_db(key: str) -> np.ndarray:
     """Load a numpy array from the database given the database key.
 
-    Results of this function are cached for maximum efficiency!
+    The array is cached in a memory mapped file that is shared by all worker
+    processes (see :py:mod:`~qhana_plugin_runner.plugin_utils.array_cache`).
 
     Args:
         key (str): the key the array is stored under
 
     Returns:
-        np.ndarray: the numpy array
+        np.ndarray: the (read-only) numpy array
     """
-    data = BytesIO(DataBlob.get_value(RidgeLoss.instance.name, key))
-    return np.load(data, allow_pickle=False)
+    return get_array_cache().get_array(
+        RidgeLoss.instance.name,
+        key,
+        lambda: DataBlob.get_value(RidgeLoss.instance.name, key),
+    )
@@ -84,6 +84,11 @@ class MetadataView(MethodView):
                         content_type=["text/plain"],
                         required=True,
                     ),
+                    DataMetadata(
+                        data_type="provenance/trace",
+                        content_type=["application/json"],
+                        required=True,
+                    ),
                 ],
             ),
         )
@@ -95,6 +100,7 @@ class MinimizerSetupMicroFrontend(MethodView):
 
     example_inputs = {
         "method": MinimizerEnum.nelder_mead,
+        "starts": 1,
     }
 
     @SCIPY_MINIMIZER_BLP.html_response(
@@ -188,6 +194,8 @@ class MinimizerSetupProcessStep(MethodView):
             task_name="minimizer_task",
         )
         db_task.data["method"] = arguments.method.value
+        db_task.data["starts"] = arguments.starts
+        db_task.data["cancel_dominated"] = arguments.cancel_dominated
 
         db_task.save()
         DB.session.flush()
@@ -55,6 +55,8 @@ class MinimizerTaskResponseSchema(MaBaseSchema):
 @dataclass
 class MinimizerSetupTaskInputData:
     method: MinimizerEnum
+    starts: int = 1
+    cancel_dominated: bool = False
 
 
 class MinimizerSetupTaskInputSchema(FrontendFormBaseSchema):
@@ -68,6 +70,27 @@ class MinimizerSetupTaskInputSchema(FrontendFormBaseSchema):
             "input_type": "select",
         },
     )
+    starts = ma.fields.Integer(
+        required=False,
+        allow_none=False,
+        load_default=1,
+        validate=ma.validate.Range(min=1, max=64),
+        metadata={
+            "label": "Number of Starts",
+            "description": "Minimize from this many initial weights in parallel and keep the best result.",
+            "input_type": "number",
+        },
+    )
+    cancel_dominated = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        load_default=False,
+        metadata={
+            "label": "Cancel Dominated Starts",
+            "description": "Stop starts that used more evaluations than a finished start without reaching its loss.",
+            "input_type": "checkbox",
+        },
+    )
 
     @ma.post_load
     def make_task_input_data(self, data, **kwargs):
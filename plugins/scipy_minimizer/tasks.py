@@ -12,18 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from json import dumps, loads
 from tempfile import SpooledTemporaryFile
-from typing import Optional, Any
-from time import sleep, time
+from time import time
+from typing import Callable, List, Optional, Sequence
 
 import numpy as np
-import requests
-from requests.exceptions import ConnectionError, Timeout
+from celery import chord
 from celery.utils.log import get_task_logger
 from scipy.optimize import minimize as scipy_minimize
 
 from qhana_plugin_runner.celery import CELERY
-from qhana_plugin_runner.db.models.tasks import ProcessingTask
+from qhana_plugin_runner.db.db import DB
+from qhana_plugin_runner.db.models.tasks import ProcessingTask, TaskStateTransition
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     ensure_array,
     load_entities,
@@ -31,7 +32,11 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     array_to_entity,
     ArrayEntity,
 )
-from qhana_plugin_runner.plugin_utils.interop import get_task_result_no_wait
+from qhana_plugin_runner.plugin_utils.interop import (
+    get_task_result_no_wait,
+    request_plugin_endpoint,
+)
+from qhana_plugin_runner.plugin_utils.objective_function import evaluate
 from qhana_plugin_runner.requests import get_mimetype, open_url
 from qhana_plugin_runner.storage import STORE
 
@@ -39,55 +44,25 @@ from . import ScipyMinimizer
 
 TASK_LOGGER = get_task_logger(__name__)
 
+MAX_BATCH_VALUES = 2**22
+"""Maximum number of weight values sent in one request to the batch evaluation endpoint (32 MiB)."""
 
-def async_request(url: str, json: Optional[Any] = None, timeout: int = 24 * 6 * 60):
-    """Call an evaluation endpoint of the objective function and return the result.
+FINITE_DIFFERENCE_STEP = float(np.sqrt(np.finfo(float).eps))
+"""Relative step of the forward differences (the default of the scipy 2-point scheme)."""
 
-    This function follows redirects and polls the endpoint until the result is available if required.
-    The function does an exponential backoff up to 30 seconds to reduce load on the target server.
-    If the connection fails for some reason 5 times on succession, the connectione error will be escalated.
+GRADIENT_METHODS = frozenset(("CG", "BFGS", "L-BFGS-B", "TNC", "SLSQP", "trust-constr"))
+"""Minimization methods that use the gradient of the objective function."""
 
-    Args:
-        url (str): the url to call
-        json (Optional[Any], optional): the data to pass to the endpoint. Defaults to None.
-        timeout (int, optional): the timeout in seconds after which an error will be thrown. Defaults to 24 hours.
 
-    Raises:
-        Timeout: reached the final timeout
+CANCEL_CHECK_INTERVAL = 1
+"""Seconds between two checks if a start of a multi-start minimization is dominated."""
 
-    Returns:
-        Response: the resulting response
-    """
-    errors = 0
-    is_first = True
-    sleep_duration = 1
-    max_sleep = 30
-    timeout_after = time() + timeout
-    while errors < 5:
-        if time() > timeout_after:
-            raise Timeout()  # timeout after specified time
-        if not is_first:
-            # sleep after first request and adjust next sleep duration
-            sleep(sleep_duration)
-            sleep_duration = min(max_sleep, sleep_duration * 2)
-        try:
-            response = requests.request(
-                method=("POST" if is_first else "GET"), url=url, json=json, timeout=3
-            )
-            if is_first:
-                url = response.url  # follow redirects on first request
-            is_first = False
-            errors = max(0, errors - 1)  # successfull attempts decrease errors
-        except ConnectionError:
-            is_first = False
-            errors += 1
-            if errors >= 5:
-                raise
-            continue  # error with the connection, wait and retry
-        if response.status_code == 204 or (is_first and response.status_code == 404):
-            continue  # no result available, wait and retry
-        response.raise_for_status()
-        return response
+START_MACHINE_PREFIX = "start-"
+"""Prefix of the names of the task state machines tracking the starts of a minimization."""
+
+RUNNING = "running"
+FINISHED = "finished"
+CANCELLED = "cancelled"
 
 
 def loss_(calc_loss_endpoint_url: str):
@@ -103,15 +78,258 @@ def loss_(calc_loss_endpoint_url: str):
     """
 
     def loss(x0):
-        weights = x0
-        if isinstance(x0, np.ndarray):
-            weights = x0.tolist()
-        response = async_request(url=calc_loss_endpoint_url, json={"weights": weights})
-        return response.json()["loss"]
+        (loss_value,) = evaluate(calc_loss_endpoint_url, x0, ("loss",))
+        return float(loss_value)
 
     return loss
 
 
+def loss_and_finite_difference_jac_(calc_loss_batch_endpoint_url: str):
+    """
+    Function generator to calculate the loss and a forward difference approximation of the gradient.
+    All points of the approximation are evaluated with as few requests to the batch endpoint of the
+    objective function as possible instead of one request per point.
+
+    Args:
+        calc_loss_batch_endpoint_url: The URL to which the batched loss calculation requests will be sent.
+
+    Returns:
+        A function that calculates the loss and the approximated gradient.
+    """
+
+    def loss_and_jac(x0):
+        x0 = np.asarray(x0, dtype=float)
+        size = len(x0)
+        sign = np.where(x0 >= 0, 1.0, -1.0)
+        step = FINITE_DIFFERENCE_STEP * sign * np.maximum(1.0, np.abs(x0))
+        step = (x0 + step) - x0  # use exactly representable steps
+        chunk_size = max(1, MAX_BATCH_VALUES // max(1, size))
+        losses = []
+        # row 0 is the unperturbed point, row i + 1 is perturbed in dimension i
+        for start in range(0, size + 1, chunk_size):
+            dims = np.arange(start, min(start + chunk_size, size + 1)) - 1
+            points = np.tile(x0, (len(dims), 1))
+            rows = np.flatnonzero(dims >= 0)
+            points[rows, dims[rows]] += step[dims[rows]]
+            (chunk_losses,) = evaluate(calc_loss_batch_endpoint_url, points, ("losses",))
+            losses.append(chunk_losses)
+        losses = np.concatenate(losses)
+        return float(losses[0]), (losses[1:] - losses[0]) / step
+
+    return loss_and_jac
+
+
+class StartCancelled(Exception):
+    """Raised by the objective function of a start that is dominated by a finished start."""
+
+
+class StartProgress:
+    """Wrap the objective function of one start of a minimization to record its progress.
+
+    The wrapper records the number of evaluations and the best loss (and weights)
+    seen so far. With ``cancel_dominated`` it periodically checks the finished
+    starts of the same task and raises :py:class:`StartCancelled` once one of them
+    reached a lower loss with at most as many evaluations as this start used.
+
+    Args:
+        db_id (int): the database id of the minimization task
+        fun (Callable): the objective function returning the loss (or the loss and the gradient)
+        cancel_dominated (bool): cancel the start if it is dominated by a finished start
+    """
+
+    def __init__(self, db_id: int, fun: Callable, cancel_dominated: bool):
+        self.db_id = db_id
+        self.fun = fun
+        self.cancel_dominated = cancel_dominated
+        self.evaluations = 0
+        self.best_loss = float("inf")
+        self.best_x: Optional[np.ndarray] = None
+        self.trace: List[List[float]] = []  # (evaluations, loss) of every improvement
+        self._next_check = time() + CANCEL_CHECK_INTERVAL
+
+    def __call__(self, x):
+        value = self.fun(x)
+        loss = value[0] if isinstance(value, tuple) else value
+        self.evaluations += 1
+        if loss < self.best_loss:
+            self.best_loss = float(loss)
+            self.best_x = np.array(x, dtype=float)
+            self.trace.append([self.evaluations, self.best_loss])
+        if self.cancel_dominated and time() >= self._next_check:
+            if self.is_dominated():
+                raise StartCancelled()
+            self._next_check = time() + CANCEL_CHECK_INTERVAL
+        return value
+
+    def is_dominated(self) -> bool:
+        """Check if a finished start of the task is better than this start."""
+        DB.session.commit()  # end the transaction to see the starts finished meanwhile
+        for machine, current in TaskStateTransition.get_current_states(
+            self.db_id
+        ).items():
+            if not machine.startswith(START_MACHINE_PREFIX) or current.state != FINISHED:
+                continue
+            other = loads(current.data)
+            if (
+                other["loss"] < self.best_loss
+                and other["evaluations"] <= self.evaluations
+            ):
+                return True
+        return False
+
+
+def _run_start(
+    db_id: int,
+    start: int,
+    x0: Sequence[float],
+    method: str,
+    calc_loss_endpoint: str,
+    calc_loss_batch_endpoint: Optional[str],
+    cancel_dominated: bool,
+) -> dict:
+    """Run one start of a minimization and return its result and trace."""
+    machine = f"{START_MACHINE_PREFIX}{start}"
+    TaskStateTransition.transition(db_id, machine, RUNNING, from_states=(None,))
+
+    loss_fun = loss_(calc_loss_endpoint)
+    jac = None
+    if calc_loss_batch_endpoint and method in GRADIENT_METHODS:
+        # evaluate all points of the finite differences in batches
+        loss_fun = loss_and_finite_difference_jac_(calc_loss_batch_endpoint)
+        jac = True
+
+    progress = StartProgress(db_id, loss_fun, cancel_dominated=cancel_dominated)
+    try:
+        result = scipy_minimize(
+            fun=progress, x0=np.asarray(x0, dtype=float), method=method, jac=jac
+        )
+    except StartCancelled:
+        status, message = CANCELLED, "Dominated by a finished start."
+        x, loss = progress.best_x, progress.best_loss
+    else:
+        TASK_LOGGER.info(f"Optimization result of start {start}: {result}")
+        status, message = FINISHED, str(result.message)
+        x, loss = result.x, float(result.fun)
+        if progress.best_loss < loss:  # some methods do not return the best point
+            x, loss = progress.best_x, progress.best_loss
+
+    TaskStateTransition.transition(
+        db_id,
+        machine,
+        status,
+        from_states=(RUNNING,),
+        data=dumps({"loss": loss, "evaluations": progress.evaluations}),
+    )
+    return {
+        "start": start,
+        "status": status,
+        "message": message,
+        "loss": loss,
+        "evaluations": progress.evaluations,
+        "x": np.asarray(x, dtype=float).tolist(),
+        "trace": progress.trace,
+    }
+
+
+def _save_results(db_id: int, method: str, results: Sequence[dict]) -> str:
+    """Save the weights of the best start and the traces of all starts as task results."""
+    best = min(results, key=lambda r: r["loss"])
+    TASK_LOGGER.info(
+        f"Best of {len(results)} start(s) is start {best['start']} with loss {best['loss']}."
+    )
+
+    array_entities = [ArrayEntity("weights", "", best["x"])]
+    entities = tuple(array_to_entity(array_entities, prefix="x_"))
+
+    csv_attributes = entities[0].entity_attributes
+
+    with SpooledTemporaryFile(mode="w") as output:
+        save_entities(entities, output, "text/csv", attributes=csv_attributes)
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"final_weights_scipy_{method}.csv",
+            "entity/vector",
+            "text/csv",
+        )
+
+    traces = {
+        "best_start": best["start"],
+        "starts": [{k: v for k, v in r.items() if k != "x"} for r in results],
+    }
+    with SpooledTemporaryFile(mode="w") as output:
+        output.write(dumps(traces))
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"minimization_traces_scipy_{method}.json",
+            "provenance/trace",
+            "application/json",
+        )
+    return "Success"
+
+
+@CELERY.task(name=f"{ScipyMinimizer.instance.identifier}.minimize_start")
+def minimize_start(
+    db_id: int,
+    start: int,
+    x0: List[float],
+    calc_loss_endpoint: str,
+    calc_loss_batch_endpoint: Optional[str],
+) -> dict:
+    """
+    Run one start of a multi-start minimization.
+
+    Args:
+        db_id: The database id of the task.
+        start: The index of the start.
+        x0: The initial weights of the start.
+        calc_loss_endpoint: The loss endpoint of the objective function.
+        calc_loss_batch_endpoint: The batch loss endpoint of the objective function (if available).
+
+    Returns:
+        The result of the start including its trace.
+    """
+    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+
+    if task_data is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        TASK_LOGGER.error(msg)
+        raise KeyError(msg)
+
+    return _run_start(
+        db_id,
+        start,
+        x0,
+        method=task_data.data.get("method"),
+        calc_loss_endpoint=calc_loss_endpoint,
+        calc_loss_batch_endpoint=calc_loss_batch_endpoint,
+        cancel_dominated=task_data.data.get("cancel_dominated", False),
+    )
+
+
+@CELERY.task(name=f"{ScipyMinimizer.instance.identifier}.save_best_start")
+def save_best_start(results: List[dict], db_id: int) -> str:
+    """
+    Save the result of the best start of a multi-start minimization.
+
+    Args:
+        results: The results of all starts.
+        db_id: The database id of the task.
+
+    Returns:
+        A string describing the outcome.
+    """
+    task_data: Optional[ProcessingTask] = ProcessingTask.get_by_id(id_=db_id)
+
+    if task_data is None:
+        msg = f"Could not load task data with id {db_id} to read parameters!"
+        TASK_LOGGER.error(msg)
+        raise KeyError(msg)
+
+    return _save_results(db_id, task_data.data.get("method"), results)
+
+
 @CELERY.task(name=f"{ScipyMinimizer.instance.identifier}.minimize", bind=True)
 def minimize_task(self, db_id: int) -> str:
     """
@@ -152,19 +370,24 @@ def minimize_task(self, db_id: int) -> str:
         )
 
     calc_loss_endpoint = None
+    calc_loss_batch_endpoint = None
     get_weight_count_endpoint = None
     for link in of_task_result.get("links", []):
         if link["type"] == "of-weights":
             get_weight_count_endpoint = link["href"]
         elif link["type"] == "of-evaluate":
             calc_loss_endpoint = link["href"]
+        elif link["type"] == "of-evaluate-batch":
+            calc_loss_batch_endpoint = link["href"]
 
     if not calc_loss_endpoint:
         raise ValueError("Objective function task does not provide a 'of-evaluate' link!")
     if not get_weight_count_endpoint:
         raise ValueError("Objective function task does not provide a 'of-weights' link!")
 
-    weights_response = requests.get(get_weight_count_endpoint, timeout=3)
+    weights_response = request_plugin_endpoint(
+        "GET", get_weight_count_endpoint, timeout=3
+    )
     weights_response.raise_for_status()
 
     nr_of_weights = weights_response.json()["weights"]
@@ -198,26 +421,33 @@ def minimize_task(self, db_id: int) -> str:
         if (0 > initial_weights).any() or (1 < initial_weights).any():
             raise ValueError("Initial weights may only have values between 0 and 1!")
 
-    loss_fun = loss_(calc_loss_endpoint)
-
-    minimize_params = {"fun": loss_fun, "x0": initial_weights, "method": method}
-
-    result = scipy_minimize(**minimize_params)
-
-    TASK_LOGGER.info(f"Optimization result: {result}")
-
-    array_entities = [ArrayEntity("weights", "", result.x.tolist())]
-    entities = tuple(array_to_entity(array_entities, prefix="x_"))
-
-    csv_attributes = entities[0].entity_attributes
+    starts = task_data.data.get("starts", 1)
 
-    with SpooledTemporaryFile(mode="w") as output:
-        save_entities(entities, output, "text/csv", attributes=csv_attributes)
-        STORE.persist_task_result(
+    if starts == 1:
+        result = _run_start(
             db_id,
-            output,
-            f"final_weights_scipy_{method}.csv",
-            "entity/vector",
-            "text/csv",
+            0,
+            initial_weights,
+            method=method,
+            calc_loss_endpoint=calc_loss_endpoint,
+            calc_loss_batch_endpoint=calc_loss_batch_endpoint,
+            cancel_dominated=False,
         )
-    return "Success"
+        return _save_results(db_id, method, [result])
+
+    # run the starts in parallel on all workers and save the best result once all are done
+    TASK_LOGGER.info(f"Starting {starts} minimizations with method {method}.")
+    initial_points = [initial_weights] + [
+        np.random.randn(nr_of_weights) for _ in range(starts - 1)
+    ]
+    minimization = [
+        minimize_start.si(
+            db_id=db_id,
+            start=start,
+            x0=x0.tolist(),
+            calc_loss_endpoint=calc_loss_endpoint,
+            calc_loss_batch_endpoint=calc_loss_batch_endpoint,
+        )
+        for start, x0 in enumerate(initial_points)
+    ]
+    return self.replace(chord(minimization, save_best_start.s(db_id=db_id)))
@@ -13,13 +13,10 @@
 # limitations under the License.
 
 from tempfile import SpooledTemporaryFile
-from time import sleep, time
-from typing import Any, Optional
+from typing import Optional
 
 import numpy as np
-import requests
 from celery.utils.log import get_task_logger
-from requests.exceptions import ConnectionError, Timeout
 from scipy.optimize import minimize as scipy_minimize
 
 from qhana_plugin_runner.celery import CELERY
@@ -31,7 +28,11 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     load_entities,
     save_entities,
 )
-from qhana_plugin_runner.plugin_utils.interop import get_task_result_no_wait
+from qhana_plugin_runner.plugin_utils.interop import (
+    get_task_result_no_wait,
+    request_plugin_endpoint,
+)
+from qhana_plugin_runner.plugin_utils.objective_function import evaluate
 from qhana_plugin_runner.requests import get_mimetype, open_url
 from qhana_plugin_runner.storage import STORE
 
@@ -40,56 +41,6 @@ from . import ScipyMinimizerGrad
 TASK_LOGGER = get_task_logger(__name__)
 
 
-def async_request(url: str, json: Optional[Any] = None, timeout: int = 24 * 6 * 60):
-    """Call an evaluation endpoint of the objective function and return the result.
-
-    This function follows redirects and polls the endpoint until the result is available if required.
-    The function does an exponential backoff up to 30 seconds to reduce load on the target server.
-    If the connection fails for some reason 5 times on succession, the connectione error will be escalated.
-
-    Args:
-        url (str): the url to call
-        json (Optional[Any], optional): the data to pass to the endpoint. Defaults to None.
-        timeout (int, optional): the timeout in seconds after which an error will be thrown. Defaults to 24 hours.
-
-    Raises:
-        Timeout: reached the final timeout
-
-    Returns:
-        Response: the resulting response
-    """
-    errors = 0
-    is_first = True
-    sleep_duration = 1
-    max_sleep = 30
-    timeout_after = time() + timeout
-    while errors < 5:
-        if time() > timeout_after:
-            raise Timeout()  # timeout after specified time
-        if not is_first:
-            # sleep after first request and adjust next sleep duration
-            sleep(sleep_duration)
-            sleep_duration = min(max_sleep, sleep_duration * 2)
-        try:
-            response = requests.request(
-                method=("POST" if is_first else "GET"), url=url, json=json, timeout=3
-            )
-            if is_first:
-                url = response.url  # follow redirects on first request
-            is_first = False
-            errors = max(0, errors - 1)  # successfull attempts decrease errors
-        except ConnectionError:
-            is_first = False
-            errors += 1
-            if errors >= 5:
-                raise
-            continue  # error with the connection, wait and retry
-        if response.status_code == 204 or (is_first and response.status_code == 404):
-            continue  # no result available, wait and retry
-        response.raise_for_status()
-        return response
-
-
 def loss_(calc_loss_endpoint_url: str):
     """
     Function generator to calculate loss. This returns a function that calculates loss
@@ -103,11 +54,8 @@ def loss_(calc_loss_endpoint_url: str):
     """
 
     def loss(x0):
-        weights = x0
-        if isinstance(x0, np.ndarray):
-            weights = x0.tolist()
-        response = async_request(url=calc_loss_endpoint_url, json={"weights": weights})
-        return response.json()["loss"]
+        (loss_value,) = evaluate(calc_loss_endpoint_url, x0, ("loss",))
+        return float(loss_value)
 
     return loss
 
@@ -125,14 +73,8 @@ def jac_(calc_gradient_endpoint_url: str):
     """
 
     def jac(x0):
-        weights = x0
-        if isinstance(x0, np.ndarray):
-            weights = x0.tolist()
-
-        response = async_request(
-            url=calc_gradient_endpoint_url, json={"weights": weights}
-        )
-        return np.array(response.json()["gradient"])
+        (gradient,) = evaluate(calc_gradient_endpoint_url, x0, ("gradient",))
+        return np.array(gradient)
 
     return jac
 
@@ -150,15 +92,10 @@ def loss_and_jac_(calc_loss_and_gradient_endpoint_url: str):
     """
 
     def loss_and_jac(x0):
-        weights = x0
-        if isinstance(x0, np.ndarray):
-            weights = x0.tolist()
-
-        response = async_request(
-            url=calc_loss_and_gradient_endpoint_url, json={"weights": weights}
+        loss_value, gradient = evaluate(
+            calc_loss_and_gradient_endpoint_url, x0, ("loss", "gradient")
         )
-        data = response.json()
-        return data["loss"], np.array(data["gradient"])
+        return float(loss_value), np.array(gradient)
 
     return loss_and_jac
 
@@ -226,7 +163,9 @@ def minimize_task(self, db_id: int) -> str:
     if not get_weight_count_endpoint:
         raise ValueError("Objective function task does not provide a 'of-weights' link!")
 
-    weights_response = requests.get(get_weight_count_endpoint, timeout=3)
+    weights_response = request_plugin_endpoint(
+        "GET", get_weight_count_endpoint, timeout=3
+    )
     weights_response.raise_for_status()
 
     nr_of_weights = weights_response.json()["weights"]
@@ -124,9 +124,18 @@ def create_app(test_config: Optional[Dict[str, Any]] = None):
         if "DEFAULT_FILE_STORE" in os.environ:
             config["DEFAULT_FILE_STORE"] = os.environ["DEFAULT_FILE_STORE"]
 
+        if "KERNEL_CACHE_MAX_BYTES" in os.environ:
+            config["KERNEL_CACHE_MAX_BYTES"] = int(os.environ["KERNEL_CACHE_MAX_BYTES"])
+
+        if "ARRAY_CACHE_MAX_BYTES" in os.environ:
+            config["ARRAY_CACHE_MAX_BYTES"] = int(os.environ["ARRAY_CACHE_MAX_BYTES"])
+
         if "SERVER_NAME" in os.environ:
             config["SERVER_NAME"] = os.environ["SERVER_NAME"]
 
+        if "LOCAL_PLUGIN_HOSTS" in os.environ:
+            config["LOCAL_PLUGIN_HOSTS"] = os.environ["LOCAL_PLUGIN_HOSTS"].split()
+
         if "PLUGIN_REGISTRY_URL" in os.environ:
             config["PLUGIN_REGISTRY_URL"] = os.environ["PLUGIN_REGISTRY_URL"]
 
@@ -12,14 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from datetime import datetime
-from typing import List, NamedTuple, Optional, Sequence, Union
+from datetime import datetime, timezone
+from typing import Collection, Dict, List, NamedTuple, Optional, Sequence, Union
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.orderinglist import OrderingList, ordering_list
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import sqltypes as sql
 from sqlalchemy.sql.expression import delete, distinct, or_, select
-from sqlalchemy.sql.schema import ForeignKey
+from sqlalchemy.sql.schema import ForeignKey, Index
 
 from ..db import DB, REGISTRY
 from .mutable_json import JSON_LIKE, MutableJSON
@@ -322,6 +323,145 @@ class TaskUpdateSubscription:
             DB.session.commit()
 
 
+@REGISTRY.mapped_as_dataclass
+class TaskStateTransition:
+    """Table for the state transitions of (logical) tasks that coordinate other tasks.
+
+    A task can track multiple named state machines (e.g. one per coordinated
+    task). Every transition is a new row with a sequence number that is unique
+    per task and state machine, the current state of a state machine is the
+    transition with the highest sequence number.
+
+    Use :meth:`transition` to change a state. Transitions that start from the
+    same state concurrently are detected by the unique index and only one of
+    them succeeds.
+
+    Attributes:
+        id (int, optional): automatically generated database id.
+        task_id (int): the id of the :class:`ProcessingTask` the state machine belongs to.
+        machine (str): the name of the state machine.
+        seq (int): the sequence number of the transition within its state machine.
+        state (str): the state entered by this transition.
+        data (Optional[str], optional): lightweight data attached to the state, e.g. the URL of a coordinated task.
+        created_at (datetime, optional): the moment of the transition. (default :py:func:`~datetime.datetime.utcnow`)
+    """
+
+    __tablename__ = "TaskStateTransition"
+    __table_args__ = (
+        Index("ix_TaskStateTransition_task_id", "task_id", "machine", "seq", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(sql.INTEGER(), primary_key=True, init=False)
+    task_id: Mapped[int] = mapped_column(sql.INTEGER(), ForeignKey(ProcessingTask.id))
+    machine: Mapped[str] = mapped_column(sql.String(64))
+    seq: Mapped[int] = mapped_column(sql.Integer())
+    state: Mapped[str] = mapped_column(sql.String(64))
+    data: Mapped[Optional[str]] = mapped_column(sql.Text(), nullable=True, default=None)
+    created_at: Mapped[datetime] = mapped_column(
+        sql.TIMESTAMP(timezone=True), default_factory=datetime.utcnow
+    )
+
+    @classmethod
+    def get_current(
+        cls, task: Union[int, ProcessingTask], machine: str
+    ) -> Optional["TaskStateTransition"]:
+        """Get the last transition of a state machine of a task. (None if the state machine has no state yet)"""
+        task_id = task.id if isinstance(task, ProcessingTask) else task
+        q = (
+            select(cls)
+            .filter_by(task_id=task_id, machine=machine)
+            .order_by(cls.seq.desc())
+            .limit(1)
+        )
+        return DB.session.execute(q).scalar_one_or_none()
+
+    @classmethod
+    def get_current_states(
+        cls, task: Union[int, ProcessingTask]
+    ) -> Dict[str, "TaskStateTransition"]:
+        """Get the last transitions of all state machines of a task by the name of the state machine."""
+        task_id = task.id if isinstance(task, ProcessingTask) else task
+        q = select(cls).filter_by(task_id=task_id).order_by(cls.seq)
+        # later transitions replace earlier transitions of the same state machine
+        return {t.machine: t for t in DB.session.execute(q).scalars()}
+
+    @classmethod
+    def transition(
+        cls,
+        task: Union[int, ProcessingTask],
+        machine: str,
+        state: str,
+        from_states: Optional[Collection[Optional[str]]] = None,
+        data: Optional[str] = None,
+        commit: bool = True,
+    ) -> Optional["TaskStateTransition"]:
+        """Change the state of a state machine of a task if it is in one of the expected states.
+
+        A transition that conflicts with a concurrent transition rolls back the
+        current session (including other uncommitted transitions).
+
+        Args:
+            task (Union[int, ProcessingTask]): the task (or its id) the state machine belongs to
+            machine (str): the name of the state machine
+            state (str): the new state
+            from_states (Optional[Collection[Optional[str]]], optional): the states the transition may start from, ``None`` in the collection matches a state machine without a state. Defaults to None (any state).
+            data (Optional[str], optional): data to attach to the new state. Defaults to None.
+            commit (bool, optional): commit the session, otherwise the transition is only flushed and conflicts are detected on flush. Defaults to True.
+
+        Returns:
+            Optional[TaskStateTransition]: the new transition or None if the state machine was not in one of the expected states
+        """
+        task_id = task.id if isinstance(task, ProcessingTask) else task
+        q = (
+            select(cls.seq, cls.state)
+            .filter_by(task_id=task_id, machine=machine)
+            .order_by(cls.seq.desc())
+            .limit(1)
+        )
+        current = DB.session.execute(q).first()
+        current_state = current.state if current is not None else None
+        if from_states is not None and current_state not in from_states:
+            return None
+        new_transition = cls(
+            task_id=task_id,
+            machine=machine,
+            seq=current.seq + 1 if current is not None else 0,
+            state=state,
+            data=data,
+        )
+        DB.session.add(new_transition)
+        try:
+            if commit:
+                DB.session.commit()
+            else:
+                DB.session.flush()
+        except IntegrityError:
+            DB.session.rollback()
+            return None  # another transition of this state machine was faster
+        return new_transition
+
+    def seconds_since(self, now: Optional[datetime] = None) -> float:
+        """Get the number of seconds passed since this transition.
+
+        Databases without timezone support (e.g. sqlite) return naive
+        timestamps, these are interpreted as UTC.
+
+        Args:
+            now (Optional[datetime], optional): the moment to compare to (naive values are interpreted as UTC). Defaults to None (the current time).
+
+        Returns:
+            float: the seconds since the transition
+        """
+        if now is None:
+            now = datetime.now(timezone.utc)
+        elif now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        created_at = self.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return (now - created_at).total_seconds()
+
+
 @REGISTRY.mapped_as_dataclass
 class TaskFile:
     __tablename__ = "TaskFile"
@@ -0,0 +1,211 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a file based cache for numpy arrays that are read often.
+
+Arrays are stored as ``.npy`` files and opened as read-only memory maps, so
+that all worker processes on the same machine share one copy of the data in
+the page cache instead of deserializing their own copy.
+Arrays are identified by a namespace (e.g. the plugin name) and a key (e.g.
+the key of the data blob the array is loaded from). Plugins should remove the
+arrays of a task with :py:meth:`ArrayCache.remove` once the task is finished.
+
+The cache is stored in the ``ARRAY_CACHE_PATH`` folder (relative paths are
+relative to the root of the local file store) and bounded to
+``ARRAY_CACHE_MAX_BYTES`` bytes. Least recently opened arrays are evicted
+first. Set ``ARRAY_CACHE_MAX_BYTES`` to 0 to disable the cache.
+
+Numpy is imported lazily, plugins using this module must require it.
+"""
+
+from collections import OrderedDict
+from hashlib import sha256
+from io import BytesIO
+from os import replace, utime
+from pathlib import Path
+from secrets import token_hex
+from threading import RLock
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Union
+
+from celery.utils.log import get_task_logger
+from flask import current_app
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+TASK_LOGGER = get_task_logger(__name__)
+
+DEFAULT_MAX_BYTES = 2**32
+"""The default size limit of the array cache (4 GiB)."""
+
+MAX_OPEN_ARRAYS = 32
+"""The maximum number of memory maps kept open per worker process."""
+
+_ENTRY_SUFFIX = ".npy"
+
+_SERIALIZED_TYPES = (bytes, bytearray, memoryview)
+
+_LOCK = RLock()
+_OPEN_ARRAYS: "OrderedDict[Path, Tuple[int, ndarray]]" = OrderedDict()
+
+
+def _close(path: Path) -> None:
+    with _LOCK:
+        _OPEN_ARRAYS.pop(path, None)
+
+
+class ArrayCache:
+    """A size bounded cache for numpy arrays stored in memory mapped files.
+
+    Args:
+        root (Path): the folder to store the cache entries in
+        max_bytes (int, optional): the size limit of all cache entries. Defaults to DEFAULT_MAX_BYTES.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _get_path(self, namespace: str, key: str) -> Path:
+        name = sha256(f"{namespace}\0{key}".encode()).hexdigest()
+        return self.root / f"{name[:32]}{_ENTRY_SUFFIX}"
+
+    def _open(self, path: Path) -> "ndarray":
+        import numpy as np
+
+        inode = path.stat().st_ino
+        with _LOCK:
+            entry = _OPEN_ARRAYS.get(path)
+            if entry is not None:
+                if entry[0] == inode:
+                    _OPEN_ARRAYS.move_to_end(path)
+                    return entry[1]
+                del _OPEN_ARRAYS[path]  # replaced by another process
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+        utime(path)  # mark entry as recently used
+        with _LOCK:
+            _OPEN_ARRAYS[path] = (inode, array)
+            while len(_OPEN_ARRAYS) > MAX_OPEN_ARRAYS:
+                _OPEN_ARRAYS.popitem(last=False)
+        return array
+
+    def _store(self, path: Path, data: Union[bytes, "ndarray"]) -> None:
+        import numpy as np
+
+        is_serialized = isinstance(data, _SERIALIZED_TYPES)
+        size = memoryview(data).nbytes if is_serialized else data.nbytes
+        if size > self.max_bytes:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that other workers never read partial entries
+        tmp_path = path.with_name(f".{path.name}.{token_hex(8)}")
+        with tmp_path.open("wb") as tmp_file:
+            if is_serialized:
+                tmp_file.write(data)
+            else:
+                np.save(tmp_file, data, allow_pickle=False)
+        replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Remove the least recently opened cache entries until the cache fits its size limit.
+
+        Args:
+            keep (Optional[Path], optional): an entry that must not be removed. Defaults to None.
+        """
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.root.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another worker
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            _close(path)
+            total -= size
+
+    def get_array(
+        self, namespace: str, key: str, load: Callable[[], Union[bytes, "ndarray"]]
+    ) -> "ndarray":
+        """Get a (read-only) array from the cache.
+
+        Args:
+            namespace (str): the namespace of the array, e.g. the plugin name
+            key (str): the key of the array in the namespace
+            load (Callable[[], Union[bytes, ndarray]]): loads the array or its serialized ``.npy`` bytes if it is not cached
+
+        Returns:
+            ndarray: the array, memory mapped if the cache is enabled and the array fits into the cache
+        """
+        import numpy as np
+
+        if self.enabled:
+            path = self._get_path(namespace, key)
+            try:
+                return self._open(path)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                TASK_LOGGER.warning(f"Removing unreadable array cache entry {path}.")
+                path.unlink(missing_ok=True)
+
+        data = load()
+
+        if self.enabled:
+            self._store(path, data)
+            try:
+                return self._open(path)
+            except FileNotFoundError:
+                pass  # array is larger than the cache or was evicted immediately
+
+        if isinstance(data, _SERIALIZED_TYPES):
+            return np.load(BytesIO(data), allow_pickle=False)
+        return data
+
+    def remove(self, namespace: str, key: str) -> None:
+        """Remove an array from the cache.
+
+        Args:
+            namespace (str): the namespace of the array
+            key (str): the key of the array in the namespace
+        """
+        path = self._get_path(namespace, key)
+        path.unlink(missing_ok=True)
+        _close(path)
+
+
+def get_array_cache() -> ArrayCache:
+    """Get the array cache configured in the current app config.
+
+    Returns:
+        ArrayCache: the array cache
+    """
+    config = current_app.config
+    root = Path(config.get("ARRAY_CACHE_PATH", "array_cache"))
+    if not root.is_absolute():
+        file_store_root = Path(config.get("FILE_STORE_ROOT_PATH", "files"))
+        if not file_store_root.is_absolute():
+            file_store_root = Path(current_app.instance_path) / file_store_root
+        root = file_store_root / root
+    return ArrayCache(root, int(config.get("ARRAY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)))
@@ -0,0 +1,141 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a compact binary encoding for numeric arrays in requests and responses.
+
+Objective function plugins exchange weight vectors, losses and gradients with
+minimizer plugins for every evaluation. Encoding large vectors as json lists
+is slow, so endpoints can additionally accept and return the binary encoding
+of this module with the mimetype ``application/octet-stream``.
+
+The body is a sequence of arrays. Every array starts with its number of
+dimensions as little-endian uint32, followed by its shape as little-endian
+uint64 values and its values as little-endian float64 in row-major order.
+A scalar (e.g. a loss) is encoded as an array with 0 dimensions.
+
+Endpoints should keep accepting json and only answer in the binary encoding if
+the client prefers it (see :py:func:`accepts_binary`).
+
+Numpy is imported lazily, plugins using this module must require it.
+"""
+
+from struct import Struct
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from flask import Response, request
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+ARRAY_MIMETYPE = "application/octet-stream"
+"""The mimetype of the binary array encoding."""
+
+_NDIM = Struct("<I")
+_DTYPE = "<f8"
+_ITEMSIZE = 8
+
+
+def encode_arrays(*arrays: Union["ndarray", float, List[float]]) -> bytes:
+    """Encode arrays (or scalars) in the binary array encoding.
+
+    Args:
+        *arrays: the arrays to encode, values are converted to float64
+
+    Returns:
+        bytes: the encoded arrays
+    """
+    import numpy as np
+
+    parts = []
+    for array in arrays:
+        array = np.asarray(array, dtype=_DTYPE, order="C")
+        parts.append(_NDIM.pack(array.ndim))
+        parts.append(np.array(array.shape, dtype="<u8").tobytes())
+        parts.append(array.tobytes())
+    return b"".join(parts)
+
+
+def decode_arrays(data: Union[bytes, bytearray, memoryview]) -> List["ndarray"]:
+    """Decode all arrays of a body in the binary array encoding.
+
+    The returned arrays are read-only views of ``data``.
+
+    Args:
+        data (Union[bytes, bytearray, memoryview]): the encoded arrays
+
+    Raises:
+        ValueError: if the data is not a valid binary array encoding
+
+    Returns:
+        List[ndarray]: the decoded arrays
+    """
+    import numpy as np
+
+    buffer = memoryview(data).cast("B")
+    arrays = []
+    offset = 0
+    while offset < len(buffer):
+        if offset + _NDIM.size > len(buffer):
+            raise ValueError("Truncated array header!")
+        (ndim,) = _NDIM.unpack_from(buffer, offset)
+        offset += _NDIM.size
+        if offset + 8 * ndim > len(buffer):
+            raise ValueError("Truncated array shape!")
+        shape = tuple(
+            int(d) for d in np.frombuffer(buffer, dtype="<u8", count=ndim, offset=offset)
+        )
+        offset += 8 * ndim
+        size = int(np.prod(shape, dtype=np.uint64))
+        if offset + size * _ITEMSIZE > len(buffer):
+            raise ValueError("Truncated array data!")
+        values = np.frombuffer(buffer, dtype=_DTYPE, count=size, offset=offset)
+        arrays.append(values.reshape(shape))
+        offset += size * _ITEMSIZE
+    return arrays
+
+
+def get_request_arrays() -> Optional[List["ndarray"]]:
+    """Get the arrays of the current request if its body uses the binary array encoding.
+
+    Raises:
+        ValueError: if the body is not a valid binary array encoding
+
+    Returns:
+        Optional[List[ndarray]]: the decoded arrays or None for other content types
+    """
+    if request.mimetype != ARRAY_MIMETYPE:
+        return None
+    return decode_arrays(request.get_data(cache=False))
+
+
+def accepts_binary() -> bool:
+    """Check if the client of the current request prefers the binary array encoding over json.
+
+    Returns:
+        bool: True if the response should use the binary array encoding
+    """
+    best = request.accept_mimetypes.best_match(("application/json", ARRAY_MIMETYPE))
+    return best == ARRAY_MIMETYPE
+
+
+def make_binary_response(*arrays: Union["ndarray", float, List[float]]) -> Response:
+    """Create a response containing the arrays in the binary array encoding.
+
+    Args:
+        *arrays: the arrays to return
+
+    Returns:
+        Response: the response
+    """
+    return Response(encode_arrays(*arrays), mimetype=ARRAY_MIMETYPE)
@@ -0,0 +1,362 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a per process cache for transpiled (parameterized) qiskit circuits.
+
+Transpiling a circuit is often more expensive than simulating it. Plugins that
+execute structurally identical circuits for every data point or training
+iteration should transpile the parameterized circuit once and bind the
+parameter values of all executions in bulk.
+
+Cache entries are keyed by a hash of the circuit structure (including the
+parameter names but not the parameter values), the backend (class, name,
+basis gates and coupling map) and the optimization level. Parameters of the caller are matched to the parameters of
+the cached circuit by name, so that new circuit objects with the same structure
+(e.g. of a new model instance) reuse the transpiled circuit.
+The cache keeps at most :py:data:`MAX_CACHED_CIRCUITS` circuits per worker
+process, least recently used circuits are evicted first.
+
+Qiskit and numpy are imported lazily, plugins using this module must require
+them.
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import RLock
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from celery.utils.log import get_task_logger
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from qiskit import QuantumCircuit
+    from qiskit.circuit import Parameter
+    from qiskit.result import Result
+
+TASK_LOGGER = get_task_logger(__name__)
+
+MAX_CACHED_CIRCUITS = 64
+"""The maximum number of cached transpiled circuits per worker process."""
+
+MAX_EXPERIMENTS_PER_JOB = 1024
+"""The maximum number of parameter binds that are submitted in one job by :py:meth:`CachedCircuit.get_counts`."""
+
+_NON_GATE_INSTRUCTIONS = frozenset(("barrier", "measure", "reset", "delay"))
+
+_LOCK = RLock()
+_CIRCUIT_CACHE: "OrderedDict[Hashable, QuantumCircuit]" = OrderedDict()
+_HITS = 0
+_MISSES = 0
+_TRANSPILE_TIME = 0.0
+
+
+class CircuitCacheInfo(NamedTuple):
+    """Statistics of the circuit cache of the current process."""
+
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+    transpile_time: float
+    """The total time spent transpiling circuits for cache misses in seconds."""
+
+
+def _update_hash(digest, circuit: "QuantumCircuit", standard_gates: frozenset) -> None:
+    import numpy as np
+
+    qubits = {qubit: i for i, qubit in enumerate(circuit.qubits)}
+    clbits = {clbit: i for i, clbit in enumerate(circuit.clbits)}
+    registers = [len(creg) for creg in circuit.cregs]
+    digest.update(f"{circuit.num_qubits};{registers};{circuit.global_phase};".encode())
+    for instruction in circuit.data:
+        operation = instruction.operation
+        params = [
+            p.tobytes() if isinstance(p, np.ndarray) else str(p) for p in operation.params
+        ]
+        condition = getattr(operation, "condition", None)
+        if condition is not None:
+            target, value = condition
+            if target in clbits:
+                condition = (clbits[target], value)
+            else:  # classical register
+                condition = (tuple(clbits[bit] for bit in target), value)
+        digest.update(
+            repr(
+                (
+                    operation.name,
+                    tuple(qubits[q] for q in instruction.qubits),
+                    tuple(clbits[c] for c in instruction.clbits),
+                    params,
+                    condition,
+                )
+            ).encode()
+        )
+        if operation.name in standard_gates or operation.name in _NON_GATE_INSTRUCTIONS:
+            continue
+        definition = getattr(operation, "definition", None)
+        if definition is not None:
+            # custom gates with the same name can have different definitions
+            digest.update(b"(")
+            _update_hash(digest, definition, standard_gates)
+            digest.update(b")")
+
+
+def circuit_structure_hash(circuit: "QuantumCircuit") -> str:
+    """Hash the structure of a circuit.
+
+    The hash includes the instructions, the qubits and clbits they act on and
+    their parameters. Unbound parameters are included by name, so that
+    different circuit objects with the same structure have the same hash.
+    Register names are not included.
+
+    Args:
+        circuit (QuantumCircuit): the circuit
+
+    Returns:
+        str: the hash of the circuit structure
+    """
+    from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+
+    digest = blake2b(digest_size=20)
+    _update_hash(digest, circuit, frozenset(get_standard_gate_name_mapping()))
+    return digest.hexdigest()
+
+
+def _get_backend_name(backend) -> str:
+    name = backend.name
+    return name() if callable(name) else name
+
+
+def _get_backend_key(backend) -> Hashable:
+    """Identify the transpilation target of a backend.
+
+    Backends of different providers can share a name (e.g. the "qasm_simulator"
+    of Aer and BasicAer), so the key contains the backend class and the basis
+    gates and coupling map that circuits are transpiled for.
+    """
+    backend_class = type(backend)
+    if getattr(backend, "version", 1) >= 2:
+        basis_gates = backend.target.operation_names
+        coupling_map = backend.coupling_map
+    else:
+        configuration = backend.configuration()
+        basis_gates = configuration.basis_gates or ()
+        coupling_map = configuration.coupling_map
+    if coupling_map is not None and hasattr(coupling_map, "get_edges"):
+        coupling_map = coupling_map.get_edges()
+    edges = None if coupling_map is None else tuple(sorted(map(tuple, coupling_map)))
+    return (
+        f"{backend_class.__module__}.{backend_class.__qualname__}",
+        _get_backend_name(backend),
+        tuple(sorted(basis_gates)),
+        edges,
+    )
+
+
+def _is_aer_backend(backend) -> bool:
+    try:
+        from qiskit_aer.backends.aerbackend import AerBackend
+    except ImportError:
+        return False
+    return isinstance(backend, AerBackend)
+
+
+class CachedCircuit:
+    """A transpiled (parameterized) circuit together with the backend to execute it on.
+
+    Args:
+        circuit (QuantumCircuit): the transpiled circuit
+        backend (Backend): the backend the circuit was transpiled for
+    """
+
+    def __init__(self, circuit: "QuantumCircuit", backend) -> None:
+        self.circuit = circuit
+        self.backend = backend
+        self._parameters: Dict[str, "Parameter"] = {p.name: p for p in circuit.parameters}
+
+    def _get_parameters(self, parameters: Sequence["Parameter"]) -> List["Parameter"]:
+        """Match the given parameters to the parameters of the transpiled circuit by name."""
+        try:
+            return [self._parameters[p.name] for p in parameters]
+        except KeyError as err:
+            raise ValueError(f"The circuit has no parameter {err.args[0]}!") from err
+
+    def bind(
+        self, parameters: Sequence["Parameter"], values: "ndarray"
+    ) -> List["QuantumCircuit"]:
+        """Bind the parameter values to the transpiled circuit.
+
+        Args:
+            parameters (Sequence[Parameter]): the parameters to bind (matched by name)
+            values (ndarray): the parameter values with one row per circuit and one column per parameter
+
+        Returns:
+            List[QuantumCircuit]: one bound circuit per row of ``values``
+        """
+        import numpy as np
+
+        params = self._get_parameters(parameters)
+        values = np.asarray(values, dtype=float).reshape(-1, len(params))
+        return [
+            self.circuit.assign_parameters(dict(zip(params, row)))
+            for row in values.tolist()
+        ]
+
+    def run(
+        self,
+        parameters: Sequence["Parameter"] = (),
+        values: Optional["ndarray"] = None,
+        shots: int = 1024,
+        **run_options: Any,
+    ) -> "Result":
+        """Execute the circuit once for every row of parameter values.
+
+        Aer backends bind all parameter values in one job without copying the
+        circuit. All other backends receive one bound circuit per row.
+
+        Args:
+            parameters (Sequence[Parameter], optional): the parameters to bind (matched by name). Defaults to ().
+            values (Optional[ndarray], optional): the parameter values with one row per execution. Defaults to None.
+            shots (int, optional): the number of shots per execution. Defaults to 1024.
+            **run_options: further options for ``backend.run``
+
+        Returns:
+            Result: the result of the job with one experiment per row of ``values``
+        """
+        import numpy as np
+
+        if values is None or not parameters:
+            return self.backend.run(self.circuit, shots=shots, **run_options).result()
+        if not _is_aer_backend(self.backend):
+            circuits = self.bind(parameters, values)
+            return self.backend.run(circuits, shots=shots, **run_options).result()
+        params = self._get_parameters(parameters)
+        values = np.asarray(values, dtype=float).reshape(-1, len(params))
+        parameter_binds = [{p: column for p, column in zip(params, values.T.tolist())}]
+        return self.backend.run(
+            self.circuit, shots=shots, parameter_binds=parameter_binds, **run_options
+        ).result()
+
+    def get_counts(
+        self,
+        parameters: Sequence["Parameter"],
+        values: "ndarray",
+        shots: int = 1024,
+        **run_options: Any,
+    ) -> List[Dict[str, int]]:
+        """Execute the circuit once for every row of parameter values and return the counts.
+
+        Large batches are split into jobs of at most
+        :py:data:`MAX_EXPERIMENTS_PER_JOB` executions.
+
+        Args:
+            parameters (Sequence[Parameter]): the parameters to bind (matched by name)
+            values (ndarray): the parameter values with one row per execution
+            shots (int, optional): the number of shots per execution. Defaults to 1024.
+            **run_options: further options for ``backend.run``
+
+        Returns:
+            List[Dict[str, int]]: the counts of every execution
+        """
+        import numpy as np
+
+        values = np.asarray(values, dtype=float).reshape(-1, len(parameters))
+        counts: List[Dict[str, int]] = []
+        for start in range(0, len(values), MAX_EXPERIMENTS_PER_JOB):
+            batch = values[start : start + MAX_EXPERIMENTS_PER_JOB]
+            result = self.run(parameters, batch, shots=shots, **run_options)
+            counts.extend(result.get_counts(i) for i in range(len(batch)))
+        return counts
+
+
+def get_cached_circuit(
+    circuit: "QuantumCircuit",
+    backend,
+    optimization_level: Optional[int] = None,
+) -> CachedCircuit:
+    """Get the transpiled circuit for the backend from the cache.
+
+    The circuit is only transpiled if no circuit with the same structure was
+    transpiled for the same optimization level and a backend of the same class
+    with the same name, basis gates and coupling map before.
+
+    Args:
+        circuit (QuantumCircuit): the (parameterized) circuit
+        backend (Backend): the backend to transpile the circuit for
+        optimization_level (Optional[int], optional): the optimization level of the transpiler. Defaults to None.
+
+    Returns:
+        CachedCircuit: the transpiled circuit
+    """
+    global _HITS, _MISSES, _TRANSPILE_TIME
+    from qiskit import transpile
+
+    key = (
+        circuit_structure_hash(circuit),
+        _get_backend_key(backend),
+        optimization_level,
+    )
+    with _LOCK:
+        transpiled = _CIRCUIT_CACHE.pop(key, None)
+        if transpiled is not None:
+            _HITS += 1
+            _CIRCUIT_CACHE[key] = transpiled
+            return CachedCircuit(transpiled, backend)
+
+    start = perf_counter()
+    transpiled = transpile(
+        circuit, backend=backend, optimization_level=optimization_level
+    )
+    duration = perf_counter() - start
+    TASK_LOGGER.debug(
+        f"Transpiled circuit {key[0]} for {_get_backend_name(backend)} in {duration:.3f}s."
+    )
+
+    with _LOCK:
+        _MISSES += 1
+        _TRANSPILE_TIME += duration
+        _CIRCUIT_CACHE[key] = transpiled
+        while len(_CIRCUIT_CACHE) > MAX_CACHED_CIRCUITS:
+            _CIRCUIT_CACHE.popitem(last=False)
+    return CachedCircuit(transpiled, backend)
+
+
+def cache_info() -> CircuitCacheInfo:
+    """Get the statistics of the circuit cache of the current process.
+
+    Returns:
+        CircuitCacheInfo: the cache statistics
+    """
+    with _LOCK:
+        return CircuitCacheInfo(
+            _HITS, _MISSES, len(_CIRCUIT_CACHE), MAX_CACHED_CIRCUITS, _TRANSPILE_TIME
+        )
+
+
+def clear_circuit_cache() -> None:
+    """Remove all circuits from the cache and reset the statistics."""
+    global _HITS, _MISSES, _TRANSPILE_TIME
+    with _LOCK:
+        _CIRCUIT_CACHE.clear()
+        _HITS, _MISSES, _TRANSPILE_TIME = 0, 0, 0.0
@@ -12,16 +12,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Module containing helper functions for invoking other plugins from plugins."""
-
-from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
-from urllib.parse import urljoin
+"""Module containing helper functions for invoking other plugins from plugins.
+
+Endpoints of plugins that are loaded in the current plugin runner can be
+called in process with :py:func:`request_plugin_endpoint`. The request is
+dispatched directly to the flask app of the current process instead of being
+sent over the network, so the endpoints keep their input and output contracts.
+Only endpoint URLs with a host in the ``LOCAL_PLUGIN_HOSTS`` config (or the
+``SERVER_NAME``) are called in process, all other URLs are requested over HTTP.
+"""
+
+from io import BytesIO
+from typing import (
+    Any,
+    Dict,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from urllib.parse import urljoin, urlsplit
 
-from requests import post
-from requests.exceptions import ConnectionError, RequestException
+from flask import current_app, has_app_context
+from requests import PreparedRequest, Request, Response, post
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, TooManyRedirects
+from urllib3 import HTTPResponse
+from werkzeug.exceptions import HTTPException
 
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.requests import REQUEST_SESSION, open_url
+from qhana_plugin_runner.util.plugins import QHAnaPluginBase
+
+MAX_LOCAL_REDIRECTS = 30
+"""The maximum number of redirects followed by :py:func:`request_plugin_endpoint`."""
+
+_RESPONSE_BUILDER = HTTPAdapter()
+_BODY_HEADERS = ("content-type", "content-length", "transfer-encoding")
 
 
 def get_plugin_endpoint(
@@ -97,6 +128,129 @@ def get_task_result_no_wait(
             return "FAILURE", result_data
 
 
+class LocalEndpoint(NamedTuple):
+    """A plugin endpoint that is served by the current plugin runner."""
+
+    plugin: QHAnaPluginBase
+    endpoint: str
+    view_args: Dict[str, Any]
+
+
+def get_local_plugin_hosts() -> Set[str]:
+    """Get the hosts (host[:port]) under which the plugins of the current plugin runner are reachable.
+
+    Returns:
+        Set[str]: the hosts from the ``LOCAL_PLUGIN_HOSTS`` config and the ``SERVER_NAME``
+    """
+    config = current_app.config
+    hosts = set(config.get("LOCAL_PLUGIN_HOSTS", []))
+    if config.get("SERVER_NAME"):
+        hosts.add(config["SERVER_NAME"])
+    return hosts
+
+
+def resolve_local_endpoint(url: str, method: str = "POST") -> Optional[LocalEndpoint]:
+    """Resolve an endpoint url to a plugin endpoint of the current plugin runner.
+
+    Args:
+        url (str): the endpoint url
+        method (str, optional): the http method used to call the endpoint. Defaults to "POST".
+
+    Returns:
+        Optional[LocalEndpoint]: the plugin endpoint or None if the url is not served by a plugin of this runner
+    """
+    if not has_app_context():
+        return None
+    parts = urlsplit(url)
+    if parts.netloc not in get_local_plugin_hosts():
+        return None
+    adapter = current_app.url_map.bind(parts.netloc, url_scheme=parts.scheme or "http")
+    try:
+        endpoint, view_args = adapter.match(parts.path, method=method)
+    except HTTPException:  # not found, method not allowed or redirect
+        return None
+    plugin = QHAnaPluginBase.get_plugins().get(endpoint.rpartition(".")[0])
+    if plugin is None:
+        return None  # not a plugin endpoint
+    return LocalEndpoint(plugin, endpoint, view_args)
+
+
+def _dispatch_locally(request: PreparedRequest) -> Response:
+    """Dispatch the request to the flask app of the current process."""
+    parts = urlsplit(request.url)
+    body = request.body.encode() if isinstance(request.body, str) else request.body
+    with current_app.test_request_context(
+        parts.path,
+        base_url=f"{parts.scheme}://{parts.netloc}",
+        query_string=parts.query,
+        method=request.method,
+        data=body,
+        headers=dict(request.headers),
+    ):
+        try:
+            flask_response = current_app.full_dispatch_request()
+        except Exception as err:
+            flask_response = current_app.handle_exception(err)
+    raw = HTTPResponse(
+        body=BytesIO(flask_response.get_data()),
+        headers=list(flask_response.headers.items()),
+        status=flask_response.status_code,
+        reason=flask_response.status.partition(" ")[2],
+        preload_content=False,
+        decode_content=False,
+    )
+    return _RESPONSE_BUILDER.build_response(request, raw)
+
+
+def request_plugin_endpoint(
+    method: str, url: str, allow_redirects: bool = True, **kwargs: Any
+) -> Response:
+    """Call a plugin endpoint in process if it is served by the current plugin runner or over HTTP otherwise.
+
+    Requests that are dispatched in process skip the network stack, but not
+    the routing, argument parsing and response serialization of the endpoint.
+
+    Args:
+        method (str): the http method
+        url (str): the endpoint url
+        allow_redirects (bool, optional): if redirects should be followed. Defaults to True.
+        **kwargs: further arguments of :py:meth:`~requests.Session.request` (only ``params``, ``data``, ``json`` and ``headers`` are used for requests that are dispatched in process)
+
+    Raises:
+        TooManyRedirects: if more than :py:data:`MAX_LOCAL_REDIRECTS` redirects were followed in process
+
+    Returns:
+        Response: the response
+    """
+    for _ in range(MAX_LOCAL_REDIRECTS + 1):
+        if resolve_local_endpoint(url, method) is None:
+            return REQUEST_SESSION.request(
+                method, url, allow_redirects=allow_redirects, **kwargs
+            )
+        request = Request(
+            method=method,
+            url=url,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            json=kwargs.get("json"),
+            headers=kwargs.get("headers"),
+        ).prepare()
+        response = _dispatch_locally(request)
+        if not (allow_redirects and response.is_redirect):
+            return response
+        url = urljoin(response.url, response.headers["location"])
+        if response.status_code in (301, 302, 303) and method != "HEAD":
+            # follow redirects like requests, without the request body
+            method = "GET"
+            headers = {
+                key: value
+                for key, value in (kwargs.get("headers") or {}).items()
+                if key.lower() not in _BODY_HEADERS
+            }
+            kwargs = {"headers": headers}
+    raise TooManyRedirects(f"Exceeded {MAX_LOCAL_REDIRECTS} redirects.")
+
+
 class ResultUnchangedError(Exception):
     pass
 
@@ -0,0 +1,376 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a content keyed cache for kernel matrices.
+
+Kernel values are cached per kernel configuration (e.g. kernel type,
+entanglement pattern, reps, backend and shots). The data points are split
+into blocks of ``block_size`` consecutive points and every block is identified
+by a hash of the content of its points. The cache stores one entry (tile) per
+pair of blocks, so that reruns with the same points reuse all cached values
+and reruns with appended points only compute the tiles of the changed last
+block and the new blocks. Unrelated datasets get their own tiles and never
+grow the entries of other datasets.
+
+The cache is stored in the ``KERNEL_CACHE_PATH`` folder (relative paths are
+relative to the root of the local file store) and bounded to
+``KERNEL_CACHE_MAX_BYTES`` bytes. Least recently used tiles are evicted
+first. Set ``KERNEL_CACHE_MAX_BYTES`` to 0 to disable the cache.
+
+Numpy is imported lazily, plugins using this module must require it.
+"""
+
+from hashlib import blake2b, sha256
+from json import dumps
+from os import replace, utime
+from pathlib import Path
+from secrets import token_hex
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from celery.utils.log import get_task_logger
+from flask import current_app
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+TASK_LOGGER = get_task_logger(__name__)
+
+DEFAULT_MAX_BYTES = 2**30
+"""The default size limit of the kernel cache (1 GiB)."""
+
+DEFAULT_BLOCK_SIZE = 256
+"""The default number of data points per block (a tile of 256x256 kernel values has 512 KiB)."""
+
+_ENTRY_SUFFIX = ".npy"
+
+_LOCK = Lock()
+_HITS = 0
+_MISSES = 0
+
+
+class KernelCacheInfo(NamedTuple):
+    """Statistics of a kernel cache."""
+
+    hits: int
+    """The number of values that were read from the cache."""
+    misses: int
+    """The number of values that had to be computed."""
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses
+        return f"reused {self.hits} of {total} values (hit rate {self.hit_rate:.0%})"
+
+
+def cache_info() -> KernelCacheInfo:
+    """Get the statistics of all kernel caches of the current process.
+
+    Returns:
+        KernelCacheInfo: the cache statistics
+    """
+    with _LOCK:
+        return KernelCacheInfo(_HITS, _MISSES)
+
+
+def _count(hits: int, misses: int) -> None:
+    global _HITS, _MISSES
+    with _LOCK:
+        _HITS += hits
+        _MISSES += misses
+
+
+def hash_points(data: "ndarray") -> List[bytes]:
+    """Hash the content of every data point (row) of ``data``.
+
+    Args:
+        data (ndarray): the data points
+
+    Returns:
+        List[bytes]: one 16 byte hash per data point
+    """
+    import numpy as np
+
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    data = data.reshape(len(data), -1)
+    return [blake2b(point.tobytes(), digest_size=16).digest() for point in data]
+
+
+class KernelCache:
+    """A size bounded cache for kernel matrices and per point values stored in files.
+
+    Args:
+        root (Path): the folder to store the cache entries in
+        max_bytes (int, optional): the size limit of all cache entries. Defaults to DEFAULT_MAX_BYTES.
+        block_size (int, optional): the number of data points per block. Defaults to DEFAULT_BLOCK_SIZE.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.hits = 0
+        """Number of values that were read from the cache."""
+        self.misses = 0
+        """Number of values that had to be computed."""
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def info(self) -> KernelCacheInfo:
+        """Get the statistics of this cache instance.
+
+        Use :py:func:`cache_info` for the statistics of all instances of the current process.
+
+        Returns:
+            KernelCacheInfo: the cache statistics
+        """
+        return KernelCacheInfo(self.hits, self.misses)
+
+    def _count(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+        _count(hits, misses)
+
+    def _get_config_key(self, config: Mapping[str, Any]) -> str:
+        return sha256(dumps(config, sort_keys=True, default=str).encode()).hexdigest()[
+            :32
+        ]
+
+    def _get_blocks(self, data: "ndarray") -> List[Tuple[slice, str]]:
+        """Split the data points into blocks and hash the content of every block."""
+        hashes = hash_points(data)
+        blocks = []
+        for start in range(0, len(hashes), self.block_size):
+            stop = min(start + self.block_size, len(hashes))
+            digest = blake2b(b"".join(hashes[start:stop]), digest_size=16)
+            blocks.append((slice(start, stop), digest.hexdigest()))
+        return blocks
+
+    def _load(self, path: Path) -> Optional["ndarray"]:
+        import numpy as np
+
+        try:
+            values = np.load(path, allow_pickle=False)
+            utime(path)  # mark entry as recently used
+            return values
+        except FileNotFoundError:
+            return None
+        except Exception:
+            TASK_LOGGER.warning(f"Removing unreadable kernel cache entry {path}.")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _store(self, path: Path, values: "ndarray") -> None:
+        import numpy as np
+
+        if values.nbytes > self.max_bytes:
+            return  # would evict all other entries (choose a smaller block size)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that other workers never read partial entries
+        tmp_path = path.with_name(f".{path.name}.{token_hex(8)}")
+        with tmp_path.open("wb") as tmp_file:
+            np.save(tmp_file, values, allow_pickle=False)
+        replace(tmp_path, path)
+
+    def evict(self) -> None:
+        """Remove the least recently used cache entries until the cache fits its size limit."""
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.root.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another worker
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def get_kernel_matrix(
+        self,
+        config: Mapping[str, Any],
+        kernel: Callable[["ndarray", "ndarray"], "ndarray"],
+        data_x: "ndarray",
+        data_y: "ndarray",
+        store: bool = True,
+    ) -> "ndarray":
+        """Get the kernel matrix between ``data_x`` and ``data_y``.
+
+        Only the tiles (pairs of blocks of data points) that are not already
+        cached for the kernel configuration are computed, the missing tiles
+        of a block of ``data_x`` in one call to ``kernel``.
+        The kernel must be symmetric (``k(x, y) == k(y, x)``), as cached
+        tiles are reused for swapped blocks.
+
+        Args:
+            config (Mapping[str, Any]): all parameters that influence the kernel values (must be json serializable)
+            kernel (Callable[[ndarray, ndarray], ndarray]): computes the kernel matrix of size ``len(x) x len(y)`` between two arrays of data points
+            data_x (ndarray): the data points of the rows
+            data_y (ndarray): the data points of the columns
+            store (bool, optional): if False, computed values are not added to the cache (e.g. for one-off prediction queries). Defaults to True.
+
+        Returns:
+            ndarray: the kernel matrix of size ``len(data_x) x len(data_y)``
+        """
+        import numpy as np
+
+        if not self.enabled:
+            self._count(0, len(data_x) * len(data_y))
+            return kernel(data_x, data_y)
+
+        data_x, data_y = np.asarray(data_x), np.asarray(data_y)
+        config_key = self._get_config_key(config)
+        blocks_x, blocks_y = self._get_blocks(data_x), self._get_blocks(data_y)
+        matrix = np.empty((len(data_x), len(data_y)))
+        # tiles of this call with sorted block keys (blocks can repeat, e.g. if data_x is data_y)
+        tiles: Dict[Tuple[str, str], "ndarray"] = {}
+        new_tiles: List[Tuple[str, str]] = []
+        hits = misses = 0
+
+        def get_tile(key_x: str, key_y: str) -> Optional["ndarray"]:
+            key = (key_x, key_y) if key_x <= key_y else (key_y, key_x)
+            tile = tiles.get(key)
+            if tile is None:
+                tile = self._load(self.root / f"kernel-{config_key}-{'-'.join(key)}.npy")
+                if tile is None:
+                    return None
+                tiles[key] = tile
+            return tile if key_x <= key_y else tile.T
+
+        for rows, key_x in blocks_x:
+            missing: List[Tuple[slice, str]] = []
+            for cols, key_y in blocks_y:
+                tile = get_tile(key_x, key_y)
+                if tile is None:
+                    missing.append((cols, key_y))
+                else:
+                    matrix[rows, cols] = tile
+                    hits += tile.size
+            if not missing:
+                continue
+            cols = np.concatenate([np.arange(c.start, c.stop) for c, _ in missing])
+            values = kernel(data_x[rows], data_y[cols])
+            misses += values.size
+            offset = 0
+            for cols, key_y in missing:
+                tile = values[:, offset : offset + cols.stop - cols.start]
+                offset += tile.shape[1]
+                matrix[rows, cols] = tile
+                key = (key_x, key_y) if key_x <= key_y else (key_y, key_x)
+                if key not in tiles:
+                    tiles[key] = tile if key_x <= key_y else tile.T
+                    new_tiles.append(key)
+
+        self._count(hits, misses)
+        TASK_LOGGER.info(f"Kernel cache: reused {hits} of {matrix.size} kernel entries.")
+
+        if store and new_tiles:
+            for key in new_tiles:
+                path = self.root / f"kernel-{config_key}-{'-'.join(key)}.npy"
+                self._store(path, tiles[key])
+            self.evict()
+        return matrix
+
+    def get_point_values(
+        self,
+        config: Mapping[str, Any],
+        compute: Callable[["ndarray"], "ndarray"],
+        data: "ndarray",
+        store: bool = True,
+    ) -> "ndarray":
+        """Get values that are computed per data point, e.g. statevectors.
+
+        The values are cached per block of data points, all missing blocks
+        are computed in one call to ``compute``.
+
+        Args:
+            config (Mapping[str, Any]): all parameters that influence the values (must be json serializable)
+            compute (Callable[[ndarray], ndarray]): computes the values (one row per data point) for an array of data points
+            data (ndarray): the data points
+            store (bool, optional): if False, computed values are not added to the cache. Defaults to True.
+
+        Returns:
+            ndarray: the values with one row per data point
+        """
+        import numpy as np
+
+        if not self.enabled:
+            self._count(0, len(data))
+            return compute(data)
+
+        data = np.asarray(data)
+        config_key = self._get_config_key(config)
+        blocks = self._get_blocks(data)
+        paths = [self.root / f"points-{config_key}-{key}.npy" for _, key in blocks]
+        values = [self._load(path) for path in paths]
+        missing = [i for i, block_values in enumerate(values) if block_values is None]
+        n_missing = sum(blocks[i][0].stop - blocks[i][0].start for i in missing)
+        self._count(len(data) - n_missing, n_missing)
+        if not blocks:
+            return compute(data)
+
+        if missing:
+            indices = np.concatenate(
+                [np.arange(len(data))[blocks[i][0]] for i in missing]
+            )
+            new_values = compute(data[indices])
+            offset = 0
+            for i in missing:
+                size = blocks[i][0].stop - blocks[i][0].start
+                values[i] = new_values[offset : offset + size]
+                offset += size
+                if store:
+                    self._store(paths[i], values[i])
+            if store:
+                self.evict()
+        return np.concatenate(values)
+
+
+def get_kernel_cache() -> KernelCache:
+    """Get the kernel cache configured in the current app config.
+
+    Returns:
+        KernelCache: the kernel cache
+    """
+    config = current_app.config
+    root = Path(config.get("KERNEL_CACHE_PATH", "kernel_cache"))
+    if not root.is_absolute():
+        file_store_root = Path(config.get("FILE_STORE_ROOT_PATH", "files"))
+        if not file_store_root.is_absolute():
+            file_store_root = Path(current_app.instance_path) / file_store_root
+        root = file_store_root / root
+    return KernelCache(root, int(config.get("KERNEL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)))
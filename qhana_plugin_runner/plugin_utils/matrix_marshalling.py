@@ -0,0 +1,379 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing helpers to marshall and unmarshall pairwise matrices.
+
+Pairwise matrices (e.g. entity distances, similarities or kernel matrices) can
+be stored in two formats:
+
+``application/json``
+    The legacy format, a list of entities with the attributes ``entity_1_ID``,
+    ``entity_2_ID`` and the value (e.g. ``distance``) of the pair.
+
+``application/X-pairwise-matrix``
+    A compact binary format. The file starts with the magic bytes
+    ``QHMATRIX`` followed by the length of a json header as a little-endian
+    uint32 and the utf-8 encoded json header itself. The header contains the
+    row and column IDs, the shape, the layout and the (little-endian) dtype of
+    the stored values. The array data starts at the next 64 byte boundary
+    after the header, which allows the data to be memory-mapped directly.
+
+    Supported layouts are ``"dense"`` (row-major values), ``"upper-triangular"``
+    (the values of ``numpy.triu_indices`` of a symmetric square matrix) and
+    ``"coo"`` (row indices, column indices and values of all non zero entries,
+    each section aligned to 8 bytes).
+
+Plugins consuming pairwise matrices should accept both content types in their
+input metadata so that producers and consumers that only know the json format
+keep working.
+
+Numpy is only imported when a matrix is loaded or saved, so that plugins can
+import the mimetype constants before their requirements are installed.
+"""
+
+from json import dumps, loads
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    TYPE_CHECKING,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from requests.models import Response
+
+from qhana_plugin_runner.requests import get_mimetype
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MATRIX_MIMETYPE = "application/X-pairwise-matrix"
+"""The mimetype of the binary pairwise matrix format."""
+
+MATRIX_FILE_EXTENSION = ".matrix"
+"""The file extension to use for files in the binary pairwise matrix format."""
+
+MATRIX_MAGIC = b"QHMATRIX"
+
+_FORMAT_VERSION = 1
+_HEADER_ALIGNMENT = 64
+_SECTION_ALIGNMENT = 8
+
+MatrixLayout = Literal["dense", "upper-triangular", "coo"]
+
+
+class PairwiseMatrix(NamedTuple):
+    """A pairwise matrix with the entity IDs of its rows and columns."""
+
+    row_ids: Sequence[str]
+    col_ids: Sequence[str]
+    values: "np.ndarray"
+
+    @property
+    def row_index(self) -> Dict[str, int]:
+        """Map from row entity ID to row index."""
+        return {id_: idx for idx, id_ in enumerate(self.row_ids)}
+
+    @property
+    def col_index(self) -> Dict[str, int]:
+        """Map from column entity ID to column index."""
+        return {id_: idx for idx, id_ in enumerate(self.col_ids)}
+
+
+def _padding(offset: int, alignment: int) -> int:
+    return -offset % alignment
+
+
+def _iter_json_pairs(matrix: PairwiseMatrix, value_key: str) -> Iterator[Dict[str, Any]]:
+    import numpy as np
+
+    col_ids = list(matrix.col_ids)
+    for row_id, row in zip(matrix.row_ids, np.asarray(matrix.values)):
+        for col_id, value in zip(col_ids, row.tolist()):
+            if value != value:  # nan values are missing values
+                continue
+            yield {
+                "ID": f"{row_id}_{col_id}",
+                "href": "",
+                "entity_1_ID": row_id,
+                "entity_2_ID": col_id,
+                value_key: value,
+            }
+
+
+def _save_json_matrix(matrix: PairwiseMatrix, file_: TextIO, value_key: str):
+    file_.write("[")
+    for i, pair in enumerate(_iter_json_pairs(matrix, value_key)):
+        if i:
+            file_.write(",")
+        file_.write(dumps(pair, separators=(",", ":")))
+    file_.write("]\n")
+
+
+def _save_binary_matrix(
+    matrix: PairwiseMatrix,
+    file_: IO[bytes],
+    value_key: str,
+    dtype: str,
+    layout: MatrixLayout,
+):
+    import numpy as np
+
+    values = np.asarray(matrix.values)
+    value_dtype = np.dtype(dtype).newbyteorder("<")
+    header: Dict[str, Any] = {
+        "version": _FORMAT_VERSION,
+        "layout": layout,
+        "dtype": value_dtype.str,
+        "shape": list(values.shape),
+        "value": value_key,
+        "rows": list(matrix.row_ids),
+        "cols": list(matrix.col_ids),
+    }
+
+    sections: List[np.ndarray]
+    if layout == "dense":
+        sections = [values.astype(value_dtype)]
+    elif layout == "upper-triangular":
+        if values.shape[0] != values.shape[1] or list(matrix.row_ids) != list(
+            matrix.col_ids
+        ):
+            raise ValueError(
+                "The upper-triangular layout can only be used for symmetric square matrices!"
+            )
+        sections = [values[np.triu_indices(values.shape[0])].astype(value_dtype)]
+    elif layout == "coo":
+        rows, cols = np.nonzero(np.nan_to_num(values, nan=0.0))
+        index_dtype = np.dtype("<i4" if max(values.shape) < 2**31 else "<i8")
+        header["nnz"] = len(rows)
+        header["index_dtype"] = index_dtype.str
+        sections = [
+            rows.astype(index_dtype),
+            cols.astype(index_dtype),
+            values[rows, cols].astype(value_dtype),
+        ]
+    else:
+        raise ValueError(f"Unknown matrix layout {layout}!")
+
+    if header["rows"] == header["cols"]:
+        header["cols"] = None  # do not store the same id list twice
+
+    header_bytes = dumps(header, separators=(",", ":")).encode()
+    offset = len(MATRIX_MAGIC) + 4 + len(header_bytes)
+    header_bytes += b" " * _padding(offset, _HEADER_ALIGNMENT)
+
+    file_.write(MATRIX_MAGIC)
+    file_.write(len(header_bytes).to_bytes(4, "little"))
+    file_.write(header_bytes)
+    for section in sections:
+        data = section.tobytes()
+        file_.write(data)
+        file_.write(b"\x00" * _padding(len(data), _SECTION_ALIGNMENT))
+
+
+def save_matrix(
+    matrix: PairwiseMatrix,
+    file_: Union[TextIO, IO[bytes]],
+    mimetype: str = MATRIX_MIMETYPE,
+    value_key: str = "distance",
+    dtype: str = "float64",
+    layout: MatrixLayout = "dense",
+):
+    """Write a pairwise matrix to a file.
+
+    The json format requires a text file while the binary format requires a
+    file opened in binary mode. ``nan`` values are treated as missing values
+    and are omitted in the json and the ``"coo"`` format.
+
+    Args:
+        matrix (PairwiseMatrix): the matrix to save
+        file_ (Union[TextIO, IO[bytes]]): the file to write the matrix into
+        mimetype (str, optional): the mime type to use for serialization (supported mimetypes: ``MATRIX_MIMETYPE`` and "application/json"). Defaults to MATRIX_MIMETYPE.
+        value_key (str, optional): the name of the matrix values, e.g. "distance", "similarity" or "kernel". Defaults to "distance".
+        dtype (str, optional): the dtype of the stored values ("float32" or "float64", only used with the binary format). Defaults to "float64".
+        layout (MatrixLayout, optional): the layout of the stored values (only used with the binary format). Defaults to "dense".
+
+    Raises:
+        ValueError: For unknown mimetypes or layouts
+    """
+    import numpy as np
+
+    if mimetype == "application/json":
+        _save_json_matrix(matrix, file_, value_key)
+    elif mimetype == MATRIX_MIMETYPE:
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported dtype {dtype}, use float32 or float64!")
+        _save_binary_matrix(matrix, file_, value_key, dtype, layout)
+    else:
+        raise ValueError(f"Saving matrices to {mimetype} files is not implemented!")
+
+
+def _load_json_matrix(
+    pairs: List[Dict[str, Any]], value_key: str, fill_value: float
+) -> PairwiseMatrix:
+    import numpy as np
+
+    row_index: Dict[str, int] = {}
+    col_index: Dict[str, int] = {}
+
+    def row_of(entity_id: str) -> int:
+        return row_index.setdefault(entity_id, len(row_index))
+
+    def col_of(entity_id: str) -> int:
+        return col_index.setdefault(entity_id, len(col_index))
+
+    count = len(pairs)
+    rows = np.fromiter((row_of(p["entity_1_ID"]) for p in pairs), np.intp, count)
+    cols = np.fromiter((col_of(p["entity_2_ID"]) for p in pairs), np.intp, count)
+    values = np.fromiter((p[value_key] for p in pairs), np.float64, count)
+
+    if row_index.keys() == col_index.keys() and row_index != col_index:
+        # use the same entity order for rows and columns of square matrices
+        col_ids = list(col_index.keys())
+        col_to_row = np.array([row_index[id_] for id_ in col_ids], dtype=np.intp)
+        cols = col_to_row[cols]
+        col_index = row_index
+
+    matrix = np.full((len(row_index), len(col_index)), fill_value, dtype=np.float64)
+    matrix[rows, cols] = values
+
+    return PairwiseMatrix(list(row_index.keys()), list(col_index.keys()), matrix)
+
+
+def _read_header(buffer: Union[bytes, memoryview]) -> Tuple[Dict[str, Any], int]:
+    if bytes(buffer[: len(MATRIX_MAGIC)]) != MATRIX_MAGIC:
+        raise ValueError("The file is not in the pairwise matrix format!")
+    header_start = len(MATRIX_MAGIC) + 4
+    header_length = int.from_bytes(buffer[len(MATRIX_MAGIC) : header_start], "little")
+    header_end = header_start + header_length
+    header = loads(bytes(buffer[header_start:header_end]).decode())
+    if header.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported matrix format version {header.get('version')}!")
+    return header, header_end
+
+
+def _load_binary_matrix(
+    data: Union[bytes, "np.ndarray"], fill_value: float
+) -> PairwiseMatrix:
+    import numpy as np
+
+    buffer = memoryview(data).cast("B")
+    header, offset = _read_header(buffer)
+
+    row_ids: List[str] = header["rows"]
+    col_ids: List[str] = header["cols"] if header["cols"] is not None else row_ids
+    shape = tuple(header["shape"])
+    value_dtype = np.dtype(header["dtype"])
+    layout = header["layout"]
+
+    def read_section(dtype: np.dtype, count: int) -> np.ndarray:
+        nonlocal offset
+        section = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        offset += count * dtype.itemsize
+        offset += _padding(offset, _SECTION_ALIGNMENT)
+        return section
+
+    if layout == "dense":
+        values = read_section(value_dtype, shape[0] * shape[1]).reshape(shape)
+    elif layout == "upper-triangular":
+        size = shape[0]
+        upper = read_section(value_dtype, size * (size + 1) // 2)
+        values = np.empty(shape, dtype=value_dtype)
+        rows, cols = np.triu_indices(size)
+        values[rows, cols] = upper
+        values[cols, rows] = upper
+    elif layout == "coo":
+        index_dtype = np.dtype(header["index_dtype"])
+        rows = read_section(index_dtype, header["nnz"])
+        cols = read_section(index_dtype, header["nnz"])
+        values = np.full(shape, fill_value, dtype=value_dtype)
+        values[rows, cols] = read_section(value_dtype, header["nnz"])
+    else:
+        raise ValueError(f"Unknown matrix layout {layout}!")
+
+    return PairwiseMatrix(row_ids, col_ids, values)
+
+
+def _get_local_path(file_: Response) -> Optional[Path]:
+    """Get the path of a file opened from a ``file://`` URL."""
+    name = getattr(getattr(file_, "raw", None), "name", None)
+    if isinstance(name, str) and Path(name).is_file():
+        return Path(name)
+    return None
+
+
+def load_matrix(
+    file_: Response,
+    mimetype: Optional[str] = None,
+    value_key: str = "distance",
+    fill_value: float = 0.0,
+) -> PairwiseMatrix:
+    """Load a pairwise matrix from a :py:class:`~requests.Response` object.
+
+    If the mimetype is not given, it is taken from the response. Files with an
+    unknown mimetype are checked for the magic bytes of the binary format and
+    are otherwise parsed as json. Binary files opened from ``file://`` URLs are
+    memory-mapped instead of being read into memory.
+
+    Json files use the first appearance of ``entity_1_ID`` and ``entity_2_ID``
+    to determine the order of the rows and columns. If both sets of IDs are
+    the same, the columns use the row order.
+
+    Args:
+        file_ (Response): the response to load the matrix from
+        mimetype (Optional[str], optional): the mime type to use for deserialization (supported mimetypes: ``MATRIX_MIMETYPE`` and "application/json"). Defaults to None.
+        value_key (str, optional): the name of the matrix values in the json format. Defaults to "distance".
+        fill_value (float, optional): the value of pairs that are missing in the file. Defaults to 0.0.
+
+    Raises:
+        ValueError: For unknown mimetypes
+
+    Returns:
+        PairwiseMatrix: the loaded matrix (the values may be a read-only view of the file)
+    """
+    import numpy as np
+
+    if mimetype is None:
+        mimetype = get_mimetype(file_)
+    if mimetype:
+        mimetype = mimetype.split(";", maxsplit=1)[0].strip()
+
+    if mimetype not in ("application/json", MATRIX_MIMETYPE):
+        local_path = _get_local_path(file_)
+        if local_path is not None:
+            with local_path.open("rb") as local_file:
+                magic = local_file.read(len(MATRIX_MAGIC))
+        else:
+            magic = file_.content[: len(MATRIX_MAGIC)]
+        mimetype = MATRIX_MIMETYPE if magic == MATRIX_MAGIC else "application/json"
+
+    if mimetype == "application/json":
+        return _load_json_matrix(file_.json(), value_key, fill_value)
+    elif mimetype == MATRIX_MIMETYPE:
+        local_path = _get_local_path(file_)
+        if local_path is not None:
+            data = np.memmap(local_path, dtype=np.uint8, mode="r")
+            return _load_binary_matrix(data, fill_value)
+        return _load_binary_matrix(file_.content, fill_value)
+    else:
+        raise ValueError(f"Loading matrices from {mimetype} files is not implemented!")
@@ -0,0 +1,189 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing helper functions for minimizer plugins calling the evaluation endpoints of objective functions.
+
+The weights are sent in the binary array encoding of
+:py:mod:`~qhana_plugin_runner.plugin_utils.array_transport` and endpoints that
+do not support it are called with json instead.
+
+Numpy is imported lazily, plugins using this module must require it.
+"""
+
+from time import sleep, time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set
+
+from celery.utils.log import get_task_logger
+from requests import Response
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+from qhana_plugin_runner.plugin_utils.array_transport import (
+    ARRAY_MIMETYPE,
+    decode_arrays,
+    encode_arrays,
+)
+from qhana_plugin_runner.plugin_utils.interop import request_plugin_endpoint
+from qhana_plugin_runner.requests import get_mimetype
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+TASK_LOGGER = get_task_logger(__name__)
+
+BINARY_REQUEST_HEADERS = {
+    "Content-Type": ARRAY_MIMETYPE,
+    "Accept": f"{ARRAY_MIMETYPE}, application/json;q=0.9",
+}
+"""Headers of evaluation requests that send the weights in the binary array encoding."""
+
+BINARY_REJECTED_STATUS_CODES = frozenset((400, 406, 415, 422))
+"""Status codes with which endpoints that only accept json may reject binary request bodies.
+
+Endpoints that parse the weights with ``location="json"`` answer a binary body
+with 422 (missing field) or 400 instead of 406/415, so the request is retried
+with json for all of these status codes.
+"""
+
+_JSON_ONLY_ENDPOINTS: Set[str] = set()
+"""Evaluation endpoints that rejected binary request bodies."""
+
+
+def async_request(
+    url: str,
+    json: Optional[Any] = None,
+    data: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = 24 * 6 * 60,
+) -> Response:
+    """Call an evaluation endpoint of the objective function and return the result.
+
+    Results that are returned directly by the first request are used without polling.
+    Otherwise this function follows redirects and polls the endpoint until the result is available.
+    The function does an exponential backoff up to 30 seconds to reduce load on the target server.
+    If the connection fails for some reason 5 times on succession, the connectione error will be escalated.
+    Endpoints of plugins of the same plugin runner are called in process, all other
+    requests use the pooled connections of the shared request session.
+
+    Args:
+        url (str): the url to call
+        json (Optional[Any], optional): the data to pass to the endpoint. Defaults to None.
+        data (Optional[bytes], optional): the raw request body to pass to the endpoint. Defaults to None.
+        headers (Optional[Dict[str, str]], optional): additional request headers. Defaults to None.
+        timeout (int, optional): the timeout in seconds after which an error will be thrown. Defaults to 24 hours.
+
+    Raises:
+        Timeout: reached the final timeout
+
+    Returns:
+        Response: the resulting response
+    """
+    errors = 0
+    is_first = True
+    sleep_duration = 0.1
+    max_sleep = 30
+    timeout_after = time() + timeout
+    while errors < 5:
+        if time() > timeout_after:
+            raise Timeout()  # timeout after specified time
+        if not is_first:
+            # sleep after first request and adjust next sleep duration
+            sleep(sleep_duration)
+            sleep_duration = min(max_sleep, sleep_duration * 2)
+        was_first = is_first
+        try:
+            response = request_plugin_endpoint(
+                method=("POST" if is_first else "GET"),
+                url=url,
+                json=json,
+                data=data,
+                headers=headers,
+                timeout=3,
+            )
+            if is_first:
+                url = response.url  # follow redirects on first request
+            is_first = False
+            errors = max(0, errors - 1)  # successfull attempts decrease errors
+        except ConnectionError:
+            is_first = False
+            errors += 1
+            if errors >= 5:
+                raise
+            continue  # error with the connection, wait and retry
+        if response.status_code == 204 or (was_first and response.status_code == 404):
+            continue  # no result available, wait and retry
+        response.raise_for_status()
+        return response
+
+
+def _decode_response(response: Response, keys: Sequence[str]) -> List["ndarray"]:
+    """Get the values of the keys from a binary or json evaluation response."""
+    import numpy as np
+
+    mimetype = get_mimetype(response, default="")
+    if mimetype.startswith(ARRAY_MIMETYPE):
+        arrays = decode_arrays(response.content)
+        if len(arrays) != len(keys):
+            raise ValueError(
+                f"Expected {len(keys)} arrays in the response but got {len(arrays)}!"
+            )
+        return arrays
+    data = response.json()
+    return [np.array(data[key], dtype=float) for key in keys]
+
+
+def evaluate(url: str, weights: "ndarray", keys: Sequence[str]) -> List["ndarray"]:
+    """Call an evaluation endpoint of the objective function with the given weights.
+
+    The weights are sent in the binary array encoding (application/octet-stream)
+    and the binary encoding is preferred for the response. If the endpoint rejects
+    the binary request (see :py:data:`BINARY_REJECTED_STATUS_CODES`) the request
+    is retried once with json. Endpoints that answer the json request are called
+    with json from then on. Errors of the json request and all other errors of the
+    binary request are raised.
+
+    Args:
+        url (str): the url of the evaluation endpoint
+        weights (ndarray): the weights to evaluate
+        keys (Sequence[str]): the keys of the requested values in a json response, e.g. ``("loss", "gradient")``
+
+    Raises:
+        HTTPError: if the endpoint responded with an error
+
+    Returns:
+        List[ndarray]: the requested values in the order of the keys
+    """
+    import numpy as np
+
+    weights = np.asarray(weights, dtype=float)
+    if url not in _JSON_ONLY_ENDPOINTS:
+        try:
+            response = async_request(
+                url=url, data=encode_arrays(weights), headers=BINARY_REQUEST_HEADERS
+            )
+            return _decode_response(response, keys)
+        except HTTPError as err:
+            if (
+                err.response is None
+                or err.response.status_code not in BINARY_REJECTED_STATUS_CODES
+            ):
+                raise
+            TASK_LOGGER.info(
+                f"Endpoint {url} rejected binary weights with status "
+                f"{err.response.status_code}, retrying with json."
+            )
+            response = async_request(url=url, json={"weights": weights.tolist()})
+            _JSON_ONLY_ENDPOINTS.add(url)
+            return _decode_response(response, keys)
+    response = async_request(url=url, json={"weights": weights.tolist()})
+    return _decode_response(response, keys)
@@ -0,0 +1,181 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing a shared provider for pennylane devices and qiskit backends.
+
+Creating simulator devices and logging in to the IBMQ provider is expensive.
+This module keeps a pool of simulator devices per worker process and caches
+the IBMQ provider for the last used token.
+Pooled devices are reset when they are handed out and after every celery task.
+
+Pennylane and qiskit are imported lazily, plugins using this module must
+require them.
+"""
+
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Hashable, Optional, Sequence, Tuple, Union
+
+from celery.signals import task_postrun
+from celery.utils.log import get_task_logger
+
+TASK_LOGGER = get_task_logger(__name__)
+
+SIMULATOR_DEVICES = frozenset(
+    (
+        "default.qubit",
+        "default.mixed",
+        "lightning.qubit",
+        "qiskit.aer",
+        "qiskit.basicaer",
+    )
+)
+"""Pennylane devices that are simulated locally and can be reused across tasks."""
+
+MAX_POOLED_DEVICES = 16
+"""The maximum number of pooled devices per worker process."""
+
+_LOCK = RLock()
+_DEVICE_POOL: "OrderedDict[Hashable, Any]" = OrderedDict()
+_IBMQ_PROVIDER: Optional[Tuple[str, Any]] = None
+
+
+def get_ibmq_provider(ibmq_token: str):
+    """Get the IBMQ provider for the given token.
+
+    The login is only done once per token. As qiskit only allows one enabled
+    IBMQ account per process, the active account is disabled before logging in
+    with a different token.
+
+    Args:
+        ibmq_token (str): the IBMQ token
+
+    Returns:
+        AccountProvider: the provider of the token
+    """
+    global _IBMQ_PROVIDER
+    from qiskit import IBMQ
+
+    with _LOCK:
+        if _IBMQ_PROVIDER is not None:
+            token, provider = _IBMQ_PROVIDER
+            if token == ibmq_token:
+                return provider
+            IBMQ.disable_account()
+            _IBMQ_PROVIDER = None
+        provider = IBMQ.enable_account(ibmq_token)
+        _IBMQ_PROVIDER = (ibmq_token, provider)
+        return provider
+
+
+def get_ibmq_backend(ibmq_token: str, backend_name: str):
+    """Get a backend of the IBMQ provider.
+
+    Args:
+        ibmq_token (str): the IBMQ token
+        backend_name (str): the name of the backend
+
+    Returns:
+        IBMQBackend: the backend
+    """
+    return get_ibmq_provider(ibmq_token).get_backend(backend_name)
+
+
+def get_ibmq_max_num_qubits(ibmq_token: str, backend_name: str) -> int:
+    """Get the number of qubits of an IBMQ backend.
+
+    Args:
+        ibmq_token (str): the IBMQ token
+        backend_name (str): the name of the backend
+
+    Returns:
+        int: the number of qubits
+    """
+    return get_ibmq_backend(ibmq_token, backend_name).configuration().n_qubits
+
+
+def _reset_device(device) -> None:
+    reset = getattr(device, "reset", None)
+    if reset is not None:
+        reset()
+
+
+def get_pennylane_device(name: str, wires: Union[int, Sequence[Hashable]], **kwargs: Any):
+    """Get a pennylane device.
+
+    Simulator devices (see :py:data:`SIMULATOR_DEVICES`) are taken from a per
+    process pool keyed by the device name, wires and the keyword arguments.
+    They are reset before they are returned. All other devices are created new
+    for every call.
+
+    Do not change the returned device (e.g. its shots) but request a device
+    with the required keyword arguments instead.
+
+    Args:
+        name (str): the name of the pennylane device, e.g. ``"default.qubit"``
+        wires (Union[int, Sequence[Hashable]]): the wires of the device
+        **kwargs: keyword arguments for the device, e.g. ``shots=1024`` or ``backend="qasm_simulator"``
+
+    Returns:
+        qml.Device: the device
+    """
+    import pennylane as qml
+
+    if name not in SIMULATOR_DEVICES:
+        return qml.device(name, wires=wires, **kwargs)
+
+    key = (
+        name,
+        wires if isinstance(wires, int) else tuple(wires),
+        tuple(sorted(kwargs.items())),
+    )
+    with _LOCK:
+        device = _DEVICE_POOL.pop(key, None)
+        if device is None:
+            device = qml.device(name, wires=wires, **kwargs)
+        else:
+            _reset_device(device)
+        _DEVICE_POOL[key] = device
+        while len(_DEVICE_POOL) > MAX_POOLED_DEVICES:
+            _DEVICE_POOL.popitem(last=False)
+        return device
+
+
+def reset_pooled_devices(clear: bool = False) -> None:
+    """Reset all pooled devices.
+
+    Args:
+        clear (bool, optional): if True, remove all devices from the pool to free their memory. Defaults to False.
+    """
+    with _LOCK:
+        if clear:
+            _DEVICE_POOL.clear()
+            return
+        for device in _DEVICE_POOL.values():
+            try:
+                _reset_device(device)
+            except Exception:
+                TASK_LOGGER.warning(
+                    f"Could not reset pooled device {device}, removing it from the pool."
+                )
+                clear = True
+        if clear:
+            _DEVICE_POOL.clear()
+
+
+@task_postrun.connect
+def _reset_after_task(**kwargs) -> None:
+    """Reset the pooled devices between tasks."""
+    if _DEVICE_POOL:
+        reset_pooled_devices()
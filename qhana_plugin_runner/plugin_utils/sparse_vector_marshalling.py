@@ -0,0 +1,136 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing helpers to marshall and unmarshall sparse entity vectors.
+
+Sparse entity vectors (data type ``entity/sparse-vector``) are entity vectors
+of which most values are 0, e.g. one-hot encodings. Instead of one entity per
+row they are stored column wise in the compressed sparse row (CSR) layout as
+a single json object (``application/json``)::
+
+    {
+        "ID": ["e1", "e2"],
+        "href": ["", ""],
+        "attributes": ["dim0", "dim1", "dim2"],
+        "indptr": [0, 2, 3],
+        "indices": [0, 2, 1],
+        "data": [1, 1, 1]
+    }
+
+The values of the entity ``i`` are ``data[indptr[i]:indptr[i+1]]`` in the
+columns ``indices[indptr[i]:indptr[i+1]]``, all other values are 0.
+
+Numpy and scipy are only imported when vectors are loaded or saved, so that
+plugins can import the data type constant before their requirements are installed.
+"""
+
+from json import dump
+from typing import TYPE_CHECKING, NamedTuple, Sequence, TextIO
+
+from qhana_plugin_runner.plugin_utils.entity_marshalling import ResponseLike
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+SPARSE_VECTOR_DATA_TYPE = "entity/sparse-vector"
+"""The data type of sparse entity vectors."""
+
+
+class SparseVectors(NamedTuple):
+    """Sparse entity vectors with the IDs and hrefs of their entities and the names of their attributes."""
+
+    ids: Sequence[str]
+    hrefs: Sequence[str]
+    attributes: Sequence[str]
+    values: "csr_matrix"
+
+
+def save_sparse_vectors(
+    vectors: SparseVectors, file_: TextIO, mimetype: str = "application/json"
+):
+    """Write sparse entity vectors to a file.
+
+    Args:
+        vectors (SparseVectors): the vectors to save, the values can be any scipy sparse matrix
+        file_ (TextIO): the file to write the vectors into
+        mimetype (str, optional): the mime type to use for serialization (supported mimetypes: "application/json"). Defaults to "application/json".
+
+    Raises:
+        ValueError: if the shape of the values does not match the entities and attributes
+        ValueError: For unknown mimetypes
+    """
+    if mimetype != "application/json":
+        raise ValueError(f"Saving sparse vectors to {mimetype} files is not implemented!")
+
+    values = vectors.values.tocsr()
+    if values.shape != (len(vectors.ids), len(vectors.attributes)):
+        raise ValueError(
+            f"The shape {values.shape} of the values does not match the number of "
+            f"entities ({len(vectors.ids)}) and attributes ({len(vectors.attributes)})!"
+        )
+    values.sort_indices()
+    dump(
+        {
+            "ID": list(vectors.ids),
+            "href": list(vectors.hrefs),
+            "attributes": list(vectors.attributes),
+            "indptr": values.indptr.tolist(),
+            "indices": values.indices.tolist(),
+            "data": values.data.tolist(),
+        },
+        file_,
+        separators=(",", ":"),
+    )
+    file_.write("\n")
+
+
+def load_sparse_vectors(
+    file_: ResponseLike, mimetype: str = "application/json"
+) -> SparseVectors:
+    """Load sparse entity vectors from a :py:class:`~requests.Response` like object.
+
+    Args:
+        file_ (ResponseLike): the object to load the vectors from
+        mimetype (str, optional): the mime type to use for deserialization (supported mimetypes: "application/json"). Defaults to "application/json".
+
+    Raises:
+        ValueError: if the CSR arrays do not match the entities and attributes
+        ValueError: For unknown mimetypes
+
+    Returns:
+        SparseVectors: the vectors, the values are a scipy ``csr_matrix``
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    if mimetype != "application/json":
+        raise ValueError(
+            f"Loading sparse vectors from {mimetype} files is not implemented!"
+        )
+
+    data = file_.json()
+    ids, attributes = data["ID"], data["attributes"]
+    hrefs = data.get("href") or [""] * len(ids)
+    indptr = np.array(data["indptr"], dtype=np.int64)
+    indices = np.array(data["indices"], dtype=np.int64)
+    values = np.array(data["data"])
+    if len(indptr) != len(ids) + 1 or len(hrefs) != len(ids):
+        raise ValueError("The CSR row pointers do not match the number of entities!")
+    if len(indices) != len(values) or indptr[-1] != len(values):
+        raise ValueError("The CSR indices do not match the number of values!")
+    if len(indices) and (indices.min() < 0 or indices.max() >= len(attributes)):
+        raise ValueError("The CSR column indices do not match the attributes!")
+
+    matrix = csr_matrix((values, indices, indptr), shape=(len(ids), len(attributes)))
+    return SparseVectors(ids, hrefs, attributes, matrix)
@@ -0,0 +1,286 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module containing shared helpers to visualize the decision regions of classifiers.
+
+The background of a classification plot shows the label the classifier
+predicts for every point of a mesh grid. For quantum classifiers every
+prediction can require circuit executions, so the whole grid is predicted
+with as few calls of the predictor as possible:
+
+* All grid points are passed to the predictor in one call.
+* With adaptive resolution, a coarse grid is predicted first and only the
+  cells along decision boundaries (cells whose corners have different labels)
+  are refined to the full resolution in a second call.
+* The predicted backgrounds are cached per worker process and model hash
+  (see :py:func:`get_model_hash`), so plotting the same model again reuses
+  the predictions.
+
+Numpy and plotly are imported lazily, plugins using this module must require
+them.
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from json import dumps
+from threading import RLock
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from plotly.graph_objects import Figure
+
+MAX_CACHED_BACKGROUNDS = 16
+"""The maximum number of cached background predictions per worker process."""
+
+DEFAULT_COARSE_STEP = 4
+"""The default distance (in grid points) between the points of the coarse grid of the adaptive resolution."""
+
+_LOCK = RLock()
+_BACKGROUND_CACHE: "OrderedDict[Hashable, ndarray]" = OrderedDict()
+
+
+def get_model_hash(*parts: Any) -> str:
+    """Hash everything that determines the predictions of a model.
+
+    Args:
+        *parts: numpy arrays (hashed by content), torch tensors or json serializable values, e.g. training data, labels, weights and hyperparameters
+
+    Returns:
+        str: the model hash
+    """
+    import numpy as np
+
+    digest = blake2b(digest_size=20)
+    for part in parts:
+        if hasattr(part, "detach"):  # torch tensors
+            part = part.detach().cpu().numpy()
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"{part.dtype.str}{part.shape}".encode())
+            digest.update(part.tobytes())
+        else:
+            digest.update(dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b";")
+    return digest.hexdigest()
+
+
+def get_mesh_grid(points: "ndarray", resolution: int) -> Tuple["ndarray", "ndarray"]:
+    """Get the x and y coordinates of a grid that covers all points with a margin.
+
+    Args:
+        points (ndarray): the 2d points to cover
+        resolution (int): the number of grid points per dimension
+
+    Returns:
+        Tuple[ndarray, ndarray]: the x and the y coordinates of the grid
+    """
+    import numpy as np
+
+    # Get min and max of each dimension (here x and y) and write them into vector
+    min_vec = np.array(points, dtype=float).min(axis=0)
+    max_vec = np.array(points, dtype=float).max(axis=0)
+
+    # The plotly zooms a little further out (autozoom), such that the points at the edge of the plot are perfectly visible.
+    # If we do not account for this, there would be an margin of empty space between the points and the edge of the plot.
+    # Therefore, we adapt the min and max values and thus, stretching the heatmap to the edge.
+    max_values = (
+        np.array([np.abs(min_vec), np.abs(max_vec)]).max(axis=0) * 0.2 + 1
+    )  # +1 to avoid the zero case
+    min_vec -= max_values
+    max_vec += max_values
+
+    # Subtract 1 from the resolution, we add it later on again.
+    # This lets us fill the whole screen, on low resolutions
+    h_vec = (max_vec - min_vec) / (resolution - 1)  # step size for x and y direction
+
+    max_vec += h_vec  # +h adds the previously subtracted resolution
+    x_grid = np.arange(min_vec[0], max_vec[0], h_vec[0])
+    y_grid = np.arange(min_vec[1], max_vec[1], h_vec[1])
+    return x_grid, y_grid
+
+
+def _coarse_indices(size: int, step: int) -> "ndarray":
+    import numpy as np
+
+    return np.unique(np.append(np.arange(0, size, step), size - 1))
+
+
+def predict_mesh_grid(
+    predictor: Callable[["ndarray"], Sequence[Any]],
+    x_grid: "ndarray",
+    y_grid: "ndarray",
+    coarse_step: int = 1,
+) -> "ndarray":
+    """Predict the labels of all points of a mesh grid.
+
+    With a ``coarse_step`` larger than 1, only every ``coarse_step``-th grid
+    point is predicted first. Cells of the coarse grid with the same label at
+    all four corners are filled with that label, all other cells are predicted
+    at full resolution. Decision regions smaller than a coarse cell can be
+    missed by this adaptive resolution.
+
+    Args:
+        predictor (Callable[[ndarray], Sequence[Any]]): predicts the labels of an array of 2d points
+        x_grid (ndarray): the x coordinates of the grid
+        y_grid (ndarray): the y coordinates of the grid
+        coarse_step (int, optional): the distance between the points of the coarse grid, 1 predicts all points. Defaults to 1.
+
+    Returns:
+        ndarray: the labels with shape ``(len(y_grid), len(x_grid))``
+    """
+    import numpy as np
+
+    grid = np.stack(np.meshgrid(x_grid, y_grid), axis=-1)
+    shape = grid.shape[:2]
+    if coarse_step <= 1 or min(shape) <= 2 * coarse_step:
+        return np.array(list(predictor(grid.reshape(-1, 2)))).reshape(shape)
+
+    rows = _coarse_indices(shape[0], coarse_step)
+    cols = _coarse_indices(shape[1], coarse_step)
+    coarse = np.empty((len(rows), len(cols)), dtype=object)
+    coarse[...] = np.array(
+        list(predictor(grid[np.ix_(rows, cols)].reshape(-1, 2))), dtype=object
+    ).reshape(coarse.shape)
+
+    labels = np.empty(shape, dtype=object)
+    labels[np.ix_(rows, cols)] = coarse
+    uniform = (
+        (coarse[:-1, :-1] == coarse[1:, :-1])
+        & (coarse[:-1, :-1] == coarse[:-1, 1:])
+        & (coarse[:-1, :-1] == coarse[1:, 1:])
+    )
+    refine = np.zeros(shape, dtype=bool)
+    for i, j in np.argwhere(uniform):
+        labels[rows[i] : rows[i + 1] + 1, cols[j] : cols[j + 1] + 1] = coarse[i, j]
+    for i, j in np.argwhere(~uniform):
+        refine[rows[i] : rows[i + 1] + 1, cols[j] : cols[j + 1] + 1] = True
+    refine[np.ix_(rows, cols)] = False
+
+    if refine.any():
+        labels[refine] = np.array(list(predictor(grid[refine])), dtype=object)
+    return np.array(labels.tolist())
+
+
+def add_background(
+    points: "ndarray",
+    resolution: int,
+    predictor: Callable[["ndarray"], Sequence[Any]],
+    scatter: "Figure",
+    two_classes: bool = False,
+    label_to_int: Optional[dict] = None,
+    model_hash: Optional[str] = None,
+    coarse_step: int = DEFAULT_COARSE_STEP,
+) -> "Figure":
+    """Add a heatmap to the given scatter plot that shows the areas in which the predictor predicts a certain label.
+
+    The labels of the whole mesh grid are predicted in one batched call of
+    the predictor (two calls with adaptive resolution, see
+    :py:func:`predict_mesh_grid`).
+
+    Args:
+        points (ndarray): the plotted 2d points
+        resolution (int): the number of grid points per dimension
+        predictor (Callable[[ndarray], Sequence[Any]]): predicts the labels of an array of 2d points
+        scatter (Figure): the scatter plot of the points
+        two_classes (bool, optional): if True, draw contours instead of a heatmap. Defaults to False.
+        label_to_int (Optional[dict], optional): maps the labels of the scatter plot traces to the color indices. Defaults to None.
+        model_hash (Optional[str], optional): hash of the model (see :py:func:`get_model_hash`), enables caching the background. Defaults to None.
+        coarse_step (int, optional): the coarse grid step of the adaptive resolution, 1 predicts all grid points. Defaults to DEFAULT_COARSE_STEP.
+
+    Returns:
+        Figure: the plot with the background
+    """
+    import numpy as np
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    x_grid, y_grid = get_mesh_grid(points, resolution)
+
+    key = None
+    Z = None
+    if model_hash is not None:
+        key = (model_hash, get_model_hash(x_grid, y_grid), coarse_step)
+        with _LOCK:
+            Z = _BACKGROUND_CACHE.get(key)
+            if Z is not None:
+                _BACKGROUND_CACHE.move_to_end(key)
+    if Z is None:
+        Z = predict_mesh_grid(predictor, x_grid, y_grid, coarse_step)
+        if key is not None:
+            with _LOCK:
+                _BACKGROUND_CACHE[key] = Z
+                while len(_BACKGROUND_CACHE) > MAX_CACHED_BACKGROUNDS:
+                    _BACKGROUND_CACHE.popitem(last=False)
+
+    if two_classes:
+        # Create contours
+        background = go.Figure(
+            go.Contour(
+                z=Z + 1,
+                x=x_grid,
+                y=y_grid,
+                showscale=False,
+                colorscale=list(px.colors.qualitative.D3),
+                zmin=0,
+                zmax=10,
+                hoverinfo="skip",
+                opacity=0.55,
+                line_width=1,
+            )
+        )
+    else:
+        # Create heatmap
+        background = go.Figure(
+            go.Heatmap(
+                z=Z,
+                x=x_grid,
+                y=y_grid,
+                showscale=False,
+                colorscale=list(px.colors.qualitative.D3),
+                zmin=0,
+                zmax=9,
+                hoverinfo="skip",
+                opacity=0.55,
+            )
+        )
+
+    # Give markers a slightly thicker border, since their background will most likely have the same color.
+    # Note, background is due to the heatmap
+    scatter.update_traces(marker=dict(line=dict(width=2.5)))
+    # Correct colors of different labels. 0 gets the first color, 1 the second and so on
+    # Thus the color match with the heatmap colors
+    for sca_plt in scatter.data:
+        label = int(
+            sca_plt.legendgroup[0]
+            if label_to_int is None
+            else label_to_int[", ".join(sca_plt.legendgroup.split(", ")[:-1])]
+        )
+        sca_plt.update(marker=dict(color=px.colors.qualitative.D3[label]))
+
+    # Combine both heatmap and scatter plot
+    # layout=fig.layout keeps the description of the legend
+    scatter = go.Figure(data=background.data + scatter.data, layout=scatter.layout)
+
+    # Set x- and y-axes correctly, in case the background still is not large enough for autozoom
+    scatter.update_xaxes(range=[x_grid.min(), x_grid.max()])
+    scatter.update_yaxes(range=[y_grid.min(), y_grid.max()])
+
+    return scatter
+
+
+def clear_background_cache() -> None:
+    """Remove all cached background predictions."""
+    with _LOCK:
+        _BACKGROUND_CACHE.clear()
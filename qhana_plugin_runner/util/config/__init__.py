@@ -49,12 +49,25 @@ class ProductionConfig(SQLAchemyProductionConfig, SmorestProductionConfig):
     DEFAULT_FILE_STORE = "local_filesystem"
     FILE_STORE_ROOT_PATH = "files"
 
+    # folder of the kernel cache (relative paths are relative to FILE_STORE_ROOT_PATH)
+    KERNEL_CACHE_PATH = "kernel_cache"
+    KERNEL_CACHE_MAX_BYTES = 2**30  # set to 0 to disable the kernel cache
+
+    # folder of the array cache (relative paths are relative to FILE_STORE_ROOT_PATH)
+    ARRAY_CACHE_PATH = "array_cache"
+    ARRAY_CACHE_MAX_BYTES = 2**32  # set to 0 to disable the array cache
+
     PLUGIN_REGISTRY_URL: Optional[str] = None
 
     # URL rewrite rules are (pattern, replacement) pairs that are applied
     # in order to URLs opened with qhana_plugin_runner.requests.open_url
     URL_REWRITE_RULES: Sequence[Tuple[re.Pattern, str]] = []
 
+    # hosts (host[:port]) under which the plugins of this runner are reachable,
+    # plugin endpoints with these hosts are called in process (see plugin_utils.interop)
+    # SERVER_NAME is always included if it is set
+    LOCAL_PLUGIN_HOSTS: Sequence[str] = []
+
     NISQ_ANALYZER_UI_URL = "http://localhost:4201"
 
 
@@ -15,7 +15,9 @@ import json
 from enum import Enum
 from http import HTTPStatus
 from tempfile import SpooledTemporaryFile
-from typing import Mapping, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
 
 from celery.canvas import chain
 from celery.utils.log import get_task_logger
@@ -44,7 +46,12 @@ from qhana_plugin_runner.api.util import (
 )
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
-from qhana_plugin_runner.plugin_utils.entity_marshalling import save_entities
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import (
+    MATRIX_FILE_EXTENSION,
+    MATRIX_MIMETYPE,
+    PairwiseMatrix,
+    save_matrix,
+)
 from qhana_plugin_runner.plugin_utils.zip_utils import get_files_from_zip_url
 from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.tasks import save_task_error, save_task_result
@@ -137,7 +144,7 @@ class PluginsView(MethodView):
                 data_output=[
                     DataMetadata(
                         data_type="custom/entity-distances",
-                        content_type=["application/zip"],
+                        content_type=["application/json", MATRIX_MIMETYPE],
                         required=True,
                     )
                 ],
@@ -244,6 +251,111 @@ class Aggregator(QHAnaPluginBase):
         return ""
 
 
+class DistanceAccumulator:
+    """Aggregates attribute distances incrementally, one attribute at a time.
+
+    Entity IDs are mapped to matrix indices in the order they are first seen.
+    Every attribute is converted into aligned index and value arrays that are
+    folded into dense ``n x n`` accumulators, so only one attribute has to be
+    kept in its parsed form at any time. The individual attribute distances
+    are only retained (as index and value arrays of the present pairs) if the
+    median is requested.
+    """
+
+    def __init__(self, aggregator: AggregatorsEnum) -> None:
+        if aggregator not in AggregatorsEnum:
+            raise ValueError("Unknown aggregator")
+        self.aggregator = aggregator
+        self.entity_index: Dict[str, int] = {}
+        self._count = np.zeros((0, 0), dtype=np.int32)
+        self._value = np.zeros((0, 0), dtype=np.float64)
+        self._reservoir: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def _grow(self, size: int):
+        """Grow all accumulators to accommodate ``size`` entities."""
+        old_size = self._count.shape[0]
+        if size <= old_size:
+            return
+        padding = ((0, size - old_size), (0, size - old_size))
+        self._count = np.pad(self._count, padding)
+        fill_value = 0.0 if self.aggregator == AggregatorsEnum.mean else np.nan
+        self._value = np.pad(self._value, padding, constant_values=fill_value)
+
+    def add_attribute_distances(self, attribute_distances: List[Dict[str, Any]]):
+        """Add the distances of a single attribute to the aggregate.
+
+        Args:
+            attribute_distances (List[Dict[str, Any]]): the parsed attribute distances
+        """
+        entity_index = self.entity_index
+
+        def index_of(entity_id: str) -> int:
+            return entity_index.setdefault(entity_id, len(entity_index))
+
+        count = len(attribute_distances)
+        rows = np.fromiter(
+            (index_of(ent["entity_1_ID"]) for ent in attribute_distances),
+            dtype=np.intp,
+            count=count,
+        )
+        cols = np.fromiter(
+            (index_of(ent["entity_2_ID"]) for ent in attribute_distances),
+            dtype=np.intp,
+            count=count,
+        )
+        distances = np.fromiter(
+            (ent["distance"] for ent in attribute_distances),
+            dtype=np.float64,
+            count=count,
+        )
+
+        self._grow(len(entity_index))
+        # unbuffered ufuncs, a pair may occur more than once
+        np.add.at(self._count, (rows, cols), 1)
+
+        if self.aggregator == AggregatorsEnum.mean:
+            np.add.at(self._value, (rows, cols), distances)
+        elif self.aggregator == AggregatorsEnum.max:
+            np.fmax.at(self._value, (rows, cols), distances)
+        elif self.aggregator == AggregatorsEnum.min:
+            np.fmin.at(self._value, (rows, cols), distances)
+        elif self.aggregator == AggregatorsEnum.median:
+            self._reservoir.append((rows, cols, distances))
+
+    def aggregate(self) -> np.ndarray:
+        """Compute the aggregated distance matrix.
+
+        Pairs without any attribute distance are ``nan``.
+        """
+        if self.aggregator == AggregatorsEnum.mean:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return self._value / self._count
+        if self.aggregator == AggregatorsEnum.median:
+            size = self._count.shape[0]
+            median = np.full((size, size), np.nan, dtype=np.float64)
+            if not self._reservoir:
+                return median
+            rows, cols, distances = (np.concatenate(a) for a in zip(*self._reservoir))
+            self._reservoir.clear()
+            # sort the distances by pair and value, the median of a pair is in the middle of its run
+            pairs = rows * size + cols
+            order = np.lexsort((distances, pairs))
+            pairs, distances = pairs[order], distances[order]
+            unique_pairs, starts, counts = np.unique(
+                pairs, return_index=True, return_counts=True
+            )
+            lower = distances[starts + (counts - 1) // 2]
+            upper = distances[starts + counts // 2]
+            median.flat[unique_pairs] = 0.5 * (lower + upper)
+            return median
+        return self._value
+
+    def to_matrix(self) -> PairwiseMatrix:
+        """Get the aggregated distances as a pairwise matrix."""
+        entity_ids = list(self.entity_index.keys())
+        return PairwiseMatrix(entity_ids, entity_ids, self.aggregate())
+
+
 TASK_LOGGER = get_task_logger(__name__)
 
 
@@ -268,73 +380,21 @@ def calculation_task(self, db_id: int) -> str:
     aggregator = input_params.aggregator
     TASK_LOGGER.info(f"Loaded input parameters from db: aggregator='{aggregator}'")
 
-    # load data from file
+    # load data from file, aggregating one attribute at a time
 
-    attribute_distances = {}
+    accumulator = DistanceAccumulator(aggregator)
 
     for file, file_name in get_files_from_zip_url(attribute_distances_url):
-        # removes .json from file name to get the name of the attribute
-        attr_name = file_name[:-5]
-
-        attribute_distances[attr_name] = json.load(file)
-
-    entity_distance_lists = {}
-
-    for attr_dist in attribute_distances.values():
-        for ent in attr_dist:
-            ent_ids = (ent["entity_1_ID"], ent["entity_2_ID"])
-
-            if ent_ids in entity_distance_lists:
-                entity_distance_lists[ent_ids].append(ent)
-            else:
-                entity_distance_lists[ent_ids] = [ent]
-
-    entity_distances = []
-
-    for ent_dist_list in entity_distance_lists.values():
-        ent_dist = 0.0
-        dist_list = [ent["distance"] for ent in ent_dist_list]
-
-        if aggregator == AggregatorsEnum.mean:
-            for dist in dist_list:
-                ent_dist += dist
-
-            ent_dist /= len(ent_dist_list)
-        elif aggregator == AggregatorsEnum.median:
-            dist_list = sorted(dist_list)
-
-            if len(dist_list) % 2 == 0:
-                ent_dist = (
-                    0.5 * dist_list[len(dist_list) // 2]
-                    + 0.5 * dist_list[len(dist_list) // 2 - 1]
-                )
-            else:
-                ent_dist = dist_list[len(dist_list) // 2]
-        elif aggregator == AggregatorsEnum.max:
-            ent_dist = max(dist_list)
-        elif aggregator == AggregatorsEnum.min:
-            ent_dist = min(dist_list)
-        else:
-            raise ValueError("Unknown aggregator")
-
-        ent_1_id = ent_dist_list[0]["entity_1_ID"]
-        ent_2_id = ent_dist_list[0]["entity_2_ID"]
-
-        entity_distances.append(
-            {
-                "ID": ent_1_id + "_" + ent_2_id,
-                "entity_1_ID": ent_1_id,
-                "entity_2_ID": ent_2_id,
-                "href": "",
-                "distance": ent_dist,
-            }
-        )
+        TASK_LOGGER.info(f"Aggregating attribute distances from '{file_name}'")
+        accumulator.add_attribute_distances(json.load(file))
 
     filename = retrieve_filename(attribute_distances_url)
     info_str = f"aggregator_{aggregator.name}_from_{filename}"
 
+    entity_distances = accumulator.to_matrix()
+
     with SpooledTemporaryFile(mode="w") as output:
-        save_entities(entity_distances, output, "application/json")
+        save_matrix(entity_distances, output, "application/json")
         STORE.persist_task_result(
             db_id,
             output,
@@ -343,4 +403,14 @@ def calculation_task(self, db_id: int) -> str:
             "application/json",
         )
 
+    with SpooledTemporaryFile(mode="wb") as output:
+        save_matrix(entity_distances, output, MATRIX_MIMETYPE)
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"entity_distances_{info_str}{MATRIX_FILE_EXTENSION}",
+            "custom/entity-distances",
+            MATRIX_MIMETYPE,
+        )
+
     return "Result stored in file"
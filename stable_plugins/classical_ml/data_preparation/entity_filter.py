@@ -18,7 +18,21 @@ from enum import Enum
 from http import HTTPStatus
 from json import JSONEncoder, dumps, loads
 from tempfile import SpooledTemporaryFile
-from typing import Any, Dict, Generator, List, Mapping, Optional, Set, Union
+from csv import reader, writer
+from operator import itemgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+)
 import re
 
 import marshmallow as ma
@@ -50,6 +64,7 @@ from qhana_plugin_runner.api.util import (
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
+    ResponseLike,
     ensure_dict,
     load_entities,
     save_entities,
@@ -65,6 +80,9 @@ _identifier = plugin_identifier(_plugin_name, __version__)
 
 INFINITY = -1
 
+# read large csv files in bigger chunks than the default of iter_lines
+CSV_CHUNK_SIZE = 2**16
+
 ENTITY_FILTER_BLP = SecurityBlueprint(
     _identifier,  # blueprint name
     __name__,  # module import name!
@@ -309,64 +327,70 @@ TASK_LOGGER = get_task_logger(__name__)
 
 
 def filter_rows(
-    input_entities: Generator[Dict[str, Any], None, None],
+    input_entities: Iterable[Any],
     id_set: Set[str],
     n_sampled_rows: int,
-    row_sampling: str,
-) -> List[Dict[str, Any]]:
+    row_sampling: Optional[str],
+    get_id: Callable[[Any], str] = itemgetter("ID"),
+) -> List[Any]:
     """Filters rows of ``input_entities``.
 
     Iterates over entities in ``input_entities``.
     If "ID" of entity is in ``id_set``, the entity is added to output list.
     If not and ``n_sampled_rows > 0``, row sampling is applied according to the strategy specified in ``row_sampling``.
     Random row sampling is done as in `Uniformly sampling from N elements <https://math.stackexchange.com/questions/846036/can-i-uniformly-sample-from-n-distinct-elements-where-n-is-unknown-but-fini>`_.
+    Stops reading the input as soon as no further entity can change the result.
 
     Args:
-        input_entities (Generator[Dict[str, Any], None, None]): input entities to be filtered
+        input_entities (Iterable[Any]): input entities to be filtered (dicts or raw csv rows)
         id_set (Set[str]): list of entity ID's
         n_sampled_rows (int): number of rows that are to be sampled randomly
-        row_sampling (str): strategy for sampling (value of :class:`RowSamplingType`)
+        row_sampling (Optional[str]): strategy for sampling (value of :class:`RowSamplingType`)
+        get_id (Callable[[Any], str], optional): function returning the ID of an entity. Defaults to ``itemgetter("ID")``.
 
     Raises:
         ValueError: if invalid value for ``row_sampling``
         ValueError: if some ID's in ``id_set`` cannot be found
 
     Returns:
-        List[Dict[str, Any]]: filtered entities
+        List[Any]: filtered entities
     """
+    sample_randomly = row_sampling == RowSamplingType.RANDOM.value
+    if n_sampled_rows > 0 and not (
+        sample_randomly or row_sampling == RowSamplingType.FIRST_N.value
+    ):
+        msg = "Invalid argument for Row Sampling!"
+        TASK_LOGGER.error(msg)
+        raise ValueError(msg)
+
     # list of output entities with ID in id_set
-    output_entities_id_list: List[Dict[str, Any]] = []
+    output_entities_id_list: List[Any] = []
     # list of sampled output entities,
-    output_entities_random_rows: List[Dict[str, Any]] = []
+    output_entities_random_rows: List[Any] = []
     # counts number of sampled entities
     sampling_counter = 0
     for entity in input_entities:
-        if entity["ID"] in id_set:
+        entity_id = get_id(entity)
+        if entity_id in id_set:
             # find entities in id_set if id_set not empty
-            output_entities_id_list.append(entity)  # TODO
-            id_set.remove(entity["ID"])
-
-        elif n_sampled_rows > 0:
-            # sample rows to fill up remaining rows according to row sampling
-            if row_sampling == RowSamplingType.RANDOM.value:
-                if sampling_counter < n_sampled_rows:
-                    # add first n
-                    output_entities_random_rows.append(entity)
-                    sampling_counter += 1
-                else:
-                    # add with prob n/(n+k+1) at random index, k is counter
-                    if random.random() < n_sampled_rows / (sampling_counter + 1):
-                        index = random.randrange(n_sampled_rows)
-                        output_entities_random_rows[index] = entity
-                    sampling_counter += 1
-            elif row_sampling == RowSamplingType.FIRST_N.value:
-                if sampling_counter < n_sampled_rows:
-                    output_entities_random_rows.append(entity)
-                    sampling_counter += 1
-            else:
-                msg = "Invalid argument for Row Sampling!"
-                TASK_LOGGER.error(msg)
-                raise ValueError(msg)
+            output_entities_id_list.append(entity)
+            id_set.remove(entity_id)
+
+        elif sampling_counter < n_sampled_rows:
+            # add first n
+            output_entities_random_rows.append(entity)
+            sampling_counter += 1
+
+        elif sample_randomly and n_sampled_rows > 0:
+            # add with prob n/(n+k+1) at random index, k is counter
+            if random.random() < n_sampled_rows / (sampling_counter + 1):
+                index = random.randrange(n_sampled_rows)
+                output_entities_random_rows[index] = entity
+            sampling_counter += 1
+
+        elif not id_set:
+            # all ID's found and no further rows are sampled
+            break
 
     if id_set:  # not all ID's in file
         msg = f"The following ID's could not be found: {str(id_set)}"
@@ -376,8 +400,34 @@ def filter_rows(
     return output_entities_id_list + output_entities_random_rows
 
 
+def compile_attribute_filter(
+    attribute_filter_strategy: Optional[str], attributes: Set[str]
+) -> Set[str]:
+    """Compiles the attribute filter specification into the set of allowed or blocked attributes.
+
+    Makes sure that the "ID" attribute is never removed.
+
+    Args:
+        attribute_filter_strategy (Optional[str]): filter strategy as defined in :class:`AttributeFilterType`
+        attributes (Set[str]): set of attributes
+
+    Raises:
+        ValueError: if attribute attribute filter strategy invalid
+
+    Returns:
+        Set[str]: the set of attributes in the allowlist/blocklist
+    """
+    if attribute_filter_strategy == AttributeFilterType.ALLOWLIST.value:
+        return attributes | {"ID"}
+    elif attribute_filter_strategy == AttributeFilterType.BLOCKLIST.value:
+        return attributes - {"ID"}
+    msg = "Invalid argument for Attribute Filter Strategy!"
+    TASK_LOGGER.error(msg)
+    raise ValueError(msg)
+
+
 def filter_cols(
-    input_entities: Union[List[Dict[str, Any]], Generator[Dict[str, Any], None, None]],
+    input_entities: Iterable[Dict[str, Any]],
     attribute_filter_strategy: Optional[str],
     attributes: Set[str],
 ) -> Generator[Dict[str, Any], None, None]:
@@ -386,7 +436,7 @@ def filter_cols(
     Iterates over all entities and yields output entities filtered as specified in ``attribute_filter_strategy`` and ``attributes``.
 
     Args:
-        input_entities (Union[List[Dict[str, Any]], Generator[Dict[str, Any], None, None]]): input entities to be filtered
+        input_entities (Iterable[Dict[str, Any]]): input entities to be filtered
         attribute_filter_strategy (Optional[str]): filter strategy as defined in :class:`AttributeFilterType`
         attributes (Set[str]): set of attributes
 
@@ -396,32 +446,92 @@ def filter_cols(
     Yields:
         Generator[Dict[str, Any], None, None]: filtered entities
     """
-    # make sure that "ID" is not deleted
-    if attribute_filter_strategy == AttributeFilterType.ALLOWLIST.value:
-        attributes.add("ID")
-    elif attribute_filter_strategy == AttributeFilterType.BLOCKLIST.value:
-        if "ID" in attributes:
-            attributes.remove("ID")
-    else:
-        msg = "Invalid argument for Attribute Filter Strategy!"
+    attributes = compile_attribute_filter(attribute_filter_strategy, attributes)
+
+    if not attributes:  # nothing to do if empty
+        yield from input_entities
+    elif attribute_filter_strategy == AttributeFilterType.ALLOWLIST.value:
+        # only copy the allowed attributes instead of deleting all others
+        for entity in input_entities:
+            yield {attr: value for attr, value in entity.items() if attr in attributes}
+    else:  # Blocklist
+        for entity in input_entities:
+            for attr in attributes:
+                entity.pop(attr, None)
+            yield entity
+
+
+def filter_csv(
+    url_data: ResponseLike,
+    output: TextIO,
+    id_set: Set[str],
+    n_rows: int,
+    n_sampled_rows: int,
+    row_sampling: Optional[str],
+    attribute_filter_strategy: Optional[str],
+    attributes: Set[str],
+) -> int:
+    """Filters rows and columns of a csv file in a single scan without creating entity dicts.
+
+    The columns are projected directly on the raw csv rows and only the projected
+    rows are kept for row filtering.
+
+    Args:
+        url_data (ResponseLike): the csv input file
+        output (TextIO): the file to write the filtered csv to
+        id_set (Set[str]): list of entity ID's
+        n_rows (int): number of rows to keep (:data:`INFINITY` to keep all rows)
+        n_sampled_rows (int): number of rows that are to be sampled
+        row_sampling (Optional[str]): strategy for sampling (value of :class:`RowSamplingType`)
+        attribute_filter_strategy (Optional[str]): filter strategy as defined in :class:`AttributeFilterType`
+        attributes (Set[str]): set of attributes
+
+    Raises:
+        ValueError: if the csv file has no "ID" column
+
+    Returns:
+        int: the number of rows written (-1 if all rows were kept)
+    """
+    attributes = compile_attribute_filter(attribute_filter_strategy, attributes)
+
+    csv_reader = reader(
+        url_data.iter_lines(chunk_size=CSV_CHUNK_SIZE, decode_unicode=True), "default"
+    )
+    header: List[str] = next(csv_reader, [])
+    if "ID" not in header:
+        msg = "The input file has no ID column!"
         TASK_LOGGER.error(msg)
         raise ValueError(msg)
 
-    # remove columns that are not in allowlist
-    for entity in input_entities:
-        if (
-            attribute_filter_strategy == AttributeFilterType.ALLOWLIST.value
-            and attributes
-        ):
-            for attr in tuple(entity.keys()):
-                if attr not in attributes:
-                    del entity[attr]
-        else:  # Blocklist
-            if attributes:  # nothing to do if empty
-                for attr in tuple(entity.keys()):
-                    if attr in attributes:
-                        del entity[attr]
-        yield entity
+    if not attributes:
+        columns = list(range(len(header)))
+    elif attribute_filter_strategy == AttributeFilterType.ALLOWLIST.value:
+        columns = [i for i, attr in enumerate(header) if attr in attributes]
+    else:  # Blocklist
+        columns = [i for i, attr in enumerate(header) if attr not in attributes]
+    out_header = [header[i] for i in columns]
+
+    rows: Iterable[Sequence[str]] = (row for row in csv_reader if row)
+    if len(columns) < len(header):
+        project = itemgetter(*columns) if len(columns) > 1 else lambda r: (r[columns[0]],)
+        rows = map(project, rows)
+
+    csv_writer = writer(output, dialect="default")
+    csv_writer.writerow(out_header)
+
+    if n_rows == INFINITY:
+        csv_writer.writerows(rows)
+        return INFINITY
+
+    filtered_rows = filter_rows(
+        input_entities=rows,
+        id_set=id_set,
+        n_sampled_rows=n_sampled_rows,
+        row_sampling=row_sampling,
+        get_id=itemgetter(out_header.index("ID")),
+    )
+    csv_writer.writerows(filtered_rows)
+    return len(filtered_rows)
 
 
 @CELERY.task(name=f"{EntityFilter.instance.identifier}.entity_filter_task", bind=True)
@@ -490,44 +600,58 @@ def entity_filter_task(self, db_id: int) -> str:
 
     ## Filtering ##
     with open_url(input_file_url, stream=True) as url_data:
-        r_filtered_entities: Union[
-            List[Dict[str, Any]], Generator[Dict[str, Any], None, None]
-        ] = []
         try:
             mimetype = url_data.headers["Content-Type"]
         except KeyError:
             mimetype = mimetypes.MimeTypes().guess_type(url=input_file_url)[0]
-        input_entities = ensure_dict(load_entities(file_=url_data, mimetype=mimetype))
-
-        # Filter rows
-        if n_rows != INFINITY:
-            r_filtered_entities = filter_rows(
-                input_entities=input_entities,
-                id_set=id_set,
-                n_sampled_rows=n_sampled_rows,
-                row_sampling=row_sampling,
-            )
-
-            if len(r_filtered_entities) != n_rows:
-                msg = "Number of rows requested is greater than number of rows in input file!"
-                TASK_LOGGER.error(msg)
-                raise ValueError(msg)
-        else:
-            r_filtered_entities = input_entities
-
-        # Filter cols
-        output_entities = filter_cols(
-            input_entities=r_filtered_entities,
-            attribute_filter_strategy=attribute_filter_strategy,
-            attributes=attributes,
-        )
 
         filename = retrieve_filename(url_data)
         info_str = f"_setting_{attribute_filter_strategy}_rows_{n_rows}_sampling_{n_sampled_rows}_from_{filename}"
 
         # Write to output file
         with SpooledTemporaryFile(mode="w") as output:
-            save_entities(entities=output_entities, file_=output, mimetype=mimetype)
+            if mimetype == "text/csv":
+                # fast path: filter the raw csv rows without creating entities
+                n_output_rows = filter_csv(
+                    url_data,
+                    output,
+                    id_set=id_set,
+                    n_rows=n_rows,
+                    n_sampled_rows=n_sampled_rows,
+                    row_sampling=row_sampling,
+                    attribute_filter_strategy=attribute_filter_strategy,
+                    attributes=attributes,
+                )
+            else:
+                input_entities = ensure_dict(
+                    load_entities(file_=url_data, mimetype=mimetype)
+                )
+
+                # Filter rows
+                r_filtered_entities: Iterable[Dict[str, Any]] = input_entities
+                n_output_rows = INFINITY
+                if n_rows != INFINITY:
+                    r_filtered_entities = filter_rows(
+                        input_entities=input_entities,
+                        id_set=id_set,
+                        n_sampled_rows=n_sampled_rows,
+                        row_sampling=row_sampling,
+                    )
+                    n_output_rows = len(r_filtered_entities)
+
+                # Filter cols
+                output_entities = filter_cols(
+                    input_entities=r_filtered_entities,
+                    attribute_filter_strategy=attribute_filter_strategy,
+                    attributes=attributes,
+                )
+
+                save_entities(entities=output_entities, file_=output, mimetype=mimetype)
+
+            if n_output_rows != n_rows:
+                msg = "Number of rows requested is greater than number of rows in input file!"
+                TASK_LOGGER.error(msg)
+                raise ValueError(msg)
 
             if mimetype == "application/json":
                 file_type = ".json"
@@ -14,7 +14,7 @@
 
 from http import HTTPStatus
 from tempfile import SpooledTemporaryFile
-from typing import Mapping, Optional, List, Set, Tuple
+from typing import TYPE_CHECKING, Mapping, Optional, List, Tuple
 
 import marshmallow as ma
 from celery.canvas import chain
@@ -46,15 +46,23 @@ from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     save_entities,
 )
+from qhana_plugin_runner.plugin_utils.sparse_vector_marshalling import (
+    SPARSE_VECTOR_DATA_TYPE,
+    SparseVectors,
+    save_sparse_vectors,
+)
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.tasks import save_task_error, save_task_result
 from qhana_plugin_runner.util.plugins import QHAnaPluginBase, plugin_identifier
 from qhana_plugin_runner.plugin_utils.zip_utils import get_files_from_zip_url
 import json
-from itertools import count, chain
+from itertools import count
 import numpy as np
 
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
 
 """ 
 This Plugin can be further improved!
@@ -214,7 +222,12 @@ class PluginsView(MethodView):
                         data_type="entity/vector",
                         content_type=["application/csv"],
                         required=True,
-                    )
+                    ),
+                    DataMetadata(
+                        data_type=SPARSE_VECTOR_DATA_TYPE,
+                        content_type=["application/json"],
+                        required=True,
+                    ),
                 ],
             ),
             tags=OneHot.instance.tags,
@@ -316,6 +329,9 @@ class OneHot(QHAnaPluginBase):
     def get_api_blueprint(self):
         return ONEHOT_BLP
 
+    def get_requirements(self) -> str:
+        return "scipy~=1.10.1"
+
 
 TASK_LOGGER = get_task_logger(__name__)
 
@@ -361,87 +377,104 @@ def taxonomy_node_to_parent(taxonomy):
     return parent_dict
 
 
-def get_ancestor_nodes(parent_node_dict, attribute, ancestor_nodes_dict) -> Set:
-    if attribute == "":
-        return set()
-    if attribute in ancestor_nodes_dict:
-        return ancestor_nodes_dict[attribute]
-    else:
-        parent = parent_node_dict[attribute]
-        result = get_ancestor_nodes(parent_node_dict, parent, ancestor_nodes_dict).copy()
-        if parent != "":
-            result.add(parent)
-        ancestor_nodes_dict[attribute] = result
-        return result
-
-
-def compute_ancestors_and_index_dict(
-    entities, attributes, attribute_ref_targets, taxonomies
-) -> Tuple[List, List, int]:
+def get_ancestor_closure(taxonomy) -> Tuple[List[str], "csr_matrix"]:
     """
-    Each entity owns certain attributes in a given taxonomy. This method computes the ancestors for each of the
-    attributes in every given taxonomy.
-    It also assigns each attribute a unique index (across taxonomies) and it computes the total amount of attributes.
+    Computes the ancestor closure of all nodes of a taxonomy (ignoring the root node "") as a sparse matrix.
+    Row i of the matrix contains a 1 for node i and for every ancestor of node i.
+    The closure is computed by repeatedly squaring the sparse parent relation until it does not change anymore.
     """
-    taxonomies_ancestors_list = []
-    attr_to_idx_dict_list = []
-    dim = 0
-    for attribute in attributes:
-        taxonomy = taxonomies[attribute_ref_targets[attribute]]
-        parent_node_dict = taxonomy_node_to_parent(taxonomy)
+    from scipy.sparse import csr_matrix, identity
+
+    tax_entities = taxonomy["entities"]
+    if tax_entities and tax_entities[0] == "":
+        tax_entities = tax_entities[1:]
+    node_to_idx = dict(zip(tax_entities, count()))
+    size = len(tax_entities)
+
+    parent_node_dict = taxonomy_node_to_parent(taxonomy)
+    edges = [
+        (node_to_idx[node], node_to_idx[parent])
+        for node, parent in parent_node_dict.items()
+        if parent in node_to_idx and node in node_to_idx
+    ]
+    rows = np.fromiter((e[0] for e in edges), dtype=np.int64, count=len(edges))
+    cols = np.fromiter((e[1] for e in edges), dtype=np.int64, count=len(edges))
+
+    closure = identity(size, dtype=np.int32, format="csr") + csr_matrix(
+        (np.ones(len(edges), dtype=np.int32), (rows, cols)), shape=(size, size)
+    )
+    closure.data[:] = 1
+    while True:
+        squared = closure @ closure
+        squared.data[:] = 1
+        if squared.nnz == closure.nnz:
+            break
+        closure = squared
 
-        tax_entities = taxonomy["entities"]
-        if tax_entities[0] == "":
-            tax_entities = tax_entities[1:]
+    return tax_entities, closure
 
-        attr_to_idx_dict_list.append(dict(zip(tax_entities, count(start=dim))))
-        dim += len(tax_entities)
 
-        # A dictionary. Given a node, the dict returns all the ancestry nodes
-        ancestor_nodes_dict = dict()
-        for entity in entities:
-            values = entity[attribute]
+def encode_attribute(entities, attribute, node_to_idx, closure) -> "csr_matrix":
+    """
+    Computes the one-hot encodings (including the ancestors) of a single attribute for all entities.
+    The values of an entity are collected in a sparse incidence matrix that is then multiplied with the ancestor closure.
+    """
+    from scipy.sparse import csr_matrix
+
+    rows = []
+    cols = []
+    for entity_idx, entity in enumerate(entities):
+        values = entity[attribute]
+        if not isinstance(values, list):
+            values = [values]
+        for value in set(values):
+            rows.append(entity_idx)
+            cols.append(node_to_idx[value])
+
+    incidence = csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(len(entities), closure.shape[0]),
+    )
+    encoding = incidence @ closure
+    encoding.data[:] = 1
+    return encoding
 
-            sub_attributes = set()
-            if isinstance(values, list):
-                sub_attributes = set(values)
-            else:
-                sub_attributes.add(values)
 
-            for sub_attribute in sub_attributes:
-                get_ancestor_nodes(parent_node_dict, sub_attribute, ancestor_nodes_dict)
+def compute_encodings(
+    entities, attributes, attribute_ref_targets, taxonomies
+) -> "csr_matrix":
+    """
+    Computes the sparse one-hot encodings of all entities for the given attributes.
+    The ancestor closure is computed only once per taxonomy, even if multiple attributes use the same taxonomy.
+    Each attribute gets its own block of columns in the order of the attributes.
+    """
+    from scipy.sparse import csr_matrix, hstack
 
-        taxonomies_ancestors_list.append(ancestor_nodes_dict)
+    closures = {}
+    blocks = []
+    for attribute in attributes:
+        ref_target = attribute_ref_targets[attribute]
+        if ref_target not in closures:
+            tax_entities, closure = get_ancestor_closure(taxonomies[ref_target])
+            closures[ref_target] = (dict(zip(tax_entities, count())), closure)
+        node_to_idx, closure = closures[ref_target]
+        blocks.append(encode_attribute(entities, attribute, node_to_idx, closure))
 
-    return taxonomies_ancestors_list, attr_to_idx_dict_list, dim
+    if not blocks:
+        return csr_matrix((len(entities), 0), dtype=np.int32)
+    return hstack(blocks, format="csr")
 
 
-def prepare_stream_output(
-    entities, attributes, taxonomies_ancestors_list, attr_to_idx_dict_list, dim
-):
+def prepare_stream_output(entity_ids, encodings):
     """
-    Transforms an entity into it's one-hot encoding and yields it.
+    Transforms the sparse encodings into dense entities and yields them.
     """
-    for entity in entities:
-        id = entity["ID"]
+    dim = encodings.shape[1]
+    indptr = encodings.indptr
+    indices = encodings.indices
+    for row, id in enumerate(entity_ids):
         one_hot_encodings = np.zeros((dim,))
-        for attribute, attr_to_idx_dict, taxonomies_ancestors in zip(
-            attributes, attr_to_idx_dict_list, taxonomies_ancestors_list
-        ):
-            values = entity[attribute]
-
-            sub_attributes = set()
-            if isinstance(values, list):
-                sub_attributes = set(values)
-            else:
-                sub_attributes.add(values)
-
-            for sub_attribute in sub_attributes:
-                for ancestor in taxonomies_ancestors[sub_attribute]:
-                    one_hot_encodings[attr_to_idx_dict[ancestor]] = 1
-
-                one_hot_encodings[attr_to_idx_dict[sub_attribute]] = 1
-
+        one_hot_encodings[indices[indptr[row] : indptr[row + 1]]] = 1
         yield get_entity_dict(id, one_hot_encodings)
 
 
@@ -482,16 +515,12 @@ def calculation_task(self, db_id: int) -> str:
     opened_url = open_url(entities_url)
     entities_name = retrieve_filename(opened_url)
     entities = opened_url.json()
-    (
-        taxonomies_ancestors_list,
-        attr_to_idx_dict_list,
-        dim,
-    ) = compute_ancestors_and_index_dict(
-        entities, attributes, attribute_ref_targets, taxonomies
-    )
-    entity_points = prepare_stream_output(
-        entities, attributes, taxonomies_ancestors_list, attr_to_idx_dict_list, dim
-    )
+    entity_ids = [entity["ID"] for entity in entities]
+
+    encodings = compute_encodings(entities, attributes, attribute_ref_targets, taxonomies)
+    dim = encodings.shape[1]
+
+    entity_points = prepare_stream_output(entity_ids, encodings)
     csv_attributes = ["ID", "href"] + [f"dim{d}" for d in range(dim)]
 
     with SpooledTemporaryFile(mode="w") as output:
@@ -504,4 +533,18 @@ def calculation_task(self, db_id: int) -> str:
             "text/csv",
         )
 
+    # the same encodings without the zeros (CSR)
+    sparse_vectors = SparseVectors(
+        entity_ids, [""] * len(entity_ids), csv_attributes[2:], encodings
+    )
+    with SpooledTemporaryFile(mode="w") as output:
+        save_sparse_vectors(sparse_vectors, output)
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"sparse_one-hot-encoded_points_from_{entities_name}.json",
+            SPARSE_VECTOR_DATA_TYPE,
+            "application/json",
+        )
+
     return "Result stored in file"
@@ -46,6 +46,10 @@ from qhana_plugin_runner.api.util import (
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import save_entities
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import (
+    MATRIX_MIMETYPE,
+    load_matrix,
+)
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.tasks import save_task_error, save_task_result
@@ -66,6 +70,7 @@ MDS_BLP = SecurityBlueprint(
 class MetricEnum(Enum):
     metric_mds = "Metric MDS"
     nonmetric_mds = "Nonmetric MDS"
+    classical_mds = "Classical MDS"
 
 
 class InputParameters:
@@ -76,12 +81,14 @@ class InputParameters:
         metric: MetricEnum,
         n_init: int,
         max_iter: int,
+        warm_start: bool = False,
     ):
         self.entity_distances_url = entity_distances_url
         self.dimensions = dimensions
         self.metric = metric
         self.n_init = n_init
         self.max_iter = max_iter
+        self.warm_start = warm_start
 
 
 class InputParametersSchema(FrontendFormBaseSchema):
@@ -89,10 +96,10 @@ class InputParametersSchema(FrontendFormBaseSchema):
         required=True,
         allow_none=False,
         data_input_type="custom/entity-distances",
-        data_content_types="application/json",
+        data_content_types=["application/json", MATRIX_MIMETYPE],
         metadata={
             "label": "Entity distances URL",
-            "description": "URL to a json file with the entity distances.",
+            "description": "URL to a json or binary matrix file with the entity distances.",
             "input_type": "text",
         },
     )
@@ -111,7 +118,7 @@ class InputParametersSchema(FrontendFormBaseSchema):
         allow_none=False,
         metadata={
             "label": "Metric",
-            "description": "Type of MDS that will be used.",
+            "description": "Type of MDS that will be used. Classical MDS computes the embedding directly from the eigenvectors of the double centered distance matrix without running SMACOF.",
             "input_type": "select",
         },
     )
@@ -133,6 +140,17 @@ class InputParametersSchema(FrontendFormBaseSchema):
             "input_type": "text",
         },
     )
+    warm_start = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Warm start",
+            "description": "Start SMACOF from the classical MDS embedding instead of random initial values. "
+            "SMACOF is then only executed once and usually needs fewer iterations "
+            "to reach about the same stress as the random restarts.",
+            "input_type": "checkbox",
+        },
+    )
 
     @post_load
     def make_input_params(self, data, **kwargs) -> InputParameters:
@@ -159,7 +177,7 @@ class PluginsView(MethodView):
                 data_input=[
                     InputDataMetadata(
                         data_type="custom/entity-distances",
-                        content_type=["application/json"],
+                        content_type=["application/json", MATRIX_MIMETYPE],
                         required=True,
                         parameter="entityDistancesUrl",
                     )
@@ -223,6 +241,7 @@ class MicroFrontend(MethodView):
             fields["metric"].data_key: MetricEnum.metric_mds,
             fields["n_init"].data_key: 4,
             fields["max_iter"].data_key: 300,
+            fields["warm_start"].data_key: True,
         }
 
         # overwrite default values with other values if possible
@@ -321,41 +340,47 @@ def calculation_task(self, db_id: int) -> str:
     TASK_LOGGER.info(f"Loaded input parameters from db: n_init='{n_init}'")
     max_iter = input_params.max_iter
     TASK_LOGGER.info(f"Loaded input parameters from db: max_iter='{max_iter}'")
+    warm_start = input_params.warm_start
+    TASK_LOGGER.info(f"Loaded input parameters from db: warm_start='{warm_start}'")
 
     # load data from file
 
-    entity_distances = open_url(entity_distances_url).json()
-    id_to_idx = {}
-
-    idx = 0
-
-    for ent_dist in entity_distances:
-        if ent_dist["entity_1_ID"] not in id_to_idx:
-            id_to_idx[ent_dist["entity_1_ID"]] = idx
-            idx += 1
-
-    distance_matrix = np.zeros((len(id_to_idx), len(id_to_idx)))
-
-    for ent_dist in entity_distances:
-        ent_1_id = ent_dist["entity_1_ID"]
-        ent_2_id = ent_dist["entity_2_ID"]
-        dist = ent_dist["distance"]
-
-        ent_1_idx = id_to_idx[ent_1_id]
-        ent_2_idx = id_to_idx[ent_2_id]
+    with open_url(entity_distances_url) as entity_distances_file:
+        entity_distances = load_matrix(
+            entity_distances_file, value_key="distance", fill_value=np.nan
+        )
 
-        distance_matrix[ent_1_idx, ent_2_idx] = dist
-        distance_matrix[ent_2_idx, ent_1_idx] = dist
+    if list(entity_distances.row_ids) != list(entity_distances.col_ids):
+        raise ValueError("The entity distances must form a square matrix!")
 
-    mds = manifold.MDS(
-        dimensions,
-        metric=metric == MetricEnum.metric_mds,
-        n_init=n_init,
-        max_iter=max_iter,
-        dissimilarity="precomputed",
+    id_to_idx = entity_distances.row_index
+    distance_matrix = np.array(entity_distances.values, dtype=np.float64)
+    # use the distance of the mirrored pair for missing pairs
+    distance_matrix = np.where(
+        np.isnan(distance_matrix), distance_matrix.T, distance_matrix
     )
+    distance_matrix = np.nan_to_num(distance_matrix, nan=0.0)
+
+    if metric == MetricEnum.classical_mds:
+        transformed = classical_mds(distance_matrix, dimensions)
+    else:
+        init = None
+        if warm_start:
+            init = classical_mds(distance_matrix, dimensions)
+            n_init = 1  # a fixed start only needs to be optimized once
+
+        mds = manifold.MDS(
+            dimensions,
+            metric=metric == MetricEnum.metric_mds,
+            n_init=n_init,
+            max_iter=max_iter,
+            dissimilarity="precomputed",
+        )
 
-    transformed = mds.fit_transform(distance_matrix)
+        transformed = mds.fit_transform(distance_matrix, init=init)
+        TASK_LOGGER.info(
+            f"SMACOF finished after {mds.n_iter_} iterations with stress {mds.stress_}"
+        )
 
     entity_points = []
     dim_attributes = _get_dim_attributes(dimensions)
@@ -383,6 +408,41 @@ def calculation_task(self, db_id: int) -> str:
     return "Result stored in file"
 
 
+def classical_mds(distance_matrix, dimensions: int):
+    """
+    Computes the classical (Torgerson) MDS embedding of a distance matrix.
+    Only the eigenvectors of the largest ``dimensions`` eigenvalues of the double centered squared distance matrix are computed.
+    :param distance_matrix: symmetric np.ndarray of shape (n, n)
+    :param dimensions: int number of dimensions of the embedding
+    :return: np.ndarray of shape (n, dimensions)
+    """
+    import numpy as np
+    from scipy.linalg import eigh
+
+    size = distance_matrix.shape[0]
+    n_components = min(dimensions, size)
+
+    # double centering B = -1/2 * J D^2 J without building the centering matrix J
+    squared = np.square(distance_matrix)
+    row_mean = squared.mean(axis=1, keepdims=True)
+    col_mean = squared.mean(axis=0, keepdims=True)
+    gram = -0.5 * (squared - row_mean - col_mean + squared.mean())
+
+    eigenvalues, eigenvectors = eigh(
+        gram, subset_by_index=[size - n_components, size - 1]
+    )
+
+    # eigh returns the eigenvalues in ascending order
+    eigenvalues = np.clip(eigenvalues[::-1], 0, None)
+    eigenvectors = eigenvectors[:, ::-1]
+
+    embedding = eigenvectors * np.sqrt(eigenvalues)
+
+    if embedding.shape[1] < dimensions:
+        embedding = np.pad(embedding, ((0, 0), (0, dimensions - embedding.shape[1])))
+    return embedding
+
+
 def _get_dim_attributes(dim):
     """
     Returns the attributes for each dimension, with the correct length.
@@ -27,6 +27,7 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import load_matrix
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
@@ -96,39 +97,21 @@ def load_entity_points_and_idx_to_id(entity_points_url: str):
     return points_arr, id_to_idx
 
 
-def load_kernel_matrix(kernel_url: str) -> (dict, dict, List[List[float]]):
+def load_kernel_matrix(kernel_url: str) -> (dict, dict, np.ndarray):
     """
     Loads in a kernel matrix, given its url
-    :param kernel_url: url to the kernel matrix
+    :param kernel_url: url to the kernel matrix (json or binary matrix file)
     """
-    kernel_json = open_url(kernel_url).json()
-    id_to_idx_X = {}
-    id_to_idx_Y = {}
-    idx_X = 0
-    idx_Y = 0
-    for entry in kernel_json:
-        if entry["entity_1_ID"] not in id_to_idx_Y:
-            id_to_idx_Y[entry["entity_1_ID"]] = idx_Y
-            idx_Y += 1
-        if entry["entity_2_ID"] not in id_to_idx_X:
-            id_to_idx_X[entry["entity_2_ID"]] = idx_X
-            idx_X += 1
-    kernel_matrix = np.zeros((len(id_to_idx_Y), len(id_to_idx_X)))
+    with open_url(kernel_url) as kernel_file:
+        kernel = load_matrix(kernel_file, value_key="kernel")
+
+    id_to_idx_X = kernel.col_index
+    id_to_idx_Y = kernel.row_index
 
     if id_to_idx_Y.keys() == id_to_idx_X.keys():
         id_to_idx_Y = id_to_idx_X
 
-    for entry in kernel_json:
-        ent_id_Y = entry["entity_1_ID"]
-        ent_id_X = entry["entity_2_ID"]
-        kernel = entry["kernel"]
-
-        ent_idx_Y = id_to_idx_Y[ent_id_Y]
-        ent_idx_X = id_to_idx_X[ent_id_X]
-
-        kernel_matrix[ent_idx_Y, ent_idx_X] = kernel
-
-    return id_to_idx_X, id_to_idx_Y, kernel_matrix
+    return id_to_idx_X, id_to_idx_Y, kernel.values
 
 
 def get_pca(input_params: dict):
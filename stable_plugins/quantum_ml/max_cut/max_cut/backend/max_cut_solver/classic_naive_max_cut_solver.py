@@ -12,88 +12,190 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
 import numpy as np
 import networkx as nx
-from itertools import chain, combinations
-from typing import Set
-from collections.abc import Iterable
 
 from celery.utils.log import get_task_logger
 
 
 TASK_LOGGER = get_task_logger(__name__)
 
+BLOCK_BITS = 18
+"""Number of vertices whose assignments are evaluated together in one numpy array (2^18 cuts)."""
 
-class ClassicNaiveMaxCutSolver:
-    def __init__(self, graph: nx.Graph):
-        self.graph = graph
+PARALLEL_MIN_VERTICES = 28
+"""Minimum number of vertices for splitting the search across worker processes."""
 
+
+def _subset_sums(values: np.ndarray) -> np.ndarray:
     """
-    Solves the max cut problem classically and
-    naive (O(2^n)) and returns the
-    maximum cut in the format (cutValue, [(node1, node2), ...]),
-    i.e. the cut value and the list of edges that
-    correspond to the cut.
+    Returns the sums of all subsets of values. The i-th bit of the index of an entry
+    indicates, if values[i] is part of the subset.
     """
+    sums = np.zeros(1)
+    for value in values:
+        sums = np.concatenate((sums, sums + value))
+    return sums
 
-    def solve(self) -> (np.array, float):
-        nodes = set(self.graph.nodes())
-        powerset = set(self.__get_powerset(nodes))
-
-        largestCutValue = 0.0
-        largestCutSubset = None
-        tempCutValue = 0.0
-
-        printMod = 100
-        probsize = len(powerset)
-        count = 0
-
-        for subset in powerset:
-            count = count + 1
-            tempCutValue = self.__calculate_cut_value(nodes, set(subset))
-            if tempCutValue > largestCutValue:
-                largestCutValue = tempCutValue
-                largestCutSubset = list(subset)
-
-            # Print output
-            if count % printMod == 0:
-                TASK_LOGGER.info(str(count) + " / " + str(probsize) + " cuts checked")
-            if count >= probsize:
-                break
-
-        largestCutSubset = np.array(largestCutSubset)
-        cut = np.zeros(len(nodes))
-        cut[largestCutSubset] = 1
-
-        return cut, largestCutValue
-
-    def __calculate_cut_edges(self, set: Set, subset: Set):
-        diffSubSet = set - subset
 
-        cutEdges = []
-
-        for a in subset:
-            for b in diffSubSet:
-                cutEdges.append((a, b))
-
-        return cutEdges
-
-    def __calculate_cut_value(self, set: Set, subset: Set) -> float:
-        diffSubSet = set - subset
+def _low_cut_values(
+    weights: np.ndarray, degrees: np.ndarray, low_bits: int
+) -> np.ndarray:
+    """
+    Returns x·degrees - xᵀ·weights·x for all assignments x of the first low_bits vertices,
+    i.e. the cut values of these assignments, if all other vertices are in partition 0.
+    """
+    values = np.zeros(1)
+    for i in range(low_bits):
+        values = np.concatenate(
+            (values, values + degrees[i] - 2 * _subset_sums(weights[i, :i]))
+        )
+    return values
 
-        cutValue = 0.0
 
-        for a in subset:
-            for b in diffSubSet:
-                cutValue = cutValue + float(self.graph[a][b]["weight"])
+def _search_block(
+    weights: np.ndarray, low_bits: int, prefix: int, prefix_bits: int
+) -> Tuple[float, int, int]:
+    """
+    Searches the maximum cut of all assignments that start with the given prefix.
+
+    The last vertex is always in partition 0. The first low_bits vertices are evaluated
+    for all of their assignments at once, the remaining vertices (except the prefix_bits
+    highest ones, which are set by the prefix) are enumerated in gray code order, such that
+    every step flips one vertex and updates the cut values incrementally.
+
+    :param weights: symmetric weight matrix with zero diagonal
+    :param low_bits: number of vertices evaluated together
+    :param prefix: assignment of the prefix_bits highest enumerated vertices
+    :param prefix_bits: number of vertices set by the prefix
+    :return: the (approximate) maximum cut value, the assignment of the low vertices and of the high vertices as bitmasks
+    """
+    num_free = len(weights) - 1
+    degrees = weights.sum(axis=1)
+    high_degrees = degrees[low_bits:num_free]
+    high_weights = weights[low_bits:num_free, low_bits:num_free]
+    num_high = num_free - low_bits
+    gray_bits = num_high - prefix_bits
+
+    # doubled cut value changes of the low assignments, if a high vertex is in partition 1
+    coupling: List[np.ndarray] = [
+        2 * _subset_sums(weights[:low_bits, low_bits + k]) for k in range(num_high)
+    ]
+
+    high = np.zeros(num_high)
+    for j in range(prefix_bits):
+        high[gray_bits + j] = (prefix >> j) & 1
+
+    values = _low_cut_values(weights, degrees, low_bits)
+    for k in np.flatnonzero(high):
+        values -= coupling[k]
+    offset = float(high @ high_degrees - high @ high_weights @ high)
+    field = high_weights @ high
+
+    best_low = int(values.argmax())
+    best_value = float(values[best_low]) + offset
+    best_high = high.copy()
+
+    for step in range(1, 2**gray_bits):
+        k = (step & -step).bit_length() - 1  # the bit that changes in the gray code
+        if high[k]:
+            high[k] = 0
+            offset -= high_degrees[k] - 2 * field[k]
+            field -= high_weights[:, k]
+            np.add(values, coupling[k], out=values)
+        else:
+            high[k] = 1
+            offset += high_degrees[k] - 2 * field[k]
+            field += high_weights[:, k]
+            np.subtract(values, coupling[k], out=values)
+        low = int(values.argmax())
+        if values[low] + offset > best_value:
+            best_value = float(values[low]) + offset
+            best_low = low
+            best_high = high.copy()
+
+    high_mask = int(sum(1 << k for k in np.flatnonzero(best_high)))
+    return best_value, best_low, high_mask
+
+
+def _can_fork() -> bool:
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and not multiprocessing.current_process().daemon
+    )
 
-        return cutValue
 
+class ClassicNaiveMaxCutSolver:
     """
-    Returns the powerset of the given set,
-    excluding the empty set.
+    Solves the max cut problem classically and exact (O(2^n)) and returns the
+    maximum cut in the format (cut, cutValue), i.e. an array containing the partition
+    (0 or 1) of every node and the cut value.
+
+    A cut and its complement have the same value, therefore the last node is always
+    in partition 0. All other assignments are enumerated in gray code order in blocks
+    of 2^BLOCK_BITS assignments that are evaluated with numpy. Large graphs are split
+    across worker processes.
     """
 
-    def __get_powerset(self, nodes: Iterable):
-        s = list(nodes)
-        return chain.from_iterable(combinations(s, r) for r in range(1, len(s) + 1))
+    def __init__(self, graph: nx.Graph, processes: Optional[int] = None):
+        """
+        :param graph: weighted graph
+        :param processes: maximum number of worker processes, defaults to the number of cpus
+        """
+        self.graph = graph
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+
+    def solve(self) -> (np.array, float):
+        nodes = list(self.graph.nodes())
+        num_nodes = len(nodes)
+        cut = np.zeros(num_nodes)
+        if num_nodes < 2:
+            return cut, 0.0
+
+        weights = nx.to_numpy_array(self.graph, nodelist=nodes, weight="weight")
+        np.fill_diagonal(weights, 0)
+
+        num_free = num_nodes - 1
+        low_bits = min(num_free, BLOCK_BITS)
+        prefix_bits = 0
+        if num_nodes >= PARALLEL_MIN_VERTICES and self.processes > 1 and _can_fork():
+            prefix_bits = min(num_free - low_bits, (self.processes - 1).bit_length())
+
+        num_blocks = 2**prefix_bits
+        TASK_LOGGER.info(
+            f"Checking {2**num_free} cuts of {num_nodes} nodes in {num_blocks} block(s)"
+        )
+        if num_blocks == 1:
+            results = [_search_block(weights, low_bits, 0, 0)]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(self.processes, num_blocks),
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                results = list(
+                    executor.map(
+                        _search_block,
+                        [weights] * num_blocks,
+                        [low_bits] * num_blocks,
+                        range(num_blocks),
+                        [prefix_bits] * num_blocks,
+                    )
+                )
+
+        _, low_mask, high_mask = max(results, key=lambda result: result[0])
+        assignment = np.zeros(num_nodes)
+        assignment[:num_free] = [
+            ((high_mask << low_bits | low_mask) >> i) & 1 for i in range(num_free)
+        ]
+        # recompute the value of the best cut without accumulated rounding errors
+        cut_value = float(
+            assignment @ weights.sum(axis=1) - assignment @ weights @ assignment
+        )
+
+        cut[nodes] = assignment
+        return cut, cut_value
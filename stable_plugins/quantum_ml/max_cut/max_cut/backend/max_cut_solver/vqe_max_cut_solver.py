@@ -12,12 +12,71 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from functools import lru_cache
+from threading import local
+from typing import Tuple
+
 import numpy as np
-from qiskit.primitives.sampler import BaseSampler
+from qiskit import QuantumCircuit
 from qiskit.algorithms.optimizers.optimizer import Optimizer
+from qiskit.algorithms.utils import validate_bounds, validate_initial_point
 from qiskit.circuit.library import TwoLocal
-from qiskit_optimization.applications import Maxcut
-from qiskit.algorithms.minimum_eigensolvers import SamplingVQE
+from qiskit.primitives import BackendSampler
+from qiskit.primitives.sampler import BaseSampler
+
+_THREAD_LOCAL = local()
+
+
+@lru_cache(maxsize=32)
+def _measured_ansatz(num_qubits: int, reps: int, entanglement: str) -> QuantumCircuit:
+    """
+    Returns the measured ansatz circuit. The same circuit object is reused for all
+    (sub)graphs with the same number of nodes, so that the sampler can reuse its
+    transpiled circuit.
+    """
+    ansatz = TwoLocal(num_qubits, "ry", "cz", reps=reps, entanglement=entanglement)
+    ansatz.measure_all()
+    return ansatz
+
+
+def _thread_sampler(sampler: BaseSampler) -> BaseSampler:
+    """
+    Returns a copy of a backend sampler for the current thread. Samplers cache the
+    (transpiled) circuits without synchronization and must not be shared between threads.
+    """
+    if not isinstance(sampler, BackendSampler):
+        return sampler
+    samplers = getattr(_THREAD_LOCAL, "samplers", None)
+    if samplers is None:
+        samplers = _THREAD_LOCAL.samplers = {}
+    key = id(sampler)
+    if key not in samplers or samplers[key][0] is not sampler:
+        copy = BackendSampler(sampler.backend, options=sampler.options.__dict__)
+        samplers[key] = (sampler, copy)
+    return samplers[key][1]
+
+
+def edge_list(adjacency_matrix: np.array) -> Tuple[np.array, np.array, np.array]:
+    """
+    Returns the edges (u, v, weight) with u < v of the graph given by a symmetric
+    weighted adjacency matrix.
+    """
+    u, v = np.nonzero(np.triu(adjacency_matrix, k=1))
+    return u, v, np.asarray(adjacency_matrix, dtype=float)[u, v]
+
+
+def cut_values(
+    bitstrings: np.array, edges: Tuple[np.array, np.array, np.array], num_nodes: int
+) -> np.array:
+    """
+    Returns the cut values of all bitstrings at once. Bit i of a bitstring (an integer as
+    returned by the sampler) is the partition of node i.
+    """
+    u, v, weights = edges
+    bits = (np.asarray(bitstrings, dtype=np.int64)[:, None] >> np.arange(num_nodes)) & 1
+    bits = bits.astype(bool)
+    # a matrix product of floats is much faster than of booleans
+    return (bits[:, u] != bits[:, v]).astype(float) @ weights
 
 
 class VQEMaxCutSolver:
@@ -36,29 +95,41 @@ class VQEMaxCutSolver:
         self.entanglement = entanglement
 
     """
-    Solves the max cut problem via VQE
+    Solves the max cut problem via VQE. The energy of a parameterization is the negative
+    expected cut value of the sampled bitstrings. The cut values of all sampled bitstrings
+    are computed at once from the edge list of the graph. The best cut of all sampled
+    bitstrings is returned.
     """
 
     def solve(self) -> (np.array, float):
-        max_cut = Maxcut(self.adjacency_matrix)
-        qp = max_cut.to_quadratic_program()
-
-        qubitOp, offset = qp.to_ising()
-
-        # construct SamplingVQE
-        ry = TwoLocal(
-            qubitOp.num_qubits,
-            "ry",
-            "cz",
-            reps=self.reps,
-            entanglement=self.entanglement,
-        )
-        vqe = SamplingVQE(sampler=self.backend, ansatz=ry, optimizer=self.optimizer)
+        num_nodes = self.adjacency_matrix.shape[0]
+        edges = edge_list(self.adjacency_matrix)
+        ansatz = _measured_ansatz(num_nodes, self.reps, self.entanglement)
+        sampler = _thread_sampler(self.backend)
 
-        # run SamplingVQE
-        result = vqe.compute_minimum_eigenvalue(qubitOp)
+        best = {"bitstring": 0, "value": 0.0}
 
-        x = max_cut.sample_most_likely(result.eigenstate)
-        x = np.array(list(x) + [0] * (qubitOp.num_qubits - len(x)), dtype=np.int)
+        def evaluate_energy(parameters: np.array):
+            batch = np.reshape(parameters, (-1, ansatz.num_parameters)).tolist()
+            quasi_dists = sampler.run([ansatz] * len(batch), batch).result().quasi_dists
+            energies = []
+            for quasi_dist in quasi_dists:
+                bitstrings = np.fromiter(quasi_dist.keys(), dtype=np.int64)
+                probabilities = np.fromiter(quasi_dist.values(), dtype=float)
+                values = cut_values(bitstrings, edges, num_nodes)
+                energies.append(-float(probabilities @ values))
+                index = int(values.argmax())
+                if values[index] > best["value"]:
+                    best.update(
+                        bitstring=int(bitstrings[index]), value=float(values[index])
+                    )
+            return energies[0] if len(energies) == 1 else np.array(energies)
+
+        self.optimizer.minimize(
+            fun=evaluate_energy,
+            x0=validate_initial_point(None, ansatz),
+            bounds=validate_bounds(ansatz),
+        )
 
-        return x, qp.objective.evaluate(x)
+        x = (best["bitstring"] >> np.arange(num_nodes)) & 1
+        return x.astype(int), best["value"]
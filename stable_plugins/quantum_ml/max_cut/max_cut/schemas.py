@@ -86,7 +86,7 @@ class InputParametersSchema(FrontendFormBaseSchema):
         allow_none=False,
         metadata={
             "label": "Max Cut Solver",
-            "description": "Determines the max cut solver.",
+            "description": "Determines the max cut solver. The VQE solver returns the best cut of all bitstrings sampled during the optimization.",
             "input_type": "select",
         },
     )
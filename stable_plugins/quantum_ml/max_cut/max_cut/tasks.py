@@ -37,6 +37,7 @@ import numpy as np
 
 from .backend.load_utils import load_matrix_url
 from .backend.max_cut_clustering import MaxCutClustering
+from .backend.max_cut_solver import MaxCutSolverEnum
 from .backend.visualize import plot_graph
 
 
@@ -95,7 +96,9 @@ def calculation_task(self, db_id: int) -> str:
 
     # Cluster data
     max_cut_solver = max_cut_enum.get_solver(**quantum_parameters)
-    max_cut_cluster = MaxCutClustering(max_cut_solver, num_clusters)
+    # the vqe solver mostly waits for the backend, the classical solvers use all cpus themselves
+    max_workers = os.cpu_count() if max_cut_enum == MaxCutSolverEnum.vqe else 1
+    max_cut_cluster = MaxCutClustering(max_cut_solver, num_clusters, max_workers)
     predictions = max_cut_cluster.create_cluster(adjacency_matrix)
 
     labels = [
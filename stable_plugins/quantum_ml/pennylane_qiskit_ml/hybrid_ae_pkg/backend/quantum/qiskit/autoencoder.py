@@ -12,22 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Union
 
 import numpy as np
 import torch
 from qiskit import (
     QuantumCircuit,
     QuantumRegister,
-    execute,
     ClassicalRegister,
     BasicAer,
-    transpile,
-    assemble,
 )
 from qiskit.circuit import Gate, ControlledGate, Parameter, Instruction
 from qiskit.providers.aer import QasmSimulator
 
+from qhana_plugin_runner.plugin_utils.circuit_cache import get_cached_circuit
+
 
 # TODO: measure performance
 class QuantumAutoencoder:
@@ -94,8 +93,9 @@ class QuantumAutoencoder:
         # measure SWAP test result
         self.train_circ.measure(swap_out_qr[0], swap_out_cr[0])
 
+        # the circuits are transpiled once per structure and reused by all instances
         self.backend = QasmSimulator()
-        self.transpiled_train_circ = transpile(self.train_circ, backend=self.backend)
+        self.transpiled_train_circ = get_cached_circuit(self.train_circ, self.backend)
 
         # construct the circuit for measuring the embeddings
         self.embedding_circ = self.input_encoder_circ.copy()
@@ -128,8 +128,14 @@ class QuantumAutoencoder:
         self.reconstruction_circ.append(decoder, input_qr)
         self.reconstruction_circ.measure(input_qr, reconstruction_cr)
 
-        self.transpiled_recon_circ = transpile(
-            self.reconstruction_circ, backend=self.backend
+        self.transpiled_embedding_circ = get_cached_circuit(
+            self.embedding_circ, self.backend
+        )
+        self.transpiled_quantum_embedding_circ = get_cached_circuit(
+            self.quantum_embedding_circ, BasicAer.get_backend("statevector_simulator")
+        )
+        self.transpiled_recon_circ = get_cached_circuit(
+            self.reconstruction_circ, self.backend
         )
 
         # construct the circuit for measuring the fidelity between two quantum embeddings
@@ -159,8 +165,8 @@ class QuantumAutoencoder:
         self.fidelity_circ.append(swap_test, [swap_out_qr] + input_qr[:] + input2_qr[:])
         self.fidelity_circ.measure(swap_out_qr, swap_out_cr)
 
-        self.transpiled_fidelity_circ = transpile(
-            self.fidelity_circ, backend=self.backend
+        self.transpiled_fidelity_circ = get_cached_circuit(
+            self.fidelity_circ, self.backend
         )
 
     def run(self, input_values: torch.Tensor, encoder_weights: torch.Tensor, shots: int):
@@ -171,22 +177,12 @@ class QuantumAutoencoder:
         :param shots: number of shots
         :return:
         """
-        parameter_binds = self._create_param_binds(
-            input_values, self._input_params, encoder_weights, self._encoder_params
-        )
-        qobj = assemble(
-            [
-                self.transpiled_train_circ.bind_parameters(value_dict)
-                for value_dict in parameter_binds
-            ]
+        counts = self.transpiled_train_circ.get_counts(
+            self._input_params + self._encoder_params,
+            self._create_param_values(input_values, encoder_weights),
+            shots,
         )
 
-        job = self.backend.run(qobj)
-        counts: List[Dict[str, int]] = job.result().get_counts()
-
-        if isinstance(counts, Dict):
-            counts = [counts]
-
         zero_prob = 1 - self._extract_single_qubit_expectations(
             counts, 1, shots
         )  # probability that 0 is measured
@@ -196,20 +192,11 @@ class QuantumAutoencoder:
     def calc_embedding(
         self, input_values: torch.Tensor, encoder_weights: torch.Tensor, shots: int
     ):
-        parameter_binds = self._create_param_binds(
-            input_values, self._input_params, encoder_weights, self._encoder_params
-        )
-
-        job = execute(
-            self.embedding_circ,
-            backend=QasmSimulator(),
-            shots=shots,
-            parameter_binds=parameter_binds,
+        counts = self.transpiled_embedding_circ.get_counts(
+            self._input_params + self._encoder_params,
+            self._create_param_values(input_values, encoder_weights),
+            shots,
         )
-        counts: List[Dict[str, int]] = job.result().get_counts()
-
-        if isinstance(counts, Dict):
-            counts = [counts]
 
         embeddings = self._extract_single_qubit_expectations(
             counts, self.embedding_dim, shots
@@ -221,50 +208,57 @@ class QuantumAutoencoder:
         self,
         input1: np.ndarray,
         input2: np.ndarray,
-        encoder_weights: np.ndarray,
+        encoder_weights: Union[np.ndarray, torch.Tensor],
         shots: int,
     ) -> float:
-        bind = {}
-
-        for i in range(input1.shape[0]):
-            bind[self._input_params1[i]] = input1[i]
-            bind[self._input_params2[i]] = input2[i]
-
-        for i in range(encoder_weights.shape[0]):
-            bind[self._encoder_params1[i]] = encoder_weights[i].item()
-            bind[self._encoder_params2[i]] = encoder_weights[i].item()
+        return self.calc_fidelities(
+            input1.reshape((1, -1)), input2.reshape((1, -1)), encoder_weights, shots
+        )[0]
 
-        qobj = assemble(
-            [
-                self.transpiled_fidelity_circ.bind_parameters(value_dict)
-                for value_dict in [bind]
-            ]
+    def calc_fidelities(
+        self,
+        inputs1: np.ndarray,
+        inputs2: np.ndarray,
+        encoder_weights: Union[np.ndarray, torch.Tensor],
+        shots: int,
+    ) -> np.ndarray:
+        """
+        Calculates the fidelities between the quantum embeddings of pairs of inputs in one job.
+        :param inputs1: size: [pair_cnt, input_cnt]
+        :param inputs2: size: [pair_cnt, input_cnt]
+        :param encoder_weights: size: [encoder_params_cnt]
+        :param shots: number of shots
+        :return: size: [pair_cnt]
+        """
+        weights = self._to_array(encoder_weights).reshape((1, -1))
+        weights = np.repeat(weights, inputs1.shape[0], axis=0)
+        values = np.concatenate(
+            [self._to_array(inputs1), self._to_array(inputs2), weights, weights], axis=1
         )
-        job = self.backend.run(qobj)
-
-        counts = job.result().get_counts()
-        expectation: float = self._extract_single_qubit_expectations(
-            [counts], 1, shots
-        ).numpy()[0, 0]
-        fidelity = max(1 - (2.0 * expectation), 0)
+        counts = self.transpiled_fidelity_circ.get_counts(
+            self._input_params1
+            + self._input_params2
+            + self._encoder_params1
+            + self._encoder_params2,
+            values,
+            shots,
+        )
+        expectations = np.asarray(
+            self._extract_single_qubit_expectations(counts, 1, shots)
+        )[:, 0]
+        fidelities = np.maximum(1 - (2.0 * expectations), 0)
 
-        return fidelity
+        return fidelities
 
     def calc_embedding_statevector(
         self, input_values: torch.Tensor, encoder_weights: torch.Tensor, shots: int
     ):
-        parameter_binds = self._create_param_binds(
-            input_values, self._input_params, encoder_weights, self._encoder_params
+        result = self.transpiled_quantum_embedding_circ.run(
+            self._input_params + self._encoder_params,
+            self._create_param_values(input_values, encoder_weights),
+            shots,
         )
 
-        job = execute(
-            self.quantum_embedding_circ,
-            backend=BasicAer.get_backend("statevector_simulator"),
-            shots=shots,
-            parameter_binds=parameter_binds,
-        )
-        result = job.result()
-
         statevectors = [result.get_statevector(i) for i in range(len(result.results))]
         embedding_states = []
 
@@ -281,22 +275,12 @@ class QuantumAutoencoder:
     def calc_reconstructions(
         self, input_values: torch.Tensor, encoder_weights: torch.Tensor, shots: int
     ):
-        parameter_binds = self._create_param_binds(
-            input_values, self._input_params, encoder_weights, self._encoder_params
+        counts = self.transpiled_recon_circ.get_counts(
+            self._input_params + self._encoder_params,
+            self._create_param_values(input_values, encoder_weights),
+            shots,
         )
 
-        qobj = assemble(
-            [
-                self.transpiled_recon_circ.bind_parameters(value_dict)
-                for value_dict in parameter_binds
-            ]
-        )
-        job = self.backend.run(qobj)
-        counts: List[Dict[str, int]] = job.result().get_counts()
-
-        if isinstance(counts, Dict):
-            counts = [counts]
-
         reconstructions = self._extract_single_qubit_expectations(
             counts, self.input_dim, shots
         )
@@ -449,26 +433,28 @@ class QuantumAutoencoder:
         return circ.to_instruction()
 
     @staticmethod
-    def _create_param_binds(
-        input_values: torch.Tensor,
-        input_params: List[Parameter],
-        encoder_weights: torch.Tensor,
-        encoder_params: List[Parameter],
-    ) -> List[Dict[Parameter, float]]:
-        parameter_binds = []
-
-        for i in range(input_values.shape[0]):
-            param_bind = {}
+    def _to_array(values: Union[np.ndarray, torch.Tensor]) -> np.ndarray:
+        if isinstance(values, torch.Tensor):
+            values = values.detach().cpu().numpy()
 
-            for j, input_param in enumerate(input_params):
-                param_bind[input_param] = input_values[i, j].item()
+        return np.asarray(values, dtype=float)
 
-            for j, encoder_param in enumerate(encoder_params):
-                param_bind[encoder_param] = encoder_weights[i, j].item()
-
-            parameter_binds.append(param_bind)
-
-        return parameter_binds
+    @staticmethod
+    def _create_param_values(
+        input_values: torch.Tensor, encoder_weights: torch.Tensor
+    ) -> np.ndarray:
+        """
+        :param input_values: size: [instance_cnt, input_cnt]
+        :param encoder_weights: size: [instance_cnt, encoder_params_cnt]
+        :return: parameter values with one row per instance, size: [instance_cnt, input_cnt + encoder_params_cnt]
+        """
+        return np.concatenate(
+            [
+                QuantumAutoencoder._to_array(input_values),
+                QuantumAutoencoder._to_array(encoder_weights),
+            ],
+            axis=1,
+        )
 
     @staticmethod
     def _extract_single_qubit_expectations(
@@ -131,16 +131,23 @@ class HybridAutoencoder:
     def calc_distance_matrix(self, data: np.ndarray) -> np.ndarray:
         distance_matrix = np.zeros((data.shape[0], data.shape[0]))
 
-        for i in range(data.shape[0]):
-            for j in range(0, i + 1):
-                fidelity = self.calc_fidelity(data[i], data[j])
-                distance = math.acos(math.sqrt(fidelity)) / (
-                    math.pi / 2
-                )  # Fubini-Study Metric + normalization
-
-                # because the distance matrix is symmetric, only half of the values need to be computed
-                distance_matrix[i, j] = distance
-                distance_matrix[j, i] = distance
+        with torch.no_grad():
+            reduced: np.ndarray = (
+                self.outer_cae.get_embeddings(torch.tensor(data, dtype=torch.float32))
+                * math.pi
+            ).numpy()
+
+        # because the distance matrix is symmetric, only half of the values need to be computed
+        rows, cols = np.tril_indices(data.shape[0])
+        fidelities = self.qae.calc_fidelities(
+            reduced[rows], reduced[cols], self.qae_module.encoder_params, 1024
+        )
+        distances = np.arccos(np.sqrt(fidelities)) / (
+            math.pi / 2
+        )  # Fubini-Study Metric + normalization
+
+        distance_matrix[rows, cols] = distances
+        distance_matrix[cols, rows] = distances
 
         return distance_matrix
 
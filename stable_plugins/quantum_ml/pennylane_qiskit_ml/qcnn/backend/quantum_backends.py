@@ -14,7 +14,11 @@
 
 import pennylane as qml
 from enum import Enum
-from qiskit import IBMQ
+
+from qhana_plugin_runner.plugin_utils.quantum_backends import (
+    get_ibmq_provider,
+    get_pennylane_device,
+)
 
 
 class QuantumBackends(Enum):
@@ -32,19 +36,24 @@ class QuantumBackends(Enum):
     custom_ibmq = "custom_ibmq"
 
     def get_pennylane_backend(
-        self, ibmq_token: str, custom_backend_name: str, qubit_cnt: int, shots: int
+        self,
+        ibmq_token: str,
+        custom_backend_name: str,
+        qubit_cnt: int,
+        shots: int,
     ) -> qml.Device:
         if self.name.startswith("aer"):
             # Use local AER backend
             aer_backend_name = self.name[4:]
-            return qml.device(
+
+            return get_pennylane_device(
                 "qiskit.aer", wires=qubit_cnt, backend=aer_backend_name, shots=shots
             )
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=self.name,
@@ -53,9 +62,9 @@ class QuantumBackends(Enum):
             )
         elif self.name.startswith("custom_ibmq"):
             # Use custom IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=custom_backend_name,
@@ -63,7 +72,7 @@ class QuantumBackends(Enum):
                 shots=shots,
             )
         elif self.name.startswith("pennylane"):
-            return qml.device(self.value[10:], wires=qubit_cnt, shots=shots)
+            return get_pennylane_device(self.value[10:], wires=qubit_cnt, shots=shots)
         else:
             # TASK_LOGGER.error
             raise NotImplementedError("Unknown pennylane backend specified!")
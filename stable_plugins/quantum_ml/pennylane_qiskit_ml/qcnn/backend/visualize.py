@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Callable
+from typing import Callable, Optional
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -20,110 +20,7 @@ import numpy as np
 from sklearn.metrics import confusion_matrix
 from torch import Tensor
 
-
-def add_background(
-    points: np.array,
-    resolution: int,
-    predictor: Callable[[Tensor], Tensor],
-    scatter: go.Scatter,
-    two_classes: bool = False,
-    label_to_int: dict = None,
-) -> go.Figure:
-    """
-    Adds heatmap to given scatter plot. Heatmap shows the areas in which the predictor predicts a certain label.
-    """
-    # Prep for grid (heatmap)
-    # Get min and max of each dimension (here x and y) and write them into vector
-    min_vec = points.min(axis=0)
-    max_vec = points.max(axis=0)
-
-    # The plotly zooms a little further out (autozoom), such that the points at the edge of the plot are perfectly visible.
-    # If we do not account for this, there would be an margin of empty space between the points and the edge of the plot.
-    # Therefore, we adapt the min and max values and thus, stretching the heatmap to the edge.
-    max_values = (
-        np.array([np.abs(min_vec), np.abs(max_vec)]).max(axis=0) * 0.2 + 1
-    )  # +1 to avoid the zero case
-    min_vec -= max_values
-    max_vec += max_values
-
-    # Compute ranges (still in vector)
-    range_vec = max_vec - min_vec
-
-    # Subtract 1 from the resolution, we add it later on again.
-    # This lets us fill the whole screen, on low resolutions
-    resolution -= 1
-    h_vec = range_vec / resolution  # h_vec contains the step size for x and y direction
-
-    # get x and y coordinates of a grid.
-    # We need to determine the label of each point in the grid to create the heatmap
-    max_vec += h_vec  # +h adds the previously subtracted resolution
-    x_grid = np.arange(min_vec[0], max_vec[0], h_vec[0])
-    y_grid = np.arange(min_vec[1], max_vec[1], h_vec[1])
-
-    # Determine labels of points in grid for heatmap
-    Z = []
-    for y_v in y_grid:
-        temp = []
-        for x_v in x_grid:
-            temp.append([x_v, y_v])
-        Z.append(predictor(temp))
-
-    Z = np.array(Z)
-
-    if two_classes:
-        # Create contours
-        background = go.Figure(
-            go.Contour(
-                z=Z + 1,
-                x=x_grid,
-                y=y_grid,
-                showscale=False,
-                colorscale=list(px.colors.qualitative.D3),
-                zmin=0,
-                zmax=10,
-                hoverinfo="skip",
-                opacity=0.55,
-                line_width=1,
-            )
-        )
-    else:
-        # Create heatmap
-        background = go.Figure(
-            go.Heatmap(
-                z=Z,
-                x=x_grid,
-                y=y_grid,
-                showscale=False,
-                colorscale=list(px.colors.qualitative.D3),
-                zmin=0,
-                zmax=9,
-                hoverinfo="skip",
-                opacity=0.55,
-            )
-        )
-
-    # Give markers a slightly thicker border, since their background will most likely have the same color.
-    # Note, background is due to the heatmap
-    scatter.update_traces(marker=dict(line=dict(width=2.5)))
-    # Correct colors of different labels. 0 gets the first color, 1 the second and so on
-    # Thus the color match with the heatmap colors
-    for sca_plt in scatter.data:
-        label = int(
-            sca_plt.legendgroup[0]
-            if label_to_int is None
-            else label_to_int[", ".join(sca_plt.legendgroup.split(", ")[:-1])]
-        )
-        sca_plt.update(marker=dict(color=px.colors.qualitative.D3[label]))
-
-    # Combine both heatmap and scatter plot
-    # layout=fig.layout keeps the description of the legend
-    scatter = go.Figure(data=background.data + scatter.data, layout=scatter.layout)
-
-    # Set x- and y-axes correctly, in case the background still is not large enough for autozoom
-    scatter.update_xaxes(range=[x_grid.min(), x_grid.max()])
-    scatter.update_yaxes(range=[y_grid.min(), y_grid.max()])
-
-    return scatter
+from qhana_plugin_runner.plugin_utils.visualization import add_background
 
 
 def plot_data(
@@ -138,6 +35,7 @@ def plot_data(
     only_first_100: bool = True,
     title: str = "",
     label_to_int: dict = None,
+    model_hash: Optional[str] = None,
 ) -> go.Figure:
     """
     Returns plotly plot of data
@@ -194,6 +92,7 @@ def plot_data(
                 fig,
                 two_classes=len(set(train_labels)) == 2,
                 label_to_int=label_to_int,
+                model_hash=model_hash,
             )
     else:
         df["y"] = [0] * len(df["x"])
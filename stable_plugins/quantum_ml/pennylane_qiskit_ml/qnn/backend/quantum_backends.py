@@ -14,7 +14,11 @@
 
 import pennylane as qml
 from enum import Enum
-from qiskit import IBMQ
+
+from qhana_plugin_runner.plugin_utils.quantum_backends import (
+    get_ibmq_provider,
+    get_pennylane_device,
+)
 
 
 class QuantumBackends(Enum):
@@ -41,14 +45,15 @@ class QuantumBackends(Enum):
         if self.name.startswith("aer"):
             # Use local AER backend
             aer_backend_name = self.name[4:]
-            return qml.device(
+
+            return get_pennylane_device(
                 "qiskit.aer", wires=qubit_cnt, backend=aer_backend_name, shots=shots
             )
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=self.name,
@@ -57,9 +62,9 @@ class QuantumBackends(Enum):
             )
         elif self.name.startswith("custom_ibmq"):
             # Use custom IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=custom_backend_name,
@@ -67,7 +72,7 @@ class QuantumBackends(Enum):
                 shots=shots,
             )
         elif self.name.startswith("pennylane"):
-            return qml.device(self.value[10:], wires=qubit_cnt, shots=shots)
+            return get_pennylane_device(self.value[10:], wires=qubit_cnt, shots=shots)
         else:
             # TASK_LOGGER.error
             raise NotImplementedError("Unknown pennylane backend specified!")
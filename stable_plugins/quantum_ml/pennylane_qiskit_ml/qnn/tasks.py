@@ -36,6 +36,7 @@ from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     save_entities,
 )
+from qhana_plugin_runner.plugin_utils.visualization import get_model_hash
 from qhana_plugin_runner.requests import retrieve_filename
 
 import numpy as np
@@ -268,6 +269,14 @@ def calculation_task(self, db_id: int) -> str:
             predictor=predictor,
             title=plot_title,
             label_to_int=label_to_int,
+            # the trained weights and the quantum device determine the background predictions
+            model_hash=get_model_hash(
+                network_enum.name,
+                q_device_enum.name,
+                custom_backend,
+                shots,
+                *model.state_dict().values(),
+            ),
         )
 
         # show plot
@@ -16,6 +16,7 @@ import enum
 from abc import abstractmethod, ABCMeta
 from celery.utils.log import get_task_logger
 
+import pennylane as qml
 from pennylane import Device
 from typing import List, Tuple
 import numpy as np
@@ -34,58 +35,60 @@ class ClusteringEnum(enum.Enum):
     state_preparation = "State Preparation"
     positive_correlation = "Positive Correlation"
 
-    def get_cluster_algo(self, backend: Device, tol: float, max_runs: int):
+    def get_cluster_algo(
+        self, backend: Device, tol: float, max_runs: int, centroid_tol: float = 0.0
+    ):
         if self == ClusteringEnum.negative_rotation:
             from .negative_rotation import NegativeRotationQuantumKMeans
 
-            return NegativeRotationQuantumKMeans(backend, tol, max_runs)
+            return NegativeRotationQuantumKMeans(backend, tol, max_runs, centroid_tol)
 
         elif self == ClusteringEnum.destructive_interference:
             from .destructive_interference import DestructiveInterferenceQuantumKMeans
 
-            return DestructiveInterferenceQuantumKMeans(backend, tol, max_runs)
+            return DestructiveInterferenceQuantumKMeans(
+                backend, tol, max_runs, centroid_tol
+            )
 
         elif self == ClusteringEnum.positive_correlation:
             from .positive_correlation import PositiveCorrelationQuantumKmeans
 
-            return PositiveCorrelationQuantumKmeans(backend, tol, max_runs)
+            return PositiveCorrelationQuantumKmeans(backend, tol, max_runs, centroid_tol)
 
         elif self == ClusteringEnum.state_preparation:
             from .state_preparation import StatePreparationQuantumKMeans
 
-            return StatePreparationQuantumKMeans(backend, tol, max_runs)
+            return StatePreparationQuantumKMeans(backend, tol, max_runs, centroid_tol)
 
         else:
             raise ValueError("Unkown clustering algorithm!")
 
 
 class Clustering(metaclass=ABCMeta):
-    def __init__(self, backend: Device, tol, max_runs):
+    def __init__(self, backend: Device, tol, max_runs, centroid_tol=0.0):
         self.backend = backend
         self.max_qbits = backend.num_wires
         self.tol = tol
         self.max_runs = max_runs
+        self.centroid_tol = centroid_tol
+        # Number of qbits needed to calculate "distance" between one data point and one centroid
+        self.needed_qbits = 1
+        # Index of the measured wire within the qbits of one data point and centroid pair
+        self.measure_wire_idx = 0
 
     def normalize(self, data):
         """
         Normalize the data, i.e. every entry of data has length 1.
         Note, that a copy of the data will be done.
         """
-        return np.array([point / np.linalg.norm(point) for point in data])
+        return data / np.linalg.norm(data, axis=1, keepdims=True)
 
     def standardize(self, data):
         """
         Standardize all the points, i.e. they have zero mean and unit variance.
         Note that a copy of the data points will be created.
         """
-        preprocessed_data = np.empty(data.shape)
-
-        for d in range(data.shape[1]):
-            # Go through each dimension and give it a zero mean and unit variance
-            data_d = data[:, d].copy()
-            preprocessed_data[:, d] = (data_d - data_d.mean(axis=0)) / data_d.std(axis=0)
-
-        return preprocessed_data
+        return (data - data.mean(axis=0)) / data.std(axis=0)
 
     def check_convergence(self, old_centroid_mapping, new_centroid_mapping):
         """
@@ -93,13 +96,20 @@ class Clustering(metaclass=ABCMeta):
         They are similar enough, if the number of different labels are less than
         the tolerance tol (a number between 0 and 1) times the total number of data points
         """
-        n_different_labels = 0
-        n_data_points = len(new_centroid_mapping)
-        for i in range(len(old_centroid_mapping)):
-            if old_centroid_mapping[i] != new_centroid_mapping[i]:
-                n_different_labels += 1
+        n_different_labels = np.count_nonzero(
+            np.asarray(old_centroid_mapping) != np.asarray(new_centroid_mapping)
+        )
+        return (n_different_labels - (len(new_centroid_mapping) * self.tol)) <= 0
 
-        return (n_different_labels - (n_data_points * self.tol)) <= 0
+    def check_centroid_shift(self, old_centroids, new_centroids) -> bool:
+        """
+        Returns True, if no centroid moved further than the tolerance centroid_tol. A tolerance of 0 disables this
+        convergence criterion.
+        """
+        if self.centroid_tol <= 0:
+            return False
+        shift = np.linalg.norm(new_centroids - old_centroids, axis=1).max()
+        return shift <= self.centroid_tol
 
     @abstractmethod
     def init_centroids(self, k) -> np.ndarray:
@@ -126,31 +136,87 @@ class Clustering(metaclass=ABCMeta):
         """
 
     @abstractmethod
+    def quantum_circuit(self, wires_to_use: List[int], data_param, centroid_param):
+        """
+        Applies the circuit, that computes the "distance" between a data point and a centroid, to the wires_to_use.
+        The parameters may be broadcast, i.e. have an additional leading dimension with one entry per circuit.
+        """
+
+    def get_quantum_tape(
+        self, data_params: np.ndarray, centroid_params: np.ndarray
+    ) -> qml.tape.QuantumTape:
+        """
+        Returns a circuit that computes the "distance" of one data point and centroid pair per slot of
+        needed_qbits wires. data_params and centroid_params have one entry per slot. If their entries are broadcast,
+        then the returned circuit is a template for multiple circuits, that is bound to all of the parameters.
+        """
+        with qml.tape.QuantumTape() as tape:
+            for slot, (data_param, centroid_param) in enumerate(
+                zip(data_params, centroid_params)
+            ):
+                first_wire = slot * self.needed_qbits
+                wires_to_use = list(range(first_wire, first_wire + self.needed_qbits))
+                self.quantum_circuit(wires_to_use, data_param, centroid_param)
+            for slot in range(len(data_params)):
+                qml.probs(wires=[slot * self.needed_qbits + self.measure_wire_idx])
+        return tape
+
+    def execute_circuit(
+        self, data_params: np.ndarray, centroid_params: np.ndarray
+    ) -> Tuple[np.ndarray, str]:
+        """
+        Executes the circuits of all data point and centroid pairs in one batch. The parameters have the shape
+        (slots, circuits, ...). Returns the probabilities of measuring |1> with the shape (slots, circuits) and a
+        representative circuit.
+        """
+        tape = self.get_quantum_tape(data_params, centroid_params)
+        result = qml.execute([tape], self.backend, gradient_fn=None, cache=False)[0]
+        probs = np.reshape(result, (len(data_params), -1, 2))[:, :, 1]
+        representative_circuit = self.get_quantum_tape(
+            data_params[:, 0], centroid_params[:, 0]
+        ).to_openqasm()
+        return probs, representative_circuit
+
     def compute_new_centroid_mapping(
-        self, prepped_data, centroids
-    ) -> (List[int], int, str):
+        self, prepped_data: np.ndarray, centroids: np.ndarray
+    ) -> Tuple[np.ndarray, int, str]:
         """
         Returns new centroid mapping, depending on the prepared data and the current centroids
         """
+        centroid_params = self.prep_data_for_circuit(np.asarray(centroids))
+        num_centroids = len(centroid_params)
+        num_pairs = len(prepped_data) * num_centroids
+
+        # Each circuit computes the "distance" of as many data point and centroid pairs as fit on the backend.
+        # The last circuit is filled up with the first pairs, whose results are ignored.
+        slots = max(1, self.max_qbits // self.needed_qbits)
+        amount_executed_circuits = -(-num_pairs // slots)
+        pairs = np.resize(np.arange(num_pairs), (amount_executed_circuits, slots)).T
+        data_idx, centroid_idx = np.divmod(pairs, num_centroids)
+
+        probs, representative_circuit = self.execute_circuit(
+            np.asarray(prepped_data)[data_idx], centroid_params[centroid_idx]
+        )
+        # A probability of 0 means, the centroid and the data point are close to each other,
+        # a probability of 1 means, they are far away from each other
+        distances = probs.T.reshape(-1)[:num_pairs].reshape(-1, num_centroids)
+        centroid_mapping = distances.argmin(axis=1)
+
+        return centroid_mapping, amount_executed_circuits, representative_circuit
 
     def get_mean_centroids_from_mapping(
         self, centroid_mapping: List[int], prepped_data: np.ndarray, k: int
     ) -> np.ndarray:
-        centroid_mapping = np.array(centroid_mapping)
-        centroids = np.zeros((k, len(prepped_data[0])))
-        num_points = [0] * k
+        centroid_mapping = np.asarray(centroid_mapping, dtype=int)
+        centroids = np.zeros((k, prepped_data.shape[1]))
         # Sum points up
-        for i in range(len(centroid_mapping)):
-            c = centroid_mapping[i]
-            centroids[c] += prepped_data[i]
-            num_points[c] += 1
+        np.add.at(centroids, centroid_mapping, prepped_data)
+        num_points = np.bincount(centroid_mapping, minlength=k)
 
         # Average sum
-        for c in range(k):
-            if num_points[c] == 0:
-                centroids[c] = prepped_data[c]
-            else:
-                centroids[c] = centroids[c] / num_points[c]
+        empty = num_points == 0
+        centroids[~empty] /= num_points[~empty, None]
+        centroids[empty] = prepped_data[np.flatnonzero(empty)]
 
         return centroids
 
@@ -197,10 +263,12 @@ class Clustering(metaclass=ABCMeta):
             centroids = self.get_mean_centroids_from_mapping(
                 new_centroid_mapping, prepped_data, k
             )
+            old_prepped_centroids = prepped_centroids
             prepped_centroids = self.prep_centroids(centroids)
 
-            not_converged = not self.check_convergence(
-                old_centroid_mapping, new_centroid_mapping
+            not_converged = not (
+                self.check_convergence(old_centroid_mapping, new_centroid_mapping)
+                or self.check_centroid_shift(old_prepped_centroids, prepped_centroids)
             )
             iterations += 1
             TASK_LOGGER.info(f"Iteration {iterations} done")
@@ -15,14 +15,18 @@
 from .clustering import Clustering
 import pennylane as qml
 import numpy as np
-from typing import List, Tuple
+from typing import List
 
 
 class DestructiveInterferenceQuantumKMeans(Clustering):
-    def __init__(self, backend: qml.Device, tol, max_runs):
-        super(DestructiveInterferenceQuantumKMeans, self).__init__(backend, tol, max_runs)
+    def __init__(self, backend: qml.Device, tol, max_runs, centroid_tol=0.0):
+        super(DestructiveInterferenceQuantumKMeans, self).__init__(
+            backend, tol, max_runs, centroid_tol
+        )
         # Number of qbits needed to calculate "distance" between one data point and one centroid
         self.needed_qbits = 2
+        # Index of the measured wire within the qbits of one data point and centroid pair
+        self.measure_wire_idx = 0
 
     def init_centroids(self, k: int) -> np.ndarray:
         """
@@ -41,14 +45,10 @@ class DestructiveInterferenceQuantumKMeans(Clustering):
         Calculates the angle between the 2D vetors and the base vector.
         The cartesian points are given in a tuple format (x, y).
         """
-        base_vector = np.array([1, 0])
-        angles = []
-        for d_point in cartesian_points:
-            if d_point[1] < 0:
-                angles.append(2 * np.pi - np.arccos(np.dot(d_point, base_vector)))
-            else:
-                angles.append(np.arccos(np.dot(d_point, base_vector)))
-        return np.array(angles)
+        cartesian_points = np.asarray(cartesian_points)
+        # The dot product with the base vector (1, 0) is the x coordinate
+        angles = np.arccos(cartesian_points[:, 0])
+        return np.where(cartesian_points[:, 1] < 0, 2 * np.pi - angles, angles)
 
     def prep_data(self, data) -> np.ndarray:
         """
@@ -75,86 +75,6 @@ class DestructiveInterferenceQuantumKMeans(Clustering):
         qml.RY(relative_angle, wires=ancilla_wire)
         qml.Hadamard(measure_wire)
 
-    def execute_circuit(
-        self,
-        current_distances_calculated,
-        data_angles: List[float],
-        centroid_angles: np.ndarray,
-    ) -> Tuple[List[float], str]:
-        @qml.qnode(self.backend)
-        def circuit():
-            wires_to_measure = []
-            for wires_to_use, indices in current_distances_calculated:
-                data_idx, centroid_idx = indices
-                self.quantum_circuit(
-                    wires_to_use, data_angles[data_idx], centroid_angles[centroid_idx]
-                )
-                wires_to_measure.append(wires_to_use[0])
-            return [qml.probs(wires=[wire]) for wire in wires_to_measure]
-
-        result = circuit()
-        # Probability of measuring |1> and open qasm
-        return [probs[1] for probs in result], circuit.tape.to_openqasm()
-
-    def compute_new_centroid_mapping(
-        self, prepped_data: List[float], centroids: List[List[float]]
-    ) -> Tuple[np.ndarray, int, str]:
-        # Need to return one of the quantum circuits
-        representative_circuit = ""
-
-        centroid_angles = self.calculate_angles(centroids)
-        centroid_mapping = np.zeros(len(prepped_data), dtype=int)
-        # Since we want the minimum result of our quantum circuits and the results lie within [0, 1],
-        # we can start out with 1.
-        mapping_distance = np.ones(len(prepped_data))
-
-        next_qbit = 0  # this tracks the next free qbit
-        amount_executed_circuits = 0
-        current_distances_calculated = []
-        for i in range(len(prepped_data)):
-            for j in range(len(centroid_angles)):
-                # If if-statement is true, then we don't have enough qbits left to prepare another circuit
-                # Therefore execute the circuits on a quantum computer
-                if next_qbit + self.needed_qbits > self.max_qbits:
-                    amount_executed_circuits += 1
-                    # This adds the measurements and executes the circuits
-                    results, representative_circuit = self.execute_circuit(
-                        current_distances_calculated, prepped_data, centroid_angles
-                    )
-                    # Update centroid mapping
-                    for k in range(len(results)):
-                        data_idx, centroid_idx = current_distances_calculated[k][1]
-                        # If result = 0, then the centroid and the data point are close to each other
-                        # If result = 1, then the centroid and the data point are far away from each other
-                        # Therefore we look at which is min
-                        if mapping_distance[data_idx] > results[k]:
-                            mapping_distance[data_idx] = results[k]
-                            centroid_mapping[data_idx] = centroid_idx
-                    # Reset variables
-                    next_qbit = 0
-                    current_distances_calculated = []
-
-                # Prepare quantum circuit
-                wires_to_use = [i + next_qbit for i in range(self.needed_qbits)]
-                current_distances_calculated.append([wires_to_use, [i, j]])
-                next_qbit += self.needed_qbits
-
-        if next_qbit != 0:
-            amount_executed_circuits += 1
-            # This adds the measurements and executes the circuits
-            results, representative_circuit = self.execute_circuit(
-                current_distances_calculated, prepped_data, centroid_angles
-            )
-            # Update centroid mapping
-            for k in range(len(results)):
-                data_idx, centroid_idx = current_distances_calculated[k][1]
-                # We want min
-                if mapping_distance[data_idx] > results[k]:
-                    mapping_distance[data_idx] = results[k]
-                    centroid_mapping[data_idx] = centroid_idx
-
-        return centroid_mapping, amount_executed_circuits, representative_circuit
-
     def plot(self, prepped_data, prepped_centroids, centroid_mapping):
         import plotly.express as px
         import pandas as pd
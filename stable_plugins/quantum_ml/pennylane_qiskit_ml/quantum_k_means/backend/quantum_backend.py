@@ -15,7 +15,13 @@
 import enum
 
 import pennylane as qml
-from qiskit import IBMQ
+from typing import Optional
+
+from qhana_plugin_runner.plugin_utils.quantum_backends import (
+    get_ibmq_max_num_qubits,
+    get_ibmq_provider,
+    get_pennylane_device,
+)
 
 
 class QuantumBackends(enum.Enum):
@@ -35,48 +41,51 @@ class QuantumBackends(enum.Enum):
         self,
         ibmq_token: str,
         custom_backend_name: str,
-    ):
+    ) -> Optional[int]:
         if self.name.startswith("aer"):
             return None
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(self.name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(custom_backend_name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, custom_backend_name)
 
     def get_pennylane_backend(
         self,
         ibmq_token: str,
         custom_backend_name: str,
         qubit_cnt: int,
+        shots: Optional[int] = None,
     ) -> qml.Device:
+        options = {} if shots is None else {"shots": shots}
         if self.name.startswith("aer"):
             # Use local AER backend
             aer_backend_name = self.name[4:]
 
-            return qml.device("qiskit.aer", wires=qubit_cnt, backend=aer_backend_name)
+            return get_pennylane_device(
+                "qiskit.aer", wires=qubit_cnt, backend=aer_backend_name, **options
+            )
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=self.name,
                 provider=provider,
+                **options,
             )
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
+            # Use custom IBMQ backend
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=custom_backend_name,
                 provider=provider,
+                **options,
             )
         else:
             raise ValueError("Unknown pennylane backend specified!")
@@ -126,6 +126,7 @@ class MicroFrontend(MethodView):
         default_values = {
             fields["clusters_cnt"].data_key: 2,
             fields["tol"].data_key: 0.0,
+            fields["centroid_tol"].data_key: 0.01,
             fields["max_runs"].data_key: 1000,
             fields["backend"].data_key: QuantumBackends.aer_statevector_simulator.value,
             fields["shots"].data_key: 1024,
@@ -36,11 +36,13 @@ class InputParameters:
         shots: int,
         ibmq_token: str,
         custom_backend: str,
+        centroid_tol: float = 0.0,
     ):
         self.entity_points_url = entity_points_url
         self.clusters_cnt = clusters_cnt
         self.variant = variant
         self.tol = tol / 100.0
+        self.centroid_tol = centroid_tol
         self.max_runs = max_runs
         self.backend = backend
         self.shots = shots
@@ -101,6 +103,18 @@ class InputParametersSchema(FrontendFormBaseSchema):
         },
         validate=ma.validate.Range(min=0, min_inclusive=True),
     )
+    centroid_tol = ma.fields.Float(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Tolerance for Centroid Shift",
+            "description": "The algorithm also stops, if no centroid moved further than this tolerance in the last "
+            "iteration. The centroids are compared after the preprocessing of the variant, e.g. after normalizing "
+            "them. A tolerance of 0 disables this convergence criterion.",
+            "input_type": "number",
+        },
+        validate=ma.validate.Range(min=0, min_inclusive=True),
+    )
     max_runs = ma.fields.Integer(
         required=True,
         allow_none=False,
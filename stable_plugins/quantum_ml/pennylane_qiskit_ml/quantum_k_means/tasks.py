@@ -94,6 +94,7 @@ def calculation_task(self, db_id: int) -> str:
     clusters_cnt = input_params.clusters_cnt
     variant = input_params.variant
     tol = input_params.tol
+    centroid_tol = input_params.centroid_tol
     max_runs = input_params.max_runs
     backend = input_params.backend
     shots = input_params.shots
@@ -140,10 +141,10 @@ def calculation_task(self, db_id: int) -> str:
     max_qbits = backend.get_max_num_qbits(ibmq_token, custom_backend)
     if max_qbits is None:
         max_qbits = 6
-    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, max_qbits)
-    backend.shots = shots
+    # devices without parameter broadcasting get all circuits of an iteration as one batch
+    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, max_qbits, shots)
 
-    cluster_algo = variant.get_cluster_algo(backend, tol, max_runs)
+    cluster_algo = variant.get_cluster_algo(backend, tol, max_runs, centroid_tol)
 
     clusters, representative_circuit = cluster_algo.create_clusters(
         points_arr, clusters_cnt
@@ -45,6 +45,19 @@ def aa_steps(
         oracle_circuit()
 
 
+def aa_success_probability(good_fraction: float, itr: int) -> float:
+    """
+    Returns the probability of measuring a good state after the state_circuit and itr many aa_steps, if the
+    state_circuit prepares an equal superposition in which good_fraction of the states are good.
+    aa_steps applies the reflection about the initial state before the oracle. Thus, the first step only changes the
+    global phase and itr steps amplify like itr - 1 grover iterations.
+    :param good_fraction: The fraction of good states in the superposition
+    :param itr: The number of iterations
+    """
+    theta = np.arcsin(np.sqrt(good_fraction))
+    return float(np.sin((2 * max(itr - 1, 0) + 1) * theta) ** 2)
+
+
 def amplitude_amplification_unique(
     num_states: int,
     state_circuit: Callable[[], None],
@@ -201,6 +214,38 @@ def exp_searching_amplitude_amplification(
     return None
 
 
+def emulate_exp_searching_amplitude_amplification(
+    good_fraction: float,
+    shots: int,
+    exp_itr: int = 10,
+    rng: Optional[np.random.Generator] = None,
+) -> bool:
+    """
+    Emulates the measurements of exp_searching_amplitude_amplification without executing its circuits and returns
+    True, if a good state is measured. The random number of grover iterations is chosen as in
+    exp_searching_amplitude_amplification and the number of good samples of each circuit is drawn from a binomial
+    distribution with the exact success probability of the circuit (see aa_success_probability).
+    Since the state_circuit prepares an equal superposition, the measured good state is uniformly distributed over
+    all good states.
+    :param good_fraction: The fraction of good states in the superposition prepared by the state_circuit
+    :param shots: The number of samples measured per circuit
+    :param exp_itr: The max number of iterations the exponential search might take.
+    :param rng: The random number generator to use
+    """
+    if good_fraction <= 0:
+        return False
+    if rng is None:
+        rng = np.random.default_rng()
+
+    c = 1.5  # 1 < c < 2
+    for i in range(exp_itr + 1):
+        # The first circuit checks for a good state without grover
+        itr = 0 if i == 0 else rng.integers(1, int(np.ceil(c**i)))
+        if rng.binomial(shots, aa_success_probability(good_fraction, itr)) > 0:
+            return True
+    return False
+
+
 def lambda_amplitude_amplification(
     num_states: int,
     state_circuit: Callable[[], None],
@@ -22,6 +22,7 @@ from ..q_arithmetic import cc_increment_register
 from ..ccnot import adaptive_ccnot
 from .qknn import QkNN
 from ..amplitude_amplification import (
+    emulate_exp_searching_amplitude_amplification,
     exp_searching_amplitude_amplification,
     get_exp_search_aa_representative_circuit,
 )
@@ -325,21 +326,53 @@ class BasheerHammingQkNN(QkNN):
         hamming_distance = len(train_bits) - np.array(train_bits).sum()
         return int(bitlist_to_int(idx_bits) % self.num_train_data), hamming_distance
 
-    def label_point(self, x: np.ndarray) -> int:
-        check_binary(
-            x,
-            "All the data needs to be binary, when dealing with the hamming distance",
-        )
-        x = np.array(x, dtype=int)
-        # Init: First choose k random points, to be the current nearest neighbours
-        chosen_indices = np.random.choice(
-            range(self.num_train_data), self.k, replace=False
-        )
+    def emulate_better_training_point_idx(
+        self,
+        distances: np.ndarray,
+        distance_threshold: int,
+        chosen_indices: List[int],
+        shots: int,
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Emulates get_better_training_point_idx without executing its circuits. The oracle marks the (repeated) training
+        points with a hamming distance of at most distance_threshold, whose indices are not in chosen_indices.
+        The measurements of the amplitude amplification are sampled from their exact probabilities, which only depend
+        on the fraction of marked points (see emulate_exp_searching_amplitude_amplification).
+        :param distances: The hamming distances of x to all (repeated) training points
+        """
+        if distance_threshold < 0:
+            return None, None
 
-        chosen_distances = np.array(
-            [calc_hamming_distance(x, self.train_data[idx]) for idx in chosen_indices]
-        )
+        distance_threshold = min(distance_threshold, self.train_data.shape[0])
+        good = distances <= distance_threshold
+        chosen_indices = np.asarray(chosen_indices, dtype=int)
+        good[chosen_indices] = False
+        looped_indices = chosen_indices + self.num_train_data
+        good[looped_indices[looped_indices < len(good)]] = False
+        good_indices = np.flatnonzero(good)
+
+        if not emulate_exp_searching_amplitude_amplification(
+            len(good_indices) / len(good), shots, self.exp_itr, self.rng
+        ):
+            return None, None
+
+        idx = self.rng.choice(good_indices)
+        return int(idx % self.num_train_data), int(distances[idx])
 
+    def search_nearest_neighbours(
+        self,
+        chosen_indices: np.ndarray,
+        chosen_distances: np.ndarray,
+        get_better_training_point_idx: Callable[
+            [int, np.ndarray], Tuple[Optional[int], Optional[int]]
+        ],
+    ) -> np.ndarray:
+        """
+        Replaces the chosen training point with the largest distance with a closer one, until no closer training point
+        can be found.
+        :param get_better_training_point_idx: Returns the index and distance of a training point with a distance of at
+            most the given threshold, that is not in the given indices, or (None, None)
+        """
         # Loop converges, if no better y can be found
         # Loop should take at most |train data| - k many steps
         # Allow for more iterations with a slack variable
@@ -351,8 +384,8 @@ class BasheerHammingQkNN(QkNN):
             y_idx = chosen_distances.argmax()
 
             # Find new_y with quantum algorithm such that new_y_distance < y_distance and new_y not in A
-            new_y, distance = self.get_better_training_point_idx(
-                x, chosen_distances[y_idx] - 1, chosen_indices
+            new_y, distance = get_better_training_point_idx(
+                chosen_distances[y_idx] - 1, chosen_indices
             )
             if new_y is not None and new_y != chosen_indices[y_idx]:
                 # Replace y with new_y
@@ -369,14 +402,73 @@ class BasheerHammingQkNN(QkNN):
                 f"{int((1 + self.slack) * (self.num_train_data - self.k))} iterations. "
                 "An error prone quantum backend could be the issue."
             )
+        return chosen_indices
 
-        # Majority voting
+    def majority_vote(self, chosen_indices: np.ndarray) -> int:
         counts = Counter(
             self.train_labels[chosen_indices]
         )  # Count occurrences of labels in k smallest values
         new_label = max(counts, key=counts.get)  # Get most frequent label
         return new_label
 
+    def label_point(self, x: np.ndarray) -> int:
+        check_binary(
+            x,
+            "All the data needs to be binary, when dealing with the hamming distance",
+        )
+        x = np.array(x, dtype=int)
+        # Init: First choose k random points, to be the current nearest neighbours
+        chosen_indices = np.random.choice(
+            range(self.num_train_data), self.k, replace=False
+        )
+
+        chosen_distances = np.array(
+            [calc_hamming_distance(x, self.train_data[idx]) for idx in chosen_indices]
+        )
+
+        chosen_indices = self.search_nearest_neighbours(
+            chosen_indices,
+            chosen_distances,
+            lambda threshold, indices: self.get_better_training_point_idx(
+                x, threshold, indices
+            ),
+        )
+        return self.majority_vote(chosen_indices)
+
+    def label_points_analytic(self, X: np.ndarray) -> np.ndarray:
+        """
+        Labels the points like label_point, but emulates the amplitude amplification instead of executing its
+        circuits (see emulate_better_training_point_idx). Each circuit is measured with the shots of the emulated shot
+        noise or, if not set, with the shots of the quantum backend.
+        """
+        check_binary(
+            X,
+            "All the data needs to be binary, when dealing with the hamming distance",
+        )
+        X = np.array(X, dtype=int)
+        shots = self.shots
+        if shots is None:
+            shots = getattr(self.backend, "shots", None)
+        if not shots:
+            raise ValueError(
+                "The basheer hamming qknn measures samples, thus the number of shots needs to be set!"
+            )
+
+        # distances to the repeated training points, like the circuits
+        hamming_distances = X @ (1 - self.train_data).T + (1 - X) @ self.train_data.T
+        labels = []
+        for distances in hamming_distances:
+            chosen_indices = self.rng.choice(self.num_train_data, self.k, replace=False)
+            chosen_indices = self.search_nearest_neighbours(
+                chosen_indices,
+                distances[chosen_indices],
+                lambda threshold, indices: self.emulate_better_training_point_idx(
+                    distances, threshold, indices, shots
+                ),
+            )
+            labels.append(self.majority_vote(chosen_indices))
+        return np.array(labels)
+
     @staticmethod
     def get_necessary_wires(train_data: np.ndarray) -> Tuple[int, int, int]:
         # train wires: we need a qubit for each dimension of a point
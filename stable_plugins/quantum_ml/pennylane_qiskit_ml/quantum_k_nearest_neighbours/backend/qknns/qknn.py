@@ -13,15 +13,32 @@
 # limitations under the License.
 
 import numpy as np
+import pennylane as qml
 from abc import abstractmethod, ABCMeta
 from enum import Enum
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+
+
+# number of circuits that are submitted to the backend at once
+DEFAULT_BATCH_SIZE = 64
 
 
 def count_wires(wires: List[List]) -> int:
     return sum(len(w) for w in wires)
 
 
+def majority_vote(neighbour_labels: np.ndarray) -> np.ndarray:
+    """
+    Returns the most frequent label of each row.
+    :param neighbour_labels: array of size number of points x k containing the labels of the k nearest neighbours
+    """
+    unique_labels, label_indices = np.unique(neighbour_labels, return_inverse=True)
+    label_indices = label_indices.reshape(neighbour_labels.shape)
+    votes = np.zeros((len(neighbour_labels), len(unique_labels)), dtype=int)
+    np.add.at(votes, (np.arange(len(votes))[:, None], label_indices), 1)
+    return unique_labels[votes.argmax(axis=1)]
+
+
 class QkNN(metaclass=ABCMeta):
     def __init__(self, train_data, train_labels, k, backend):
         if not isinstance(train_data, np.ndarray):
@@ -32,10 +49,50 @@ class QkNN(metaclass=ABCMeta):
 
         self.k = min(k, len(self.train_data))
         self.backend = backend
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.analytic = False
+        self.shots = None
+        self.rng = np.random.default_rng()
 
     def set_quantum_backend(self, backend):
         self.backend = backend
 
+    def set_analytic_simulation(self, analytic: bool, shots: Optional[int] = None):
+        """
+        If analytic is True, the measurement probabilities of the circuits are computed with matrix operations for
+        all test points at once, instead of executing one circuit per test point. This is only correct for noiseless
+        simulators.
+        :param analytic: whether to use the analytic simulation
+        :param shots: if given, the shot noise of the circuits is emulated by sampling shots many measurements
+        """
+        self.analytic = analytic
+        self.shots = shots
+
+    def execute_batch(self, circuits: List[Callable[[], None]]) -> List[np.ndarray]:
+        """
+        Executes the circuits in batches of batch_size circuits and returns their samples.
+        :param circuits: list of quantum functions ending with a sample measurement
+        """
+        results = []
+        for start in range(0, len(circuits), self.batch_size):
+            tapes = []
+            for circuit in circuits[start : start + self.batch_size]:
+                with qml.tape.QuantumTape() as tape:
+                    circuit()
+                tapes.append(tape)
+            results.extend(
+                qml.execute(tapes, self.backend, gradient_fn=None, cache=False)
+            )
+        return [np.asarray(result, dtype=int) for result in results]
+
+    def label_points_analytic(self, X: np.ndarray) -> np.ndarray:
+        """
+        Labels all points in X with the analytic simulation, see set_analytic_simulation.
+        """
+        raise NotImplementedError(
+            "The analytic simulation is not implemented for this qknn!"
+        )
+
     def get_representative_circuit(self, X) -> str:
         return ""
 
@@ -46,6 +103,8 @@ class QkNN(metaclass=ABCMeta):
         """
 
     def label_points(self, X) -> List[int]:
+        if self.analytic:
+            return self.label_points_analytic(np.asarray(X)).tolist()
         if self.backend is None:
             raise ValueError("The quantum backend may not be None!")
         new_labels = []
@@ -19,7 +19,7 @@ import pennylane as qml
 from ..data_loading_circuits import QAM
 from .qknn import QkNN
 from ..utils import (
-    bitlist_to_int,
+    bits_to_ints,
     int_to_bitlist,
     check_binary,
     ceil_log2,
@@ -103,19 +103,15 @@ class SchuldQkNN(QkNN):
             label_indices.append(label_to_idx[label])
         return np.array(label_indices)
 
-    def get_label_from_samples(self, samples: List[List[int]]) -> int:
+    def get_label_from_samples(self, samples: np.ndarray) -> int:
         """
         Given a list of samples, this function returns the label with the most occurrences, where an oracle qubit
         is equal to |0>.
         """
-        label_probs = np.zeros(len(self.unique_labels))
-        counts = np.zeros(len(self.unique_labels))
-        for sample in samples:
-            label = bitlist_to_int(sample[1:])
-            if sample[0] == 0 and label < len(label_probs):
-                label_probs[label] += 1
-            if label < len(label_probs):
-                counts[label] += 1
+        samples = np.asarray(samples, dtype=int).reshape(-1, len(self.label_wires) + 1)
+        labels = bits_to_ints(samples[:, 1:])
+        is_label = (samples[:, 0] == 0) & (labels < len(self.unique_labels))
+        label_probs = np.bincount(labels[is_label], minlength=len(self.unique_labels))
         return self.unique_labels[label_probs.argmax()]
 
     def get_quantum_circuit(self, x: np.ndarray) -> Callable[[], None]:
@@ -131,7 +127,6 @@ class SchuldQkNN(QkNN):
         """
         rot_angle = np.pi / self.train_data.shape[1]
 
-        @qml.qnode(self.backend)
         def circuit():
             self.qam.circuit()
             for x_, train_wire in zip(x, self.train_wires):
@@ -148,9 +143,43 @@ class SchuldQkNN(QkNN):
         check_binary(
             x, "All the data needs to be binary, when dealing with the hamming distance"
         )
-        samples = self.get_quantum_circuit(x)()
+        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)()
         return self.get_label_from_samples(samples)
 
+    def label_points(self, X) -> List[int]:
+        """
+        Labels all test points. The circuits of all test points are executed in batches, or the label probabilities
+        are calculated analytically, see set_analytic_simulation.
+        """
+        check_binary(
+            X, "All the data needs to be binary, when dealing with the hamming distance"
+        )
+        X = np.array(X, dtype=int)
+        if self.analytic:
+            return self.label_points_analytic(X).tolist()
+        if self.backend is None:
+            raise ValueError("The quantum backend may not be None!")
+        samples = self.execute_batch([self.get_quantum_circuit(x) for x in X])
+        return [self.get_label_from_samples(s) for s in samples]
+
+    def label_points_analytic(self, X: np.ndarray) -> np.ndarray:
+        num_dims = self.train_data.shape[1]
+        # number of bits that differ from the test point, i.e. the number of rotations of the oracle qubit
+        hamming_distances = X @ (1 - self.train_data).T + (1 - X) @ self.train_data.T
+        # P(oracle = |0>, index = i) = cos^2(hamming_distance * rot_angle / 2) / len(train_data)
+        probs = np.square(np.cos(hamming_distances * np.pi / (2 * num_dims)))
+        probs /= len(self.train_data)
+        # P(oracle = |0>, label = l) is the sum over all training points with label l
+        label_of_point = bits_to_ints(self.label_indices)
+        label_probs = probs @ np.eye(len(self.unique_labels))[label_of_point]
+        if self.shots is not None:
+            # the last category contains all samples with oracle = |1>
+            other_prob = np.clip(1 - label_probs.sum(axis=1, keepdims=True), 0, 1)
+            pvals = np.hstack((label_probs, other_prob))
+            pvals /= pvals.sum(axis=1, keepdims=True)
+            label_probs = self.rng.multinomial(self.shots, pvals)[:, :-1]
+        return np.array(self.unique_labels)[label_probs.argmax(axis=1)]
+
     @staticmethod
     def get_necessary_wires(
         train_data: np.ndarray, train_labels: np.ndarray
@@ -163,7 +192,7 @@ class SchuldQkNN(QkNN):
         )
 
     def get_representative_circuit(self, X: np.ndarray) -> str:
-        circuit = self.get_quantum_circuit(X[0])
+        circuit = qml.QNode(self.get_quantum_circuit(X[0]), self.backend)
         circuit.construct([], {})
         return circuit.qtape.to_openqasm()
 
@@ -16,12 +16,12 @@ import pennylane as qml
 import numpy as np
 from collections import Counter
 from abc import abstractmethod
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 
-from .qknn import QkNN
+from .qknn import QkNN, majority_vote
 from ..data_loading_circuits import QAM
 from ..data_loading_circuits import TreeLoader
-from ..utils import int_to_bitlist, bitlist_to_int, check_binary, ceil_log2
+from ..utils import int_to_bitlist, bits_to_ints, check_binary, ceil_log2
 from ..check_wires import check_wires_uniqueness, check_num_wires
 
 
@@ -36,12 +36,78 @@ class SimpleQkNN(QkNN):
         super(SimpleQkNN, self).__init__(train_data, train_labels, k, backend)
 
     @abstractmethod
+    def get_quantum_circuit(self, x: np.ndarray) -> Callable[[], None]:
+        """
+        Returns the quantum circuit computing the distances of each training point to x.
+        """
+
+    @abstractmethod
+    def distances_from_samples(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Calculates and returns the distances for each training point from the samples of the quantum circuit.
+        :param samples: array of size shots x measured wires
+        """
+
+    @abstractmethod
+    def calculate_distance_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Calculates the distances of all test points to all training points analytically, i.e. from the measurement
+        probabilities of the quantum circuits. Shot noise is emulated, if self.shots is set.
+        :param X: the (prepared) test points
+        :return: array of size len(X) x len(train_data)
+        """
+
+    def prep_test_data(self, X: np.ndarray) -> np.ndarray:
+        """
+        Prepares the test points before the distances are calculated.
+        """
+        return X
+
     def calculate_distances(self, x: np.ndarray) -> List[float]:
         """
         Calculates and returns the distances for each point to x.
         :param x:
         :return:
         """
+        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)()
+        return self.distances_from_samples(np.asarray(samples, dtype=int))
+
+    def estimate_probabilities(self, probs: np.ndarray, num_idx: int) -> np.ndarray:
+        """
+        Returns the probabilities of the measured qubit being in a certain state, given the index of a training point.
+        If self.shots is set, the probabilities are estimated from emulated samples, like they would be from the
+        samples of the quantum circuits. The index register is measured uniformly over num_idx indices, where index i
+        belongs to the training point i % len(train_data).
+        :param probs: array of size number of test points x len(train_data)
+        :param num_idx: the number of indices loaded in the index register
+        :return: the (estimated) probabilities, nan if the index of a training point was never measured
+        """
+        if self.shots is None:
+            return probs
+        num_points = probs.shape[1]
+        idx_to_point = np.arange(num_idx) % num_points
+        idx_counts = self.rng.multinomial(
+            self.shots, np.full(num_idx, 1 / num_idx), size=len(probs)
+        )
+        state_counts = self.rng.binomial(idx_counts, probs[:, idx_to_point])
+        # sum up the counts of looped training points (num_idx < 2 * num_points)
+        for counts in (idx_counts, state_counts):
+            counts[:, : num_idx - num_points] += counts[:, num_points:]
+        idx_counts, state_counts = (
+            idx_counts[:, :num_points],
+            state_counts[:, :num_points],
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(idx_counts == 0, np.nan, state_counts / idx_counts)
+
+    def labels_from_distances(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Assigns each test point the most occurring label within the set of the k closest training points.
+        :param distances: array of size number of test points x len(train_data)
+        """
+        # Get k smallest values
+        indices = np.argpartition(distances, self.k, axis=1)[:, : self.k]
+        return majority_vote(self.train_labels[indices])
 
     def label_point(self, x: np.ndarray) -> int:
         """
@@ -61,6 +127,23 @@ class SimpleQkNN(QkNN):
             new_label = max(counts, key=counts.get)  # Get most frequent label
         return new_label
 
+    def label_points(self, X) -> List[int]:
+        """
+        Labels all test points. The circuits of all test points are executed in batches, or their distances are
+        calculated analytically, see set_analytic_simulation.
+        """
+        if not self.analytic and self.backend is None:
+            raise ValueError("The quantum backend may not be None!")
+        X = self.prep_test_data(np.asarray(X))
+        if self.k == len(self.train_data):
+            return [np.bincount(self.train_labels).argmax()] * len(X)
+        if self.analytic:
+            distances = self.calculate_distance_matrix(X)
+        else:
+            samples = self.execute_batch([self.get_quantum_circuit(x) for x in X])
+            distances = np.array([self.distances_from_samples(s) for s in samples])
+        return self.labels_from_distances(distances).tolist()
+
 
 class SimpleHammingQkNN(SimpleQkNN):
     def __init__(
@@ -144,26 +227,38 @@ class SimpleHammingQkNN(SimpleQkNN):
 
         return quantum_circuit
 
-    def calculate_distances(self, x: np.ndarray) -> List[float]:
-        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)().tolist()
-        num_zero_ancilla = [0] * len(self.train_data)
-        total_ancilla = [0] * len(self.train_data)
+    def distances_from_samples(self, samples: np.ndarray) -> np.ndarray:
+        samples = samples.reshape(-1, len(self.idx_wires) + 1)
+        idx = bits_to_ints(samples[:, :-1])
+        is_train_idx = idx < len(self.train_data)
+        idx, ancilla = idx[is_train_idx], samples[is_train_idx, -1]
         # Count how often a certain point was measured (total_ancilla)
         # and how often the ancilla qubit was zero (num_zero_ancilla)
-        for sample in samples:
-            idx = bitlist_to_int(sample[:-1])
-            if idx < len(self.train_data):
-                total_ancilla[idx] += 1
-                if sample[-1] == 0:
-                    num_zero_ancilla[idx] += 1
+        total_ancilla = np.bincount(idx, minlength=len(self.train_data))
+        num_zero_ancilla = np.bincount(
+            idx, weights=(ancilla == 0), minlength=len(self.train_data)
+        )
         # Get prob for ancilla qubit to be equal to 0
-        for i, (total_anc_, num_zero_anc) in enumerate(
-            zip(total_ancilla, num_zero_ancilla)
-        ):
-            # 0 <= num_zero_ancilla[i] / total_ancilla[i] <= 1. Hence if total_ancilla[i] == 0, we have no information
-            # about the distance, but due to the rot_angle it can't be greater than 1, therefore we set it to 1
-            num_zero_ancilla[i] = 1 if total_anc_ == 0 else num_zero_anc / total_anc_
-        return num_zero_ancilla
+        # 0 <= num_zero_ancilla[i] / total_ancilla[i] <= 1. Hence if total_ancilla[i] == 0, we have no information
+        # about the distance, but due to the rot_angle it can't be greater than 1, therefore we set it to 1
+        return np.where(
+            total_ancilla == 0, 1, num_zero_ancilla / np.maximum(total_ancilla, 1)
+        )
+
+    def prep_test_data(self, X: np.ndarray) -> np.ndarray:
+        check_binary(
+            X, "All the data needs to be binary, when dealing with the hamming distance"
+        )
+        return np.array(X, dtype=int)
+
+    def calculate_distance_matrix(self, X: np.ndarray) -> np.ndarray:
+        num_dims = self.train_data.shape[1]
+        # number of bits that are equal to the test point, i.e. the number of rotations of the ancilla qubit
+        num_equal_bits = X @ self.train_data.T + (1 - X) @ (1 - self.train_data).T
+        # P(ancilla = |0>) = cos^2(num_equal_bits * rot_angle / 2) with rot_angle = pi / num_dims
+        probs = np.square(np.cos(num_equal_bits * np.pi / (2 * num_dims)))
+        probs = self.estimate_probabilities(probs, len(self.train_data))
+        return np.where(np.isnan(probs), 1, probs)
 
     @staticmethod
     def get_necessary_wires(train_data: np.ndarray) -> Tuple[int, int, int]:
@@ -311,40 +406,32 @@ class SimpleFidelityQkNN(SimpleQkNN):
 
         return quantum_circuit
 
-    def calculate_distances(self, x) -> np.ndarray:
-        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)().tolist()
-        num_zero_swap = [0] * len(self.train_data)
-        idx_count = [0] * len(self.train_data)
+    def distances_from_samples(self, samples: np.ndarray) -> np.ndarray:
+        samples = samples.reshape(-1, len(self.idx_wires) + 1)
+        # Modulo, since we looped the data, until the number of points is a power of 2
+        idx = bits_to_ints(samples[:, :-1]) % self.train_data.shape[0]
         # Count how often a certain index was measured (idx_count)
-        # and how often the swap qubit was zero (num_zero_ancilla)
-        for sample in samples:
-            # Modulo, since we looped the data, until the number of points is a power of 2
-            idx = bitlist_to_int(sample[:-1]) % self.train_data.shape[0]
-            idx_count[idx] += 1
-            if sample[-1] == 0:
-                num_zero_swap[idx] += 1
-
-        distances = np.ones((self.train_data.shape[0],))
-        for i, (idx_c_, num_zero_s_) in enumerate(zip(idx_count, num_zero_swap)):
-            if idx_c_ != 0:
-                zero_prob = num_zero_s_ / idx_c_
-                # fidelitiy = zero_prob - one_prob = zero_prob - (1 - zero_prob) = 2*zero_prob - 1
-                fidelity = 2 * zero_prob - 1
-                # Barres distance is sqrt(2 - 2*sqrt(fidelity)). Therefore it suffices to maximise the fidelity
-                # maximising fidelity is equivalent to minimising -1*fidelity
-                distances[i] = -1 * fidelity
-
-        return distances
+        # and how often the swap qubit was zero (num_zero_swap)
+        idx_count = np.bincount(idx, minlength=self.train_data.shape[0])
+        num_zero_swap = np.bincount(
+            idx, weights=(samples[:, -1] == 0), minlength=self.train_data.shape[0]
+        )
+        zero_prob = num_zero_swap / np.maximum(idx_count, 1)
+        # fidelitiy = zero_prob - one_prob = zero_prob - (1 - zero_prob) = 2*zero_prob - 1
+        # Barres distance is sqrt(2 - 2*sqrt(fidelity)). Therefore it suffices to maximise the fidelity
+        # maximising fidelity is equivalent to minimising -1*fidelity
+        return np.where(idx_count == 0, 1, -1 * (2 * zero_prob - 1))
+
+    def calculate_distance_matrix(self, X: np.ndarray) -> np.ndarray:
+        # The swap test results in zero_prob = (1 + |<x|y>|^2)/2
+        train_points = self.prepped_points[: self.train_data.shape[0]]
+        zero_probs = (1 + np.square(X @ train_points.T)) / 2
+        zero_probs = self.estimate_probabilities(zero_probs, len(self.prepped_points))
+        return np.where(np.isnan(zero_probs), 1, -1 * (2 * zero_probs - 1))
 
     # Override so that we can use 'prep_data'
-    def label_points(self, X) -> List[int]:
-        if self.backend is None:
-            raise ValueError("The quantum backend may not be None!")
-        new_labels = []
-        X = self.prep_data(X)
-        for x in X:
-            new_labels.append(self.label_point(x))
-        return new_labels
+    def prep_test_data(self, X: np.ndarray) -> np.ndarray:
+        return self.prep_data(X)
 
     @staticmethod
     def get_necessary_wires(train_data):
@@ -505,42 +592,33 @@ class SimpleAngleQkNN(SimpleQkNN):
 
         return quantum_circuit
 
-    def calculate_distances(self, x) -> np.ndarray:
-        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)().tolist()
-        num_one_swap = [0] * len(self.train_data)
-        idx_count = [0] * len(self.train_data)
+    def distances_from_samples(self, samples: np.ndarray) -> np.ndarray:
+        samples = samples.reshape(-1, len(self.idx_wires) + 1)
+        # Modulo, since we looped the data, until the number of points is a power of 2
+        idx = bits_to_ints(samples[:, :-1]) % self.train_data.shape[0]
         # Count how often a certain index was measured (idx_count)
-        # and how often the swap qubit was zero (num_zero_ancilla)
-        for sample in samples:
-            # Modulo, since we looped the data, until the number of points is a power of 2
-            idx = bitlist_to_int(sample[:-1]) % self.train_data.shape[0]
-            idx_count[idx] += 1
-            if sample[-1] == 1:
-                num_one_swap[idx] += 1
-
-        distances = np.ones((self.train_data.shape[0],))
-        for i, (idx_c_, num_one_s_) in enumerate(zip(idx_count, num_one_swap)):
-            if idx_c_ != 0:
-                # The swap test variant used, results in zero_prob = (1 + <Psi|Phi>)/2 and one_prob = (1 - <Psi|Phi>)/2,
-                # where |Psi> and |Phi> are the quantum states that get compared
-                one_prob = num_one_s_ / idx_c_
-                # angle = arccos(<Psi | Phi>) and we want to minimize the angle
-                # We want to minimize the angle between the different states. Thus, if we maximize <Psi|Phi>,
-                # we also minimize the angle. Further, maximizing zero_prob = (1 + <Psi|Phi)/2 is equivalent.
-                # Maximizing zero_prob is the same as minimizing one_prob
-                distances[i] = one_prob
-
-        return distances
+        # and how often the swap qubit was one (num_one_swap)
+        idx_count = np.bincount(idx, minlength=self.train_data.shape[0])
+        num_one_swap = np.bincount(
+            idx, weights=(samples[:, -1] == 1), minlength=self.train_data.shape[0]
+        )
+        # The swap test variant used, results in zero_prob = (1 + <Psi|Phi>)/2 and one_prob = (1 - <Psi|Phi>)/2,
+        # where |Psi> and |Phi> are the quantum states that get compared
+        # angle = arccos(<Psi | Phi>) and we want to minimize the angle
+        # We want to minimize the angle between the different states. Thus, if we maximize <Psi|Phi>,
+        # we also minimize the angle. Further, maximizing zero_prob = (1 + <Psi|Phi)/2 is equivalent.
+        # Maximizing zero_prob is the same as minimizing one_prob
+        return np.where(idx_count == 0, 1, num_one_swap / np.maximum(idx_count, 1))
+
+    def calculate_distance_matrix(self, X: np.ndarray) -> np.ndarray:
+        train_points = self.prepped_points[: self.train_data.shape[0]]
+        one_probs = (1 - X @ train_points.T) / 2
+        one_probs = self.estimate_probabilities(one_probs, len(self.prepped_points))
+        return np.where(np.isnan(one_probs), 1, one_probs)
 
     # Override so that we can use 'prep_data'
-    def label_points(self, X) -> List[int]:
-        if self.backend is None:
-            raise ValueError("The quantum backend may not be None!")
-        new_labels = []
-        X = self.prep_data(X)
-        for x in X:
-            new_labels.append(self.label_point(x))
-        return new_labels
+    def prep_test_data(self, X: np.ndarray) -> np.ndarray:
+        return self.prep_data(X)
 
     @staticmethod
     def get_necessary_wires(train_data):
@@ -175,6 +175,8 @@ class MicroFrontend(MethodView):
             fields["slack"].data_key: 0.05,
             fields["backend"].data_key: QuantumBackends.pennylane_default.value,
             fields["shots"].data_key: 1024,
+            fields["analytic_simulation"].data_key: False,
+            fields["emulate_shot_noise"].data_key: True,
             fields["resolution"].data_key: 20,
         }
 
@@ -49,6 +49,8 @@ class InputParameters:
     custom_backend: str
     resolution: int
     minimize_qubit_count: bool = False
+    analytic_simulation: bool = False
+    emulate_shot_noise: bool = False
     visualize: bool = False
 
     def __str__(self):
@@ -184,6 +186,30 @@ class InputParametersSchema(FrontendFormBaseSchema):
         },
         validate=validate.Range(min=0, min_inclusive=False),
     )
+    analytic_simulation = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Analytic simulation",
+            "description": "If checked, the measurement probabilities of the quantum kNN circuits are computed "
+            "with matrix operations for all test points at once, instead of simulating one circuit per test point. "
+            "Only used with the local simulators (pennylane default and aer). "
+            "For the basheer hamming qknn, the measurements of the amplitude amplification are sampled from their "
+            "exact probabilities instead.",
+            "input_type": "checkbox",
+        },
+    )
+    emulate_shot_noise = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Emulate shot noise",
+            "description": "If checked, the analytic simulation samples the given number of shots from the "
+            "measurement probabilities, like the simulated circuits would. Otherwise, the exact probabilities are used. "
+            "The basheer hamming qknn always samples its measurements with the given number of shots.",
+            "input_type": "checkbox",
+        },
+    )
     ibmq_token = ma.fields.String(
         required=False,
         allow_none=False,
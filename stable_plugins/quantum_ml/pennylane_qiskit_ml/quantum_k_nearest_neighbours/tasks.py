@@ -31,6 +31,7 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.visualization import get_model_hash
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
@@ -209,9 +210,14 @@ def calculation_task(self, db_id: int) -> str:
         use_access_wires=(not minimize_qubit_count),
     )
 
+    # noiseless local simulators can compute the measurement probabilities analytically
+    if input_params.analytic_simulation and backend.is_simulator():
+        qknn.set_analytic_simulation(
+            True, shots if input_params.emulate_shot_noise else None
+        )
+
     # Set backend
-    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, num_qbits)
-    backend.shots = shots
+    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, num_qbits, shots)
     qknn.set_quantum_backend(backend)
 
     # Label test data
@@ -261,6 +267,20 @@ def calculation_task(self, db_id: int) -> str:
             predictor=qknn.label_points,
             title=plot_title,
             label_to_int=label_to_int,
+            model_hash=get_model_hash(
+                variant.name,
+                k,
+                exp_itr,
+                slack,
+                minimize_qubit_count,
+                input_params.backend.name,
+                custom_backend,
+                shots,
+                input_params.analytic_simulation,
+                input_params.emulate_shot_noise,
+                train_data,
+                train_labels,
+            ),
         )
 
     neighbourhood_size = "all" if variant == QkNNEnum.schuld_qknn else str(k)
@@ -24,8 +24,8 @@ import numpy as np
 
 
 class HavlicekKernel(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern_enum):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern_enum)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern_enum, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern_enum, exact=exact)
 
     def feature_map(self, x) -> float:
         result = 1
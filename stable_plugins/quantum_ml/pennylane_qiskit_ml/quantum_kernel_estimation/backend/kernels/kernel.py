@@ -14,14 +14,22 @@
 
 from abc import abstractmethod, ABCMeta
 from typing import List, Tuple
+import pennylane as qml
 from pennylane import Device
+from pennylane.tape import QuantumTape
 import numpy as np
+from scipy.linalg.blas import zherk
 import enum
 from celery.utils.log import get_task_logger
 
 
 TASK_LOGGER = get_task_logger(__name__)
 
+# number of packed circuits that are submitted to the backend at once
+DEFAULT_BATCH_SIZE = 64
+# number of statevectors of data_y that are kept in memory at once in the exact mode
+EXACT_CHUNK_SIZE = 64
+
 
 class EntanglementPatternEnum(enum.Enum):
     """
@@ -69,36 +77,49 @@ class KernelEnum(enum.Enum):
         n_qbits: int,
         reps: int,
         entanglement_pattern_enum: EntanglementPatternEnum,
+        exact: bool = False,
     ):
         if self == KernelEnum.havlicek_kernel:
             from .havlicek_kernel import HavlicekKernel
 
-            return HavlicekKernel(backend, n_qbits, reps, entanglement_pattern_enum)
+            return HavlicekKernel(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         elif self == KernelEnum.suzuki_kernel8:
             from .suzuki_kernels import SuzukiKernelEq8
 
-            return SuzukiKernelEq8(backend, n_qbits, reps, entanglement_pattern_enum)
+            return SuzukiKernelEq8(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         elif self == KernelEnum.suzuki_kernel9:
             from .suzuki_kernels import SuzukiKernelEq9
 
-            return SuzukiKernelEq9(backend, n_qbits, reps, entanglement_pattern_enum)
+            return SuzukiKernelEq9(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         elif self == KernelEnum.suzuki_kernel10:
             from .suzuki_kernels import SuzukiKernelEq10
 
-            return SuzukiKernelEq10(backend, n_qbits, reps, entanglement_pattern_enum)
+            return SuzukiKernelEq10(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         elif self == KernelEnum.suzuki_kernel11:
             from .suzuki_kernels import SuzukiKernelEq11
 
-            return SuzukiKernelEq11(backend, n_qbits, reps, entanglement_pattern_enum)
+            return SuzukiKernelEq11(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         elif self == KernelEnum.suzuki_kernel12:
             from .suzuki_kernels import SuzukiKernelEq12
 
-            return SuzukiKernelEq12(backend, n_qbits, reps, entanglement_pattern_enum)
+            return SuzukiKernelEq12(
+                backend, n_qbits, reps, entanglement_pattern_enum, exact=exact
+            )
 
         else:
             raise ValueError("Unkown kernel!")
@@ -111,18 +132,26 @@ class Kernel(metaclass=ABCMeta):
         n_qbits: int,
         reps: int,
         entanglement_pattern_enum: EntanglementPatternEnum,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        exact: bool = False,
     ):
         self.backend = backend
         self.n_qbits = n_qbits
         self.max_qbits = backend.num_wires
         self.reps = reps
         self.entanglement_pattern_enum = entanglement_pattern_enum
+        self.batch_size = batch_size
+        self.exact = exact
 
     @abstractmethod
-    def execute_circuit(
-        self, data_x, Y, to_calculate, entanglement_pattern
-    ) -> Tuple[List[float], str]:
-        raise NotImplementedError("Method evaluate is not implemented yet!")
+    def build_circuit(
+        self, data_x, data_y, to_calculate, entanglement_pattern
+    ) -> QuantumTape:
+        """
+        Builds one circuit evaluating all entries in to_calculate. An entry in to_calculate contains the information of which data point
+        in data_x should be evaluated with which data point in data_y and which qubits should be used for the resulting quantum circuit.
+        The circuit must return the probabilities of the used wires of each entry in the order of to_calculate.
+        """
 
     @abstractmethod
     def get_qbits_needed(self, data_x, data_y) -> int:
@@ -130,66 +159,161 @@ class Kernel(metaclass=ABCMeta):
         Returns the number of qbits needed, to compute one quantum circuit
         """
 
+    def get_statevectors(self, data, entanglement_pattern) -> np.ndarray:
+        """
+        Returns the statevectors of the feature map for all data points. Only needed for the exact mode.
+        :param data: A list of data points
+        :param entanglement_pattern: Entanglement pattern that should be used.
+        :return: array of size len(data) x 2**qbits_needed
+        """
+        raise NotImplementedError("Exact evaluation is not implemented for this kernel!")
+
+    def execute_circuit(
+        self, data_x, data_y, to_calculate, entanglement_pattern
+    ) -> Tuple[List[float], str]:
+        """
+        Executes the circuit for the entries in to_calculate.
+        :return: the kernel values of the entries and the circuit in openqasm format
+        """
+        circuit = self.build_circuit(data_x, data_y, to_calculate, entanglement_pattern)
+        results = self.execute_batch([circuit], [len(to_calculate)])
+        return list(results), circuit.to_openqasm()
+
+    def execute_batch(
+        self, circuits: List[QuantumTape], n_entries: List[int]
+    ) -> np.ndarray:
+        """
+        Executes a batch of circuits in one job and returns the probabilities of measuring only zeros for all entries.
+        :param circuits: list of circuits as returned by build_circuit
+        :param n_entries: number of entries packed in each circuit
+        :return: the kernel values of all entries of all circuits in order
+        """
+        # every circuit is unique, so caching the results would only add hashing overhead
+        results = qml.execute(circuits, self.backend, gradient_fn=None, cache=False)
+        return np.concatenate(
+            [
+                np.reshape(np.asarray(result, dtype=float), (n, -1))[:, 0]
+                for result, n in zip(results, n_entries)
+            ]
+        )
+
     def evaluate(self, data_x, data_y) -> Tuple[np.ndarray, str]:
         """
         This function computes the kernel matrix between input data_x and data_y.
-        If possible, it evaluates multiple entries at once, e.g. if we have 5 qubits available and need 2 qubits to
+        In the exact mode, the kernel is computed from the statevectors of the feature map, see evaluate_exact.
+        Otherwise, it evaluates multiple entries at once if possible, e.g. if we have 5 qubits available and need 2 qubits to
         evaluate on entry, then the circuits of two entries will run in parallel.
+        The circuits are executed in batches of batch_size circuits. If data_x and data_y are equal, only the entries
+        above the diagonal are computed.
         :param data_x: A list of data points
         :param data_y: A list of data points
         :return: kernel-matrix of size len(data_y) x len(data_x)
         """
+        if self.exact:
+            return self.evaluate_exact(data_x, data_y)
+
         # Need a representative circuit in openqasm format
         representative_circuit = ""
 
         needed_qbits = self.get_qbits_needed(data_x, data_y)
+        if needed_qbits > self.max_qbits:
+            raise ValueError(
+                "The number of needed qubits exceeds the number given qubits."
+            )
         entanglement_pattern = self.entanglement_pattern_enum.get_pattern(needed_qbits)
-        amount_of_circuits = 0
 
         is_symmetric = np.array_equal(data_x, data_y)
 
         kernel_matrix = np.zeros((len(data_y), len(data_x)))
-        start = 0
-        to_calculate = []
-        next_qbit = 0
-        if needed_qbits > self.max_qbits:
-            raise ValueError(
-                "The number of needed qubits exceeds the number given qubits."
-            )
-        for idx_x in range(len(data_x)):
-            if is_symmetric:
-                start = idx_x + 1
-                kernel_matrix[idx_x, idx_x] = 1
-            for idx_y in range(start, len(data_y)):
-                if next_qbit + needed_qbits > self.max_qbits:
-                    result, representative_circuit = self.execute_circuit(
-                        data_x, data_y, to_calculate, entanglement_pattern
+        if is_symmetric:
+            np.fill_diagonal(kernel_matrix, 1)
+            idx_x, idx_y = np.triu_indices(len(data_x), k=1)
+        else:
+            idx_y, idx_x = np.indices(kernel_matrix.shape).reshape(2, -1)
+
+        entries_per_circuit = self.max_qbits // needed_qbits
+        wires = np.arange(entries_per_circuit * needed_qbits).reshape(
+            entries_per_circuit, needed_qbits
+        )
+        circuit_starts = range(0, len(idx_x), entries_per_circuit)
+        batch_starts = range(0, len(circuit_starts), max(1, self.batch_size))
+
+        results = []
+        for batch_start in batch_starts:
+            circuits = []
+            n_entries = []
+            for start in circuit_starts[batch_start : batch_start + batch_starts.step]:
+                to_calculate = [
+                    [x, y, wires_to_use.tolist()]
+                    for x, y, wires_to_use in zip(
+                        idx_x[start : start + entries_per_circuit],
+                        idx_y[start : start + entries_per_circuit],
+                        wires,
                     )
-                    amount_of_circuits += 1
-                    for i in range(len(result)):
-                        result_idx_x = to_calculate[i][0]
-                        result_idx_y = to_calculate[i][1]
-                        kernel_matrix[result_idx_y, result_idx_x] = result[i]
-                    next_qbit = 0
-                    to_calculate = []
-
-                wires_to_use = [i + next_qbit for i in range(needed_qbits)]
-                to_calculate.append([idx_x, idx_y, wires_to_use])
-                next_qbit += needed_qbits
-
-        if next_qbit != 0:
-            result, representative_circuit = self.execute_circuit(
-                data_x, data_y, to_calculate, entanglement_pattern
-            )
-            amount_of_circuits += 1
-            for i in range(len(result)):
-                result_idx_x = to_calculate[i][0]
-                result_idx_y = to_calculate[i][1]
-                kernel_matrix[result_idx_y, result_idx_x] = result[i]
+                ]
+                circuits.append(
+                    self.build_circuit(data_x, data_y, to_calculate, entanglement_pattern)
+                )
+                n_entries.append(len(to_calculate))
+            results.append(self.execute_batch(circuits, n_entries))
+            representative_circuit = circuits[-1].to_openqasm()
+
+        if results:
+            results = np.concatenate(results)
+            kernel_matrix[idx_y, idx_x] = results
+            if is_symmetric:
+                kernel_matrix[idx_x, idx_y] = results
 
-        if is_symmetric:
-            for idx_x in range(len(data_x)):
-                for idx_y in range(idx_x):
-                    kernel_matrix[idx_y, idx_x] = kernel_matrix[idx_x, idx_y]
-        TASK_LOGGER.info(f"It took {amount_of_circuits} quantum circuits")
+        TASK_LOGGER.info(
+            f"It took {len(circuit_starts)} quantum circuits in {len(batch_starts)} batches"
+        )
         return kernel_matrix, representative_circuit
+
+    def evaluate_exact(self, data_x, data_y) -> Tuple[np.ndarray, str]:
+        """
+        This function computes the exact kernel matrix between input data_x and data_y without sampling.
+        The statevector of the feature map is computed once per data point and the kernel entries are
+        the squared absolute values of the overlaps |<phi(y)|phi(x)>|^2. This is only correct for noiseless simulators.
+        :param data_x: A list of data points
+        :param data_y: A list of data points
+        :return: kernel-matrix of size len(data_y) x len(data_x)
+        """
+        needed_qbits = self.get_qbits_needed(data_x, data_y)
+        entanglement_pattern = self.entanglement_pattern_enum.get_pattern(needed_qbits)
+
+        is_symmetric = np.array_equal(data_x, data_y)
+
+        states_x = self.get_statevectors(data_x, entanglement_pattern)
+        if is_symmetric:
+            # zherk only computes the upper triangle of conj(states_x) @ states_x.T
+            overlaps = zherk(1.0, states_x.conj())
+            kernel_matrix = np.square(np.abs(overlaps))
+            kernel_matrix = np.triu(kernel_matrix) + np.triu(kernel_matrix, 1).T
+        else:
+            kernel_matrix = np.empty((len(data_y), len(data_x)))
+            # compute the states of data_y in chunks to limit the memory usage
+            for start in range(0, len(data_y), EXACT_CHUNK_SIZE):
+                states_y = self.get_statevectors(
+                    data_y[start : start + EXACT_CHUNK_SIZE], entanglement_pattern
+                )
+                overlaps = states_y.conj() @ states_x.T
+                kernel_matrix[start : start + EXACT_CHUNK_SIZE] = np.square(
+                    np.abs(overlaps)
+                )
+
+        TASK_LOGGER.info(
+            f"Computed {len(data_x) + (0 if is_symmetric else len(data_y))} statevectors"
+        )
+        return kernel_matrix, self.get_representative_circuit(data_x, data_y)
+
+    def get_representative_circuit(self, data_x, data_y) -> str:
+        """
+        Returns the circuit evaluating the first entry of the kernel matrix in openqasm format.
+        :param data_x: A list of data points
+        :param data_y: A list of data points
+        """
+        needed_qbits = self.get_qbits_needed(data_x, data_y)
+        entanglement_pattern = self.entanglement_pattern_enum.get_pattern(needed_qbits)
+        return self.build_circuit(
+            data_x, data_y, [[0, 0, list(range(needed_qbits))]], entanglement_pattern
+        ).to_openqasm()
@@ -26,8 +26,8 @@ import numpy as np
 
 
 class SuzukiKernelEq8(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern, exact=exact)
 
     def feature_map(self, x) -> float:
         result = np.pi
@@ -39,8 +39,8 @@ class SuzukiKernelEq8(ZZKernel):
 
 
 class SuzukiKernelEq9(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern, exact=exact)
 
     def feature_map(self, x) -> float:
         result = np.pi / 2.0
@@ -52,8 +52,8 @@ class SuzukiKernelEq9(ZZKernel):
 
 
 class SuzukiKernelEq10(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern, exact=exact)
 
     def feature_map(self, x) -> float:
         if len(x) == 1:
@@ -68,8 +68,8 @@ class SuzukiKernelEq10(ZZKernel):
 
 
 class SuzukiKernelEq11(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern, exact=exact)
 
     def feature_map(self, x) -> float:
         if len(x) == 1:
@@ -79,8 +79,8 @@ class SuzukiKernelEq11(ZZKernel):
 
 
 class SuzukiKernelEq12(ZZKernel):
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern, exact=exact)
 
     def feature_map(self, x) -> float:
         if len(x) == 1:
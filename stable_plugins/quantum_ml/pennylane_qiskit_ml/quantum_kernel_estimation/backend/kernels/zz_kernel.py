@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from typing import List
+import numpy as np
 import pennylane as qml
 from .kernel import Kernel
 from celery.utils.log import get_task_logger
@@ -29,8 +30,8 @@ class ZZKernel(Kernel, metaclass=ABCMeta):
     Havlíček, V., Córcoles, A.D., Temme, K. et al. Supervised learning with quantum-enhanced feature spaces. Nature 567, 209–212 (2019). https://doi.org/10.1038/s41586-019-0980-2
     """
 
-    def __init__(self, backend, n_qbits, reps, entanglement_pattern_enum):
-        super().__init__(backend, n_qbits, reps, entanglement_pattern_enum)
+    def __init__(self, backend, n_qbits, reps, entanglement_pattern_enum, exact=False):
+        super().__init__(backend, n_qbits, reps, entanglement_pattern_enum, exact=exact)
 
     def get_qbits_needed(self, data_x, data_y) -> int:
         return len(data_x[0])
@@ -39,14 +40,57 @@ class ZZKernel(Kernel, metaclass=ABCMeta):
     def feature_map(self, x) -> float:
         raise NotImplementedError("Method evaluate is not implemented yet!")
 
-    def execute_circuit(self, data_x, data_y, to_calculate, entanglement_pattern):
+    def get_statevectors(self, data, entanglement_pattern) -> np.ndarray:
         """
-        Executes circuits foreach entry in to_calculate. An entry in to_calculate contains the information of which data point
+        Computes the statevectors of the feature map for all data points with numpy.
+        Every layer of the feature map is a Hadamard layer followed by the diagonal gate
+        exp(-i * sum_S feature_map(x_S) * Z_S), where Z_S is the product of the Pauli-Z operators of the wires in S.
+        :param data: list of data points
+        :param entanglement_pattern: Entanglement pattern that should be used.
+        :return: array of size len(data) x 2**len(data[0])
+        """
+        n_qbits = len(data[0])
+        # eigenvalues of Z for all wires of all basis states, wire 0 is the most significant bit
+        bits = (np.arange(2**n_qbits)[:, None] >> np.arange(n_qbits - 1, -1, -1)) & 1
+        z_values = 1 - 2 * bits
+        pattern_z_values = np.stack(
+            [
+                np.prod(z_values[:, involved_wires_idx], axis=1)
+                for involved_wires_idx in entanglement_pattern
+            ]
+        )
+        angles = np.array(
+            [
+                [
+                    self.feature_map([x[i] for i in involved_wires_idx])
+                    for involved_wires_idx in entanglement_pattern
+                ]
+                for x in data
+            ]
+        )
+        phases = np.exp(-1j * (angles @ pattern_z_values))
+
+        # the first Hadamard layer creates the uniform superposition
+        states = phases / np.sqrt(2**n_qbits)
+        for _ in range(self.reps - 1):
+            # apply the Hadamard layer in place, one wire at a time
+            for wire in range(n_qbits):
+                split_states = states.reshape(len(data), 2**wire, 2, -1)
+                difference = split_states[:, :, 0] - split_states[:, :, 1]
+                split_states[:, :, 0] += split_states[:, :, 1]
+                split_states[:, :, 1] = difference
+            states *= phases / np.sqrt(2**n_qbits)
+        return states
+
+    def build_circuit(self, data_x, data_y, to_calculate, entanglement_pattern):
+        """
+        Builds the circuit for all entries in to_calculate. An entry in to_calculate contains the information of which data point
         in data_x should be evaluated with which data point in data_y and which qubits should be used for the resulting quantum circuit.
         :param data_x: list of data points
         :param data_y: list of data points
         :param to_calculate: list. Each entry contains an index for data_x, an index for data_y and a set of qubits.
         :param entanglement_pattern: Entanglement pattern that should be used.
+        :return: the circuit measuring the probabilities of the wires of each entry
         """
 
         def CNOT_chain(wires: List[int]):
@@ -89,11 +133,7 @@ class ZZKernel(Kernel, metaclass=ABCMeta):
             for wire in wires:
                 qml.Hadamard(wires=[wire])
 
-        @qml.qnode(self.backend)
-        def circuit():
-            """
-            Creates the circuit for evaluation
-            """
+        with qml.tape.QuantumTape() as circuit:
             wires_to_measure = []
             for entry in to_calculate:
                 x = data_x[entry[0]]
@@ -106,11 +146,7 @@ class ZZKernel(Kernel, metaclass=ABCMeta):
                     adj_ansatz(y, wires_to_use)
                     full_Hadamard_layer(wires_to_use)
                 wires_to_measure.append(wires_to_use)
-            return [
-                qml.probs(wires=wires_to_measure[i]) for i in range(len(wires_to_measure))
-            ]
-
-        results = circuit()
+            for wires in wires_to_measure:
+                qml.probs(wires=wires)
 
-        # Probs for measured wires to be |0> and open qasm
-        return [result[0] for result in results], circuit.tape.to_openqasm()
+        return circuit
@@ -15,8 +15,14 @@
 import enum
 
 import pennylane as qml
+from typing import Optional
 from celery.utils.log import get_task_logger
-from qiskit import IBMQ
+
+from qhana_plugin_runner.plugin_utils.quantum_backends import (
+    get_ibmq_max_num_qubits,
+    get_ibmq_provider,
+    get_pennylane_device,
+)
 
 
 TASK_LOGGER = get_task_logger(__name__)
@@ -39,45 +45,51 @@ class QuantumBackends(enum.Enum):
         self,
         ibmq_token: str,
         custom_backend_name: str,
-    ):
+    ) -> Optional[int]:
         if self.name.startswith("aer"):
             return None
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(self.name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(custom_backend_name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, custom_backend_name)
 
     def get_pennylane_backend(
         self,
         ibmq_token: str,
         custom_backend_name: str,
         qubit_cnt: int,
+        shots: Optional[int] = None,
     ) -> qml.Device:
+        options = {} if shots is None else {"shots": shots}
         if self.name.startswith("aer"):
             # Use local AER backend
             aer_backend_name = self.name[4:]
 
-            return qml.device("qiskit.aer", wires=qubit_cnt, backend=aer_backend_name)
+            return get_pennylane_device(
+                "qiskit.aer", wires=qubit_cnt, backend=aer_backend_name, **options
+            )
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
-                "qiskit.ibmq", wires=qubit_cnt, backend=self.name, provider=provider
+            return get_pennylane_device(
+                "qiskit.ibmq",
+                wires=qubit_cnt,
+                backend=self.name,
+                provider=provider,
+                **options,
             )
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
+            # Use custom IBMQ backend
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=custom_backend_name,
                 provider=provider,
+                **options,
             )
         else:
             TASK_LOGGER.error("Unknown pennylane backend specified!")
@@ -28,10 +28,16 @@ from .schemas import (
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
-    save_entities,
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.kernel_cache import get_kernel_cache
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import (
+    MATRIX_FILE_EXTENSION,
+    MATRIX_MIMETYPE,
+    PairwiseMatrix,
+    save_matrix,
+)
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
@@ -128,6 +134,8 @@ def calculation_task(self, db_id: int) -> str:
     backend = input_params.backend
     ibmq_token = input_params.ibmq_token
     custom_backend = input_params.custom_backend
+    # noiseless local simulators can compute the kernel exactly
+    exact = input_params.exact and backend.name.startswith("aer")
 
     TASK_LOGGER.info(f"Loaded input parameters from db: {str(input_params)}")
 
@@ -145,28 +153,53 @@ def calculation_task(self, db_id: int) -> str:
     id_to_idx_x, points_arr_x = get_indices_and_point_arr(entity_points_url1)
     id_to_idx_y, points_arr_y = get_indices_and_point_arr(entity_points_url2)
 
+    # all parameters that influence the kernel values
+    cache_config = {
+        "plugin": QKE.instance.identifier,
+        "kernel": kernel_enum.name,
+        "entanglement_pattern": entanglement_pattern.name,
+        "n_qbits": n_qbits,
+        "reps": reps,
+        "backend": backend.name,
+        "custom_backend": custom_backend,
+        "shots": None if exact else shots,
+        "exact": exact,
+    }
+
     max_qbits = backend.get_max_num_qbits(ibmq_token, custom_backend)
     if max_qbits is None:
         max_qbits = 6
 
-    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, max_qbits)
-    backend.shots = shots
+    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, max_qbits, shots)
 
     # entanglement_pattern = entanglement_pattern.get_pattern(n_qbits)
-    kernel = kernel_enum.get_kernel(backend, n_qbits, reps, entanglement_pattern)
+    kernel = kernel_enum.get_kernel(
+        backend, n_qbits, reps, entanglement_pattern, exact=exact
+    )
+
+    representative_circuit = None
+
+    def evaluate_kernel(data_x: np.ndarray, data_y: np.ndarray) -> np.ndarray:
+        nonlocal representative_circuit
+        # evaluate returns a matrix of size len(data_y) x len(data_x), so the inputs are swapped
+        kernel_matrix, representative_circuit = kernel.evaluate(data_y, data_x)
+        return kernel_matrix
+
     # kernel_matrix is size len(points_arr_y) x len(points_arr_x)
-    kernel_matrix, representative_circuit = kernel.evaluate(points_arr_x, points_arr_y)
-
-    kernel_json = []
-    for ent_id_x, idx_x in id_to_idx_x.items():
-        for ent_id_y, idx_y in id_to_idx_y.items():
-            kernel_json.append(
-                {
-                    "entity_1_ID": ent_id_y,
-                    "entity_2_ID": ent_id_x,
-                    "kernel": kernel_matrix[idx_y, idx_x],
-                }
-            )
+    kernel_cache = get_kernel_cache()
+    kernel_matrix = kernel_cache.get_kernel_matrix(
+        cache_config, evaluate_kernel, points_arr_y, points_arr_x
+    )
+    if representative_circuit is None:
+        representative_circuit = kernel.get_representative_circuit(
+            points_arr_x, points_arr_y
+        )
+
+    kernel_result = PairwiseMatrix(
+        row_ids=sorted(id_to_idx_y, key=id_to_idx_y.get),
+        col_ids=sorted(id_to_idx_x, key=id_to_idx_x.get),
+        values=kernel_matrix,
+    )
 
     concat_filenames = retrieve_filename(entity_points_url1)
     concat_filenames += retrieve_filename(entity_points_url2)
@@ -177,7 +210,7 @@ def calculation_task(self, db_id: int) -> str:
     info_str = f"_q-kernel_{kernel_name}_entanglement_{entanglement_pattern.name}_{filename_hash}"
 
     with SpooledTemporaryFile(mode="w") as output:
-        save_entities(kernel_json, output, "application/json")
+        save_matrix(kernel_result, output, "application/json", value_key="kernel")
         STORE.persist_task_result(
             db_id,
             output,
@@ -186,6 +219,16 @@ def calculation_task(self, db_id: int) -> str:
             "application/json",
         )
 
+    with SpooledTemporaryFile(mode="wb") as output:
+        save_matrix(kernel_result, output, MATRIX_MIMETYPE, value_key="kernel")
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"kernel{info_str}{MATRIX_FILE_EXTENSION}",
+            "custom/kernel-matrix",
+            MATRIX_MIMETYPE,
+        )
+
     with SpooledTemporaryFile(mode="w") as output:
         output.write(representative_circuit)
         STORE.persist_task_result(
@@ -196,4 +239,4 @@ def calculation_task(self, db_id: int) -> str:
             "application/qasm",
         )
 
-    return "Result stored in file"
+    return f"Result stored in file (kernel cache: {kernel_cache.info()})"
@@ -13,11 +13,14 @@
 # limitations under the License.
 
 import numpy as np
+import pennylane as qml
 from abc import abstractmethod, ABCMeta
 from enum import Enum
 from typing import List, Tuple
 from pennylane import Device
 
+DEFAULT_BATCH_SIZE = 64
+
 
 def count_wires(wires: List[List]) -> int:
     return sum(len(w) for w in wires)
@@ -34,9 +37,39 @@ class ParzenWindow(metaclass=ABCMeta):
         self.train_labels = train_labels
         self.unique_labels = list(set(self.train_labels))
         self.distance_threshold = distance_threshold
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.classical_prescreen = False
+        self.label_count_cache = {}
 
     def set_quantum_backend(self, backend):
         self.backend = backend
+        # The label counts were sampled with the previous backend
+        self.label_count_cache = {}
+
+    def set_classical_prescreen(self, classical_prescreen: bool):
+        """
+        If classical_prescreen is True, the circuit is only executed for test points, whose label is not already
+        determined by the training points within the window, e.g. if all of these points have the same label.
+        :param classical_prescreen: whether to use the classical pre-screen
+        """
+        self.classical_prescreen = classical_prescreen
+
+    def execute_batch(self, tapes: List[qml.tape.QuantumTape]) -> List[np.ndarray]:
+        """
+        Executes the tapes in batches of batch_size tapes and returns their samples.
+        :param tapes: list of tapes ending with a sample measurement
+        """
+        results = []
+        for start in range(0, len(tapes), self.batch_size):
+            results.extend(
+                qml.execute(
+                    tapes[start : start + self.batch_size],
+                    self.backend,
+                    gradient_fn=None,
+                    cache=False,
+                )
+            )
+        return [np.asarray(result, dtype=int) for result in results]
 
     def get_representative_circuit(self, X) -> str:
         return ""
@@ -16,9 +16,10 @@ from .parzen_window import ParzenWindow
 from typing import List, Callable, Tuple
 import numpy as np
 import pennylane as qml
+from pennylane.operation import Operation
 from ..data_loading_circuits.quantum_associative_memory import QAM
 from ..ccnot import adaptive_ccnot
-from ..utils import int_to_bitlist, bitlist_to_int, is_binary, ceil_log2
+from ..utils import int_to_bitlist, bits_to_ints, is_binary, check_binary, ceil_log2
 from ..q_arithmetic import cc_increment_register
 from ..check_wires import check_wires_uniqueness, check_num_wires
 
@@ -53,6 +54,7 @@ class RuanParzenWindow(ParzenWindow):
         self.a = int(2**self.k - self.train_data.shape[1] + self.distance_threshold)
         self.a = int_to_bitlist(self.a, self.k + 2)
         self.label_indices = self.init_labels(train_labels)
+        self.label_ints = bits_to_ints(self.label_indices)
 
         self.unclean_wires = [] if unclean_wires is None else unclean_wires
         self.idx_wires = idx_wires
@@ -103,6 +105,7 @@ class RuanParzenWindow(ParzenWindow):
             additional_wires=self.train_wires + self.label_wires,
             unclean_wires=self.unclean_wires,
         )
+        self.circuit_template = None
 
     def init_labels(self, labels: np.ndarray) -> np.ndarray:
         """
@@ -119,6 +122,63 @@ class RuanParzenWindow(ParzenWindow):
             label_indices.append(label_to_idx[label])
         return np.array(label_indices)
 
+    def get_circuit_template(self) -> Tuple[List[Operation], List[Operation]]:
+        """
+        Returns the operations of the circuit that do not depend on the test point, i.e. the operations loading the
+        training data and the operations of the oracle. They are only recorded once and shared by the circuits of all
+        test points.
+        """
+        if self.circuit_template is None:
+            with qml.tape.QuantumTape() as loading_tape:
+                self.qam.circuit()
+            with qml.tape.QuantumTape() as oracle_tape:
+                self.oracle_circuit()
+            self.circuit_template = (loading_tape.operations, oracle_tape.operations)
+        return self.circuit_template
+
+    def get_point_operations(self, x: np.ndarray) -> List[Operation]:
+        """
+        Returns the operations that turn the train register into the inverse Hamming distance to x.
+        """
+        return [
+            qml.PauliX((train_wire,))
+            for x_, train_wire in zip(x, self.train_wires)
+            if x_ == 0
+        ]
+
+    def oracle_circuit(self):
+        """
+        Executes the oracle by Ruan, Y., Xue, X., Liu, H. et al. Quantum Algorithm for K-Nearest Neighbors Classification Based on the Metric of Hamming Distance. Int J Theor Phys 56, 3496–3507 (2017). https://doi.org/10.1007/s10773-017-3514-4
+        The oracle wire is set to |1>, if the inverse Hamming distance in the train register is within the window.
+        """
+        # Prep overflow register
+        for a_, overflow_wire in zip(self.a, self.overflow_wires):
+            if a_ == 1:
+                qml.PauliX((overflow_wire,))
+
+        # Increment overflow register for each 1 in the train register
+        qml.PauliX((self.oracle_wire,))  # Allows us to set indicator_is_zero to False
+        for t_idx, t_wire in enumerate(self.train_wires):
+            cc_increment_register(
+                [t_wire],
+                self.overflow_wires,
+                self.additional_ancilla_wires,
+                self.oracle_wire,
+                unclean_wires=self.unclean_wires
+                + self.train_wires[:t_idx]
+                + self.train_wires[t_idx + 1 :],
+                indicator_is_zero=False,
+            )
+
+        for overflow_wire in self.overflow_wires[:2]:
+            qml.PauliX((overflow_wire,))
+        adaptive_ccnot(
+            self.overflow_wires[:2],
+            self.additional_ancilla_wires,
+            self.train_wires + self.unclean_wires,
+            self.oracle_wire,
+        )
+
     def get_quantum_circuit(self, x: np.ndarray) -> Callable[[], None]:
         """
         Returns a quantum circuit that does the following:
@@ -127,64 +187,89 @@ class RuanParzenWindow(ParzenWindow):
         """
 
         def quantum_circuit():
-            # Load points into register
-            self.qam.circuit()
-
-            # Get inverse Hamming Distance
-            for x_, train_wire in zip(x, self.train_wires):
-                if x_ == 0:
-                    qml.PauliX((train_wire,))
-
-            # Prep overflow register
-            for a_, overflow_wire in zip(self.a, self.overflow_wires):
-                if a_ == 1:
-                    qml.PauliX((overflow_wire,))
-
-            # Increment overflow register for each 1 in the train register
-            qml.PauliX((self.oracle_wire,))  # Allows us to set indicator_is_zero to False
-            for t_idx, t_wire in enumerate(self.train_wires):
-                cc_increment_register(
-                    [t_wire],
-                    self.overflow_wires,
-                    self.additional_ancilla_wires,
-                    self.oracle_wire,
-                    unclean_wires=self.unclean_wires
-                    + self.train_wires[:t_idx]
-                    + self.train_wires[t_idx + 1 :],
-                    indicator_is_zero=False,
-                )
-
-            for overflow_wire in self.overflow_wires[:2]:
-                qml.PauliX((overflow_wire,))
-            adaptive_ccnot(
-                self.overflow_wires[:2],
-                self.additional_ancilla_wires,
-                self.train_wires + self.unclean_wires,
-                self.oracle_wire,
-            )
+            loading_ops, oracle_ops = self.get_circuit_template()
+            for op in loading_ops + self.get_point_operations(x) + oracle_ops:
+                qml.apply(op)
             return qml.sample(wires=self.label_wires + [self.oracle_wire])
 
         return quantum_circuit
 
+    def get_quantum_tape(self, x: np.ndarray) -> qml.tape.QuantumTape:
+        """
+        Returns the circuit of get_quantum_circuit as a tape, without recording the shared operations again.
+        """
+        loading_ops, oracle_ops = self.get_circuit_template()
+        return qml.tape.QuantumTape(
+            loading_ops + self.get_point_operations(x) + oracle_ops,
+            [qml.sample(wires=self.label_wires + [self.oracle_wire])],
+        )
+
+    def get_label_counts(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Given a list of samples, this function returns the number of occurrences of each label, where an oracle
+        qubit is equal to |1>.
+        """
+        samples = np.asarray(samples, dtype=int).reshape(-1, len(self.label_wires) + 1)
+        labels = bits_to_ints(samples[samples[:, -1] == 1, :-1])
+        return np.bincount(labels, minlength=len(self.unique_labels))[
+            : len(self.unique_labels)
+        ]
+
     def get_label_from_samples(self, samples: List[List[int]]) -> int:
         """
         Given a list of samples, this function returns the label with the most occurrences, where an oracle qubit
         is equal to |1>.
         """
-        label_probs = np.zeros(len(self.unique_labels))
-        samples_with_one = 0
-        for sample in samples:
-            if sample[-1] == 1:
-                label = bitlist_to_int(sample[:-1])
-                if label < len(label_probs):
-                    label_probs[label] += 1
-                    samples_with_one += 1
-        return self.unique_labels[label_probs.argmax()]
+        return self.unique_labels[self.get_label_counts(samples).argmax()]
+
+    def get_window_label_counts(self, X: np.ndarray) -> np.ndarray:
+        """
+        Returns the number of training points of each label within the window of each point in X.
+        """
+        distances = X @ (1 - self.train_data).T + (1 - X) @ self.train_data.T
+        in_window = (distances <= self.distance_threshold).astype(int)
+        return in_window @ np.eye(len(self.unique_labels), dtype=int)[self.label_ints]
 
     def label_point(self, x: np.ndarray) -> int:
-        samples = qml.QNode(self.get_quantum_circuit(x), self.backend)().tolist()
+        samples = self.execute_batch([self.get_quantum_tape(x)])[0]
         return self.get_label_from_samples(samples)
 
+    def label_points(self, X: np.ndarray) -> List[int]:
+        X = np.array(X, dtype=int)
+        check_binary(
+            X, "All the data needs to be binary, when dealing with the hamming distance"
+        )
+        # Duplicate test points share their circuit execution
+        unique_X, inverse = np.unique(X, axis=0, return_inverse=True)
+        label_counts = np.zeros((len(unique_X), len(self.unique_labels)), dtype=int)
+
+        determined = np.zeros(len(unique_X), dtype=bool)
+        if self.classical_prescreen:
+            # If at most one label occurs within the window, the oracle only marks this label
+            window_label_counts = self.get_window_label_counts(unique_X)
+            determined = np.count_nonzero(window_label_counts, axis=1) <= 1
+            label_counts[determined] = window_label_counts[determined]
+
+        to_execute = []
+        for idx in np.flatnonzero(~determined):
+            cached = self.label_count_cache.get(unique_X[idx].tobytes())
+            if cached is None:
+                to_execute.append(idx)
+            else:
+                label_counts[idx] = cached
+
+        if to_execute:
+            if self.backend is None:
+                raise ValueError("The quantum backend may not be None!")
+            tapes = [self.get_quantum_tape(unique_X[idx]) for idx in to_execute]
+            for idx, samples in zip(to_execute, self.execute_batch(tapes)):
+                label_counts[idx] = self.get_label_counts(samples)
+                self.label_count_cache[unique_X[idx].tobytes()] = label_counts[idx]
+
+        return [
+            self.unique_labels[label] for label in label_counts.argmax(axis=1)[inverse]
+        ]
+
     @staticmethod
     def get_necessary_wires(
         train_data: np.ndarray, train_labels: np.ndarray
@@ -16,11 +16,17 @@ import enum
 
 import pennylane as qml
 from celery.utils.log import get_task_logger
-from qiskit import IBMQ
 from qiskit import Aer
 
 from typing import Optional
 
+from qhana_plugin_runner.plugin_utils.quantum_backends import (
+    get_ibmq_backend,
+    get_ibmq_max_num_qubits,
+    get_ibmq_provider,
+    get_pennylane_device,
+)
+
 TASK_LOGGER = get_task_logger(__name__)
 
 
@@ -47,43 +53,49 @@ class QuantumBackends(enum.Enum):
             return None
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(self.name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
-            backend = provider.get_backend(custom_backend_name)
-            return backend.configuration().n_qubits
+            return get_ibmq_max_num_qubits(ibmq_token, custom_backend_name)
 
     def get_pennylane_backend(
         self,
         ibmq_token: str,
         custom_backend_name: str,
         qubit_cnt: int,
+        shots: Optional[int] = None,
     ) -> qml.Device:
+        options = {} if shots is None else {"shots": shots}
         if self.name.startswith("aer"):
             # Use local AER backend
             aer_backend_name = self.name[4:]
 
-            return qml.device("qiskit.aer", wires=qubit_cnt, backend=aer_backend_name)
+            return get_pennylane_device(
+                "qiskit.aer", wires=qubit_cnt, backend=aer_backend_name, **options
+            )
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
-                "qiskit.ibmq", wires=qubit_cnt, backend=self.name, provider=provider
+            return get_pennylane_device(
+                "qiskit.ibmq",
+                wires=qubit_cnt,
+                backend=self.name,
+                provider=provider,
+                **options,
             )
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
+            # Use custom IBMQ backend
+            provider = get_ibmq_provider(ibmq_token)
 
-            return qml.device(
+            return get_pennylane_device(
                 "qiskit.ibmq",
                 wires=qubit_cnt,
                 backend=custom_backend_name,
                 provider=provider,
+                **options,
             )
         elif self.name == "pennylane_default":
-            return qml.device("default.qubit", wires=qubit_cnt)
+            return get_pennylane_device("default.qubit", wires=qubit_cnt, **options)
         else:
             TASK_LOGGER.error("Unknown pennylane backend specified!")
 
@@ -93,10 +105,8 @@ class QuantumBackends(enum.Enum):
             return Aer.get_backend(aer_backend_name)
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-            return provider.get_backend(self.name)
+            return get_ibmq_backend(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
-            provider = IBMQ.enable_account(ibmq_token)
-            return provider.get_backend(custom_backend_name)
+            return get_ibmq_backend(ibmq_token, custom_backend_name)
         else:
             TASK_LOGGER.error("Unknown qiskit backend specified!")
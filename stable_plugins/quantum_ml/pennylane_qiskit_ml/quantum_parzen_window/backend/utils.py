@@ -25,6 +25,13 @@ def bitlist_to_int(bitlist: List[int]) -> int:
     return out
 
 
+def bits_to_ints(bits: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of bitlist_to_int for the rows of a 2d array.
+    """
+    return bits @ (1 << np.arange(bits.shape[1] - 1, -1, -1))
+
+
 def int_to_bitlist(num, length: int):
     binary = bin(num)[2:]
     result = [int(el) for el in binary]
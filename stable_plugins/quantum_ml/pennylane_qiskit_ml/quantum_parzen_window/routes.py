@@ -171,6 +171,7 @@ class MicroFrontend(MethodView):
         default_values = {
             fields["window_size"].data_key: 1,
             fields["minimize_qubit_count"].data_key: False,
+            fields["classical_prescreen"].data_key: True,
             fields["backend"].data_key: QuantumBackends.pennylane_default.value,
             fields["shots"].data_key: 1024,
         }
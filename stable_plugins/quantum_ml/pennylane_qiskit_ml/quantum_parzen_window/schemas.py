@@ -46,6 +46,7 @@ class InputParameters:
     ibmq_token: str
     custom_backend: str
     minimize_qubit_count: bool = False
+    classical_prescreen: bool = False
     visualize: bool = False
 
     def __str__(self):
@@ -132,6 +133,17 @@ class InputParametersSchema(FrontendFormBaseSchema):
             "input_type": "checkbox",
         },
     )
+    classical_prescreen = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Classical Pre-Screen",
+            "description": "If checked, then the Hamming distances to the training points are computed classically "
+            "first. The circuit is only executed for test points, whose window contains more than one label, "
+            "since the label of all other test points is already determined.",
+            "input_type": "checkbox",
+        },
+    )
     backend = EnumField(
         QuantumBackends,
         required=True,
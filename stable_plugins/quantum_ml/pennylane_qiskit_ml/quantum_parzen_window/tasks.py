@@ -15,7 +15,7 @@
 import os
 from tempfile import SpooledTemporaryFile
 
-from typing import Optional, List
+from typing import Optional
 
 from celery.utils.log import get_task_logger
 
@@ -26,17 +26,14 @@ from .schemas import (
 )
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
-from qhana_plugin_runner.plugin_utils.entity_marshalling import (
-    save_entities,
-    load_entities,
-    ensure_dict,
-)
-from qhana_plugin_runner.requests import open_url, retrieve_filename
+from qhana_plugin_runner.plugin_utils.entity_marshalling import save_entities
+from qhana_plugin_runner.requests import retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
 import numpy as np
 from sklearn.metrics import accuracy_score
 
+from .backend.load_utils import get_indices_and_point_arr, get_label_arr
 from .backend.visualize import plot_data, plot_confusion_matrix
 import muid
 
@@ -47,90 +44,6 @@ def get_readable_hash(s: str) -> str:
     return muid.pretty(muid.bhash(s.encode("utf-8")), k1=6, k2=5).replace(" ", "-")
 
 
-def get_point(ent: dict) -> np.ndarray:
-    dimension_keys = [k for k in ent.keys() if k not in ("ID", "href")]
-    dimension_keys.sort()
-    point = np.empty(len(dimension_keys))
-    for idx, d in enumerate(dimension_keys):
-        point[idx] = ent[d]
-    return point
-
-
-def get_entity_generator(entity_points_url: str):
-    """
-    Return a generator for the entity points, given an url to them.
-    :param entity_points_url: url to the entity points
-    """
-    file_ = open_url(entity_points_url)
-    file_.encoding = "utf-8"
-    file_type = file_.headers["Content-Type"]
-    entities_generator = load_entities(file_, mimetype=file_type)
-    entities_generator = ensure_dict(entities_generator)
-    for ent in entities_generator:
-        yield {"ID": ent["ID"], "href": ent.get("href", ""), "point": get_point(ent)}
-
-
-def get_indices_and_point_arr(entity_points_url: str) -> (dict, List[List[float]]):
-    entity_points = list(get_entity_generator(entity_points_url))
-    id_to_idx = {}
-
-    idx = 0
-
-    for ent in entity_points:
-        if ent["ID"] in id_to_idx:
-            raise ValueError("Duplicate ID: ", ent["ID"])
-
-        id_to_idx[ent["ID"]] = idx
-        idx += 1
-
-    points_cnt = len(id_to_idx)
-    dimensions = len(entity_points[0]["point"])
-    points_arr = np.zeros((points_cnt, dimensions))
-
-    for ent in entity_points:
-        idx = id_to_idx[ent["ID"]]
-        points_arr[idx] = ent["point"]
-
-    return id_to_idx, points_arr
-
-
-def get_label_generator(entity_labels_url: str):
-    """
-    Return a generator for the entity labels, given an url to them.
-    :param entity_labels_url: url to the entity labels
-    """
-    file_ = open_url(entity_labels_url)
-    file_.encoding = "utf-8"
-    file_type = file_.headers["Content-Type"]
-    entities_generator = load_entities(file_, mimetype=file_type)
-    entities_generator = ensure_dict(entities_generator)
-    for ent in entities_generator:
-        yield {"ID": ent["ID"], "href": ent.get("href", ""), "label": ent["label"]}
-
-
-def get_label_arr(
-    entity_labels_url: str, id_to_idx: dict, label_to_int=None, int_to_label=None
-) -> (dict, List[List[float]]):
-    entity_labels = list(get_label_generator(entity_labels_url))
-
-    # Initialise label array
-    labels = np.zeros(len(id_to_idx.keys()), dtype=int)
-
-    if label_to_int is None:
-        label_to_int = dict()
-    if int_to_label is None:
-        int_to_label = list()
-    for ent in entity_labels:
-        label = ent["label"]
-        label_str = str(label)
-        if label_str not in label_to_int:
-            label_to_int[label_str] = len(int_to_label)
-            int_to_label.append(label)
-        labels[id_to_idx[ent["ID"]]] = label_to_int[label_str]
-
-    return labels, label_to_int, int_to_label
-
-
 @CELERY.task(name=f"{QParzenWindow.instance.identifier}.calculation_task", bind=True)
 def calculation_task(self, db_id: int) -> str:
     # get parameters
@@ -154,6 +67,7 @@ def calculation_task(self, db_id: int) -> str:
     window_size = input_params.window_size
     variant = input_params.variant
     minimize_qubit_count = input_params.minimize_qubit_count
+    classical_prescreen = input_params.classical_prescreen
     backend = input_params.backend
     shots = input_params.shots
     ibmq_token = input_params.ibmq_token
@@ -202,9 +116,9 @@ def calculation_task(self, db_id: int) -> str:
     )
 
     # Set backend
-    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, num_qbits)
-    backend.shots = shots
+    backend = backend.get_pennylane_backend(ibmq_token, custom_backend, num_qbits, shots)
     parzen_window.set_quantum_backend(backend)
+    parzen_window.set_classical_prescreen(classical_prescreen)
 
     # Label test data
     predictions = [int_to_label[el] for el in parzen_window.label_points(test_data)]
@@ -12,10 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from qiskit import Aer, QuantumCircuit, transpile
 from qiskit.circuit.library import ZZFeatureMap, PauliFeatureMap, ZFeatureMap
 from qiskit_machine_learning.kernels import QuantumKernel
+from scipy.linalg.blas import zherk
+import numpy as np
 import enum
-from typing import List
+from functools import partial
+from typing import Callable, List, Optional
+
+
+# number of statevectors that are simulated in one job
+STATEVECTOR_BATCH_SIZE = 64
 
 
 class EntanglementPatternEnum(enum.Enum):
@@ -62,3 +70,58 @@ class KernelEnum(enum.Enum):
             raise ValueError("Unkown kernel!")
 
         return QuantumKernel(feature_map=feature_map, quantum_instance=backend)
+
+
+def get_statevectors(feature_map: QuantumCircuit, data: np.ndarray) -> np.ndarray:
+    """
+    Simulates the statevectors of the feature map for all data points.
+    The feature map is transpiled once and the data points are simulated in batches.
+
+    :param feature_map: the parameterized feature map
+    :param data: array of data points
+    :return: array of size len(data) x 2**feature_map.num_qubits
+    """
+    backend = Aer.get_backend("aer_simulator_statevector")
+    circuit = feature_map.decompose()
+    circuit.save_statevector()
+    circuit = transpile(circuit, backend)
+
+    states = np.empty((len(data), 2**feature_map.num_qubits), dtype=complex)
+    for start in range(0, len(data), STATEVECTOR_BATCH_SIZE):
+        batch = [
+            circuit.assign_parameters(x)
+            for x in data[start : start + STATEVECTOR_BATCH_SIZE]
+        ]
+        result = backend.run(batch).result()
+        for i in range(len(batch)):
+            states[start + i] = result.get_statevector(i)
+    return states
+
+
+def evaluate_exact_kernel(
+    feature_map: QuantumCircuit,
+    x_vec: np.ndarray,
+    y_vec: np.ndarray,
+    get_states: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Computes the exact kernel matrix |<phi(y)|phi(x)>|^2 from the statevectors of the feature map.
+    Only one statevector per data point is simulated instead of one circuit per kernel entry.
+    This is only correct for noiseless simulators.
+
+    :param feature_map: the parameterized feature map
+    :param x_vec: array of data points
+    :param y_vec: array of data points
+    :param get_states: optional function returning the statevectors for an array of data points, defaults to get_statevectors
+    :return: kernel-matrix of size len(x_vec) x len(y_vec), like QuantumKernel.evaluate
+    """
+    if get_states is None:
+        get_states = partial(get_statevectors, feature_map)
+    states_x = get_states(x_vec)
+    if np.array_equal(x_vec, y_vec):
+        # zherk only computes the upper triangle of conj(states_x) @ states_x.T
+        kernel_matrix = np.square(np.abs(zherk(1.0, states_x.conj())))
+        return np.triu(kernel_matrix) + np.triu(kernel_matrix, 1).T
+
+    states_y = get_states(y_vec)
+    return np.square(np.abs(states_x.conj() @ states_y.T))
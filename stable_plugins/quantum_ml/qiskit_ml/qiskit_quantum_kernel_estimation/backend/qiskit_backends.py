@@ -15,8 +15,9 @@
 import enum
 
 from celery.utils.log import get_task_logger
-from qiskit import IBMQ, Aer
+from qiskit import Aer
 
+from qhana_plugin_runner.plugin_utils.quantum_backends import get_ibmq_backend
 
 TASK_LOGGER = get_task_logger(__name__)
 
@@ -46,13 +47,9 @@ class QiskitBackends(enum.Enum):
             return Aer.get_backend(aer_backend_name)
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-
-            return provider.get_backend(self.name)
+            return get_ibmq_backend(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
             # Use custom IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-
-            return provider.get_backend(custom_backend_name)
+            return get_ibmq_backend(ibmq_token, custom_backend_name)
         else:
             TASK_LOGGER.error("Unknown qiskit backend specified!")
@@ -37,6 +37,7 @@ from qhana_plugin_runner.api.plugin_schemas import (
     InputDataMetadata,
 )
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import MATRIX_MIMETYPE
 from qhana_plugin_runner.tasks import save_task_error, save_task_result
 
 from .tasks import calculation_task
@@ -82,7 +83,7 @@ class PluginsView(MethodView):
                 data_output=[
                     DataMetadata(
                         data_type="custom/kernel-matrix",
-                        content_type=["application/json"],
+                        content_type=["application/json", MATRIX_MIMETYPE],
                         required=True,
                     )
                 ],
@@ -137,6 +138,7 @@ class MicroFrontend(MethodView):
             fields["reps"].data_key: 2,
             fields["shots"].data_key: 1024,
             fields["backend"].data_key: QiskitBackends.aer_statevector_simulator.value,
+            fields["exact"].data_key: True,
         }
 
         if "IBMQ_BACKEND" in os.environ:
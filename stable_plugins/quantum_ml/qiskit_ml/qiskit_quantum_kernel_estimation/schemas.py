@@ -42,6 +42,7 @@ class InputParameters:
         backend: QiskitBackends,
         ibmq_token: str,
         custom_backend: str,
+        exact: bool = False,
     ):
         self.entity_points_url1 = entity_points_url1
         self.entity_points_url2 = entity_points_url2
@@ -56,6 +57,7 @@ class InputParameters:
         self.backend = backend
         self.ibmq_token = ibmq_token
         self.custom_backend = custom_backend
+        self.exact = exact
 
     def __str__(self):
         variables = self.__dict__.copy()
@@ -196,6 +198,16 @@ class InputParametersSchema(FrontendFormBaseSchema):
             "input_type": "text",
         },
     )
+    exact = ma.fields.Boolean(
+        required=False,
+        allow_none=False,
+        metadata={
+            "label": "Exact simulation",
+            "description": "Compute the exact kernel from the statevectors of the feature map instead of sampling "
+            "the overlaps with shots. Only used with the local Aer simulators, the number of shots is then ignored.",
+            "input_type": "checkbox",
+        },
+    )
 
     @post_load
     def make_input_params(self, data, **kwargs) -> InputParameters:
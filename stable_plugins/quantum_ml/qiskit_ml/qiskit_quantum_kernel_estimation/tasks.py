@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+from functools import partial
 from tempfile import SpooledTemporaryFile
 
 from typing import Optional, List
@@ -21,6 +22,7 @@ from celery.utils.log import get_task_logger
 
 from . import QiskitQKE
 
+from .backend.kernel import evaluate_exact_kernel, get_statevectors
 from .schemas import (
     InputParameters,
     InputParametersSchema,
@@ -28,10 +30,16 @@ from .schemas import (
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import (
-    save_entities,
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.kernel_cache import get_kernel_cache
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import (
+    MATRIX_FILE_EXTENSION,
+    MATRIX_MIMETYPE,
+    PairwiseMatrix,
+    save_matrix,
+)
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
@@ -128,6 +136,8 @@ def calculation_task(self, db_id: int) -> str:
     backend = input_params.backend
     ibmq_token = input_params.ibmq_token
     custom_backend = input_params.custom_backend
+    # noiseless local simulators can compute the kernel exactly
+    exact = input_params.exact and backend.name.startswith("aer")
 
     TASK_LOGGER.info(f"Loaded input parameters from db: {str(input_params)}")
 
@@ -145,6 +155,20 @@ def calculation_task(self, db_id: int) -> str:
     id_to_idx_x, points_arr_x = get_indices_and_point_arr(entity_points_url1)
     id_to_idx_y, points_arr_y = get_indices_and_point_arr(entity_points_url2)
 
+    # all parameters that influence the kernel values
+    cache_config = {
+        "plugin": QiskitQKE.instance.identifier,
+        "kernel": kernel_enum.name,
+        "entanglement_pattern": entanglement_pattern.name,
+        "n_qbits": n_qbits,
+        "paulis": paulis,
+        "reps": reps,
+        "backend": backend.name,
+        "custom_backend": custom_backend,
+        "shots": None if exact else shots,
+        "exact": exact,
+    }
+
     backend = backend.get_qiskit_backend(ibmq_token, custom_backend)
     backend.shots = shots
 
@@ -152,20 +176,30 @@ def calculation_task(self, db_id: int) -> str:
     paulis = paulis.replace(" ", "").split(",")
 
     kernel = kernel_enum.get_kernel(backend, n_qbits, paulis, reps, entanglement_pattern)
+    kernel_cache = get_kernel_cache()
+    if exact:
+        # the statevectors are cached as well, so that added points only need new statevectors
+        get_states = partial(
+            kernel_cache.get_point_values,
+            cache_config,
+            partial(get_statevectors, kernel.feature_map),
+        )
+        evaluate_kernel = partial(
+            evaluate_exact_kernel, kernel.feature_map, get_states=get_states
+        )
+    else:
+        evaluate_kernel = kernel.evaluate
     # kernel_matrix is size len(points_arr_y) x len(points_arr_x)
-    kernel_matrix = kernel.evaluate(x_vec=points_arr_x, y_vec=points_arr_y).T
+    kernel_matrix = kernel_cache.get_kernel_matrix(
+        cache_config, evaluate_kernel, points_arr_y, points_arr_x
+    )
     TASK_LOGGER.info(f"kernel_matrix.shape = {kernel_matrix.shape}")
 
-    kernel_json = []
-    for ent_id_x, idx_x in id_to_idx_x.items():
-        for ent_id_y, idx_y in id_to_idx_y.items():
-            kernel_json.append(
-                {
-                    "entity_1_ID": ent_id_y,
-                    "entity_2_ID": ent_id_x,
-                    "kernel": kernel_matrix[idx_y, idx_x],
-                }
-            )
+    kernel_result = PairwiseMatrix(
+        row_ids=sorted(id_to_idx_y, key=id_to_idx_y.get),
+        col_ids=sorted(id_to_idx_x, key=id_to_idx_x.get),
+        values=kernel_matrix,
+    )
 
     concat_filenames = retrieve_filename(entity_points_url1)
     concat_filenames += retrieve_filename(entity_points_url2)
@@ -176,7 +210,7 @@ def calculation_task(self, db_id: int) -> str:
     info_str = f"_qiskit-kernel_{kernel_name}_entanglement_{entanglement_pattern}_{filename_hash}"
 
     with SpooledTemporaryFile(mode="w") as output:
-        save_entities(kernel_json, output, "application/json")
+        save_matrix(kernel_result, output, "application/json", value_key="kernel")
         STORE.persist_task_result(
             db_id,
             output,
@@ -185,4 +219,14 @@ def calculation_task(self, db_id: int) -> str:
             "application/json",
         )
 
-    return "Result stored in file"
+    with SpooledTemporaryFile(mode="wb") as output:
+        save_matrix(kernel_result, output, MATRIX_MIMETYPE, value_key="kernel")
+        STORE.persist_task_result(
+            db_id,
+            output,
+            f"kernel{info_str}{MATRIX_FILE_EXTENSION}",
+            "custom/kernel-matrix",
+            MATRIX_MIMETYPE,
+        )
+
+    return f"Result stored in file (kernel cache: {kernel_cache.info()})"
@@ -291,15 +291,19 @@ TASK_LOGGER = get_task_logger(__name__)
 
 
 def simulate_circuit(circuit_qasm: str, execution_options: Dict[str, Union[str, int]]):
-    from qiskit import QiskitError, QuantumCircuit, execute
+    from qiskit import QiskitError, QuantumCircuit
     from qiskit.result.result import ExperimentResult, Result
     from qiskit_aer import StatevectorSimulator
 
+    from qhana_plugin_runner.plugin_utils.circuit_cache import get_cached_circuit
+
     backend = StatevectorSimulator()  # TODO noise model?
 
     circuit = QuantumCircuit.from_qasm_str(circuit_qasm)
 
-    result: Result = execute(circuit, backend, shots=execution_options["shots"]).result()
+    # reruns of the same circuit reuse the transpiled circuit
+    cached_circuit = get_cached_circuit(circuit, backend)
+    result: Result = cached_circuit.run(shots=execution_options["shots"])
     if not result.success:
         # TODO better error
         raise ValueError("Circuit could not be simulated!", result)
@@ -13,11 +13,82 @@
 # limitations under the License.
 
 from enum import Enum
+from functools import partial
 from typing import List, Callable, Optional
 import numpy as np
+from qiskit.circuit import ParameterVector
 from qiskit.circuit.library import ZZFeatureMap, PauliFeatureMap, ZFeatureMap
+from qiskit.utils.backend_utils import is_aer_provider
 from qiskit_machine_learning.kernels import QuantumKernel
 
+from qhana_plugin_runner.plugin_utils.circuit_cache import get_cached_circuit
+
+
+def evaluate_quantum_kernel(
+    quantum_kernel: QuantumKernel, x_vec: np.ndarray, y_vec: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Evaluates the kernel matrix like ``QuantumKernel.evaluate``, but transpiles the
+    parameterized kernel circuit only once per process and binds the data points of all
+    pairs in bulk. Falls back to ``QuantumKernel.evaluate`` for statevector simulators,
+    non Aer backends and quantum instances with noise models or error mitigation.
+    :param quantum_kernel: the quantum kernel
+    :param x_vec: data points of the rows
+    :param y_vec: data points of the columns, defaults to ``x_vec``
+    :return: the kernel matrix
+    """
+    quantum_instance = quantum_kernel.quantum_instance
+    if (
+        quantum_instance.is_statevector
+        or not is_aer_provider(quantum_instance.backend)
+        or quantum_instance.backend_options
+        or quantum_instance.noise_config
+        or quantum_instance.measurement_error_mitigation_cls is not None
+        or quantum_instance.bound_pass_manager is not None
+    ):
+        return quantum_kernel.evaluate(x_vec, y_vec)
+
+    x_vec = np.asarray(x_vec, dtype=float).reshape(len(x_vec), -1)
+    is_symmetric = y_vec is None or np.array_equal(x_vec, y_vec)
+    y_vec = x_vec if y_vec is None else np.asarray(y_vec, dtype=float)
+    y_vec = y_vec.reshape(len(y_vec), -1)
+
+    kernel = np.ones((x_vec.shape[0], y_vec.shape[0]))
+    if is_symmetric:
+        mus, nus = np.triu_indices(x_vec.shape[0], k=1)  # remove diagonal
+    else:
+        mus, nus = np.indices(kernel.shape).reshape(2, -1)
+        # the overlap of identical states is 1
+        distinct = np.any(x_vec[mus] != y_vec[nus], axis=1)
+        mus, nus = mus[distinct], nus[distinct]
+
+    params_x = ParameterVector("par_x", x_vec.shape[1])
+    params_y = ParameterVector("par_y", y_vec.shape[1])
+    circuit = quantum_kernel.construct_circuit(params_x, params_y, measurement=True)
+    cached_circuit = get_cached_circuit(
+        circuit,
+        quantum_instance.backend,
+        quantum_instance.compile_config.get("optimization_level"),
+    )
+    counts = cached_circuit.get_counts(
+        list(params_x) + list(params_y),
+        np.concatenate([x_vec[mus], y_vec[nus]], axis=1),
+        quantum_instance.run_config.shots,
+    )
+    measurement_basis = "0" * circuit.num_qubits
+    kernel[mus, nus] = [
+        point_counts.get(measurement_basis, 0) / sum(point_counts.values())
+        for point_counts in counts
+    ]
+
+    if is_symmetric:
+        kernel[nus, mus] = kernel[mus, nus]
+        # closest positive semi-definite approximation, as sampling noise can violate it
+        D, U = np.linalg.eig(kernel)
+        kernel = U @ np.diag(np.maximum(0, D)) @ U.transpose()
+
+    return kernel
+
 
 class EntanglementPatternEnum(Enum):
     full = "Full"
@@ -94,4 +165,7 @@ class KernelEnum(Enum):
         else:
             raise NotImplementedError("Unkown kernel!")
 
-        return QuantumKernel(feature_map=feature_map, quantum_instance=backend).evaluate
+        return partial(
+            evaluate_quantum_kernel,
+            QuantumKernel(feature_map=feature_map, quantum_instance=backend),
+        )
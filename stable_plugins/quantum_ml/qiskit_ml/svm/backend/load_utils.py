@@ -18,6 +18,7 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import load_matrix
 from qhana_plugin_runner.requests import open_url
 
 
@@ -105,42 +106,37 @@ def get_id_list(id_to_idx: dict):
     return id_list
 
 
+def _get_order(target_id_to_idx: dict, id_to_idx: dict) -> np.ndarray:
+    """Get the index array that reorders entries from ``id_to_idx`` to ``target_id_to_idx``."""
+    order = np.zeros(len(target_id_to_idx), dtype=int)
+    for ent_id, idx in target_id_to_idx.items():
+        order[idx] = id_to_idx[ent_id]
+    return order
+
+
 def load_kernel_matrix(
     kernel_url: str,
     id_to_idx_X: Optional[dict] = None,
 ) -> (dict, dict, np.array):
     """
     Loads in a kernel matrix, given its url
-    :param kernel_url: url to the kernel matrix
+    :param kernel_url: url to the kernel matrix (json or binary matrix file)
+    :param id_to_idx_X: optional column order of the kernel matrix
     """
-    kernel_json = open_url(kernel_url).json()
-    not_provided = id_to_idx_X is None
-    if not_provided:
-        id_to_idx_X = {}
-    id_to_idx_Y = {}
-    idx_X = 0
-    idx_Y = 0
-    for entry in kernel_json:
-        if entry["entity_1_ID"] not in id_to_idx_Y:
-            id_to_idx_Y[entry["entity_1_ID"]] = idx_Y
-            idx_Y += 1
-        if not_provided:
-            if entry["entity_2_ID"] not in id_to_idx_X:
-                id_to_idx_X[entry["entity_2_ID"]] = idx_X
-                idx_X += 1
-    kernel_matrix = np.zeros((len(id_to_idx_Y), len(id_to_idx_X)))
+    with open_url(kernel_url) as kernel_file:
+        kernel = load_matrix(kernel_file, value_key="kernel")
 
-    if id_to_idx_Y.keys() == id_to_idx_X.keys():
-        id_to_idx_Y = id_to_idx_X
+    kernel_matrix = kernel.values
+    id_to_idx_Y = kernel.row_index
 
-    for entry in kernel_json:
-        ent_id_Y = entry["entity_1_ID"]
-        ent_id_X = entry["entity_2_ID"]
-        kernel = entry["kernel"]
+    if id_to_idx_X is None:
+        id_to_idx_X = kernel.col_index
+    else:
+        kernel_matrix = kernel_matrix[:, _get_order(id_to_idx_X, kernel.col_index)]
 
-        ent_idx_Y = id_to_idx_Y[ent_id_Y]
-        ent_idx_X = id_to_idx_X[ent_id_X]
-
-        kernel_matrix[ent_idx_Y, ent_idx_X] = kernel
+    if id_to_idx_Y.keys() == id_to_idx_X.keys():
+        if id_to_idx_Y != id_to_idx_X:
+            kernel_matrix = kernel_matrix[_get_order(id_to_idx_X, id_to_idx_Y), :]
+        id_to_idx_Y = id_to_idx_X
 
     return id_to_idx_X, id_to_idx_Y, kernel_matrix
@@ -15,9 +15,10 @@
 import enum
 
 from celery.utils.log import get_task_logger
-from qiskit import IBMQ, Aer
+from qiskit import Aer
 from qiskit.utils import QuantumInstance
 
+from qhana_plugin_runner.plugin_utils.quantum_backends import get_ibmq_backend
 
 TASK_LOGGER = get_task_logger(__name__)
 
@@ -48,14 +49,10 @@ class QiskitBackends(enum.Enum):
             backend = Aer.get_backend(aer_backend_name)
         elif self.name.startswith("ibmq"):
             # Use IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-
-            backend = provider.get_backend(self.name)
+            backend = get_ibmq_backend(ibmq_token, self.name)
         elif self.name.startswith("custom_ibmq"):
             # Use custom IBMQ backend
-            provider = IBMQ.enable_account(ibmq_token)
-
-            backend = provider.get_backend(custom_backend_name)
+            backend = get_ibmq_backend(ibmq_token, custom_backend_name)
         else:
             raise NotImplementedError("Unknown qiskit backend specified!")
 
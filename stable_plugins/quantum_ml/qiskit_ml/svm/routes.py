@@ -38,6 +38,7 @@ from qhana_plugin_runner.api.plugin_schemas import (
     InputDataMetadata,
 )
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import MATRIX_MIMETYPE
 from qhana_plugin_runner.tasks import save_task_error, save_task_result
 
 from .tasks import calculation_task
@@ -88,13 +89,13 @@ class PluginsView(MethodView):
                     ),
                     InputDataMetadata(
                         data_type="entity/matrix",
-                        content_type=["text/csv", "application/json"],
+                        content_type=["text/csv", "application/json", MATRIX_MIMETYPE],
                         required=False,
                         parameter="trainKernelUrl",
                     ),
                     InputDataMetadata(
                         data_type="entity/matrix",
-                        content_type=["text/csv", "application/json"],
+                        content_type=["text/csv", "application/json", MATRIX_MIMETYPE],
                         required=False,
                         parameter="testKernelUrl",
                     ),
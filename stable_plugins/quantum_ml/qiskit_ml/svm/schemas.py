@@ -21,6 +21,8 @@ from qhana_plugin_runner.api.util import (
     FileUrl,
 )
 
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import MATRIX_MIMETYPE
+
 from .backend.kernel import KernelEnum, EntanglementPatternEnum
 from .backend.data_maps import DataMapsEnum
 from .backend.qiskit_backends import QiskitBackends
@@ -67,10 +69,10 @@ class InputParametersSchema(FrontendFormBaseSchema):
         required=False,
         allow_none=True,
         data_input_type="kernel-matrix",
-        data_content_types=["application/json"],
+        data_content_types=["application/json", MATRIX_MIMETYPE],
         metadata={
             "label": "Training kernel matrix URL",
-            "description": "URL to a json file, containing a kernel matrix. Let X be the set of the training points, then the matrix is K(X, X).",
+            "description": "URL to a json or binary matrix file, containing a kernel matrix. Let X be the set of the training points, then the matrix is K(X, X).",
             "input_type": "text",
         },
     )
@@ -100,10 +102,10 @@ class InputParametersSchema(FrontendFormBaseSchema):
         required=False,
         allow_none=True,
         data_input_type="kernel-matrix",
-        data_content_types=["application/json"],
+        data_content_types=["application/json", MATRIX_MIMETYPE],
         metadata={
             "label": "Test kernel matrix URL",
-            "description": "URL to a json file, containing the kernel matrix. Let X be the set of the training points and T be the set of test points, then the matrix is K(X, T).",
+            "description": "URL to a json or binary matrix file, containing the kernel matrix. Let X be the set of the training points and T be the set of test points, then the matrix is K(X, T).",
             "input_type": "text",
         },
     )
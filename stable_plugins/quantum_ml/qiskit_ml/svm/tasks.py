@@ -28,6 +28,8 @@ from .schemas import (
 from qhana_plugin_runner.celery import CELERY
 from qhana_plugin_runner.db.models.tasks import ProcessingTask
 from qhana_plugin_runner.plugin_utils.entity_marshalling import save_entities
+from qhana_plugin_runner.plugin_utils.kernel_cache import get_kernel_cache
+from qhana_plugin_runner.plugin_utils.visualization import get_model_hash
 from qhana_plugin_runner.storage import STORE
 from qhana_plugin_runner.requests import retrieve_filename
 from .backend.load_utils import (
@@ -128,6 +130,18 @@ def calculation_task(self, db_id: int) -> str:
 
     # Prepare additional parameters for the chosen kernel
     if not kernel_enum.is_classical():
+        # all parameters that influence the kernel values
+        cache_config = {
+            "plugin": SVM.instance.identifier,
+            "kernel": kernel_enum.name,
+            "data_map": data_maps_enum.name,
+            "entanglement_pattern": entanglement_pattern.name,
+            "paulis": paulis,
+            "reps": reps,
+            "backend": backend.name,
+            "custom_backend": custom_backend,
+            "shots": shots,
+        }
         backend = backend.get_qiskit_backend(ibmq_token, custom_backend, shots)
         kernel_kwargs = dict(
             backend=backend,
@@ -137,15 +151,26 @@ def calculation_task(self, db_id: int) -> str:
             entanglement_pattern=entanglement_pattern.get_pattern(),
             data_map_func=data_maps_enum.get_data_mapping(),
         )
+        kernel_cache = get_kernel_cache()
+        quantum_kernel = kernel_enum.get_kernel(**kernel_kwargs)
+
+        def kernel(data_x: np.ndarray, data_y: np.ndarray) -> np.ndarray:
+            # reuse the kernel values of previous runs (e.g. with a different regularization),
+            # the svc is fitted with kernel(X, X), the values of prediction queries
+            # (test data and visualization grid) are not stored in the cache
+            return kernel_cache.get_kernel_matrix(
+                cache_config, quantum_kernel, data_x, data_y, store=data_x is data_y
+            )
+
     else:
-        kernel_kwargs = dict()
+        kernel = kernel_enum.get_kernel()
 
     # Get trained Support Vector Classifier (SVC)
     svc = get_svc(
         train_data,
         train_labels,
         regularization_C,
-        kernel_enum.get_kernel(**kernel_kwargs),
+        kernel,
         degree,
         train_kernel,
     )
@@ -194,6 +219,16 @@ def calculation_task(self, db_id: int) -> str:
             title=plot_title,
             label_to_int=label_to_int,
             support_vectors=svc.support_,
+            # the fitted svc and the kernel determine the background predictions
+            model_hash=get_model_hash(
+                kernel_enum.name,
+                cache_config if not kernel_enum.is_classical() else None,
+                degree,
+                train_data,
+                svc.support_,
+                svc.dual_coef_,
+                svc.intercept_,
+            ),
         )
 
     # Prepare support vectors
@@ -262,4 +297,6 @@ def calculation_task(self, db_id: int) -> str:
             "application/json",
         )
 
+    if not kernel_enum.is_classical():
+        return f"Result stored in file (kernel cache: {kernel_cache.info()})"
     return "Result stored in file"
@@ -18,6 +18,7 @@ from typing import List, Optional
 
 from qiskit_machine_learning.algorithms.classifiers import VQC
 from qiskit.utils import QuantumInstance
+from qiskit.utils.backend_utils import is_aer_provider
 from qiskit import QuantumCircuit
 from qiskit.circuit.library import (
     TwoLocal,
@@ -27,6 +28,8 @@ from qiskit.circuit.library import (
 )
 from qiskit.algorithms.optimizers import Optimizer
 
+from qhana_plugin_runner.plugin_utils.circuit_cache import get_cached_circuit
+
 from .optimizer import OptimizerEnum
 
 
@@ -78,6 +81,7 @@ class QiskitVQC:
             optimizer=optimizer,
             quantum_instance=quantum_instance,
         )
+        self.__cached_circuit = None
 
     def prep_labels(self, labels: np.ndarray) -> (np.ndarray, dict):
         n_samples = len(labels)
@@ -101,10 +105,61 @@ class QiskitVQC:
         # fit vqc
         self.__vqc.fit(train_data, labels_onehot)
 
+    def _predict_probabilities(self, test_data: np.ndarray) -> Optional[np.ndarray]:
+        """Compute the class probabilities of all test points with one cached circuit.
+
+        The transpiled circuit of the trained network is reused across calls and all
+        test points are bound in bulk. Returns None if the quantum instance needs the
+        features of the qiskit machine learning implementation (statevector simulation,
+        non Aer backends, noise models or measurement error mitigation).
+        """
+        quantum_instance = self.__quantum_instance
+        network = self.__vqc._neural_network
+        if (
+            self.__vqc._fit_result is None
+            or quantum_instance.is_statevector
+            or not is_aer_provider(quantum_instance.backend)
+            or quantum_instance.backend_options
+            or quantum_instance.noise_config
+            or quantum_instance.measurement_error_mitigation_cls is not None
+            or quantum_instance.bound_pass_manager is not None
+        ):
+            return None
+
+        if self.__cached_circuit is None:
+            self.__cached_circuit = get_cached_circuit(
+                network.circuit,
+                quantum_instance.backend,
+                quantum_instance.compile_config.get("optimization_level"),
+            )
+        test_data = np.asarray(test_data, dtype=float).reshape(len(test_data), -1)
+        weights = np.repeat(self.__vqc._fit_result.x.reshape(1, -1), len(test_data), 0)
+        run_options = {}
+        seed = getattr(quantum_instance.run_config, "seed_simulator", None)
+        if seed is not None:
+            run_options["seed_simulator"] = seed
+        counts = self.__cached_circuit.get_counts(
+            list(network.input_params) + list(network.weight_params),
+            np.concatenate([test_data, weights], axis=1),
+            quantum_instance.run_config.shots,
+            **run_options,
+        )
+
+        probabilities = np.zeros((len(test_data), *network.output_shape))
+        for i, point_counts in enumerate(counts):
+            shots = sum(point_counts.values())
+            for bits, count in point_counts.items():
+                probabilities[i, network._interpret(int(bits, 2))] += count / shots
+        return probabilities
+
     def predict(self, test_data: np.ndarray) -> List[int]:
-        result = np.array(self.__vqc.predict(test_data))
-        # convert back from one-hot to class
-        label_indices = result.argmax(axis=1)
+        probabilities = self._predict_probabilities(test_data)
+        if probabilities is not None:
+            label_indices = probabilities.argmax(axis=1)
+        else:
+            result = np.array(self.__vqc.predict(test_data))
+            # convert back from one-hot to class
+            label_indices = result.argmax(axis=1)
         labels = [self.__idx_to_label[idx] for idx in label_indices]
         return labels
 
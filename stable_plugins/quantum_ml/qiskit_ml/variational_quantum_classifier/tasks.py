@@ -32,6 +32,8 @@ from qhana_plugin_runner.plugin_utils.entity_marshalling import (
     load_entities,
     ensure_dict,
 )
+from qhana_plugin_runner.plugin_utils.circuit_cache import circuit_structure_hash
+from qhana_plugin_runner.plugin_utils.visualization import get_model_hash
 from qhana_plugin_runner.requests import open_url, retrieve_filename
 from qhana_plugin_runner.storage import STORE
 
@@ -286,6 +288,15 @@ def calculation_task(self, db_id: int) -> str:
         predictor=vqc.predict,
         title=plot_title,
         label_to_int=label_to_int,
+        # the circuits, the trained weights and the backend determine the background predictions
+        model_hash=get_model_hash(
+            circuit_structure_hash(feature_map),
+            circuit_structure_hash(vqc_ansatz),
+            vqc.get_weights(),
+            train_labels,
+            backend.backend_name,
+            shots,
+        ),
     )
 
     concat_filenames = retrieve_filename(train_data_url)
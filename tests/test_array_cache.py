@@ -0,0 +1,79 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the array_cache module."""
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.plugin_utils.array_cache import ArrayCache  # noqa: E402
+
+
+class CountingLoader:
+    """Loader returning the serialized array and counting its calls."""
+
+    def __init__(self, array) -> None:
+        self.array = array
+        self.calls = 0
+
+    def __call__(self) -> bytes:
+        self.calls += 1
+        data = BytesIO()
+        np.save(data, self.array, allow_pickle=False)
+        return data.getvalue()
+
+
+def test_array_is_loaded_once(tmp_path: Path):
+    array = np.random.default_rng(0).random((20, 3))
+    loader = CountingLoader(array)
+    cache = ArrayCache(tmp_path)
+    first = cache.get_array("plugin", "1.features", loader)
+    second = ArrayCache(tmp_path).get_array("plugin", "1.features", loader)
+    assert loader.calls == 1
+    assert isinstance(second, np.memmap)
+    assert not second.flags.writeable
+    assert np.array_equal(first, array) and np.array_equal(second, array)
+
+
+def test_remove_only_affects_the_given_key(tmp_path: Path):
+    features = CountingLoader(np.arange(6.0).reshape(3, 2))
+    target = CountingLoader(np.arange(3.0))
+    cache = ArrayCache(tmp_path)
+    cache.get_array("plugin", "1.features", features)
+    cache.get_array("plugin", "2.target", target)
+    cache.remove("plugin", "1.features")
+    features.array = features.array * 2  # e.g. new data uploaded for the same key
+    assert np.array_equal(
+        cache.get_array("plugin", "1.features", features), features.array
+    )
+    cache.get_array("plugin", "2.target", target)
+    assert (features.calls, target.calls) == (2, 1)
+
+
+def test_byte_budget(tmp_path: Path):
+    array = np.zeros(100)  # 800 bytes + header
+    cache = ArrayCache(tmp_path, max_bytes=2000)
+    for key in "abc":
+        cache.get_array("plugin", key, CountingLoader(array))
+    assert sum(f.stat().st_size for f in tmp_path.glob("*.npy")) <= 2000
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+    large = np.zeros(1000)
+    result = cache.get_array("plugin", "large", CountingLoader(large))
+    assert np.array_equal(result, large)
+    assert not isinstance(result, np.memmap)
@@ -0,0 +1,62 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the array_transport module."""
+
+import pytest
+from flask import Flask
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.plugin_utils.array_transport import (  # noqa: E402
+    ARRAY_MIMETYPE,
+    accepts_binary,
+    decode_arrays,
+    encode_arrays,
+    get_request_arrays,
+)
+
+
+def test_round_trip():
+    matrix = np.arange(6).reshape(2, 3)
+    loss, weights, empty = 0.25, [1.5, -2.0], np.zeros((0, 4))
+    decoded = decode_arrays(encode_arrays(matrix, loss, weights, empty))
+    assert [a.shape for a in decoded] == [(2, 3), (), (2,), (0, 4)]
+    assert np.array_equal(decoded[0], matrix)
+    assert decoded[1] == loss
+    assert np.array_equal(decoded[2], weights)
+    assert decoded[0].dtype == np.float64
+
+
+def test_truncated_data_is_rejected():
+    data = encode_arrays(np.ones(4))
+    for end in (2, 8, len(data) - 1):
+        with pytest.raises(ValueError):
+            decode_arrays(data[:end])
+
+
+def test_content_negotiation():
+    app = Flask(__name__)
+    body = encode_arrays(np.ones(3))
+    with app.test_request_context(
+        method="POST",
+        data=body,
+        content_type=ARRAY_MIMETYPE,
+        headers={"Accept": f"{ARRAY_MIMETYPE}, application/json;q=0.5"},
+    ):
+        assert np.array_equal(get_request_arrays()[0], np.ones(3))
+        assert accepts_binary()
+    with app.test_request_context(method="POST", json={}, headers={"Accept": "*/*"}):
+        assert get_request_arrays() is None
+        assert not accepts_binary()
@@ -0,0 +1,101 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the circuit_cache module."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qiskit = pytest.importorskip("qiskit")
+
+from qiskit import BasicAer, QuantumCircuit  # noqa: E402
+from qiskit.circuit import Parameter  # noqa: E402
+
+from qhana_plugin_runner.plugin_utils.circuit_cache import (  # noqa: E402
+    cache_info,
+    circuit_structure_hash,
+    clear_circuit_cache,
+    get_cached_circuit,
+)
+
+
+def build_circuit(angle_name: str = "theta", custom_gate_reps: int = 1) -> QuantumCircuit:
+    theta = Parameter(angle_name)
+    sub_circuit = QuantumCircuit(2, name="custom")
+    for _ in range(custom_gate_reps):
+        sub_circuit.cx(0, 1)
+    circuit = QuantumCircuit(2, 2)
+    circuit.rx(theta, 0)
+    circuit.append(sub_circuit.to_gate(), [0, 1])
+    circuit.measure([0, 1], [0, 1])
+    return circuit
+
+
+def test_structure_hash():
+    assert circuit_structure_hash(build_circuit()) == circuit_structure_hash(
+        build_circuit()
+    )
+    assert circuit_structure_hash(build_circuit()) != circuit_structure_hash(
+        build_circuit("phi")
+    )
+    # same gate name, different definition
+    assert circuit_structure_hash(build_circuit()) != circuit_structure_hash(
+        build_circuit(custom_gate_reps=2)
+    )
+
+
+def test_cached_circuits_are_reused():
+    clear_circuit_cache()
+    backend = BasicAer.get_backend("qasm_simulator")
+    first = get_cached_circuit(build_circuit(), backend)
+    second = get_cached_circuit(build_circuit(), backend)
+    assert first.circuit is second.circuit
+    get_cached_circuit(build_circuit(), backend, optimization_level=0)
+    info = cache_info()
+    assert (info.hits, info.misses, info.size) == (1, 2, 2)
+    clear_circuit_cache()
+    assert cache_info().size == 0
+
+
+def test_bulk_execution():
+    clear_circuit_cache()
+    circuit = build_circuit()
+    cached = get_cached_circuit(circuit, BasicAer.get_backend("qasm_simulator"))
+    # parameters of a new circuit object are matched by name
+    params = list(build_circuit().parameters)
+    counts = cached.get_counts(params, np.array([[0.0], [np.pi]]), shots=32)
+    assert counts == [{"00": 32}, {"11": 32}]
+    bound = cached.bind(params, np.array([[0.0], [np.pi]]))
+    assert len(bound) == 2 and not any(c.parameters for c in bound)
+    with pytest.raises(ValueError):
+        cached.bind([Parameter("unknown")], np.zeros((1, 1)))
+
+
+def test_backends_with_the_same_name():
+    qiskit_aer = pytest.importorskip("qiskit_aer")
+    clear_circuit_cache()
+    aer_backend = qiskit_aer.QasmSimulator()
+    basic_backend = BasicAer.get_backend("qasm_simulator")
+    assert aer_backend.name() == basic_backend.name()
+
+    params = list(build_circuit().parameters)
+    aer_cached = get_cached_circuit(build_circuit(), aer_backend)
+    basic_cached = get_cached_circuit(build_circuit(), basic_backend)
+    assert aer_cached.circuit is not basic_cached.circuit
+    assert cache_info().misses == 2
+    # the circuit transpiled for aer keeps the rx gate that basic aer does not support
+    assert "rx" in aer_cached.circuit.count_ops()
+    assert "rx" not in basic_cached.circuit.count_ops()
+    counts = basic_cached.get_counts(params, np.array([[np.pi]]), shots=32)
+    assert counts == [{"11": 32}]
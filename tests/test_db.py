@@ -12,10 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime, timedelta, timezone
+
 from conftests import task_data
+from sqlalchemy import insert
 from sqlalchemy_json import TrackedDict, TrackedList
 
-from qhana_plugin_runner.db.models.tasks import ProcessingTask
+from qhana_plugin_runner.db.db import DB
+from qhana_plugin_runner.db.models.tasks import ProcessingTask, TaskStateTransition
 
 
 def test_mutable_json_init(task_data: ProcessingTask):
@@ -112,3 +116,69 @@ def test_mutable_json_nested(task_data: ProcessingTask):
     assert (
         task_data.data[0] == 1
     ), "Failed to persist a change to a nested list entry to the database."
+
+
+def test_task_state_transitions(task_data: ProcessingTask):
+    assert TaskStateTransition.get_current(task_data, "phase") is None
+
+    first = TaskStateTransition.transition(task_data, "phase", "setup", (None,))
+    assert first is not None and first.seq == 0, "Failed to enter the initial state."
+    assert (
+        TaskStateTransition.transition(task_data, "phase", "setup", (None,)) is None
+    ), "Entered the initial state twice."
+
+    second = TaskStateTransition.transition(
+        task_data.id, "phase", "running", ("setup",), data="http://example.com/task/1"
+    )
+    assert second is not None and second.seq == 1
+    assert TaskStateTransition.transition(task_data, "phase", "done", ("setup",)) is None
+    TaskStateTransition.transition(task_data, "other", "started")
+
+    current = TaskStateTransition.get_current(task_data, "phase")
+    assert current.state == "running" and current.data == "http://example.com/task/1"
+    states = TaskStateTransition.get_current_states(task_data)
+    assert {m: t.state for m, t in states.items()} == {
+        "phase": "running",
+        "other": "started",
+    }
+
+
+def test_concurrent_task_state_transitions(task_data: ProcessingTask, monkeypatch):
+    TaskStateTransition.transition(task_data, "phase", "setup")
+    add = DB.session.add
+
+    def add_after_concurrent_transition(instance):
+        # another worker commits a transition from the same state first
+        DB.session.execute(
+            insert(TaskStateTransition).values(
+                task_id=task_data.id,
+                machine="phase",
+                seq=1,
+                state="a",
+                created_at=datetime.utcnow(),
+            )
+        )
+        add(instance)
+
+    monkeypatch.setattr(DB.session, "add", add_after_concurrent_transition)
+    assert (
+        TaskStateTransition.transition(task_data, "phase", "b", ("setup",)) is None
+    ), "Conflicting transition was not detected."
+    monkeypatch.undo()
+
+    assert TaskStateTransition.get_current(task_data, "phase").state == "setup"
+
+
+def test_seconds_since_task_state_transition(task_data: ProcessingTask):
+    transition = TaskStateTransition.transition(task_data, "phase", "setup")
+    assert 0 <= transition.seconds_since() < 60
+
+    now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    for created_at in (
+        datetime(2024, 1, 1, 11, 59),  # naive timestamp of databases without timezones
+        datetime(2024, 1, 1, 11, 59, tzinfo=timezone.utc),
+        datetime(2024, 1, 1, 12, 59, tzinfo=timezone(timedelta(hours=1))),
+    ):
+        transition.created_at = created_at
+        assert transition.seconds_since(now) == 60
+        assert transition.seconds_since(now.replace(tzinfo=None)) == 60
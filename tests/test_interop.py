@@ -0,0 +1,111 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for calling plugin endpoints in process with the interop module."""
+
+import pytest
+from flask import Blueprint, Flask, abort, jsonify, redirect, request, url_for
+
+from qhana_plugin_runner.plugin_utils import interop
+from qhana_plugin_runner.util.plugins import QHAnaPluginBase
+
+PLUGIN_ID = "interop-test@v0-1-0"
+HOST = "runner.local:5005"
+
+
+@pytest.fixture()
+def app(monkeypatch):
+    blueprint = Blueprint(PLUGIN_ID, __name__)
+
+    @blueprint.route("/task/<int:db_id>/echo/", methods=["GET", "POST"])
+    def echo(db_id: int):
+        if request.method == "POST" and not request.data:
+            abort(400)
+        return jsonify(
+            db_id=db_id,
+            method=request.method,
+            body=request.get_data().decode(),
+            content_type=request.mimetype,
+        )
+
+    @blueprint.route("/task/<int:db_id>/start/", methods=["POST"])
+    def start(db_id: int):
+        return redirect(url_for(f"{PLUGIN_ID}.echo", db_id=db_id), 303)
+
+    app = Flask(__name__)
+    app.config["LOCAL_PLUGIN_HOSTS"] = [HOST]
+    app.register_blueprint(blueprint, url_prefix=f"/plugins/{PLUGIN_ID}")
+    app.add_url_rule("/status/", "status", lambda: "ok")
+    monkeypatch.setitem(QHAnaPluginBase.get_plugins(), PLUGIN_ID, object())
+
+    def no_http(*args, **kwargs):
+        raise AssertionError("Local endpoint was requested over HTTP!")
+
+    monkeypatch.setattr(interop.REQUEST_SESSION, "request", no_http)
+    return app
+
+
+def test_resolve_local_endpoint(app):
+    url = f"http://{HOST}/plugins/{PLUGIN_ID}/task/3/echo/"
+    with app.app_context():
+        endpoint = interop.resolve_local_endpoint(url)
+        assert endpoint is not None
+        assert endpoint.endpoint == f"{PLUGIN_ID}.echo"
+        assert endpoint.view_args == {"db_id": 3}
+        # other hosts, unknown paths and endpoints that are not plugin endpoints
+        assert interop.resolve_local_endpoint(url.replace(HOST, "other:5005")) is None
+        assert interop.resolve_local_endpoint(f"http://{HOST}/unknown/") is None
+        assert interop.resolve_local_endpoint(f"http://{HOST}/status/", "GET") is None
+    assert interop.resolve_local_endpoint(url) is None  # no app context
+
+
+def test_request_is_dispatched_in_process(app):
+    base = f"http://{HOST}/plugins/{PLUGIN_ID}/task/3"
+    with app.app_context():
+        response = interop.request_plugin_endpoint(
+            "POST",
+            f"{base}/echo/",
+            data=b"\x00\x01",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "db_id": 3,
+            "method": "POST",
+            "body": "\x00\x01",
+            "content_type": "application/octet-stream",
+        }
+
+        error = interop.request_plugin_endpoint("POST", f"{base}/echo/")
+        assert error.status_code == 400
+
+        redirected = interop.request_plugin_endpoint(
+            "POST", f"{base}/start/", json={"weights": [1.0]}
+        )
+        assert redirected.url == f"{base}/echo/"
+        assert redirected.json()["method"] == "GET"
+        assert redirected.json()["content_type"] == ""
+
+
+def test_other_hosts_are_requested_over_http(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        interop.REQUEST_SESSION,
+        "request",
+        lambda method, url, **kwargs: calls.append((method, url)),
+    )
+    url = f"http://other:5005/plugins/{PLUGIN_ID}/task/3/echo/"
+    with app.app_context():
+        interop.request_plugin_endpoint("POST", url, json={})
+    assert calls == [("POST", url)]
@@ -0,0 +1,180 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the kernel_cache module."""
+
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.plugin_utils.kernel_cache import (  # noqa: E402
+    KernelCache,
+    cache_info,
+)
+
+CONFIG = {"kernel": "rbf", "reps": 2}
+
+
+class CountingKernel:
+    """Symmetric dummy kernel counting the computed entries."""
+
+    def __init__(self) -> None:
+        self.computed = 0
+
+    def __call__(self, x, y):
+        self.computed += len(x) * len(y)
+        return rbf(x, y)
+
+
+def rbf(x, y):
+    return np.exp(-np.square(x[:, None, :] - y[None, :, :]).sum(axis=-1))
+
+
+def test_rerun_reuses_all_entries(tmp_path: Path):
+    data = np.random.default_rng(0).random((10, 3))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, block_size=4)
+    before = cache_info()
+    first = cache.get_kernel_matrix(CONFIG, kernel, data, data)
+    # the tiles of swapped blocks are only computed once
+    assert kernel.computed == 16 + 16 + 8 + 16 + 8 + 4
+    second = cache.get_kernel_matrix(CONFIG, kernel, data, data)
+    assert kernel.computed == 68
+    assert np.array_equal(first, second)
+    assert np.allclose(second, rbf(data, data))
+    assert cache.info() == (132, 68)
+    assert cache.info().hit_rate == pytest.approx(0.66)
+    after = cache_info()
+    assert (after.hits - before.hits, after.misses - before.misses) == (132, 68)
+
+
+def test_added_points_only_compute_new_tiles(tmp_path: Path):
+    data = np.random.default_rng(1).random((12, 3))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, block_size=4)
+    cache.get_kernel_matrix(CONFIG, kernel, data[:8], data[:8])
+    kernel.computed = 0
+    matrix = cache.get_kernel_matrix(CONFIG, kernel, data, data)
+    # only the tiles of the new block are computed
+    assert kernel.computed == 4 * 12
+    assert np.allclose(matrix, rbf(data, data))
+    # swapped arguments are served from the cache
+    kernel.computed = 0
+    matrix = cache.get_kernel_matrix(CONFIG, kernel, data[4:], data[:8])
+    assert kernel.computed == 0
+    assert np.allclose(matrix, rbf(data[4:], data[:8]))
+    # other configurations do not share entries
+    cache.get_kernel_matrix({**CONFIG, "reps": 3}, kernel, data[:2], data[:2])
+    assert kernel.computed == 4
+
+
+def test_unrelated_data_does_not_grow_entries(tmp_path: Path):
+    rng = np.random.default_rng(6)
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, block_size=4)
+    cache.get_kernel_matrix(CONFIG, kernel, *2 * [rng.random((8, 2))])
+    sizes = {path: path.stat().st_size for path in tmp_path.glob("*.npy")}
+    assert len(sizes) == 3
+    cache.get_kernel_matrix(CONFIG, kernel, *2 * [rng.random((8, 2))])
+    assert len(list(tmp_path.glob("*.npy"))) == 6
+    assert all(path.stat().st_size == size for path, size in sizes.items())
+
+
+def test_swapped_rectangular_matrix(tmp_path: Path):
+    rng = np.random.default_rng(5)
+    data_x, data_y = rng.random((7, 2)), rng.random((4, 2))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, block_size=3)
+    cache.get_kernel_matrix(CONFIG, kernel, data_x, data_y)
+    matrix = cache.get_kernel_matrix(CONFIG, kernel, data_y, data_x)
+    assert kernel.computed == 28
+    assert np.allclose(matrix, rbf(data_y, data_x))
+
+
+def test_queries_without_store(tmp_path: Path):
+    rng = np.random.default_rng(7)
+    train, test = rng.random((6, 2)), rng.random((5, 2))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, block_size=4)
+    cache.get_kernel_matrix(CONFIG, kernel, train, train)
+    entries = set(tmp_path.glob("*.npy"))
+    matrix = cache.get_kernel_matrix(CONFIG, kernel, test, train, store=False)
+    assert np.allclose(matrix, rbf(test, train))
+    assert set(tmp_path.glob("*.npy")) == entries
+    kernel.computed = 0
+    cache.get_kernel_matrix(CONFIG, kernel, test, train, store=False)
+    assert kernel.computed == 30
+    # cached tiles are still read
+    cache.get_kernel_matrix(CONFIG, kernel, train, train, store=False)
+    assert kernel.computed == 30
+
+
+def test_point_values(tmp_path: Path):
+    data = np.random.default_rng(2).random((6, 2))
+    cache = KernelCache(tmp_path, block_size=2)
+    calls = []
+
+    def compute(points):
+        calls.append(len(points))
+        return points * 2
+
+    cache.get_point_values(CONFIG, compute, data[:4])
+    values = cache.get_point_values(CONFIG, compute, data)
+    assert calls == [4, 2]
+    assert np.array_equal(values, data * 2)
+    assert cache.info() == (4, 6)
+
+
+def test_lru_eviction(tmp_path: Path):
+    data = np.random.default_rng(3).random((16, 2))
+    kernel = CountingKernel()
+    # room for two of the three 8x8 tiles of a configuration
+    cache = KernelCache(tmp_path, max_bytes=1400, block_size=8)
+    cache.get_kernel_matrix({"reps": 1}, kernel, data, data)
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+    kernel.computed = 0
+    cache.get_kernel_matrix({"reps": 1}, kernel, data, data)
+    # only the least recently used tile was evicted
+    assert kernel.computed == 64
+    cache.get_kernel_matrix({"reps": 2}, kernel, data[:8], data[:8])
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+    kernel.computed = 0
+    cache.get_kernel_matrix({"reps": 2}, kernel, data[:8], data[:8])
+    assert kernel.computed == 0
+
+
+def test_tiles_larger_than_the_cache(tmp_path: Path):
+    data = np.random.default_rng(8).random((8, 2))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path, max_bytes=400, block_size=4)
+    cache.get_kernel_matrix(CONFIG, kernel, data[:4], data[:4])
+    entries = set(tmp_path.glob("*.npy"))
+    assert len(entries) == 1
+    # a tile that does not fit is not stored and does not evict other tiles
+    KernelCache(tmp_path, max_bytes=400, block_size=8).get_kernel_matrix(
+        CONFIG, kernel, data, data
+    )
+    assert set(tmp_path.glob("*.npy")) == entries
+
+
+def test_disabled_cache(tmp_path: Path):
+    data = np.random.default_rng(4).random((4, 2))
+    kernel = CountingKernel()
+    cache = KernelCache(tmp_path / "cache", max_bytes=0)
+    cache.get_kernel_matrix(CONFIG, kernel, data, data)
+    cache.get_kernel_matrix(CONFIG, kernel, data, data)
+    assert kernel.computed == 32
+    assert not (tmp_path / "cache").exists()
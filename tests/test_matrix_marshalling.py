@@ -0,0 +1,111 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the matrix_marshalling module."""
+
+from io import BytesIO, StringIO
+from json import dumps, loads
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.plugin_utils.matrix_marshalling import (  # noqa: E402
+    MATRIX_MIMETYPE,
+    PairwiseMatrix,
+    load_matrix,
+    save_matrix,
+)
+
+
+class ResponseDummy:
+    """Dummy to simulate reading a written file as a response object."""
+
+    def __init__(self, data: bytes, raw: Optional[Any] = None) -> None:
+        self.content = data
+        self.raw = raw
+        self.headers = {}
+        self.url = "http://localhost/matrix"
+
+    def json(self, **kwargs):
+        return loads(self.content)
+
+
+def build_matrix(size: int, seed: int, symmetric: bool = False) -> PairwiseMatrix:
+    values = np.random.default_rng(seed).random((size, size))
+    if symmetric:
+        values = values + values.T
+    ids = [f"entity{i}" for i in range(size)]
+    return PairwiseMatrix(ids, ids, values)
+
+
+@given(size=st.integers(min_value=1, max_value=12), seed=st.integers(0, 1000))
+def test_json_roundtrip(size: int, seed: int):
+    matrix = build_matrix(size, seed)
+    output = StringIO()
+    save_matrix(matrix, output, "application/json", value_key="kernel")
+    loaded = load_matrix(
+        ResponseDummy(output.getvalue().encode()), "application/json", "kernel"
+    )
+    assert list(loaded.row_ids) == list(matrix.row_ids)
+    assert list(loaded.col_ids) == list(matrix.col_ids)
+    assert np.array_equal(loaded.values, matrix.values)
+
+
+@given(
+    size=st.integers(min_value=1, max_value=12),
+    seed=st.integers(0, 1000),
+    layout=st.sampled_from(["dense", "upper-triangular", "coo"]),
+    dtype=st.sampled_from(["float32", "float64"]),
+)
+def test_binary_roundtrip(size: int, seed: int, layout: str, dtype: str):
+    matrix = build_matrix(size, seed, symmetric=True)
+    output = BytesIO()
+    save_matrix(matrix, output, MATRIX_MIMETYPE, dtype=dtype, layout=layout)
+    # mimetype is detected from the magic bytes
+    loaded = load_matrix(ResponseDummy(output.getvalue()))
+    assert list(loaded.row_ids) == list(matrix.row_ids)
+    assert list(loaded.col_ids) == list(matrix.col_ids)
+    assert loaded.values.dtype == np.dtype(dtype)
+    assert np.array_equal(loaded.values, matrix.values.astype(dtype))
+
+
+def test_binary_memory_mapped(tmp_path: Path):
+    matrix = PairwiseMatrix(["a", "b"], ["x", "y", "z"], np.arange(6.0).reshape(2, 3))
+    path = tmp_path / "matrix.matrix"
+    with path.open("wb") as output:
+        save_matrix(matrix, output)
+    with path.open("rb") as raw:
+        loaded = load_matrix(ResponseDummy(b"", raw=raw), MATRIX_MIMETYPE)
+        assert list(loaded.row_ids) == ["a", "b"]
+        assert list(loaded.col_ids) == ["x", "y", "z"]
+        assert np.array_equal(loaded.values, matrix.values)
+
+
+def test_json_square_matrix_uses_row_order():
+    pairs = [
+        {"entity_1_ID": "a", "entity_2_ID": "b", "distance": 1.0},
+        {"entity_1_ID": "b", "entity_2_ID": "a", "distance": 2.0},
+        {"entity_1_ID": "a", "entity_2_ID": "a", "distance": 0.0},
+        {"entity_1_ID": "b", "entity_2_ID": "b", "distance": 0.0},
+    ]
+    response = ResponseDummy(dumps(pairs).encode())
+    loaded = load_matrix(response, "application/json")
+    assert list(loaded.row_ids) == ["a", "b"]
+    assert list(loaded.col_ids) == ["a", "b"]
+    assert np.array_equal(loaded.values, np.array([[0.0, 1.0], [2.0, 0.0]]))
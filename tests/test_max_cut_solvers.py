@@ -0,0 +1,112 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests comparing the max cut solvers of the max cut plugin with a brute force search."""
+
+from itertools import product
+
+import pytest
+
+np = pytest.importorskip("numpy")
+nx = pytest.importorskip("networkx")
+
+from utils import load_plugin_module  # noqa: E402
+
+
+def load_solver_module(name: str):
+    """Load a solver module without the optional dependencies of the other solvers."""
+    return load_plugin_module(
+        "stable_plugins/quantum_ml/max_cut/max_cut/backend/max_cut_solver",
+        name,
+        "max_cut_solvers",
+    )
+
+
+def random_graph(rng, num_nodes: int) -> nx.Graph:
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    for i in range(num_nodes):
+        for j in range(i + 1, num_nodes):
+            if rng.random() < 0.7:
+                graph.add_edge(i, j, weight=float(rng.integers(0, 10)))
+    return graph
+
+
+def cut_value(graph: nx.Graph, cut) -> float:
+    return sum(weight for u, v, weight in graph.edges(data="weight") if cut[u] != cut[v])
+
+
+def brute_force_max_cut(graph: nx.Graph) -> float:
+    return max(
+        cut_value(graph, cut) for cut in product((0, 1), repeat=graph.number_of_nodes())
+    )
+
+
+@pytest.mark.parametrize(
+    "block_bits,parallel_min_vertices,processes",
+    [
+        (18, 28, 1),  # all cuts in one numpy block
+        (2, 28, 1),  # gray code enumeration of the remaining vertices
+        (2, 5, 3),  # search split across worker processes
+    ],
+)
+def test_classic_naive_max_cut(monkeypatch, block_bits, parallel_min_vertices, processes):
+    solver_module = load_solver_module("classic_naive_max_cut_solver")
+    monkeypatch.setattr(solver_module, "BLOCK_BITS", block_bits)
+    monkeypatch.setattr(solver_module, "PARALLEL_MIN_VERTICES", parallel_min_vertices)
+
+    rng = np.random.default_rng(42)
+    for num_nodes in range(2, 11):
+        for _ in range(3):
+            graph = random_graph(rng, num_nodes)
+            cut, value = solver_module.ClassicNaiveMaxCutSolver(graph, processes).solve()
+            assert value == brute_force_max_cut(graph)
+            assert cut_value(graph, cut) == value
+
+
+def test_vqe_cut_values():
+    pytest.importorskip("qiskit")
+    solver_module = load_solver_module("vqe_max_cut_solver")
+
+    rng = np.random.default_rng(3)
+    graph = random_graph(rng, 7)
+    edges = solver_module.edge_list(nx.to_numpy_array(graph, nodelist=range(7)))
+    bitstrings = np.arange(2**7)
+    expected = [cut_value(graph, [(b >> i) & 1 for i in range(7)]) for b in bitstrings]
+    np.testing.assert_array_equal(
+        solver_module.cut_values(bitstrings, edges, 7), expected
+    )
+
+
+def test_vqe_max_cut():
+    pytest.importorskip("qiskit")
+    from qiskit.algorithms.optimizers import COBYLA
+    from qiskit.primitives import BackendSampler
+    from qiskit.providers.aer import AerSimulator
+    from qiskit.utils import algorithm_globals
+
+    solver_module = load_solver_module("vqe_max_cut_solver")
+    algorithm_globals.random_seed = 42
+    sampler = BackendSampler(AerSimulator(seed_simulator=42), options={"shots": 1024})
+
+    rng = np.random.default_rng(42)
+    for num_nodes in range(3, 7):
+        graph = random_graph(rng, num_nodes)
+        adjacency_matrix = nx.to_numpy_array(graph, nodelist=range(num_nodes))
+        cut, value = solver_module.VQEMaxCutSolver(
+            adjacency_matrix, sampler, COBYLA(maxiter=20)
+        ).solve()
+        # the best sampled cut is returned, the small graphs are sampled completely
+        assert value == brute_force_max_cut(graph)
+        assert cut_value(graph, cut) == value
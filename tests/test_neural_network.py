@@ -0,0 +1,86 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the minibatches and the sharded evaluation of the neural network objective function."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+from utils import REPOSITORY_ROOT, load_plugin_module  # noqa: E402
+
+# the spawned shard workers import the module by this name from the plugin folder
+neural_network = load_plugin_module(
+    "plugins/neural_network", "neural_network", "neural_network"
+)
+
+
+@pytest.fixture()
+def data():
+    rng = np.random.default_rng(42)
+    features = torch.from_numpy(rng.normal(size=(1000, 8)).astype(np.float32))
+    target = torch.from_numpy(rng.integers(0, 2, size=1000).astype(np.float32))
+    network = neural_network.NN(8, 16)
+    weights = rng.normal(size=network.number_of_weights)
+    return network, weights, features, target
+
+
+def test_minibatch_indices_are_reproducible():
+    for step in (0, 3, 17):
+        first = neural_network.minibatch_indices(100, 32, 7, step)
+        neural_network._epoch_permutation.cache_clear()
+        assert np.array_equal(first, neural_network.minibatch_indices(100, 32, 7, step))
+    assert not np.array_equal(
+        neural_network.minibatch_indices(100, 32, 7, 0),
+        neural_network.minibatch_indices(100, 32, 8, 0),
+    )
+
+
+def test_minibatch_indices_are_a_permutation_per_epoch():
+    # 4 minibatches per epoch, the last one has 4 samples
+    epochs = [
+        [neural_network.minibatch_indices(100, 32, 7, step) for step in range(e, e + 4)]
+        for e in (0, 4, 8)
+    ]
+    for batches in epochs:
+        assert [len(batch) for batch in batches] == [32, 32, 32, 4]
+        assert np.array_equal(np.sort(np.concatenate(batches)), np.arange(100))
+    # every epoch is shuffled differently
+    assert not np.array_equal(np.concatenate(epochs[0]), np.concatenate(epochs[1]))
+
+
+def test_sharded_evaluation_equals_single_evaluation(data, monkeypatch):
+    network, weights, features, target = data
+    monkeypatch.syspath_prepend(str(REPOSITORY_ROOT / "plugins"))
+    monkeypatch.setattr(neural_network, "SHARD_MIN_SAMPLES", 100)
+    features.share_memory_()
+    target.share_memory_()
+    minibatch = neural_network.minibatch_indices(len(features), 300, 1, 2)
+
+    for indices in (None, minibatch):
+        loss, gradient = neural_network.evaluate_sharded(
+            network, weights, features, target, indices
+        )
+        sharded_loss, sharded_gradient = neural_network.evaluate_sharded(
+            network, weights, features, target, indices, processes=2
+        )
+        assert sharded_loss == pytest.approx(loss, rel=1e-6)
+        np.testing.assert_allclose(sharded_gradient, gradient, rtol=1e-5, atol=1e-7)
+        sharded_loss, no_gradient = neural_network.evaluate_sharded(
+            network, weights, features, target, indices, processes=2, with_gradient=False
+        )
+        assert sharded_loss == pytest.approx(loss, rel=1e-6)
+        assert no_gradient is None
+    assert neural_network._POOL is not None
@@ -0,0 +1,171 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for calling evaluation endpoints of objective functions."""
+
+from http import HTTPStatus
+from json import dumps
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import marshmallow as ma
+import pytest
+from flask import Flask
+from flask.views import MethodView
+from flask_smorest import Api, Blueprint
+from requests import Response
+from requests.exceptions import HTTPError
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.api.util import MaBaseSchema  # noqa: E402
+from qhana_plugin_runner.plugin_utils import objective_function  # noqa: E402
+from qhana_plugin_runner.plugin_utils.array_transport import (  # noqa: E402
+    ARRAY_MIMETYPE,
+    decode_arrays,
+    encode_arrays,
+)
+
+URL = "http://objective.local/plugins/of@v0-1-0/task/1/loss/"
+
+
+def make_response(status_code: int, body: bytes = b"", mimetype: str = "") -> Response:
+    response = Response()
+    response.status_code = status_code
+    response.url = URL
+    response._content = body
+    if mimetype:
+        response.headers["Content-Type"] = mimetype
+    return response
+
+
+@pytest.fixture()
+def endpoint(monkeypatch):
+    """Fake evaluation endpoint, the status code for binary requests can be changed with ``binary_status``."""
+    calls = []
+
+    def request_plugin_endpoint(
+        method, url, json=None, data=None, headers=None, **kwargs
+    ):
+        calls.append("json" if json is not None else "binary")
+        if json is not None:
+            loss = float(np.sum(json["weights"]))
+            return make_response(200, dumps({"loss": loss}).encode(), "application/json")
+        if endpoint.binary_status != 200:
+            return make_response(endpoint.binary_status)
+        (weights,) = decode_arrays(data)
+        return make_response(200, encode_arrays(np.sum(weights)), ARRAY_MIMETYPE)
+
+    endpoint = SimpleNamespace(binary_status=200, calls=calls)
+    monkeypatch.setattr(
+        objective_function, "request_plugin_endpoint", request_plugin_endpoint
+    )
+    monkeypatch.setattr(objective_function, "_JSON_ONLY_ENDPOINTS", set())
+    return endpoint
+
+
+def test_evaluate_binary(endpoint):
+    (loss,) = objective_function.evaluate(URL, np.array([1.0, 2.0]), ("loss",))
+    assert loss == 3.0
+    assert endpoint.calls == ["binary"]
+
+
+@pytest.mark.parametrize("status_code", [400, 406, 415, 422])
+def test_evaluate_falls_back_to_json(endpoint, status_code):
+    endpoint.binary_status = status_code
+    for _ in range(2):
+        (loss,) = objective_function.evaluate(URL, np.array([1.0, 2.0]), ("loss",))
+        assert loss == 3.0
+    # the endpoint is remembered as json only
+    assert endpoint.calls == ["binary", "json", "json"]
+
+
+@pytest.mark.parametrize("status_code", [500, 503])
+def test_evaluate_raises_other_errors(endpoint, status_code):
+    endpoint.binary_status = status_code
+    with pytest.raises(HTTPError):
+        objective_function.evaluate(URL, np.array([1.0, 2.0]), ("loss",))
+    assert endpoint.calls == ["binary"]
+    assert URL not in objective_function._JSON_ONLY_ENDPOINTS
+
+
+def test_evaluate_raises_if_json_fails_too(endpoint, monkeypatch):
+    endpoint.binary_status = 422
+
+    def request_plugin_endpoint(method, url, json=None, data=None, **kwargs):
+        endpoint.calls.append("json" if json is not None else "binary")
+        return make_response(422)
+
+    monkeypatch.setattr(
+        objective_function, "request_plugin_endpoint", request_plugin_endpoint
+    )
+    with pytest.raises(HTTPError):
+        objective_function.evaluate(URL, np.array([1.0, 2.0]), ("loss",))
+    assert endpoint.calls == ["binary", "json"]
+    assert URL not in objective_function._JSON_ONLY_ENDPOINTS
+
+
+@pytest.fixture()
+def json_only_endpoint(monkeypatch):
+    """Evaluation endpoint that parses the weights from a json body only (like objective functions without binary support)."""
+    app = Flask(__name__)
+    app.config.update(API_TITLE="test", API_VERSION="v1", OPENAPI_VERSION="3.0.2")
+    api = Api(app)
+    blp = Blueprint("objective", __name__, url_prefix=urlsplit(URL).path)
+
+    class EvaluateRequestSchema(MaBaseSchema):
+        weights = ma.fields.List(ma.fields.Number(), required=True, allow_none=False)
+
+    class LossResponseSchema(MaBaseSchema):
+        loss = ma.fields.Number(required=True, allow_none=False)
+
+    @blp.route("")
+    class LossView(MethodView):
+        @blp.arguments(
+            EvaluateRequestSchema(unknown=ma.EXCLUDE), location="json", required=True
+        )
+        @blp.response(HTTPStatus.OK, LossResponseSchema())
+        def post(self, input_data: dict) -> dict:
+            return {"loss": sum(input_data["weights"])}
+
+    api.register_blueprint(blp)
+    client = app.test_client()
+    status_codes = []
+
+    def request_plugin_endpoint(
+        method, url, json=None, data=None, headers=None, **kwargs
+    ):
+        flask_response = client.open(
+            urlsplit(url).path, method=method, json=json, data=data, headers=headers
+        )
+        status_codes.append(flask_response.status_code)
+        return make_response(
+            flask_response.status_code,
+            flask_response.get_data(),
+            flask_response.mimetype,
+        )
+
+    monkeypatch.setattr(
+        objective_function, "request_plugin_endpoint", request_plugin_endpoint
+    )
+    monkeypatch.setattr(objective_function, "_JSON_ONLY_ENDPOINTS", set())
+    return status_codes
+
+
+def test_evaluate_json_only_endpoint(json_only_endpoint):
+    for _ in range(2):
+        (loss,) = objective_function.evaluate(URL, np.array([1.0, 2.0]), ("loss",))
+        assert loss == 3.0
+    # the binary body is rejected as missing json data, then json is used directly
+    assert json_only_endpoint == [422, 200, 200]
@@ -0,0 +1,127 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests comparing the emulated amplitude amplification of the basheer hamming qknn with its circuits."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qml = pytest.importorskip("pennylane")
+
+from utils import load_plugin_module  # noqa: E402
+
+BACKEND_PATH = (
+    "stable_plugins/quantum_ml/pennylane_qiskit_ml/quantum_k_nearest_neighbours/backend"
+)
+
+
+def load_backend_module(name: str):
+    return load_plugin_module(BACKEND_PATH, name, "qknn_backend")
+
+
+@pytest.fixture(scope="module")
+def basheer_qknn():
+    basheer_hamming = load_backend_module("qknns.basheer_hamming")
+    # three distinct points, the first one is repeated as fourth point
+    train_data = np.array([[0, 1, 1], [1, 0, 0], [1, 1, 0]])
+    train_wires, idx_wires, ancilla_wires = np.split(
+        np.arange(
+            sum(basheer_hamming.BasheerHammingQkNN.get_necessary_wires(train_data))
+        ),
+        [3, 5],
+    )
+    device = qml.device("default.qubit", wires=len(train_wires) + 2 + len(ancilla_wires))
+    return basheer_hamming.BasheerHammingQkNN(
+        train_data,
+        np.array([0, 1, 1]),
+        1,
+        train_wires.tolist(),
+        idx_wires.tolist(),
+        ancilla_wires.tolist(),
+        device,
+    )
+
+
+@pytest.mark.parametrize("x", [[0, 1, 1], [1, 0, 1], [1, 1, 1]])
+def test_basheer_emulation_matches_circuits(basheer_qknn, x):
+    amplitude_amplification = load_backend_module("amplitude_amplification")
+    utils = load_backend_module("utils")
+    qknn = basheer_qknn
+    x = np.array(x)
+    distances = np.abs(qknn.train_data - x).sum(axis=1)
+    p = utils.ceil_log2(qknn.train_data.shape[1])
+    for threshold in range(4):
+        for chosen_indices in ([0], [1], [2]):
+            a = utils.int_to_bitlist(
+                int(2**p - qknn.train_data.shape[1] + threshold), p + 2
+            )
+            oracle_one_circuit = qknn.get_oracle_wire_to_one_circuit(x, a, chosen_indices)
+            oracle_phase_circuit = qknn.get_phase_oracle_circuit(x, a, chosen_indices)
+
+            # the points marked by the oracle
+            @qml.qnode(qknn.backend)
+            def marked_circuit():
+                qknn.idx_circuit()
+                oracle_one_circuit()
+                return qml.probs(wires=[qknn.oracle_wire] + qknn.idx_wires)
+
+            marked = np.round(marked_circuit().reshape(2, -1)[1] * len(qknn.train_data))
+            good_fraction = marked.mean()
+            emulated = [
+                qknn.emulate_better_training_point_idx(
+                    distances, threshold, chosen_indices, 1024
+                )
+                for _ in range(20)
+            ]
+            if good_fraction == 0:
+                assert all(idx is None for idx, _ in emulated)
+            else:
+                marked_indices = np.flatnonzero(marked) % qknn.num_train_data
+                for idx, distance in emulated:
+                    assert idx in marked_indices
+                    assert distance == distances[idx]
+
+            if chosen_indices != [0]:
+                continue  # the grover iterations only depend on the fraction of marked points
+
+            # the success probability of the grover iterations
+            for itr in range(4):
+
+                @qml.qnode(qknn.backend)
+                def aa_circuit():
+                    qknn.idx_circuit()
+                    amplitude_amplification.aa_steps(
+                        qknn.idx_circuit,
+                        qknn.idx_circuit,
+                        qknn.zero_circuit,
+                        oracle_phase_circuit,
+                        itr,
+                    )
+                    oracle_one_circuit()
+                    return qml.probs(wires=[qknn.oracle_wire])
+
+                assert aa_circuit()[1] == pytest.approx(
+                    amplitude_amplification.aa_success_probability(good_fraction, itr),
+                    abs=1e-8,
+                )
+
+
+def test_basheer_label_points_analytic(basheer_qknn):
+    qknn = basheer_qknn
+    qknn.set_analytic_simulation(True, 1024)
+    # the nearest neighbour of each training point is the point itself
+    assert qknn.label_points(qknn.train_data[:3]) == [0, 1, 1]
+    qknn.set_analytic_simulation(True, None)
+    with pytest.raises(ValueError):
+        qknn.label_points(qknn.train_data[:3])
@@ -0,0 +1,46 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the quantum_backends module."""
+
+import pytest
+
+qml = pytest.importorskip("pennylane")
+
+from qhana_plugin_runner.plugin_utils.quantum_backends import (  # noqa: E402
+    get_pennylane_device,
+    reset_pooled_devices,
+)
+
+
+def test_simulator_devices_are_pooled():
+    device = get_pennylane_device("default.qubit", wires=2, shots=10)
+    assert get_pennylane_device("default.qubit", wires=2, shots=10) is device
+    assert get_pennylane_device("default.qubit", wires=2, shots=20) is not device
+    assert get_pennylane_device("default.qubit", wires=3, shots=10) is not device
+    reset_pooled_devices(clear=True)
+    assert get_pennylane_device("default.qubit", wires=2, shots=10) is not device
+
+
+def test_pooled_devices_are_reset():
+    device = get_pennylane_device("default.qubit", wires=1)
+
+    @qml.qnode(device)
+    def circuit():
+        qml.PauliX(wires=0)
+        return qml.state()
+
+    circuit()
+    assert get_pennylane_device("default.qubit", wires=1) is device
+    assert device.state[0] == 1
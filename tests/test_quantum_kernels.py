@@ -0,0 +1,98 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests comparing the exact statevector mode of the quantum kernel estimation plugins with the circuit evaluation."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils import load_plugin_module  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    return rng.uniform(0, 2, (5, 3)), rng.uniform(0, 2, (3, 3))
+
+
+@pytest.fixture(scope="module")
+def pennylane_kernels():
+    pytest.importorskip("pennylane")
+    return load_plugin_module(
+        "stable_plugins/quantum_ml/pennylane_qiskit_ml/quantum_kernel_estimation/backend/kernels",
+        "kernel",
+        "quantum_kernel_estimation_kernels",
+    )
+
+
+@pytest.mark.parametrize(
+    "kernel", ["havlicek_kernel"] + [f"suzuki_kernel{eq}" for eq in range(8, 13)]
+)
+@pytest.mark.parametrize("entanglement_pattern", ["full", "linear", "circular"])
+def test_pennylane_exact_kernels(pennylane_kernels, data, kernel, entanglement_pattern):
+    import pennylane as qml
+
+    data_x, data_y = data
+    backend = qml.device("default.qubit", wires=6, shots=None)
+
+    def evaluate(x, y, exact):
+        return (
+            pennylane_kernels.KernelEnum[kernel]
+            .get_kernel(
+                backend,
+                n_qbits=3,
+                reps=2,
+                entanglement_pattern_enum=pennylane_kernels.EntanglementPatternEnum[
+                    entanglement_pattern
+                ],
+                exact=exact,
+            )
+            .evaluate(x, y)[0]
+        )
+
+    for x, y in ((data_x, data_x), (data_x, data_y)):
+        circuit_kernel = evaluate(x, y, exact=False)
+        exact_kernel = evaluate(x, y, exact=True)
+        assert exact_kernel.shape == (len(y), len(x))
+        np.testing.assert_allclose(exact_kernel, circuit_kernel, atol=1e-10)
+
+
+@pytest.mark.parametrize(
+    "kernel", ["z_feature_map", "zz_feature_map", "pauli_feature_map"]
+)
+@pytest.mark.parametrize("entanglement_pattern", ["full", "linear", "circular"])
+def test_qiskit_exact_kernels(data, kernel, entanglement_pattern):
+    pytest.importorskip("qiskit_machine_learning")
+    from qiskit import Aer
+    from qiskit.utils import QuantumInstance
+
+    qiskit_kernels = load_plugin_module(
+        "stable_plugins/quantum_ml/qiskit_ml/qiskit_quantum_kernel_estimation/backend",
+        "kernel",
+        "qiskit_quantum_kernel_estimation_backend",
+    )
+    data_x, data_y = data
+    backend = QuantumInstance(Aer.get_backend("statevector_simulator"))
+    quantum_kernel = qiskit_kernels.KernelEnum[kernel].get_kernel(
+        backend, 3, ["Z", "ZZ", "YY"], 2, entanglement_pattern
+    )
+
+    for x, y in ((data_x, data_x), (data_x, data_y)):
+        circuit_kernel = quantum_kernel.evaluate(x, y)
+        exact_kernel = qiskit_kernels.evaluate_exact_kernel(
+            quantum_kernel.feature_map, x, y
+        )
+        assert exact_kernel.shape == (len(x), len(y))
+        np.testing.assert_allclose(exact_kernel, circuit_kernel, atol=1e-10)
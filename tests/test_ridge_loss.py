@@ -0,0 +1,97 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests comparing the moment based ridge loss of the ridge loss plugin with the direct formula."""
+
+from importlib import import_module
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from conftests import DEFAULT_TEST_CONFIG  # noqa: E402
+from qhana_plugin_runner import create_app  # noqa: E402
+from utils import REPOSITORY_ROOT  # noqa: E402
+
+ALPHA = 0.3
+
+
+@pytest.fixture(scope="module")
+def ridge_tasks(tmp_path_factory):
+    """The tasks module of the ridge loss plugin (needs an app with the plugin loaded)."""
+    plugin_folder = tmp_path_factory.mktemp("plugins")
+    (plugin_folder / "ridge_loss").symlink_to(REPOSITORY_ROOT / "plugins" / "ridge_loss")
+    test_config = {}
+    test_config.update(DEFAULT_TEST_CONFIG)
+    test_config.update(
+        {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "PLUGIN_FOLDERS": [str(plugin_folder)],
+        }
+    )
+    create_app(test_config)
+    return import_module("ridge_loss.tasks")
+
+
+@pytest.fixture()
+def data():
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(1000, 5))
+    y = X @ rng.normal(size=5) + rng.normal(scale=0.1, size=1000)
+    return X, y
+
+
+def ridge_loss(w, X, y, alpha):
+    return np.mean((y - X @ w) ** 2) + alpha * np.sum(w**2)
+
+
+def ridge_gradient(w, X, y, alpha):
+    return -2 * X.T @ (y - X @ w) / len(y) + 2 * alpha * w
+
+
+def test_accumulate_moments(ridge_tasks, monkeypatch, data):
+    X, y = data
+    # use multiple chunks including a partial last chunk
+    monkeypatch.setattr(ridge_tasks, "LOAD_CHUNK_SAMPLES", 300)
+    gram, xty, yty = ridge_tasks.accumulate_moments(map(tuple, X), y)
+    np.testing.assert_allclose(gram, X.T @ X / len(y))
+    np.testing.assert_allclose(xty, X.T @ y / len(y))
+    assert yty == pytest.approx(y @ y / len(y))
+
+    with pytest.raises(ValueError):
+        ridge_tasks.accumulate_moments(map(tuple, X), y[:-1])
+    with pytest.raises(ValueError):
+        ridge_tasks.accumulate_moments(map(tuple, X[:-1]), y)
+
+
+def test_ridge_loss_and_gradient(ridge_tasks, data):
+    X, y = data
+    moments = ridge_tasks.accumulate_moments(map(tuple, X), y)
+    rng = np.random.default_rng(0)
+    W = rng.normal(size=(10, 5))
+    for w in W:
+        loss, gradient = ridge_tasks.ridge_loss_and_gradient(w, *moments, ALPHA)
+        assert loss == pytest.approx(ridge_loss(w, X, y, ALPHA))
+        np.testing.assert_allclose(gradient, ridge_gradient(w, X, y, ALPHA))
+    np.testing.assert_allclose(
+        ridge_tasks.ridge_loss_batch(W, *moments, ALPHA),
+        [ridge_loss(w, X, y, ALPHA) for w in W],
+    )
+
+
+def test_ridge_solution(ridge_tasks, data):
+    X, y = data
+    gram, xty, _ = ridge_tasks.accumulate_moments(map(tuple, X), y)
+    w = ridge_tasks.ridge_solution(gram, xty, ALPHA)
+    np.testing.assert_allclose(ridge_gradient(w, X, y, ALPHA), 0, atol=1e-10)
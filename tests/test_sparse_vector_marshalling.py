@@ -0,0 +1,85 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the sparse_vector_marshalling module."""
+
+from io import StringIO
+from json import loads
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sparse = pytest.importorskip("scipy.sparse")
+
+from qhana_plugin_runner.plugin_utils.sparse_vector_marshalling import (  # noqa: E402
+    SparseVectors,
+    load_sparse_vectors,
+    save_sparse_vectors,
+)
+
+
+class ResponseDummy:
+    """Dummy to simulate reading a written file as a response object."""
+
+    def __init__(self, data: str) -> None:
+        self.data = data
+
+    def json(self, **kwargs):
+        return loads(self.data, **kwargs)
+
+
+def test_sparse_vectors_roundtrip():
+    values = sparse.random(20, 30, density=0.1, format="coo", random_state=42)
+    vectors = SparseVectors(
+        [f"e{i}" for i in range(20)],
+        [f"http://localhost/e{i}" for i in range(20)],
+        [f"dim{i}" for i in range(30)],
+        values,
+    )
+    output = StringIO()
+    save_sparse_vectors(vectors, output)
+    loaded = load_sparse_vectors(ResponseDummy(output.getvalue()))
+    assert list(loaded.ids) == list(vectors.ids)
+    assert list(loaded.hrefs) == list(vectors.hrefs)
+    assert list(loaded.attributes) == list(vectors.attributes)
+    assert sparse.isspmatrix_csr(loaded.values)
+    assert loaded.values.nnz == values.nnz
+    assert np.array_equal(loaded.values.toarray(), values.toarray())
+
+
+def test_sparse_vectors_format():
+    values = sparse.csr_matrix(np.array([[1, 0, 1], [0, 1, 0]], dtype=np.int32))
+    output = StringIO()
+    save_sparse_vectors(
+        SparseVectors(["e1", "e2"], ["", ""], ["a", "b", "c"], values), output
+    )
+    assert loads(output.getvalue()) == {
+        "ID": ["e1", "e2"],
+        "href": ["", ""],
+        "attributes": ["a", "b", "c"],
+        "indptr": [0, 2, 3],
+        "indices": [0, 2, 1],
+        "data": [1, 1, 1],
+    }
+
+
+def test_sparse_vectors_shape_mismatch():
+    values = sparse.csr_matrix((2, 3))
+    with pytest.raises(ValueError):
+        save_sparse_vectors(
+            SparseVectors(["e1"], [""], ["a", "b", "c"], values), StringIO()
+        )
+    data = '{"ID":["e1"],"href":[""],"attributes":["a"],"indptr":[0,1],"indices":[1],"data":[1]}'
+    with pytest.raises(ValueError):
+        load_sparse_vectors(ResponseDummy(data))
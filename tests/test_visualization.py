@@ -0,0 +1,74 @@
+# Copyright 2024 QHAna plugin runner contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the visualization module."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from qhana_plugin_runner.plugin_utils.visualization import (  # noqa: E402
+    add_background,
+    clear_background_cache,
+    get_mesh_grid,
+    get_model_hash,
+    predict_mesh_grid,
+)
+
+
+class CountingPredictor:
+    """Predicts the label of 2d points with a linear decision boundary and counts the predicted points."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.points = 0
+
+    def __call__(self, points):
+        points = np.asarray(points)
+        self.calls += 1
+        self.points += len(points)
+        return (points[:, 0] + 0.5 * points[:, 1] > 0.3).astype(int).tolist()
+
+
+def test_batched_prediction():
+    x_grid, y_grid = get_mesh_grid(np.array([[0.0, 0.0], [1.0, 1.0]]), 30)
+    predictor = CountingPredictor()
+    labels = predict_mesh_grid(predictor, x_grid, y_grid)
+    assert labels.shape == (len(y_grid), len(x_grid))
+    assert predictor.calls == 1
+    assert predictor.points == labels.size
+
+
+def test_adaptive_resolution():
+    x_grid, y_grid = get_mesh_grid(np.array([[0.0, 0.0], [1.0, 1.0]]), 60)
+    full = predict_mesh_grid(CountingPredictor(), x_grid, y_grid)
+    predictor = CountingPredictor()
+    adaptive = predict_mesh_grid(predictor, x_grid, y_grid, coarse_step=5)
+    assert np.array_equal(full, adaptive)
+    assert predictor.calls == 2
+    assert predictor.points < full.size / 2
+
+
+def test_background_cache():
+    px = pytest.importorskip("plotly.express")
+    clear_background_cache()
+    points = np.array([[0.0, 0.0], [1.0, 1.0]])
+    model_hash = get_model_hash("linear", np.array([1.0, 0.5]))
+    predictor = CountingPredictor()
+    for _ in range(2):
+        scatter = px.scatter(x=points[:, 0], y=points[:, 1], color=["0", "1"])
+        figure = add_background(points, 20, predictor, scatter, model_hash=model_hash)
+    assert predictor.calls == 2  # coarse and refined grid of the first plot
+    assert len(figure.data) == 3
+    assert get_model_hash("linear", np.array([1.0, 0.6])) != model_hash
@@ -12,8 +12,14 @@
 
 """Utilities for unit tests."""
 
+import sys
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
 from typing import Any, Sequence
 
+REPOSITORY_ROOT = Path(__file__).parent.parent
+
 
 def assert_sequence_equals(expected: Sequence[Any], actual: Sequence[Any]):
     """Assert that two sequences contain matching elements."""
@@ -51,3 +57,18 @@ def assert_sequence_partial_equals(
             assert (
                 expected_value == actual_value
             ), f"Attribute '{attr}' of pair {index} is not equal ({expected_value}!={actual_value}). Expected {expected_item} but got {actual_item}"
+
+
+def load_plugin_module(package_path: str, module: str, package_name: str) -> ModuleType:
+    """Import a module of a plugin without importing the plugin itself.
+
+    The directory ``package_path`` (relative to the repository root) is registered
+    as the package ``package_name`` without running its ``__init__.py``, so that
+    only the dependencies of the imported modules are needed. Relative imports
+    between the modules of the directory work as usual.
+    """
+    if package_name not in sys.modules:
+        package = ModuleType(package_name)
+        package.__path__ = [str(REPOSITORY_ROOT / package_path)]
+        sys.modules[package_name] = package
+    return import_module(f"{package_name}.{module}")